@@ -1,7 +1,7 @@
 # file_manager/admin.py
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Document, DocumentCategory, DocumentEmbedding, Regulation
+from .models import Document, DocumentCategory, DocumentEmbedding, DocumentStatusEvent, EmbeddingMigration, EmbeddingSummary, IngestionJob, Regulation, StoredBlob, UploadSession
 
 @admin.register(Document)
 class DocumentAdmin(admin.ModelAdmin):
@@ -29,9 +29,52 @@ class DocumentEmbeddingAdmin(admin.ModelAdmin):
     list_filter = ('model_name', 'created_at')
     search_fields = ('document__title',)
 
+@admin.register(EmbeddingMigration)
+class EmbeddingMigrationAdmin(admin.ModelAdmin):
+    list_display = (
+        'source_model', 'target_model', 'status', 'processed_chunks', 'total_chunks',
+        'estimated_cost', 'activated_at'
+    )
+    list_filter = ('status', 'target_model')
+    readonly_fields = (
+        'last_embedding_id', 'processed_chunks', 'total_tokens', 'estimated_cost', 'elapsed_seconds'
+    )
+
+@admin.register(EmbeddingSummary)
+class EmbeddingSummaryAdmin(admin.ModelAdmin):
+    list_display = ('document', 'model_name', 'chunk_count', 'dimensions', 'total_tokens', 'last_embedded_at')
+    list_filter = ('model_name',)
+    search_fields = ('document__title',)
+
 @admin.register(Regulation)
 class RegulationAdmin(admin.ModelAdmin):
-    list_display = ('title', 'regulation_type', 'status', 'effective_date')
-    list_filter = ('regulation_type', 'status', 'effective_date')
-    search_fields = ('title', 'document__content')
-    date_hierarchy = 'effective_date'
\ No newline at end of file
+    list_display = ('title', 'regulation_type', 'number', 'status', 'effective_date', 'classification_source', 'confidence')
+    list_filter = ('regulation_type', 'status', 'classification_source', 'effective_date')
+    search_fields = ('title', 'number', 'document__content')
+    date_hierarchy = 'effective_date'
+
+@admin.register(StoredBlob)
+class StoredBlobAdmin(admin.ModelAdmin):
+    list_display = ('sha256', 'size', 'mime_type', 'ref_count', 'created_at')
+    search_fields = ('sha256',)
+    readonly_fields = ('sha256', 'path', 'size', 'mime_type', 'ref_count', 'created_at', 'updated_at')
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'user', 'status', 'received_bytes', 'total_size', 'document', 'updated_at')
+    list_filter = ('status',)
+    search_fields = ('filename', 'sha256')
+    readonly_fields = ('token', 'received_bytes', 'sha256', 'document', 'created_at', 'updated_at')
+
+@admin.register(IngestionJob)
+class IngestionJobAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'batch', 'user', 'status', 'document', 'started_at', 'finished_at')
+    list_filter = ('status',)
+    search_fields = ('filename', 'batch')
+    readonly_fields = ('batch', 'blob', 'document', 'error', 'started_at', 'finished_at', 'created_at', 'updated_at')
+
+@admin.register(DocumentStatusEvent)
+class DocumentStatusEventAdmin(admin.ModelAdmin):
+    list_display = ('document', 'status', 'stage', 'progress', 'created_at')
+    list_filter = ('status', 'stage')
+    search_fields = ('document__title',)
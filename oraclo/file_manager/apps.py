@@ -1,6 +1,16 @@
+from pathlib import Path
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class FileManagerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'file_manager'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        # O Django não cria o diretório dos uploads temporários
+        if settings.FILE_UPLOAD_TEMP_DIR:
+            Path(settings.FILE_UPLOAD_TEMP_DIR).mkdir(parents=True, exist_ok=True)
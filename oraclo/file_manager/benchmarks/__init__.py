@@ -0,0 +1 @@
+# file_manager/benchmarks/__init__.py
@@ -0,0 +1,159 @@
+# file_manager/benchmarks/corpus.py
+
+import random
+from html import escape
+from pathlib import Path
+from typing import List
+
+from docx import Document as DocxDocument
+
+CORPUS_FORMATS = ('pdf', 'docx', 'html')
+
+_SUBJECTS = [
+    'O operador', 'A Autoridade Reguladora Nacional', 'O prestador de serviços',
+    'O titular da licença', 'A entidade concessionária', 'O utilizador final',
+]
+_VERBS = [
+    'deve garantir', 'fica obrigado a assegurar', 'pode requerer', 'deve comunicar',
+    'está sujeito a', 'deve publicar',
+]
+_OBJECTS = [
+    'a qualidade do serviço de telecomunicações', 'a atribuição de frequências do espectro',
+    'a portabilidade dos números', 'o pagamento das taxas de regulação',
+    'a interligação entre redes públicas', 'a proteção dos dados dos consumidores',
+    'a cobertura de banda larga móvel', 'o cumprimento do regulamento de numeração',
+]
+_QUALIFIERS = [
+    'no prazo de trinta dias', 'nos termos da Lei n.º 5/2010', 'mediante licença válida',
+    'sob pena de contraordenação', 'em todo o território nacional', 'com periodicidade trimestral',
+]
+
+# Número de páginas por documento: maioritariamente curtos, alguns longos
+PAGE_COUNTS = (1, 2, 3, 5, 8, 20)
+PARAGRAPHS_PER_PAGE = 6
+
+
+def _paragraph(rng: random.Random) -> str:
+    sentences = [
+        f"{rng.choice(_SUBJECTS)} {rng.choice(_VERBS)} {rng.choice(_OBJECTS)} {rng.choice(_QUALIFIERS)}."
+        for _ in range(rng.randint(3, 6))
+    ]
+    return ' '.join(sentences)
+
+
+def _pages(rng: random.Random, number: int, num_pages: int) -> List[List[str]]:
+    pages = []
+    for page in range(num_pages):
+        paragraphs = [f"Artigo {number}.{page + 1}"]
+        paragraphs.extend(_paragraph(rng) for _ in range(PARAGRAPHS_PER_PAGE))
+        pages.append(paragraphs)
+    return pages
+
+
+def _wrap(text: str, width: int = 90) -> List[str]:
+    lines, current = [], ''
+    for word in text.split():
+        if current and len(current) + len(word) + 1 > width:
+            lines.append(current)
+            current = word
+        else:
+            current = f"{current} {word}".strip()
+    if current:
+        lines.append(current)
+    return lines
+
+
+def _pdf_escape(line: str) -> bytes:
+    encoded = line.encode('cp1252', 'replace')
+    return encoded.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def write_pdf(path: Path, pages: List[List[str]]) -> None:
+    """PDF mínimo com camada de texto (Helvetica), sem dependências externas."""
+    objects: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    pages_id = len(objects) + 1 + 2 * len(pages)
+    kids = []
+    for paragraphs in pages:
+        lines = [line for paragraph in paragraphs for line in _wrap(paragraph) + ['']]
+        stream = b"BT /F1 9 Tf 40 800 Td 11 TL " + b"".join(
+            b"(" + _pdf_escape(line) + b") Tj T* " for line in lines
+        ) + b"ET"
+        content = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_id, font, content)
+        ))
+    add(b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % kid for kid in kids) + b"] /Count %d >>" % len(kids))
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog, xref
+    )
+    Path(path).write_bytes(bytes(output))
+
+
+def write_docx(path: Path, pages: List[List[str]]) -> None:
+    document = DocxDocument()
+    for paragraphs in pages:
+        document.add_heading(paragraphs[0], level=2)
+        for paragraph in paragraphs[1:]:
+            document.add_paragraph(paragraph)
+    document.save(str(path))
+
+
+def write_html(path: Path, pages: List[List[str]]) -> None:
+    body = ''.join(
+        f"<h2>{escape(paragraphs[0])}</h2>" + ''.join(f"<p>{escape(p)}</p>" for p in paragraphs[1:])
+        for paragraphs in pages
+    )
+    Path(path).write_text(
+        f'<!DOCTYPE html><html lang="pt"><head><meta charset="utf-8"><title>Regulamento</title>'
+        f'</head><body>{body}</body></html>',
+        encoding='utf-8'
+    )
+
+
+_WRITERS = {'pdf': write_pdf, 'docx': write_docx, 'html': write_html}
+
+
+def build_corpus(directory: Path, num_documents: int = 30, seed: int = 0) -> List[Path]:
+    """
+    Gera um corpus sintético e reprodutível de PDFs, DOCX e HTML.
+
+    Os formatos alternam e o número de páginas segue `PAGE_COUNTS`, pelo que
+    a mesma semente produz sempre os mesmos ficheiros.
+
+    Args:
+        directory: Diretório onde os ficheiros são escritos
+        num_documents: Número de documentos a gerar
+        seed: Semente do gerador de texto
+
+    Returns:
+        List[Path]: Caminhos dos ficheiros gerados
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    paths = []
+    for number in range(num_documents):
+        file_format = CORPUS_FORMATS[number % len(CORPUS_FORMATS)]
+        num_pages = PAGE_COUNTS[(number // len(CORPUS_FORMATS)) % len(PAGE_COUNTS)]
+        path = directory / f"regulamento-{number:03d}.{file_format}"
+        _WRITERS[file_format](path, _pages(rng, number + 1, num_pages))
+        paths.append(path)
+    return paths
@@ -0,0 +1,128 @@
+# file_manager/benchmarks/fakes.py
+
+import re
+import time
+import zlib
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, List
+
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+from langchain_core.language_models import FakeListChatModel
+
+
+class FakeEmbeddings(DeterministicFakeEmbedding):
+    """
+    Modelo de embeddings local e determinístico (o mesmo texto gera sempre o mesmo vetor).
+
+    `latency_ms` simula o tempo de resposta da API por chamada, para que o
+    benchmark reflita o custo de chamadas por fragmento sem usar a rede.
+    """
+    latency_ms: float = 0.0
+
+    def _wait(self) -> None:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self._wait()
+        return super().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        self._wait()
+        return super().embed_query(text)
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Embeddings lexicais locais: saco de palavras projetado por hashing.
+
+    Ao contrário dos vetores aleatórios do `FakeEmbeddings`, textos com palavras
+    em comum ficam próximos, o que torna o recall mensurável sem um modelo real.
+    """
+
+    def __init__(self, size: int = 256):
+        self.size = size
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.size, dtype=np.float32)
+        for token in re.findall(r'\w+', text.lower()):
+            # crc32 é estável entre processos, ao contrário de hash()
+            digest = zlib.crc32(token.encode('utf-8'))
+            vector[digest % self.size] += 1.0 if digest & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class RegisteredHashingEmbeddings(HashingEmbeddings):
+    """
+    `HashingEmbeddings` que o registo sabe criar: em `EMBEDDING_PROVIDERS`, use o
+    caminho desta classe como `BACKEND` (ex.: para simular a troca de modelo).
+    """
+
+    def __init__(self, model_name: str, size: int = 16):
+        super().__init__(size=size)
+        self.model_name = model_name
+
+
+def fake_llm() -> FakeListChatModel:
+    return FakeListChatModel(responses=["Resposta de teste."])
+
+
+class _TextLayerDocument:
+    def __init__(self, pages: List[str]):
+        self.pages = pages
+        self.num_pages = len(pages)
+
+    def export_to_markdown(self) -> str:
+        return '\n\n'.join(self.pages)
+
+
+class TextLayerConverter:
+    """
+    Conversor sem modelos: extrai a camada de texto dos PDFs com o pypdfium2.
+
+    Os modelos de layout do Docling para PDF são descarregados da rede; este
+    conversor permite medir o pipeline offline. Os restantes formatos são
+    delegados ao conversor Docling indicado.
+    """
+
+    def __init__(self, fallback: Any = None):
+        self.fallback = fallback
+
+    def convert(self, source: str) -> Any:
+        if Path(source).suffix.lower() != '.pdf':
+            if self.fallback is None:
+                raise ValueError(f"Formato não suportado sem Docling: {source}")
+            return self.fallback.convert(source)
+
+        import pypdfium2 as pdfium
+
+        pdf = pdfium.PdfDocument(source)
+        try:
+            pages = []
+            for page in pdf:
+                text_page = page.get_textpage()
+                pages.append(text_page.get_text_range())
+                text_page.close()
+                page.close()
+        finally:
+            pdf.close()
+        return SimpleNamespace(document=_TextLayerDocument(pages))
+
+
+def offline_converter() -> Any:
+    """Docling para DOCX/HTML (não precisa de modelos) e camada de texto para PDF."""
+    from docling.datamodel.base_models import InputFormat
+    from docling.document_converter import DocumentConverter
+
+    return TextLayerConverter(
+        fallback=DocumentConverter(allowed_formats=[InputFormat.DOCX, InputFormat.HTML])
+    )
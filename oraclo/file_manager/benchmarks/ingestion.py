@@ -0,0 +1,201 @@
+# file_manager/benchmarks/ingestion.py
+
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..services.document_processor import EMBEDDING_MODEL_NAME, DocumentProcessor
+from .corpus import build_corpus
+from .fakes import FakeEmbeddings, fake_llm, offline_converter
+from .reporting import DEFAULT_TOLERANCE, compare_reports, percentiles
+
+REPORT_VERSION = 1
+STAGES = ('conversion', 'splitting', 'embedding', 'persistence', 'total')
+REPORT_SECTIONS = ('stages', 'throughput', 'memory')
+DEFAULT_BASELINE_PATH = Path(__file__).resolve().parent / 'baselines' / 'ingestion.json'
+
+
+class _TimedComponent:
+    """Envolve um componente do processador e acumula o tempo gasto nos métodos indicados."""
+
+    def __init__(self, component: Any, stage: str, methods: Sequence[str], timings: Dict[str, float]):
+        self._component = component
+        self._stage = stage
+        self._methods = set(methods)
+        self._timings = timings
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._component, name)
+        if name not in self._methods:
+            return attribute
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return attribute(*args, **kwargs)
+            finally:
+                self._timings[self._stage] += time.perf_counter() - started
+        return timed
+
+
+def _instrument(processor: DocumentProcessor) -> Dict[str, float]:
+    timings: Dict[str, float] = defaultdict(float)
+    processor.doc_converter = _TimedComponent(processor.doc_converter, 'conversion', ['convert'], timings)
+    processor.text_splitter = _TimedComponent(processor.text_splitter, 'splitting', ['split_text'], timings)
+    processor.embeddings = _TimedComponent(
+        processor.embeddings, 'embedding', ['embed_query', 'embed_documents'], timings
+    )
+    return timings
+
+
+def _ingest(
+    processor: DocumentProcessor, paths: Iterable[Path], timings: Dict[str, float], trace_memory: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Processa os ficheiros e devolve as medições de cada um.
+
+    Tudo corre numa transação revertida no fim: a base de dados fica como estava
+    e o mesmo corpus pode ser processado várias vezes.
+    """
+    records = []
+    with transaction.atomic():
+        for path in paths:
+            timings.clear()
+            if trace_memory:
+                tracemalloc.reset_peak()
+            started = time.perf_counter()
+            document = processor.process_document(str(path))
+            total = time.perf_counter() - started
+            record = {stage: timings[stage] for stage in ('conversion', 'splitting', 'embedding')}
+            # Cálculo do hash, verificação de duplicados e escritas na base de dados
+            record['persistence'] = total - sum(record.values())
+            record['total'] = total
+            record['chunks'] = document.embeddings.count()
+            record['bytes'] = path.stat().st_size
+            if trace_memory:
+                record['peak_memory'] = tracemalloc.get_traced_memory()[1]
+            records.append(record)
+        transaction.set_rollback(True)
+    return records
+
+
+def run_ingestion_benchmark(
+    num_documents: int = 30,
+    seed: int = 0,
+    repeat: int = 3,
+    embedding_latency_ms: float = 0.0,
+    embedding_size: int = 1536,
+    corpus_dir: Optional[Path] = None,
+    doc_converter: Any = None,
+    measure_memory: bool = True,
+) -> Dict[str, Any]:
+    """
+    Mede o pipeline de ingestão (conversão, divisão, embeddings e persistência) sem rede.
+
+    Usa um modelo de embeddings determinístico e um LLM falso. Antes das medições,
+    o primeiro documento é processado uma vez para aquecer importações e caches.
+    A memória de pico é medida numa passagem separada com `tracemalloc`, para não
+    distorcer as latências.
+
+    Args:
+        num_documents: Número de documentos do corpus sintético
+        seed: Semente do corpus
+        repeat: Número de passagens medidas sobre o corpus
+        embedding_latency_ms: Latência simulada por chamada ao modelo de embeddings
+        embedding_size: Dimensão dos vetores gerados
+        corpus_dir: Diretório com um corpus já existente (em vez do sintético)
+        doc_converter: Conversor a usar (por omissão, o conversor offline)
+        measure_memory: Se deve medir a memória de pico
+
+    Returns:
+        Dict[str, Any]: Relatório com percentis por etapa, débito e memória
+    """
+    processor = DocumentProcessor(
+        embeddings=FakeEmbeddings(size=embedding_size, latency_ms=embedding_latency_ms),
+        llm=fake_llm(),
+        doc_converter=doc_converter or offline_converter(),
+        embedding_model=EMBEDDING_MODEL_NAME,
+    )
+    converter_name = type(processor.doc_converter).__name__
+    timings = _instrument(processor)
+
+    with tempfile.TemporaryDirectory() as temporary:
+        if corpus_dir:
+            paths = sorted(p for p in Path(corpus_dir).iterdir() if p.is_file())
+        else:
+            paths = build_corpus(Path(temporary), num_documents=num_documents, seed=seed)
+        if not paths:
+            raise ValueError("O corpus do benchmark está vazio")
+
+        _ingest(processor, paths[:1], timings)
+
+        records: List[Dict[str, Any]] = []
+        started = time.perf_counter()
+        for _ in range(repeat):
+            records.extend(_ingest(processor, paths, timings))
+        elapsed = time.perf_counter() - started
+
+        peak_memory = None
+        if measure_memory:
+            tracemalloc.start()
+            try:
+                memory_records = _ingest(processor, paths, timings, trace_memory=True)
+            finally:
+                tracemalloc.stop()
+            peak_memory = max(record['peak_memory'] for record in memory_records)
+
+        by_format: Dict[str, int] = defaultdict(int)
+        for path in paths:
+            by_format[path.suffix.lstrip('.').lower()] += 1
+        corpus_bytes = sum(path.stat().st_size for path in paths)
+
+    total_bytes = sum(record['bytes'] for record in records)
+    max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        'version': REPORT_VERSION,
+        'created_at': timezone.now().isoformat(),
+        'environment': {
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'converter': converter_name,
+        },
+        'config': {
+            'repeat': repeat,
+            'seed': seed,
+            'embedding_latency_ms': embedding_latency_ms,
+            'embedding_size': embedding_size,
+        },
+        'corpus': {
+            'documents': len(paths),
+            'bytes': corpus_bytes,
+            'by_format': dict(by_format),
+            'chunks': sum(record['chunks'] for record in records) // repeat,
+        },
+        'stages': {stage: percentiles([record[stage] for record in records]) for stage in STAGES},
+        'throughput': {
+            'documents_per_s': len(records) / elapsed,
+            'chunks_per_s': sum(record['chunks'] for record in records) / elapsed,
+            'mb_per_s': total_bytes / (1024 * 1024) / elapsed,
+        },
+        'memory': {
+            'peak_traced_mb': peak_memory / (1024 * 1024) if peak_memory is not None else None,
+            # ru_maxrss é em KB no Linux
+            'max_rss_mb': max_rss_kb / 1024,
+        },
+    }
+
+
+def compare_ingestion_reports(
+    current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = DEFAULT_TOLERANCE
+) -> List[Dict[str, Any]]:
+    """Compara com a baseline: latências e memória a subir, ou débito a descer, são regressões."""
+    return compare_reports(current, baseline, REPORT_SECTIONS, ('throughput.',), tolerance)
@@ -0,0 +1,86 @@
+# file_manager/benchmarks/reporting.py
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_TOLERANCE = 0.2
+
+
+def percentiles(seconds: Sequence[float]) -> Dict[str, float]:
+    """Percentis e média, em milissegundos, de uma lista de durações em segundos."""
+    milliseconds = np.asarray(seconds, dtype=np.float64) * 1000
+    if milliseconds.size == 0:
+        return {'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0, 'mean_ms': 0.0}
+    return {
+        'p50_ms': float(np.percentile(milliseconds, 50)),
+        'p95_ms': float(np.percentile(milliseconds, 95)),
+        'p99_ms': float(np.percentile(milliseconds, 99)),
+        'mean_ms': float(milliseconds.mean()),
+    }
+
+
+def flatten_metrics(report: Dict[str, Any], sections: Sequence[str]) -> Dict[str, float]:
+    """Achata as secções numéricas do relatório em chaves `secção.sub.métrica`."""
+    metrics: Dict[str, float] = {}
+
+    def walk(prefix: str, value: Any) -> None:
+        if isinstance(value, dict):
+            for name, nested in value.items():
+                walk(f'{prefix}.{name}', nested)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[prefix] = float(value)
+
+    for section in sections:
+        walk(section, report.get(section, {}))
+    return metrics
+
+
+def compare_reports(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    sections: Sequence[str],
+    higher_is_better: Sequence[str] = (),
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> List[Dict[str, Any]]:
+    """
+    Compara um relatório com a baseline, métrica a métrica.
+
+    Uma métrica é regressão quando piora mais do que `tolerance` (fração). Por
+    omissão, maior é pior (latências, memória, tokens); as métricas cujo nome
+    contém um dos padrões de `higher_is_better` (débito, recall) pioram ao descer.
+
+    Returns:
+        List[Dict[str, Any]]: Uma linha por métrica com baseline, valor atual e variação
+    """
+    baseline_metrics = flatten_metrics(baseline, sections)
+    rows = []
+    for metric, value in flatten_metrics(current, sections).items():
+        reference = baseline_metrics.get(metric)
+        if not reference:
+            continue
+        change = (value - reference) / reference
+        worse = -change if any(pattern in metric for pattern in higher_is_better) else change
+        rows.append({
+            'metric': metric,
+            'baseline': reference,
+            'current': value,
+            'change': change,
+            'regression': worse > tolerance,
+        })
+    return rows
+
+
+def load_report(path: Path) -> Optional[Dict[str, Any]]:
+    path = Path(path)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def save_report(report: Dict[str, Any], path: Path) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
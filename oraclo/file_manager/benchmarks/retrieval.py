@@ -0,0 +1,300 @@
+# file_manager/benchmarks/retrieval.py
+
+import copy
+import json
+import random
+import re
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from langchain.chains import ConversationalRetrievalChain
+from langchain_core.callbacks import BaseCallbackHandler
+
+from ..models import Document
+from ..services.ann import INDEX_HNSW, INDEX_IVFPQ, AnnParams, faiss
+from ..services.document_processor import EMBEDDING_MODEL_NAME, DocumentProcessor
+from ..services.sharded_index import SHARD_BY_CATEGORY, SHARD_BY_YEAR, build_sharded_index
+from ..services.vector_index import VectorIndex, VectorIndexRetriever
+from ..utils.tokens import count_tokens
+from .corpus import build_corpus
+from .fakes import HashingEmbeddings, fake_llm, offline_converter
+from .reporting import DEFAULT_TOLERANCE, compare_reports, percentiles
+
+REPORT_VERSION = 1
+REPORT_SECTIONS = ('retrievers',)
+DEFAULT_BASELINE_PATH = Path(__file__).resolve().parent / 'baselines' / 'retrieval.json'
+
+RETRIEVER_MMR = 'mmr'
+RETRIEVER_SIMILARITY = 'similarity'
+RETRIEVER_SHARDED_YEAR = f'sharded-{SHARD_BY_YEAR}'
+RETRIEVER_SHARDED_CATEGORY = f'sharded-{SHARD_BY_CATEGORY}'
+RETRIEVERS = (
+    RETRIEVER_MMR, RETRIEVER_SIMILARITY, INDEX_HNSW, INDEX_IVFPQ,
+    RETRIEVER_SHARDED_YEAR, RETRIEVER_SHARDED_CATEGORY,
+)
+
+
+@dataclass
+class LabelledQuestion:
+    """Pergunta com os títulos dos documentos que a respondem."""
+    question: str
+    relevant: List[str]
+
+
+def load_labelled_set(path: Path) -> List[LabelledQuestion]:
+    """
+    Lê um conjunto rotulado em JSON (lista) ou JSON Lines.
+
+    Cada entrada tem `question` e `relevant` (título ou lista de títulos dos
+    documentos relevantes; por omissão o título é o nome do ficheiro).
+    """
+    text = Path(path).read_text(encoding='utf-8').strip()
+    if text.startswith('['):
+        entries = json.loads(text)
+    else:
+        entries = [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    questions = []
+    for position, entry in enumerate(entries, 1):
+        relevant = entry.get('relevant') if isinstance(entry, dict) else None
+        if isinstance(relevant, str):
+            relevant = [relevant]
+        if not isinstance(entry, dict) or not entry.get('question') or not relevant:
+            raise ValueError(f"Entrada {position} inválida: são necessários 'question' e 'relevant'")
+        questions.append(LabelledQuestion(question=entry['question'], relevant=list(relevant)))
+    return questions
+
+
+def synthetic_labelled_set(documents: Sequence[Document], num_questions: int = 50, seed: int = 0) -> List[LabelledQuestion]:
+    """
+    Gera perguntas a partir de frases dos próprios documentos.
+
+    São relevantes todos os documentos que contêm a frase, pelo que os rótulos
+    são exatos mesmo quando o corpus sintético repete frases.
+    """
+    rng = random.Random(seed)
+    contents = {document.title: ' '.join(document.content.split()) for document in documents}
+    sentences = {
+        title: [s for s in re.split(r'(?<=\.)\s+', content) if len(s) > 40 and not s.startswith('Artigo')]
+        for title, content in contents.items()
+    }
+    titles = sorted(title for title, candidates in sentences.items() if candidates)
+    if not titles:
+        return []
+
+    questions = []
+    for _ in range(num_questions):
+        sentence = rng.choice(sentences[rng.choice(titles)])
+        relevant = sorted(title for title, content in contents.items() if sentence in content)
+        questions.append(LabelledQuestion(question=sentence.rstrip('.'), relevant=relevant))
+    return questions
+
+
+class _PromptTokenCounter(BaseCallbackHandler):
+    """Conta os tokens das mensagens enviadas ao LLM pela chain."""
+
+    def __init__(self):
+        self.tokens = 0
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], **kwargs: Any) -> None:
+        self.tokens += sum(count_tokens(str(message.content)) for batch in messages for message in batch)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs: Any) -> None:
+        self.tokens += sum(count_tokens(prompt) for prompt in prompts)
+
+
+def _token_stats(values: List[int]) -> Dict[str, float]:
+    array = np.asarray(values, dtype=np.float64)
+    if array.size == 0:
+        return {'mean': 0.0, 'p95': 0.0, 'max': 0.0}
+    return {'mean': float(array.mean()), 'p95': float(np.percentile(array, 95)), 'max': float(array.max())}
+
+
+def _build_retrievers(
+    names: Sequence[str], embeddings: Any, k: int, fetch_k: int, directory: Path
+) -> Dict[str, Any]:
+    """
+    Constrói um retriever por configuração, todos sobre os mesmos embeddings.
+
+    Todos usam MMR, como a API de chat, exceto `similarity`. Os índices aproximados
+    são forçados a responder a todas as consultas (`exact_threshold=0`), caso
+    contrário o corpus pequeno cairia na pesquisa exata.
+    """
+    base = VectorIndex.build(EMBEDDING_MODEL_NAME)
+    retrievers: Dict[str, Any] = {}
+    skipped: Dict[str, str] = {}
+
+    for name in names:
+        search_type = RETRIEVER_MMR
+        if name == RETRIEVER_MMR:
+            index = base
+        elif name == RETRIEVER_SIMILARITY:
+            index, search_type = base, RETRIEVER_SIMILARITY
+        elif name in (INDEX_HNSW, INDEX_IVFPQ):
+            if faiss is None:
+                skipped[name] = 'faiss-cpu não instalado'
+                continue
+            index = copy.copy(base)
+            # Corpus pequeno: o PQ pede cerca de 39 vetores de treino por centroide
+            pq_nbits = int(np.clip(np.log2(max(len(base), 1) / 39), 1, 8))
+            params = AnnParams(exact_threshold=0, pq_nbits=pq_nbits)
+            index.build_ann(name, params)
+        elif name in (RETRIEVER_SHARDED_YEAR, RETRIEVER_SHARDED_CATEGORY):
+            shard_by = name.split('-', 1)[1]
+            index = build_sharded_index(directory / name, EMBEDDING_MODEL_NAME, shard_by)
+        else:
+            raise ValueError(f"Retriever desconhecido: {name}")
+
+        retrievers[name] = VectorIndexRetriever(
+            index=index, embeddings=embeddings, search_type=search_type, k=k, fetch_k=fetch_k
+        )
+    return {'retrievers': retrievers, 'skipped': skipped, 'chunks': len(base)}
+
+
+def _evaluate(
+    retriever: Any, questions: List[LabelledQuestion], relevant_ids: List[set], k: int, include_chain: bool
+) -> Dict[str, Any]:
+    latencies, chain_latencies, context_tokens, prompt_tokens = [], [], [], []
+    recall_total, reciprocal_ranks = 0.0, 0.0
+
+    for item, relevant in zip(questions, relevant_ids):
+        started = time.perf_counter()
+        documents = retriever.invoke(item.question)
+        latencies.append(time.perf_counter() - started)
+
+        ranked: List[int] = []
+        for document in documents[:k]:
+            document_id = document.metadata.get('document_id')
+            if document_id not in ranked:
+                ranked.append(document_id)
+        # Com mais documentos relevantes do que k, o máximo atingível é k
+        recall_total += len(relevant & set(ranked)) / min(len(relevant), k) if relevant else 0.0
+        reciprocal_ranks += next(
+            (1 / position for position, doc_id in enumerate(ranked, 1) if doc_id in relevant), 0.0
+        )
+        # O contexto que a chain "stuff" junta e envia ao LLM
+        context_tokens.append(count_tokens('\n\n'.join(d.page_content for d in documents)))
+
+        if include_chain:
+            counter = _PromptTokenCounter()
+            chain = ConversationalRetrievalChain.from_llm(
+                llm=fake_llm(), retriever=retriever, return_source_documents=True
+            )
+            started = time.perf_counter()
+            chain.invoke({'question': item.question, 'chat_history': []}, config={'callbacks': [counter]})
+            chain_latencies.append(time.perf_counter() - started)
+            prompt_tokens.append(counter.tokens)
+
+    result = {
+        'recall_at_k': recall_total / len(questions),
+        'mrr': reciprocal_ranks / len(questions),
+        'latency': percentiles(latencies),
+        'context_tokens': _token_stats(context_tokens),
+    }
+    if include_chain:
+        result['chain_latency'] = percentiles(chain_latencies)
+        result['prompt_tokens'] = _token_stats(prompt_tokens)
+    return result
+
+
+def run_retrieval_benchmark(
+    retrievers: Sequence[str] = RETRIEVERS,
+    k: int = 5,
+    fetch_k: int = 10,
+    num_documents: int = 30,
+    num_questions: int = 50,
+    seed: int = 0,
+    dataset: Optional[Path] = None,
+    corpus_dir: Optional[Path] = None,
+    include_chain: bool = True,
+) -> Dict[str, Any]:
+    """
+    Mede a qualidade e a latência dos retrievers usados pelas APIs de chat e pesquisa.
+
+    O corpus (sintético ou `corpus_dir`) é ingerido com embeddings lexicais locais
+    numa transação revertida no fim; cada retriever configurado responde ao mesmo
+    conjunto rotulado. Sem rede: embeddings e LLM são substitutos locais.
+
+    Args:
+        retrievers: Configurações a comparar (ver `RETRIEVERS`)
+        k: Número de fragmentos devolvidos (recall@k)
+        fetch_k: Candidatos considerados pelo MMR
+        num_documents: Dimensão do corpus sintético
+        num_questions: Perguntas geradas quando não há `dataset`
+        seed: Semente do corpus e das perguntas
+        dataset: Conjunto rotulado (ver `load_labelled_set`)
+        corpus_dir: Ficheiros a ingerir em vez do corpus sintético
+        include_chain: Mede também a chain de QA completa (latência e tokens do prompt)
+
+    Returns:
+        Dict[str, Any]: Relatório com recall@k, MRR, latências e tokens por retriever
+    """
+    embeddings = HashingEmbeddings()
+    processor = DocumentProcessor(
+        embeddings=embeddings, llm=fake_llm(), doc_converter=offline_converter(),
+        embedding_model=EMBEDDING_MODEL_NAME,
+    )
+
+    with tempfile.TemporaryDirectory() as temporary, transaction.atomic():
+        temporary = Path(temporary)
+        if corpus_dir:
+            paths = sorted(p for p in Path(corpus_dir).iterdir() if p.is_file())
+        else:
+            paths = build_corpus(temporary / 'corpus', num_documents=num_documents, seed=seed)
+        documents = [processor.process_document(str(path)) for path in paths]
+        if not documents:
+            raise ValueError("O corpus do benchmark está vazio")
+
+        if dataset:
+            questions = load_labelled_set(dataset)
+        else:
+            questions = synthetic_labelled_set(documents, num_questions=num_questions, seed=seed)
+        if not questions:
+            raise ValueError("O conjunto rotulado está vazio")
+
+        ids_by_title: Dict[str, set] = {}
+        for document in documents:
+            ids_by_title.setdefault(document.title, set()).add(document.pk)
+        relevant_ids = [
+            set().union(*(ids_by_title.get(title, set()) for title in item.relevant))
+            for item in questions
+        ]
+
+        built = _build_retrievers(retrievers, embeddings, k, fetch_k, temporary / 'indexes')
+        results = {
+            name: _evaluate(retriever, questions, relevant_ids, k, include_chain)
+            for name, retriever in built['retrievers'].items()
+        }
+        transaction.set_rollback(True)
+
+    return {
+        'version': REPORT_VERSION,
+        'created_at': timezone.now().isoformat(),
+        'environment': {'python': sys.version.split()[0]},
+        'config': {
+            'k': k,
+            'fetch_k': fetch_k,
+            'seed': seed,
+            'documents': len(documents),
+            'chunks': built['chunks'],
+            'questions': len(questions),
+            'embeddings': f'{type(embeddings).__name__}({embeddings.size})',
+            'dataset': str(dataset) if dataset else 'synthetic',
+        },
+        'retrievers': results,
+        'skipped': built['skipped'],
+    }
+
+
+def compare_retrieval_reports(
+    current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = DEFAULT_TOLERANCE
+) -> List[Dict[str, Any]]:
+    """Compara com a baseline: recall e MRR a descer, ou latência e tokens a subir, são regressões."""
+    return compare_reports(current, baseline, REPORT_SECTIONS, ('.recall_at_k', '.mrr'), tolerance)
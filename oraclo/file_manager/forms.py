@@ -6,6 +6,13 @@ class DocumentUploadForm(forms.ModelForm):
     """
     Formulário para upload de documentos.
     """
+    categories = forms.ModelMultipleChoiceField(
+        label='Categorias',
+        queryset=DocumentCategory.objects.order_by('path'),
+        required=False,
+        widget=forms.SelectMultiple(attrs={'class': 'form-control'})
+    )
+
     class Meta:
         model = Document
         fields = ['title', 'file_path', 'document_type']
@@ -0,0 +1,60 @@
+# file_manager/management/commands/audit_queries.py
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from file_manager.services.query_audit import audit_views, seed_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        'Executa EXPLAIN nas consultas de cada página sobre um corpus sintético grande '
+        'e assinala as tabelas lidas por inteiro. Nada é gravado: tudo é desfeito no fim.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--documents', type=int, default=20000, help='Documentos a gerar')
+        parser.add_argument('--categories', type=int, default=200, help='Categorias a gerar')
+        parser.add_argument('--no-seed', action='store_true', help='Auditar sobre os dados existentes')
+        parser.add_argument('--plans', action='store_true', help='Mostrar o plano de todas as consultas')
+        parser.add_argument(
+            '--fail-on-scan',
+            action='store_true',
+            help='Terminar com erro se alguma página ler uma tabela inteira (para CI)'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if not options['no_seed']:
+                counts = seed_dataset(options['documents'], options['categories'])
+                self.stdout.write(
+                    f"Corpus sintético ({connection.vendor}): " +
+                    ', '.join(f"{count} {name}" for name, count in counts.items())
+                )
+            user = User(username='auditoria-de-consultas', is_active=True)
+            audits = audit_views(user)
+            transaction.set_rollback(True)
+
+        flagged = 0
+        for audit in audits:
+            problems = audit.flagged
+            flagged += len(problems)
+            style = self.style.ERROR if problems else self.style.SUCCESS
+            self.stdout.write(style(
+                f"{audit.request.name:<28} {len(audit.plans):>2} consultas, {len(problems)} com leitura completa"
+            ))
+            for plan in audit.plans:
+                if plan not in problems and not options['plans']:
+                    continue
+                if plan in problems:
+                    self.stdout.write(f"  ! leitura completa de {', '.join(plan.full_scans)}")
+                if plan.temp_sort:
+                    self.stdout.write("  ! ordenação sem índice")
+                self.stdout.write(f"    {plan.sql[:300]}")
+                for line in plan.plan:
+                    self.stdout.write(f"      {line}")
+
+        if flagged and options['fail_on_scan']:
+            raise CommandError(f"{flagged} consultas com leitura completa de tabelas")
+        self.stdout.write(self.style.SUCCESS("Auditoria concluída") if not flagged else
+                          self.style.WARNING(f"Auditoria concluída: {flagged} consultas a rever"))
@@ -0,0 +1,108 @@
+# file_manager/management/commands/benchmark_ingestion.py
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from file_manager.benchmarks.ingestion import (
+    DEFAULT_BASELINE_PATH,
+    STAGES,
+    compare_ingestion_reports,
+    run_ingestion_benchmark,
+)
+from file_manager.benchmarks.reporting import DEFAULT_TOLERANCE, load_report, save_report
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede o pipeline de ingestão (conversão, divisão, embeddings e persistência) '
+        'num corpus sintético, sem rede, e compara com a baseline guardada.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--documents', type=int, default=30)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument(
+            '--embedding-latency-ms', type=float, default=0.0,
+            help='Latência simulada por chamada ao modelo de embeddings'
+        )
+        parser.add_argument('--corpus-dir', help='Usar os ficheiros deste diretório em vez do corpus sintético')
+        parser.add_argument(
+            '--docling-pdf', action='store_true',
+            help='Converter PDFs com o pipeline completo do Docling (precisa dos modelos de layout)'
+        )
+        parser.add_argument('--no-memory', action='store_true', help='Não medir a memória de pico')
+        parser.add_argument('--output', help='Guardar o relatório JSON neste ficheiro')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE_PATH))
+        parser.add_argument('--save-baseline', action='store_true', help='Substituir a baseline por este resultado')
+        parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+        parser.add_argument(
+            '--fail-on-regression', action='store_true',
+            help='Terminar com erro se alguma métrica regredir além da tolerância'
+        )
+
+    def handle(self, *args, **options):
+        doc_converter = None
+        if options['docling_pdf']:
+            from file_manager.services.document_processor import DocumentProcessor
+            doc_converter = DocumentProcessor.setup_document_converter()
+
+        try:
+            report = run_ingestion_benchmark(
+                num_documents=options['documents'],
+                seed=options['seed'],
+                repeat=options['repeat'],
+                embedding_latency_ms=options['embedding_latency_ms'],
+                corpus_dir=options['corpus_dir'],
+                doc_converter=doc_converter,
+                measure_memory=not options['no_memory'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        corpus = report['corpus']
+        self.stdout.write(
+            f"{corpus['documents']} documentos ({corpus['bytes'] / 1024:.0f} KB, {corpus['chunks']} fragmentos), "
+            f"{report['config']['repeat']} passagens, conversor {report['environment']['converter']}"
+        )
+        self.stdout.write(f"{'etapa':<12} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'média ms':>9}")
+        for stage in STAGES:
+            values = report['stages'][stage]
+            self.stdout.write(
+                f"{stage:<12} {values['p50_ms']:>9.2f} {values['p95_ms']:>9.2f} "
+                f"{values['p99_ms']:>9.2f} {values['mean_ms']:>9.2f}"
+            )
+        throughput, memory = report['throughput'], report['memory']
+        self.stdout.write(
+            f"Débito: {throughput['documents_per_s']:.1f} doc/s, {throughput['chunks_per_s']:.1f} fragmentos/s, "
+            f"{throughput['mb_per_s']:.2f} MB/s"
+        )
+        if memory['peak_traced_mb'] is not None:
+            self.stdout.write(f"Memória de pico: {memory['peak_traced_mb']:.1f} MB (Python), "
+                              f"{memory['max_rss_mb']:.0f} MB RSS")
+
+        if options['output']:
+            save_report(report, Path(options['output']))
+
+        baseline_path = Path(options['baseline'])
+        baseline = load_report(baseline_path)
+        regressions = []
+        if baseline is not None:
+            rows = compare_ingestion_reports(report, baseline, options['tolerance'])
+            regressions = [row for row in rows if row['regression']]
+            self.stdout.write(f"Comparação com {baseline_path} (tolerância {options['tolerance']:.0%}):")
+            for row in rows:
+                line = (
+                    f"  {row['metric']:<32} {row['baseline']:>10.2f} -> {row['current']:>10.2f} "
+                    f"({row['change']:+.1%})"
+                )
+                self.stdout.write(self.style.ERROR(line) if row['regression'] else line)
+        else:
+            self.stdout.write(f"Sem baseline em {baseline_path}")
+
+        if options['save_baseline']:
+            save_report(report, baseline_path)
+            self.stdout.write(self.style.SUCCESS(f"Baseline guardada em {baseline_path}"))
+
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f"{len(regressions)} métricas regrediram além da tolerância")
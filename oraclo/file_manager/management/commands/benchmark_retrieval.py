@@ -0,0 +1,105 @@
+# file_manager/management/commands/benchmark_retrieval.py
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from file_manager.benchmarks.reporting import DEFAULT_TOLERANCE, load_report, save_report
+from file_manager.benchmarks.retrieval import (
+    DEFAULT_BASELINE_PATH,
+    RETRIEVERS,
+    compare_retrieval_reports,
+    run_retrieval_benchmark,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede recall@k, MRR, latência e tokens de contexto dos retrievers das APIs de chat '
+        'e pesquisa, com embeddings e LLM locais, e compara com a baseline guardada.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retrievers', default=','.join(RETRIEVERS),
+            help='Retrievers separados por vírgulas'
+        )
+        parser.add_argument('--k', type=int, default=5)
+        parser.add_argument('--fetch-k', type=int, default=10)
+        parser.add_argument('--documents', type=int, default=30)
+        parser.add_argument('--questions', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--dataset', help='Conjunto rotulado (JSON ou JSON Lines) com question/relevant')
+        parser.add_argument('--corpus-dir', help='Ficheiros a ingerir em vez do corpus sintético')
+        parser.add_argument('--no-chain', action='store_true', help='Não medir a chain de QA completa')
+        parser.add_argument('--output', help='Guardar o relatório JSON neste ficheiro')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE_PATH))
+        parser.add_argument('--save-baseline', action='store_true', help='Substituir a baseline por este resultado')
+        parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+        parser.add_argument(
+            '--fail-on-regression', action='store_true',
+            help='Terminar com erro se alguma métrica regredir além da tolerância'
+        )
+
+    def handle(self, *args, **options):
+        retrievers = [name.strip() for name in options['retrievers'].split(',') if name.strip()]
+        try:
+            report = run_retrieval_benchmark(
+                retrievers=retrievers,
+                k=options['k'],
+                fetch_k=options['fetch_k'],
+                num_documents=options['documents'],
+                num_questions=options['questions'],
+                seed=options['seed'],
+                dataset=options['dataset'],
+                corpus_dir=options['corpus_dir'],
+                include_chain=not options['no_chain'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        config = report['config']
+        self.stdout.write(
+            f"{config['documents']} documentos, {config['chunks']} fragmentos, "
+            f"{config['questions']} perguntas, k={config['k']}"
+        )
+        self.stdout.write(
+            f"{'retriever':<18} {'recall':>7} {'MRR':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+            f"{'tokens ctx':>10} {'tokens prompt':>13}"
+        )
+        for name, values in report['retrievers'].items():
+            latency = values['latency']
+            prompt_tokens = values.get('prompt_tokens', {}).get('mean')
+            self.stdout.write(
+                f"{name:<18} {values['recall_at_k']:>7.3f} {values['mrr']:>6.3f} "
+                f"{latency['p50_ms']:>8.2f} {latency['p95_ms']:>8.2f} {latency['p99_ms']:>8.2f} "
+                f"{values['context_tokens']['mean']:>10.0f} "
+                f"{prompt_tokens if prompt_tokens is None else round(prompt_tokens):>13}"
+            )
+        for name, reason in report['skipped'].items():
+            self.stdout.write(self.style.WARNING(f"{name} ignorado: {reason}"))
+
+        if options['output']:
+            save_report(report, Path(options['output']))
+
+        baseline_path = Path(options['baseline'])
+        baseline = load_report(baseline_path)
+        regressions = []
+        if baseline is not None:
+            rows = compare_retrieval_reports(report, baseline, options['tolerance'])
+            regressions = [row for row in rows if row['regression']]
+            self.stdout.write(f"Comparação com {baseline_path} (tolerância {options['tolerance']:.0%}):")
+            for row in rows:
+                line = (
+                    f"  {row['metric']:<44} {row['baseline']:>10.3f} -> {row['current']:>10.3f} "
+                    f"({row['change']:+.1%})"
+                )
+                self.stdout.write(self.style.ERROR(line) if row['regression'] else line)
+        else:
+            self.stdout.write(f"Sem baseline em {baseline_path}")
+
+        if options['save_baseline']:
+            save_report(report, baseline_path)
+            self.stdout.write(self.style.SUCCESS(f"Baseline guardada em {baseline_path}"))
+
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f"{len(regressions)} métricas regrediram além da tolerância")
@@ -0,0 +1,45 @@
+# file_manager/management/commands/benchmark_vector_index.py
+from django.core.management.base import BaseCommand, CommandError
+
+from file_manager.services.ann import INDEX_HNSW, INDEX_IVFPQ, benchmark_index_types
+from file_manager.services.embeddings import active_embedding_model
+from file_manager.services.vector_index import VectorIndex
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede recall@k e latência dos índices aproximados face à pesquisa exata, '
+        'usando os embeddings guardados.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', default=None, help='Modelo de embedding (por omissão, o modelo ativo)')
+        parser.add_argument('--k', type=int, default=10)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument(
+            '--index-types',
+            default=f'{INDEX_HNSW},{INDEX_IVFPQ}',
+            help='Tipos de índice separados por vírgulas'
+        )
+
+    def handle(self, *args, **options):
+        options['model'] = options['model'] or active_embedding_model()
+        index = VectorIndex.build(options['model'])
+        if len(index) == 0:
+            raise CommandError(f"Não existem embeddings para o modelo {options['model']}")
+
+        index_types = [t.strip() for t in options['index_types'].split(',') if t.strip()]
+        try:
+            results = benchmark_index_types(
+                index.vectors, index_types, k=options['k'], num_queries=options['queries']
+            )
+        except ImportError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"{len(index)} fragmentos, recall@{options['k']}")
+        self.stdout.write(f"{'índice':<8} {'parâmetro':<16} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8} {'build s':>8}")
+        for row in results:
+            self.stdout.write(
+                f"{row['index_type']:<8} {row['param'] or '-':<16} {row['recall']:>7.3f} "
+                f"{row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['build_s']:>8.1f}"
+            )
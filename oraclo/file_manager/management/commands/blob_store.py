@@ -0,0 +1,55 @@
+# file_manager/management/commands/blob_store.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from file_manager.models import Document
+from file_manager.services.blob_store import GARBAGE_GRACE_PERIOD, BlobStore
+from file_manager.services.chunked_upload import expire_sessions
+
+
+class Command(BaseCommand):
+    help = 'Manutenção do armazenamento de arquivos endereçado por conteúdo (blobs).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--adopt',
+            action='store_true',
+            help='Mover para o armazenamento os arquivos dos documentos que ainda não têm blob'
+        )
+        parser.add_argument('--recount', action='store_true', help='Recalcular as referências a partir dos documentos')
+        parser.add_argument(
+            '--gc',
+            action='store_true',
+            help='Apagar os blobs sem documentos e os uploads em partes abandonados'
+        )
+        parser.add_argument(
+            '--grace-hours',
+            type=float,
+            default=GARBAGE_GRACE_PERIOD.total_seconds() / 3600,
+            help='Só apagar blobs sem referências há mais de N horas'
+        )
+
+    def handle(self, *args, **options):
+        store = BlobStore()
+
+        if options['adopt']:
+            adopted = sum(
+                store.adopt(document)
+                for document in Document.objects.filter(blob__isnull=True).exclude(file_path='').iterator()
+            )
+            self.stdout.write(f"Documentos migrados para o armazenamento: {adopted}")
+        if options['recount']:
+            self.stdout.write(f"Blobs com referências corrigidas: {store.recount()}")
+        if options['gc']:
+            self.stdout.write(f"Uploads em partes expirados: {expire_sessions()}")
+            removed = store.collect_garbage(timedelta(hours=options['grace_hours']))
+            self.stdout.write(f"Blobs apagados: {removed}")
+
+        stats = store.stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['blobs']} blobs ({stats['unreferenced']} sem referências), "
+            f"{filesizeformat(stats['stored_bytes'])} guardados, "
+            f"{filesizeformat(stats['saved_bytes'])} poupados pela deduplicação"
+        ))
@@ -0,0 +1,65 @@
+# file_manager/management/commands/build_vector_index.py
+from django.core.management.base import BaseCommand, CommandError
+
+from file_manager.services.ann import INDEX_AUTO, INDEX_TYPES, AnnParams
+from file_manager.services.embeddings import active_embedding_model
+from file_manager.services.sharded_index import SHARD_STRATEGIES
+from file_manager.services.vector_index import build_vector_index, vector_index_path
+
+
+class Command(BaseCommand):
+    help = 'Constrói e guarda o índice vetorial de recuperação (exato, HNSW ou IVF-PQ).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            default=None,
+            help='Modelo de embedding a indexar (por omissão, o modelo ativo)'
+        )
+        parser.add_argument(
+            '--index-type',
+            choices=(INDEX_AUTO,) + INDEX_TYPES,
+            default=None,
+            help='Tipo de índice (por omissão settings.VECTOR_INDEX_TYPE, ou auto)'
+        )
+        parser.add_argument(
+            '--shard-by',
+            choices=('none',) + SHARD_STRATEGIES,
+            default=None,
+            help='Dividir o índice em shards (por omissão settings.VECTOR_INDEX_SHARD_BY)'
+        )
+        parser.add_argument(
+            '--shard',
+            action='append',
+            dest='shards',
+            help='Reconstruir apenas este shard (pode ser repetido)'
+        )
+        parser.add_argument('--hnsw-m', type=int, default=32)
+        parser.add_argument('--ef-search', type=int, default=64)
+        parser.add_argument('--nlist', type=int, default=None)
+        parser.add_argument('--nprobe', type=int, default=16)
+
+    def handle(self, *args, **options):
+        options['model'] = options['model'] or active_embedding_model()
+        params = AnnParams(
+            hnsw_m=options['hnsw_m'],
+            ef_search=options['ef_search'],
+            nlist=options['nlist'],
+            nprobe=options['nprobe'],
+        )
+        shard_by = '' if options['shard_by'] == 'none' else options['shard_by']
+        try:
+            index = build_vector_index(
+                options['model'],
+                options['index_type'],
+                params,
+                shard_by=shard_by,
+                only_shards=set(options['shards'] or []),
+            )
+        except (ImportError, ValueError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Índice {index.index_type} com {len(index)} fragmentos guardado em "
+            f"{vector_index_path(options['model'])}"
+        ))
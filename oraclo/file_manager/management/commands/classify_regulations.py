@@ -0,0 +1,50 @@
+# file_manager/management/commands/classify_regulations.py
+from django.core.management.base import BaseCommand
+
+from file_manager.services.regulation_classifier import RegulationClassifier, classify_corpus, pending_documents
+
+
+class Command(BaseCommand):
+    help = (
+        'Classifica os documentos processados como regulamentos: regras para os casos claros, '
+        'LLM em lote para os restantes. Só trata os documentos ainda não classificados.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reclassify',
+            action='store_true',
+            help='Classificar de novo todos os documentos (as classificações manuais são mantidas)'
+        )
+        parser.add_argument('--rules-only', action='store_true', help='Não chamar o LLM')
+        parser.add_argument('--limit', type=int, default=None, help='Classificar no máximo N documentos')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Documentos lidos e gravados de cada vez')
+        parser.add_argument('--dry-run', action='store_true', help='Classificar sem gravar')
+
+    def handle(self, *args, **options):
+        documents = pending_documents(reclassify=options['reclassify'])
+        if options['limit']:
+            documents = documents.filter(pk__in=list(documents.values_list('pk', flat=True)[:options['limit']]))
+
+        report = classify_corpus(
+            classifier=RegulationClassifier(use_llm=not options['rules_only']),
+            documents=documents,
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+        )
+
+        self.stdout.write(
+            f"{report['documents']} documentos em {report['seconds']:.1f}s: "
+            f"{report['rules']} pelas regras, {report['llm']} pelo LLM, "
+            f"{report['unclassified']} por classificar"
+        )
+        self.stdout.write(
+            f"  {report['regulations']} regulamentos, {report['not_regulations']} outros documentos"
+        )
+        if options['dry_run']:
+            self.stdout.write("Simulação: nada foi gravado.")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Regulamentos criados: {report['created']}, atualizados: {report['updated']}, "
+                f"removidos: {report['deleted']}"
+            ))
@@ -0,0 +1,48 @@
+# file_manager/management/commands/list_profiles.py
+from django.core.management.base import BaseCommand, CommandError
+
+from file_manager.utils.profiling import list_profiles, profiling_config
+
+
+class Command(BaseCommand):
+    help = 'Lista os perfis de pedidos guardados ou mostra o detalhe de um perfil.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('profile_id', nargs='?', help='Mostrar o detalhe deste perfil')
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--functions', type=int, default=15, help='Funções a mostrar no detalhe')
+
+    def handle(self, *args, **options):
+        directory = profiling_config()['DIRECTORY']
+        profiles = list_profiles(directory)
+
+        if not options['profile_id']:
+            if not profiles:
+                self.stdout.write(f"Sem perfis em {directory}")
+                return
+            self.stdout.write(f"{'id':<25} {'view':<24} {'estado':>6} {'duração s':>10} {'SQL':>5}")
+            for profile in profiles[:options['limit']]:
+                self.stdout.write(
+                    f"{profile['id']:<25} {profile['view']:<24} {profile['status'] or '-':>6} "
+                    f"{profile['duration_s']:>10.3f} {profile['sql']['count']:>5}"
+                )
+            return
+
+        profile = next((p for p in profiles if p['id'] == options['profile_id']), None)
+        if profile is None:
+            raise CommandError(f"Perfil não encontrado: {options['profile_id']}")
+
+        self.stdout.write(
+            f"{profile['method']} {profile['path']} ({profile['view']}) -> {profile['status']}, "
+            f"{profile['duration_s']:.3f}s, utilizador {profile['user'] or 'anónimo'}"
+        )
+        self.stdout.write(
+            f"SQL: {profile['sql']['count']} consultas, {profile['sql']['seconds'] * 1000:.1f} ms"
+        )
+        self.stdout.write('Etapas:')
+        for stage, totals in sorted(profile['stages'].items(), key=lambda item: -item[1]['seconds']):
+            self.stdout.write(f"  {stage:<18} {totals['seconds'] * 1000:>10.1f} ms  ({totals['count']}x)")
+        self.stdout.write('Funções (tempo acumulado):')
+        for row in profile['top_functions'][:options['functions']]:
+            self.stdout.write(f"  {row['cumulative_s'] * 1000:>10.1f} ms {row['calls']:>7}  {row['function']}")
+        self.stdout.write(f"Perfil completo: {directory / (profile['id'] + '.prof')}")
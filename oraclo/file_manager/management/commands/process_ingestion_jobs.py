@@ -0,0 +1,46 @@
+# file_manager/management/commands/process_ingestion_jobs.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from file_manager.models import IngestionJob
+from file_manager.services.ingestion import requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Processa os trabalhos de ingestão em lote que ficaram em fila.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requeue',
+            action='store_true',
+            help='Voltar a pôr em fila os trabalhos interrompidos a meio (estado "Processando" há mais de --stale-after)'
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=None,
+            help="Minutos em processamento a partir dos quais um trabalho está interrompido "
+                 "(por omissão BULK_INGESTION['STALE_AFTER_MINUTES'])"
+        )
+        parser.add_argument('--limit', type=int, default=None, help='Processar no máximo N trabalhos')
+
+    def handle(self, *args, **options):
+        if options['requeue']:
+            stale_after = timedelta(minutes=options['stale_after']) if options['stale_after'] is not None else None
+            requeued = requeue_stale_jobs(stale_after)
+            self.stdout.write(f"Trabalhos de volta à fila: {requeued}")
+
+        job_ids = IngestionJob.objects.filter(status=IngestionJob.JobStatus.QUEUED).values_list('pk', flat=True)
+        if options['limit']:
+            job_ids = job_ids[:options['limit']]
+
+        totals = {}
+        for job_id in list(job_ids):
+            job = run_job(job_id)
+            totals[job.status] = totals.get(job.status, 0) + 1
+            if job.status == IngestionJob.JobStatus.FAILED:
+                self.stderr.write(f"{job.filename}: {job.error}")
+
+        summary = ', '.join(f"{status}: {count}" for status, count in sorted(totals.items())) or 'nenhum trabalho em fila'
+        self.stdout.write(self.style.SUCCESS(f"Ingestão concluída ({summary})"))
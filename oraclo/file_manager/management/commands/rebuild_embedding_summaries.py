@@ -0,0 +1,21 @@
+# file_manager/management/commands/rebuild_embedding_summaries.py
+from django.core.management.base import BaseCommand
+
+from file_manager.services.embedding_summary import rebuild_embedding_summaries
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os resumos de embeddings dos documentos a partir dos fragmentos gravados.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--document',
+            type=int,
+            action='append',
+            dest='documents',
+            help='Só este documento (pode repetir-se)'
+        )
+
+    def handle(self, *args, **options):
+        written = rebuild_embedding_summaries(options['documents'])
+        self.stdout.write(self.style.SUCCESS(f"Resumos de embeddings gravados: {written}"))
@@ -0,0 +1,88 @@
+# file_manager/management/commands/reembed_documents.py
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from file_manager.models import EmbeddingMigration
+from file_manager.services.embeddings import active_embedding_model
+from file_manager.services.reembedding import (
+    DEFAULT_BATCH_SIZE,
+    activate_migration,
+    migration_report,
+    run_migration,
+    start_migration,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-indexa todos os fragmentos com um novo modelo de embedding, em lotes, e troca o '
+        'modelo ativo no fim. Pode ser interrompido: volta a correr para retomar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('target_model', nargs='?', help='Modelo de destino (em settings.EMBEDDING_PROVIDERS)')
+        parser.add_argument('--source', help='Modelo de origem (por omissão, o modelo ativo)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--max-batches', type=int, default=None, help='Parar ao fim de N lotes')
+        parser.add_argument(
+            '--no-activate',
+            action='store_true',
+            help='Não trocar o modelo ativo no fim (usar --activate depois de validar)'
+        )
+        parser.add_argument('--activate', type=int, metavar='ID', help='Ativar uma migração concluída')
+        parser.add_argument('--status', action='store_true', help='Listar as migrações')
+
+    def handle(self, *args, **options):
+        if options['status']:
+            self._print_status()
+            return
+
+        try:
+            if options['activate']:
+                migration = EmbeddingMigration.objects.filter(pk=options['activate']).first()
+                if migration is None:
+                    raise CommandError(f"Migração não encontrada: {options['activate']}")
+                activate_migration(migration)
+                self.stdout.write(self.style.SUCCESS(f"Modelo ativo: {migration.target_model}"))
+                return
+
+            if not options['target_model']:
+                raise CommandError("Indique o modelo de destino, --activate ou --status")
+
+            migration = start_migration(options['target_model'], options['source'], options['batch_size'])
+            if migration.last_embedding_id:
+                self.stdout.write(
+                    f"A retomar a migração {migration.pk} após o fragmento {migration.last_embedding_id}"
+                )
+            run_migration(
+                migration,
+                max_batches=options['max_batches'],
+                activate=not options['no_activate'],
+            )
+        except (ImproperlyConfigured, ValueError) as e:
+            raise CommandError(str(e))
+
+        self._print_report(migration_report(migration))
+        if migration.status != EmbeddingMigration.MigrationStatus.COMPLETED:
+            self.stdout.write("Migração por terminar; volte a correr o comando para continuar.")
+        elif migration.activated_at:
+            self.stdout.write(self.style.SUCCESS(f"Modelo ativo: {migration.target_model}"))
+        else:
+            self.stdout.write(f"Para ativar: reembed_documents --activate {migration.pk}")
+
+    def _print_report(self, report):
+        self.stdout.write(
+            f"Migração {report['id']} {report['source_model']} -> {report['target_model']} "
+            f"({report['status']}): {report['processed_chunks']}/{report['total_chunks']} fragmentos "
+            f"({report['progress']:.0%})"
+        )
+        self.stdout.write(
+            f"  {report['chunks_per_second']:.1f} fragmentos/s, {report['tokens_per_second']:.0f} tokens/s, "
+            f"{report['tokens']} tokens, custo estimado ${report['estimated_cost']:.4f}, "
+            f"{report['elapsed_seconds']:.1f}s"
+        )
+
+    def _print_status(self):
+        self.stdout.write(f"Modelo ativo: {active_embedding_model()}")
+        for migration in EmbeddingMigration.objects.all():
+            self._print_report(migration_report(migration))
@@ -0,0 +1,27 @@
+# file_manager/middleware.py
+import time
+
+from .utils.metrics import REQUEST_DURATION, REQUESTS_TOTAL, metrics_enabled, registry
+
+
+class MetricsMiddleware:
+    """Regista a duração e o estado de cada pedido, por view."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not metrics_enabled():
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unmatched'
+        registry.observe(
+            REQUEST_DURATION, time.perf_counter() - started, {'view': view, 'method': request.method}
+        )
+        registry.inc(
+            REQUESTS_TOTAL, labels={'view': view, 'method': request.method, 'status': response.status_code}
+        )
+        return response
@@ -0,0 +1,60 @@
+# Generated by Django 5.1.4 on 2026-10-19 11:21
+
+from django.db import migrations, models
+
+
+def backfill_chunk_content(apps, schema_editor):
+    """
+    Preenche o texto e a posição dos fragmentos já existentes.
+
+    Os embeddings foram criados pela ordem dos fragmentos do divisor de texto
+    (chunk_size=1000, chunk_overlap=200), por isso a mesma divisão do conteúdo
+    do documento reproduz o texto de cada embedding.
+    """
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    Document = apps.get_model('file_manager', 'Document')
+    DocumentEmbedding = apps.get_model('file_manager', 'DocumentEmbedding')
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200,
+        length_function=len,
+        add_start_index=True
+    )
+
+    document_ids = DocumentEmbedding.objects.values_list('document_id', flat=True).distinct()
+    for document in Document.objects.filter(id__in=document_ids).exclude(content=''):
+        embeddings = list(document.embeddings.order_by('id'))
+        chunks = splitter.split_text(document.content)
+        if len(chunks) != len(embeddings):
+            continue
+        for chunk_index, (embedding, chunk) in enumerate(zip(embeddings, chunks)):
+            embedding.chunk_index = chunk_index
+            embedding.content = chunk
+        DocumentEmbedding.objects.bulk_update(embeddings, ['chunk_index', 'content'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_manager', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='categories',
+            field=models.ManyToManyField(blank=True, help_text='Categorias às quais o documento pertence', to='file_manager.documentcategory', verbose_name='Categorias'),
+        ),
+        migrations.AddField(
+            model_name='documentembedding',
+            name='chunk_index',
+            field=models.PositiveIntegerField(default=0, help_text='Posição do fragmento de texto dentro do documento', verbose_name='Índice do Fragmento'),
+        ),
+        migrations.AddField(
+            model_name='documentembedding',
+            name='content',
+            field=models.TextField(blank=True, help_text='Texto do fragmento que originou o embedding', verbose_name='Texto do Fragmento'),
+        ),
+        migrations.RunPython(backfill_chunk_content, migrations.RunPython.noop),
+    ]
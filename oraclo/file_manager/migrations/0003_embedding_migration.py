@@ -0,0 +1,40 @@
+# Generated by Django 5.1.4 on 2026-10-19 11:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_manager', '0002_retrieval_filters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmbeddingMigration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Data e hora de criação do registro', verbose_name='Data de Criação')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Data e hora da última atualização', verbose_name='Última Atualização')),
+                ('source_model', models.CharField(help_text='Modelo cujos fragmentos são re-indexados', max_length=100, verbose_name='Modelo de Origem')),
+                ('target_model', models.CharField(help_text='Modelo que gera os novos embeddings', max_length=100, verbose_name='Modelo de Destino')),
+                ('status', models.CharField(choices=[('PENDING', 'Pendente'), ('RUNNING', 'Em execução'), ('COMPLETED', 'Concluída'), ('FAILED', 'Falhou')], default='PENDING', max_length=20, verbose_name='Status')),
+                ('batch_size', models.PositiveIntegerField(default=256, verbose_name='Tamanho do Lote')),
+                ('last_embedding_id', models.BigIntegerField(default=0, help_text='ID do último embedding de origem já re-indexado', verbose_name='Último Fragmento Processado')),
+                ('total_chunks', models.PositiveIntegerField(default=0, verbose_name='Total de Fragmentos')),
+                ('processed_chunks', models.PositiveIntegerField(default=0, verbose_name='Fragmentos Processados')),
+                ('total_tokens', models.PositiveBigIntegerField(default=0, verbose_name='Tokens Processados')),
+                ('estimated_cost', models.FloatField(default=0.0, help_text='Custo estimado em dólares, pelo preço por 1000 tokens do modelo', verbose_name='Custo Estimado')),
+                ('elapsed_seconds', models.FloatField(default=0.0, verbose_name='Tempo de Processamento (s)')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Início')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Fim')),
+                ('activated_at', models.DateTimeField(blank=True, help_text='Momento em que o modelo de destino passou a ser o modelo ativo', null=True, verbose_name='Ativação')),
+                ('error', models.TextField(blank=True, verbose_name='Erro')),
+            ],
+            options={
+                'verbose_name': 'Migração de Embeddings',
+                'verbose_name_plural': 'Migrações de Embeddings',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-19 11:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_manager', '0003_embedding_migration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='regulation',
+            name='classification_source',
+            field=models.CharField(choices=[('RULES', 'Regras'), ('LLM', 'Modelo de linguagem'), ('MANUAL', 'Manual')], default='MANUAL', max_length=10, verbose_name='Origem da Classificação'),
+        ),
+        migrations.AddField(
+            model_name='regulation',
+            name='confidence',
+            field=models.FloatField(blank=True, help_text='Confiança da classificação automática (0 a 1)', null=True, verbose_name='Confiança'),
+        ),
+        migrations.AddField(
+            model_name='regulation',
+            name='number',
+            field=models.CharField(blank=True, help_text='Número do diploma (ex.: 5/2010)', max_length=50, verbose_name='Número'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_manager', '0004_regulation_classification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='file_size',
+            field=models.BigIntegerField(blank=True, help_text='Tamanho em bytes, registado no processamento', null=True, verbose_name='Tamanho do Arquivo'),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='mime_type',
+            field=models.CharField(blank=True, help_text='Tipo MIME detetado no processamento', max_length=100, verbose_name='Tipo MIME'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_manager', '0005_document_file_info'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Data e hora de criação do registro', verbose_name='Data de Criação')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Data e hora da última atualização', verbose_name='Última Atualização')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('path', models.CharField(help_text='Caminho relativo ao diretório dos blobs', max_length=255, verbose_name='Caminho')),
+                ('size', models.BigIntegerField(help_text='Tamanho em bytes', verbose_name='Tamanho')),
+                ('mime_type', models.CharField(blank=True, max_length=100, verbose_name='Tipo MIME')),
+                ('ref_count', models.PositiveIntegerField(default=0, help_text='Número de documentos que usam este conteúdo', verbose_name='Referências')),
+            ],
+            options={
+                'verbose_name': 'Blob',
+                'verbose_name_plural': 'Blobs',
+            },
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='blob',
+            field=models.ForeignKey(blank=True, help_text='Conteúdo do arquivo no armazenamento endereçado por hash', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='documents', to='file_manager.storedblob', verbose_name='Conteúdo'),
+        ),
+    ]
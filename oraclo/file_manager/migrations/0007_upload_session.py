@@ -0,0 +1,41 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:10
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_manager', '0006_stored_blob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Data e hora de criação do registro', verbose_name='Data de Criação')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Data e hora da última atualização', verbose_name='Última Atualização')),
+                ('token', models.UUIDField(default=uuid.uuid4, editable=False, unique=True, verbose_name='Identificador')),
+                ('filename', models.CharField(max_length=255, verbose_name='Nome do Arquivo')),
+                ('title', models.CharField(blank=True, max_length=255, verbose_name='Título')),
+                ('total_size', models.BigIntegerField(help_text='Tamanho do arquivo em bytes', verbose_name='Tamanho Total')),
+                ('received_bytes', models.BigIntegerField(default=0, verbose_name='Bytes Recebidos')),
+                ('expected_sha256', models.CharField(blank=True, help_text='Hash indicado pelo cliente, verificado no fim', max_length=64, verbose_name='SHA-256 Esperado')),
+                ('sha256', models.CharField(blank=True, max_length=64, verbose_name='SHA-256')),
+                ('status', models.CharField(choices=[('ACTIVE', 'Em curso'), ('COMPLETED', 'Concluído'), ('FAILED', 'Falhou'), ('ABORTED', 'Cancelado')], default='ACTIVE', max_length=20, verbose_name='Status')),
+                ('error', models.TextField(blank=True, verbose_name='Erro')),
+                ('document', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_sessions', to='file_manager.document')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Sessão de Upload',
+                'verbose_name_plural': 'Sessões de Upload',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
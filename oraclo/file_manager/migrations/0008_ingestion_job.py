@@ -0,0 +1,39 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:14
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_manager', '0007_upload_session'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Data e hora de criação do registro', verbose_name='Data de Criação')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Data e hora da última atualização', verbose_name='Última Atualização')),
+                ('batch', models.UUIDField(db_index=True, default=uuid.uuid4, verbose_name='Lote')),
+                ('filename', models.CharField(help_text='Nome do arquivo (ou caminho dentro do arquivo compactado)', max_length=255, verbose_name='Nome do Arquivo')),
+                ('status', models.CharField(choices=[('QUEUED', 'Em fila'), ('PROCESSING', 'Processando'), ('COMPLETED', 'Concluído'), ('DUPLICATE', 'Duplicado'), ('FAILED', 'Falhou')], db_index=True, default='QUEUED', max_length=20, verbose_name='Status')),
+                ('error', models.TextField(blank=True, verbose_name='Erro')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Início')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Fim')),
+                ('blob', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ingestion_jobs', to='file_manager.storedblob')),
+                ('document', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ingestion_jobs', to='file_manager.document')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ingestion_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Trabalho de Ingestão',
+                'verbose_name_plural': 'Trabalhos de Ingestão',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_manager', '0008_ingestion_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'Pendente'), ('PROCESSING', 'Processando'), ('PROCESSED', 'Processado'), ('ERROR', 'Erro')], max_length=20, verbose_name='Status')),
+                ('stage', models.CharField(blank=True, help_text='Etapa do processamento concluída (conversion, splitting, embedding…)', max_length=30, verbose_name='Etapa')),
+                ('progress', models.FloatField(blank=True, help_text='Fração do processamento concluída, de 0 a 1', null=True, verbose_name='Progresso')),
+                ('message', models.TextField(blank=True, verbose_name='Mensagem')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_events', to='file_manager.document')),
+            ],
+            options={
+                'verbose_name': 'Evento de Status',
+                'verbose_name_plural': 'Eventos de Status',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Torna explícita a tabela intermédia de Document.categories.
+
+    A tabela criada automaticamente (file_manager_document_categories, com as
+    colunas document_id e documentcategory_id) é adotada tal como está: só o
+    estado dos modelos muda, os dados não são copiados. Depois acrescenta-se o
+    índice (categoria, documento).
+    """
+
+    dependencies = [
+        ('file_manager', '0009_document_status_event'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='DocumentCategoryLink',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('category', models.ForeignKey(db_column='documentcategory_id', on_delete=django.db.models.deletion.CASCADE, related_name='document_links', to='file_manager.documentcategory')),
+                        ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_links', to='file_manager.document')),
+                    ],
+                    options={
+                        'verbose_name': 'Categoria do Documento',
+                        'verbose_name_plural': 'Categorias do Documento',
+                        'db_table': 'file_manager_document_categories',
+                        'unique_together': {('document', 'category')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='document',
+                    name='categories',
+                    field=models.ManyToManyField(blank=True, help_text='Categorias às quais o documento pertence', related_name='documents', through='file_manager.DocumentCategoryLink', to='file_manager.documentcategory', verbose_name='Categorias'),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='documentcategorylink',
+            index=models.Index(fields=['category', 'document'], name='doc_category_link_cat_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_manager', '0010_document_category_link'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmbeddingSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Data e hora de criação do registro', verbose_name='Data de Criação')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Data e hora da última atualização', verbose_name='Última Atualização')),
+                ('model_name', models.CharField(max_length=100, verbose_name='Modelo de Embedding')),
+                ('chunk_count', models.PositiveIntegerField(default=0, verbose_name='Fragmentos')),
+                ('dimensions', models.PositiveIntegerField(default=0, verbose_name='Dimensões')),
+                ('total_tokens', models.PositiveBigIntegerField(default=0, help_text='Tokens dos fragmentos enviados ao modelo', verbose_name='Tokens')),
+                ('last_embedded_at', models.DateTimeField(blank=True, null=True, verbose_name='Último Embedding')),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='embedding_summaries', to='file_manager.document')),
+            ],
+            options={
+                'verbose_name': 'Resumo de Embeddings',
+                'verbose_name_plural': 'Resumos de Embeddings',
+                'ordering': ['model_name'],
+                'constraints': [models.UniqueConstraint(fields=('document', 'model_name'), name='unique_embedding_summary')],
+            },
+        ),
+    ]
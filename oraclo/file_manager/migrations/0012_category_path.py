@@ -0,0 +1,39 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:25
+
+from django.db import migrations, models
+
+
+def build_paths(apps, schema_editor):
+    """Calcula o caminho materializado das categorias existentes, da raiz para baixo."""
+    DocumentCategory = apps.get_model('file_manager', 'DocumentCategory')
+    children = {}
+    for category_id, parent_id in DocumentCategory.objects.values_list('id', 'parent_id'):
+        children.setdefault(parent_id, []).append(category_id)
+
+    pending = [(category_id, '') for category_id in children.get(None, [])]
+    while pending:
+        category_id, parent_path = pending.pop()
+        path = f'{parent_path}{category_id}/'
+        DocumentCategory.objects.filter(pk=category_id).update(path=path, depth=parent_path.count('/'))
+        pending.extend((child_id, path) for child_id in children.get(category_id, []))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_manager', '0011_embedding_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentcategory',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Profundidade'),
+        ),
+        migrations.AddField(
+            model_name='documentcategory',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='IDs da raiz até esta categoria, terminados por "/"', max_length=255, verbose_name='Caminho'),
+        ),
+        migrations.RunPython(build_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_manager', '0012_category_path'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['-created_at'], name='document_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['status', '-created_at'], name='document_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['document_type', '-created_at'], name='document_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['file_hash'], name='document_file_hash_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='regulation',
+            index=models.Index(fields=['-effective_date'], name='regulation_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='regulation',
+            index=models.Index(fields=['status', '-effective_date'], name='regulation_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='regulation',
+            index=models.Index(fields=['regulation_type', '-effective_date'], name='regulation_type_date_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_manager', '0013_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='documentembedding',
+            index=models.Index(fields=['model_name', 'id'], name='embedding_model_id_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_manager', '0014_embedding_model_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='documentstatusevent',
+            index=models.Index(fields=['created_at'], name='status_event_created_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:57
+
+from django.db import migrations, models
+
+
+def clear_repeated_hashes(apps, schema_editor):
+    """
+    Deixa o hash só num documento por conteúdo (o processado, ou o mais antigo)
+    antes da restrição de unicidade; os restantes ficam sem hash.
+    """
+    Document = apps.get_model('file_manager', 'Document')
+    repeated = (
+        Document.objects.exclude(file_hash='')
+        .values('file_hash')
+        .annotate(total=models.Count('id'))
+        .filter(total__gt=1)
+        .values_list('file_hash', flat=True)
+    )
+    for file_hash in list(repeated):
+        documents = Document.objects.filter(file_hash=file_hash)
+        kept = (
+            documents.exclude(status='ERROR').order_by('pk').first()
+            or documents.order_by('pk').first()
+        )
+        documents.exclude(pk=kept.pk).update(file_hash='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_manager', '0015_status_event_created_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='document',
+            name='document_file_hash_idx',
+        ),
+        migrations.RunPython(clear_repeated_hashes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='document',
+            constraint=models.UniqueConstraint(condition=models.Q(('file_hash', ''), _negated=True), fields=('file_hash',), name='unique_document_file_hash'),
+        ),
+    ]
@@ -1,14 +1,25 @@
 # file_manager/models/__init__.py
 from .base import TimeStampedModel
 from .document import Document
-from .category import DocumentCategory
-from .embeddings import DocumentEmbedding
+from .category import DocumentCategory, DocumentCategoryLink
+from .embeddings import DocumentEmbedding, EmbeddingMigration, EmbeddingSummary
 from .regulation import Regulation
+from .storage import StoredBlob
+from .uploads import UploadSession
+from .ingestion import IngestionJob
+from .events import DocumentStatusEvent
 
 __all__ = [
     'TimeStampedModel',
     'Document',
     'DocumentCategory',
+    'DocumentCategoryLink',
     'DocumentEmbedding',
+    'DocumentStatusEvent',
+    'EmbeddingMigration',
+    'EmbeddingSummary',
+    'IngestionJob',
     'Regulation',
+    'StoredBlob',
+    'UploadSession',
 ]
\ No newline at end of file
@@ -1,11 +1,38 @@
 # file_manager/models/category.py
-from django.db import models
+from typing import Dict, Iterable, List, Set
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Concat, Substr
 from django.utils.translation import gettext_lazy as _
 from .base import TimeStampedModel
 
+# Separador do caminho materializado: "1/4/9/" é a categoria 9, filha da 4, neta da 1
+PATH_SEPARATOR = '/'
+
+
+def subtree_q(path: str, prefix: str = '') -> Q:
+    """
+    Condição "caminho começa por `path`" escrita como intervalo, que usa o índice
+    em qualquer base de dados (o LIKE do SQLite ignora maiúsculas e não o usa).
+
+    Args:
+        path: Caminho da raiz da subárvore (terminado pelo separador)
+        prefix: Relação até à categoria, ex.: 'categories__'
+    """
+    upper = path[:-1] + chr(ord(PATH_SEPARATOR) + 1)
+    return Q(**{f'{prefix}path__gte': path, f'{prefix}path__lt': upper})
+
+
 class DocumentCategory(TimeStampedModel):
     """
     Modelo para categorização de documentos.
+
+    Além do `parent`, cada categoria guarda o caminho materializado desde a raiz
+    (`path`, com os IDs dos antecessores) e a profundidade. Uma subárvore é um
+    prefixo do caminho e os antecessores estão no próprio caminho: ambos se
+    obtêm numa consulta indexada. O caminho é mantido em `save`; mover uma
+    categoria atualiza todos os descendentes num único UPDATE.
     """
     name = models.CharField(
         _('Nome'),
@@ -27,10 +54,152 @@ class DocumentCategory(TimeStampedModel):
         related_name='children'
     )
 
+    path = models.CharField(
+        _('Caminho'),
+        max_length=255,
+        blank=True,
+        editable=False,
+        db_index=True,
+        help_text=_('IDs da raiz até esta categoria, terminados por "/"')
+    )
+
+    depth = models.PositiveSmallIntegerField(
+        _('Profundidade'),
+        default=0,
+        editable=False
+    )
+
     class Meta:
         verbose_name = _('Categoria')
         verbose_name_plural = _('Categorias')
         ordering = ['name']
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+    def _parent_path(self) -> str:
+        # Lido da base de dados: o pai em cache pode ter sido movido entretanto
+        if not self.parent_id:
+            return ''
+        return DocumentCategory.objects.filter(pk=self.parent_id).values_list('path', flat=True).first() or ''
+
+    def _check_parent(self, parent_path: str) -> None:
+        if self.pk and str(self.pk) in parent_path.split(PATH_SEPARATOR):
+            raise ValidationError({'parent': _('Uma categoria não pode ficar dentro de si própria')})
+
+    def clean(self):
+        super().clean()
+        self._check_parent(self._parent_path())
+
+    def save(self, *args, **kwargs):
+        parent_path = self._parent_path()
+        self._check_parent(parent_path)
+
+        with transaction.atomic():
+            previous = DocumentCategory.objects.filter(pk=self.pk).values('path', 'depth').first() if self.pk else None
+            super().save(*args, **kwargs)
+
+            self.path = f'{parent_path}{self.pk}{PATH_SEPARATOR}'
+            self.depth = parent_path.count(PATH_SEPARATOR)
+            if previous is None or previous['path'] != self.path:
+                DocumentCategory.objects.filter(pk=self.pk).update(path=self.path, depth=self.depth)
+            if previous and previous['path'] and previous['path'] != self.path:
+                # Mudança de pai: reescrever o prefixo de toda a subárvore de uma vez
+                old_path = previous['path']
+                DocumentCategory.objects.filter(subtree_q(old_path)).exclude(pk=self.pk).update(
+                    path=Concat(Value(self.path), Substr('path', len(old_path) + 1)),
+                    depth=F('depth') + (self.depth - previous['depth']),
+                )
+
+    @property
+    def ancestor_ids(self) -> List[int]:
+        """IDs dos antecessores, da raiz até ao pai (sem consultas)."""
+        return [int(part) for part in self.path.split(PATH_SEPARATOR)[:-2]]
+
+    def get_ancestors(self) -> List['DocumentCategory']:
+        """Antecessores, da raiz até ao pai, numa só consulta."""
+        return list(DocumentCategory.objects.filter(pk__in=self.ancestor_ids).order_by('depth'))
+
+    def get_descendants(self, include_self: bool = True) -> models.QuerySet:
+        """Subcategorias a qualquer profundidade (intervalo de caminhos, indexado)."""
+        descendants = DocumentCategory.objects.filter(subtree_q(self.path))
+        return descendants if include_self else descendants.exclude(pk=self.pk)
+
+    def get_descendant_ids(self, include_self: bool = True) -> Set[int]:
+        """
+        Devolve os IDs de todas as subcategorias (a qualquer profundidade).
+        """
+        return set(self.get_descendants(include_self).values_list('id', flat=True))
+
+    @staticmethod
+    def subtree_ids(category_ids: Iterable[int]) -> Set[int]:
+        """
+        IDs das categorias indicadas e de todas as suas subcategorias.
+
+        Uma consulta para os caminhos e outra para as subárvores, seja qual for
+        o número de categorias ou a profundidade.
+        """
+        paths = DocumentCategory.objects.filter(pk__in=list(category_ids)).values_list('path', flat=True)
+        conditions = Q()
+        for path in paths:
+            conditions |= subtree_q(path)
+        if not conditions:
+            return set()
+        return set(DocumentCategory.objects.filter(conditions).values_list('id', flat=True))
+
+    @staticmethod
+    def as_tree(categories: Iterable['DocumentCategory']) -> List['DocumentCategory']:
+        """
+        Ordena categorias já carregadas em árvore (cada pai seguido dos filhos,
+        irmãos por nome), sem consultas. Acrescenta a cada uma `child_count`.
+        """
+        categories = list(categories)
+        children: Dict[int, List['DocumentCategory']] = {}
+        for category in categories:
+            children.setdefault(category.parent_id, []).append(category)
+
+        ordered: List['DocumentCategory'] = []
+        known = {category.pk for category in categories}
+        roots = [category for category in categories if category.parent_id not in known]
+        pending = sorted(roots, key=lambda category: category.name, reverse=True)
+        while pending:
+            category = pending.pop()
+            category.child_count = len(children.get(category.pk, []))
+            ordered.append(category)
+            pending.extend(sorted(children.get(category.pk, []), key=lambda child: child.name, reverse=True))
+        return ordered
+
+
+class DocumentCategoryLink(models.Model):
+    """
+    Ligação entre um documento e uma categoria (tabela intermédia de
+    `Document.categories`).
+
+    A tabela é a mesma que o Django criava para a relação; o índice
+    (categoria, documento) serve as consultas no sentido inverso, como os
+    documentos de uma categoria ou de uma subárvore, só com o índice.
+    """
+    document = models.ForeignKey(
+        'Document',
+        on_delete=models.CASCADE,
+        related_name='category_links'
+    )
+
+    category = models.ForeignKey(
+        DocumentCategory,
+        on_delete=models.CASCADE,
+        db_column='documentcategory_id',
+        related_name='document_links'
+    )
+
+    class Meta:
+        db_table = 'file_manager_document_categories'
+        verbose_name = _('Categoria do Documento')
+        verbose_name_plural = _('Categorias do Documento')
+        unique_together = [('document', 'category')]
+        indexes = [
+            models.Index(fields=['category', 'document'], name='doc_category_link_cat_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.document_id} -> {self.category_id}"
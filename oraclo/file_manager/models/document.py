@@ -60,11 +60,63 @@ class Document(TimeStampedModel):
         help_text=_('Hash SHA-256 do arquivo para verificação de duplicidade')
     )
     
+    blob = models.ForeignKey(
+        'StoredBlob',
+        verbose_name=_('Conteúdo'),
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='documents',
+        help_text=_('Conteúdo do arquivo no armazenamento endereçado por hash')
+    )
+
+    file_size = models.BigIntegerField(
+        _('Tamanho do Arquivo'),
+        null=True,
+        blank=True,
+        help_text=_('Tamanho em bytes, registado no processamento')
+    )
+
+    mime_type = models.CharField(
+        _('Tipo MIME'),
+        max_length=100,
+        blank=True,
+        help_text=_('Tipo MIME detetado no processamento')
+    )
+
     metadata = models.JSONField(
         _('Metadados'),
         default=dict,
         help_text=_('Metadados adicionais do documento')
     )
 
+    categories = models.ManyToManyField(
+        'DocumentCategory',
+        verbose_name=_('Categorias'),
+        through='DocumentCategoryLink',
+        related_name='documents',
+        blank=True,
+        help_text=_('Categorias às quais o documento pertence')
+    )
+
+    class Meta:
+        # Derivados das consultas das páginas: lista (ordem por data, filtros por
+        # tipo e status), página inicial (documentos recentes, contagem por tipo)
+        # e deteção de duplicados pelo hash
+        indexes = [
+            models.Index(fields=['-created_at'], name='document_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='document_status_created_idx'),
+            models.Index(fields=['document_type', '-created_at'], name='document_type_created_idx'),
+        ]
+        constraints = [
+            # Um documento por conteúdo, mesmo com dois envios em simultâneo
+            # (também serve de índice à deteção de duplicados)
+            models.UniqueConstraint(
+                fields=['file_hash'],
+                condition=~models.Q(file_hash=''),
+                name='unique_document_file_hash'
+            ),
+        ]
+
     def __str__(self):
         return f"{self.title} ({self.document_type})"
\ No newline at end of file
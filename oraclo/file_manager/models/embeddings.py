@@ -25,9 +25,150 @@ class DocumentEmbedding(TimeStampedModel):
         help_text=_('Nome do modelo usado para gerar o embedding')
     )
 
+    chunk_index = models.PositiveIntegerField(
+        _('Índice do Fragmento'),
+        default=0,
+        help_text=_('Posição do fragmento de texto dentro do documento')
+    )
+
+    content = models.TextField(
+        _('Texto do Fragmento'),
+        blank=True,
+        help_text=_('Texto do fragmento que originou o embedding')
+    )
+
     class Meta:
         verbose_name = _('Embedding')
         verbose_name_plural = _('Embeddings')
         indexes = [
-            models.Index(fields=['document', 'model_name'])
-        ]
\ No newline at end of file
+            models.Index(fields=['document', 'model_name']),
+            # Modelos com fragmentos e fragmentos posteriores a uma versão do índice
+            models.Index(fields=['model_name', 'id'], name='embedding_model_id_idx'),
+        ]
+
+class EmbeddingSummary(TimeStampedModel):
+    """
+    Estatísticas dos embeddings de um documento para um modelo, mantidas na
+    ingestão e na re-indexação: a página do documento mostra-as sem ler os vetores.
+    """
+    document = models.ForeignKey(
+        Document,
+        on_delete=models.CASCADE,
+        related_name='embedding_summaries'
+    )
+
+    model_name = models.CharField(
+        _('Modelo de Embedding'),
+        max_length=100
+    )
+
+    chunk_count = models.PositiveIntegerField(
+        _('Fragmentos'),
+        default=0
+    )
+
+    dimensions = models.PositiveIntegerField(
+        _('Dimensões'),
+        default=0
+    )
+
+    total_tokens = models.PositiveBigIntegerField(
+        _('Tokens'),
+        default=0,
+        help_text=_('Tokens dos fragmentos enviados ao modelo')
+    )
+
+    last_embedded_at = models.DateTimeField(
+        _('Último Embedding'),
+        null=True,
+        blank=True
+    )
+
+    class Meta:
+        verbose_name = _('Resumo de Embeddings')
+        verbose_name_plural = _('Resumos de Embeddings')
+        ordering = ['model_name']
+        constraints = [
+            models.UniqueConstraint(fields=['document', 'model_name'], name='unique_embedding_summary')
+        ]
+
+    def __str__(self):
+        return f"{self.document_id} ({self.model_name}): {self.chunk_count} fragmentos"
+
+
+class EmbeddingMigration(TimeStampedModel):
+    """
+    Re-indexação do corpus de um modelo de embedding para outro.
+
+    Os fragmentos do modelo de origem são processados por ordem de ID, em lotes;
+    `last_embedding_id` é gravado na mesma transação que os vetores de cada lote,
+    pelo que o trabalho retoma do último lote concluído após uma falha.
+    """
+    class MigrationStatus(models.TextChoices):
+        PENDING = 'PENDING', _('Pendente')
+        RUNNING = 'RUNNING', _('Em execução')
+        COMPLETED = 'COMPLETED', _('Concluída')
+        FAILED = 'FAILED', _('Falhou')
+
+    source_model = models.CharField(
+        _('Modelo de Origem'),
+        max_length=100,
+        help_text=_('Modelo cujos fragmentos são re-indexados')
+    )
+
+    target_model = models.CharField(
+        _('Modelo de Destino'),
+        max_length=100,
+        help_text=_('Modelo que gera os novos embeddings')
+    )
+
+    status = models.CharField(
+        _('Status'),
+        max_length=20,
+        choices=MigrationStatus.choices,
+        default=MigrationStatus.PENDING
+    )
+
+    batch_size = models.PositiveIntegerField(
+        _('Tamanho do Lote'),
+        default=256
+    )
+
+    last_embedding_id = models.BigIntegerField(
+        _('Último Fragmento Processado'),
+        default=0,
+        help_text=_('ID do último embedding de origem já re-indexado')
+    )
+
+    total_chunks = models.PositiveIntegerField(_('Total de Fragmentos'), default=0)
+    processed_chunks = models.PositiveIntegerField(_('Fragmentos Processados'), default=0)
+    total_tokens = models.PositiveBigIntegerField(_('Tokens Processados'), default=0)
+    estimated_cost = models.FloatField(
+        _('Custo Estimado'),
+        default=0.0,
+        help_text=_('Custo estimado em dólares, pelo preço por 1000 tokens do modelo')
+    )
+    elapsed_seconds = models.FloatField(_('Tempo de Processamento (s)'), default=0.0)
+
+    started_at = models.DateTimeField(_('Início'), null=True, blank=True)
+    finished_at = models.DateTimeField(_('Fim'), null=True, blank=True)
+    activated_at = models.DateTimeField(
+        _('Ativação'),
+        null=True,
+        blank=True,
+        help_text=_('Momento em que o modelo de destino passou a ser o modelo ativo')
+    )
+    error = models.TextField(_('Erro'), blank=True)
+
+    class Meta:
+        verbose_name = _('Migração de Embeddings')
+        verbose_name_plural = _('Migrações de Embeddings')
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.source_model} → {self.target_model} ({self.get_status_display()})"
+
+    @property
+    def throughput(self) -> float:
+        """Fragmentos por segundo de processamento."""
+        return self.processed_chunks / self.elapsed_seconds if self.elapsed_seconds else 0.0
@@ -0,0 +1,59 @@
+# file_manager/models/events.py
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+from .document import Document
+
+class DocumentStatusEvent(models.Model):
+    """
+    Mudança de status ou etapa concluída no processamento de um documento.
+
+    Os eventos só são acrescentados; o `id` crescente serve de cursor ao feed
+    de alterações (api/documents/events/), e `created_at` indica há quanto
+    tempo falta um `id` ainda não confirmado (ver status_feed.next_cursor).
+    """
+    document = models.ForeignKey(
+        Document,
+        on_delete=models.CASCADE,
+        related_name='status_events'
+    )
+
+    status = models.CharField(
+        _('Status'),
+        max_length=20,
+        choices=Document.DocumentStatus.choices
+    )
+
+    stage = models.CharField(
+        _('Etapa'),
+        max_length=30,
+        blank=True,
+        help_text=_('Etapa do processamento concluída (conversion, splitting, embedding…)')
+    )
+
+    progress = models.FloatField(
+        _('Progresso'),
+        null=True,
+        blank=True,
+        help_text=_('Fração do processamento concluída, de 0 a 1')
+    )
+
+    message = models.TextField(
+        _('Mensagem'),
+        blank=True
+    )
+
+    created_at = models.DateTimeField(
+        _('Data de Criação'),
+        auto_now_add=True
+    )
+
+    class Meta:
+        verbose_name = _('Evento de Status')
+        verbose_name_plural = _('Eventos de Status')
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['created_at'], name='status_event_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.document_id}: {self.status} {self.stage}".strip()
@@ -0,0 +1,91 @@
+# file_manager/models/ingestion.py
+import uuid
+
+from django.conf import settings
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+from .base import TimeStampedModel
+from .document import Document
+from .storage import StoredBlob
+
+class IngestionJob(TimeStampedModel):
+    """
+    Processamento de um arquivo recebido pela API de ingestão em lote.
+
+    Os trabalhos do mesmo pedido partilham `batch`, consultado numa só chamada.
+    """
+    class JobStatus(models.TextChoices):
+        QUEUED = 'QUEUED', _('Em fila')
+        PROCESSING = 'PROCESSING', _('Processando')
+        COMPLETED = 'COMPLETED', _('Concluído')
+        DUPLICATE = 'DUPLICATE', _('Duplicado')
+        FAILED = 'FAILED', _('Falhou')
+
+    batch = models.UUIDField(
+        _('Lote'),
+        default=uuid.uuid4,
+        db_index=True
+    )
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='ingestion_jobs'
+    )
+
+    filename = models.CharField(
+        _('Nome do Arquivo'),
+        max_length=255,
+        help_text=_('Nome do arquivo (ou caminho dentro do arquivo compactado)')
+    )
+
+    status = models.CharField(
+        _('Status'),
+        max_length=20,
+        choices=JobStatus.choices,
+        default=JobStatus.QUEUED,
+        db_index=True
+    )
+
+    blob = models.ForeignKey(
+        StoredBlob,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='ingestion_jobs'
+    )
+
+    document = models.ForeignKey(
+        Document,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='ingestion_jobs'
+    )
+
+    error = models.TextField(
+        _('Erro'),
+        blank=True
+    )
+
+    started_at = models.DateTimeField(
+        _('Início'),
+        null=True,
+        blank=True
+    )
+
+    finished_at = models.DateTimeField(
+        _('Fim'),
+        null=True,
+        blank=True
+    )
+
+    class Meta:
+        verbose_name = _('Trabalho de Ingestão')
+        verbose_name_plural = _('Trabalhos de Ingestão')
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.filename} ({self.status})"
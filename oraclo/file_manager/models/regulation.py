@@ -8,6 +8,11 @@ class Regulation(TimeStampedModel):
     """
     Modelo para documentos regulatórios específicos do setor de telecomunicações.
     """
+    class ClassificationSource(models.TextChoices):
+        RULES = 'RULES', _('Regras')
+        LLM = 'LLM', _('Modelo de linguagem')
+        MANUAL = 'MANUAL', _('Manual')
+
     title = models.CharField(
         _('Título'),
         max_length=255
@@ -31,6 +36,13 @@ class Regulation(TimeStampedModel):
         related_name='regulations'
     )
     
+    number = models.CharField(
+        _('Número'),
+        max_length=50,
+        blank=True,
+        help_text=_('Número do diploma (ex.: 5/2010)')
+    )
+
     effective_date = models.DateField(
         _('Data de Vigência'),
         null=True,
@@ -49,10 +61,29 @@ class Regulation(TimeStampedModel):
         default='ACTIVE'
     )
 
+    classification_source = models.CharField(
+        _('Origem da Classificação'),
+        max_length=10,
+        choices=ClassificationSource.choices,
+        default=ClassificationSource.MANUAL
+    )
+
+    confidence = models.FloatField(
+        _('Confiança'),
+        null=True,
+        blank=True,
+        help_text=_('Confiança da classificação automática (0 a 1)')
+    )
+
     class Meta:
         verbose_name = _('Regulamento')
         verbose_name_plural = _('Regulamentos')
         ordering = ['-effective_date']
+        indexes = [
+            models.Index(fields=['-effective_date'], name='regulation_date_idx'),
+            models.Index(fields=['status', '-effective_date'], name='regulation_status_date_idx'),
+            models.Index(fields=['regulation_type', '-effective_date'], name='regulation_type_date_idx'),
+        ]
 
     def __str__(self):
         return self.title
\ No newline at end of file
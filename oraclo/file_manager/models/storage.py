@@ -0,0 +1,47 @@
+# file_manager/models/storage.py
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+from .base import TimeStampedModel
+
+class StoredBlob(TimeStampedModel):
+    """
+    Conteúdo de um arquivo guardado uma única vez, endereçado pelo seu SHA-256.
+
+    Os documentos apontam para o blob; `ref_count` conta os documentos que o
+    usam e o blob é apagado quando deixa de ser referido.
+    """
+    sha256 = models.CharField(
+        _('SHA-256'),
+        max_length=64,
+        unique=True
+    )
+
+    path = models.CharField(
+        _('Caminho'),
+        max_length=255,
+        help_text=_('Caminho relativo ao diretório dos blobs')
+    )
+
+    size = models.BigIntegerField(
+        _('Tamanho'),
+        help_text=_('Tamanho em bytes')
+    )
+
+    mime_type = models.CharField(
+        _('Tipo MIME'),
+        max_length=100,
+        blank=True
+    )
+
+    ref_count = models.PositiveIntegerField(
+        _('Referências'),
+        default=0,
+        help_text=_('Número de documentos que usam este conteúdo')
+    )
+
+    class Meta:
+        verbose_name = _('Blob')
+        verbose_name_plural = _('Blobs')
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} ref.)"
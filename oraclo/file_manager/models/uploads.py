@@ -0,0 +1,102 @@
+# file_manager/models/uploads.py
+import uuid
+
+from django.conf import settings
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+from .base import TimeStampedModel
+from .document import Document
+
+class UploadSession(TimeStampedModel):
+    """
+    Upload de um arquivo em partes (intervalos de bytes enviados por ordem).
+
+    `received_bytes` é o último deslocamento confirmado ao cliente: depois de
+    uma falha, o envio é retomado a partir dele.
+    """
+    class SessionStatus(models.TextChoices):
+        ACTIVE = 'ACTIVE', _('Em curso')
+        COMPLETED = 'COMPLETED', _('Concluído')
+        FAILED = 'FAILED', _('Falhou')
+        ABORTED = 'ABORTED', _('Cancelado')
+
+    token = models.UUIDField(
+        _('Identificador'),
+        default=uuid.uuid4,
+        unique=True,
+        editable=False
+    )
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='upload_sessions'
+    )
+
+    filename = models.CharField(
+        _('Nome do Arquivo'),
+        max_length=255
+    )
+
+    title = models.CharField(
+        _('Título'),
+        max_length=255,
+        blank=True
+    )
+
+    total_size = models.BigIntegerField(
+        _('Tamanho Total'),
+        help_text=_('Tamanho do arquivo em bytes')
+    )
+
+    received_bytes = models.BigIntegerField(
+        _('Bytes Recebidos'),
+        default=0
+    )
+
+    expected_sha256 = models.CharField(
+        _('SHA-256 Esperado'),
+        max_length=64,
+        blank=True,
+        help_text=_('Hash indicado pelo cliente, verificado no fim')
+    )
+
+    sha256 = models.CharField(
+        _('SHA-256'),
+        max_length=64,
+        blank=True
+    )
+
+    status = models.CharField(
+        _('Status'),
+        max_length=20,
+        choices=SessionStatus.choices,
+        default=SessionStatus.ACTIVE
+    )
+
+    document = models.ForeignKey(
+        Document,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='upload_sessions'
+    )
+
+    error = models.TextField(
+        _('Erro'),
+        blank=True
+    )
+
+    class Meta:
+        verbose_name = _('Sessão de Upload')
+        verbose_name_plural = _('Sessões de Upload')
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.filename} ({self.received_bytes}/{self.total_size})"
+
+    @property
+    def is_complete(self) -> bool:
+        return self.received_bytes >= self.total_size
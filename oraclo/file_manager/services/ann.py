@@ -0,0 +1,286 @@
+# file_manager/services/ann.py
+
+import logging
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import faiss  # faiss-cpu: necessário apenas para os índices aproximados
+except ImportError:  # pragma: no cover - depende do ambiente
+    faiss = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_FLAT = 'flat'
+INDEX_HNSW = 'hnsw'
+INDEX_IVFPQ = 'ivfpq'
+INDEX_AUTO = 'auto'
+INDEX_TYPES = (INDEX_FLAT, INDEX_HNSW, INDEX_IVFPQ)
+
+# Limiares de escolha automática do tipo de índice (número de fragmentos)
+HNSW_MIN_CHUNKS = 50_000
+IVFPQ_MIN_CHUNKS = 1_000_000
+
+
+@dataclass
+class AnnParams:
+    """
+    Parâmetros de construção e pesquisa dos índices aproximados.
+
+    `ef_search` (HNSW) e `nprobe` (IVF-PQ) controlam o compromisso entre
+    recall e latência e podem ser alterados sem reconstruir o índice.
+    """
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    ef_search: int = 64
+    nlist: Optional[int] = None
+    pq_m: Optional[int] = None
+    pq_nbits: int = 8
+    nprobe: int = 16
+    train_size: int = 100_000
+    # Pesquisas filtradas com menos fragmentos elegíveis do que isto usam pesquisa exata
+    exact_threshold: int = 20_000
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'AnnParams':
+        known = cls.__dataclass_fields__.keys()
+        return cls(**{k: v for k, v in (data or {}).items() if k in known})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def choose_index_type(num_chunks: int) -> str:
+    """Escolhe o tipo de índice adequado à dimensão do corpus."""
+    if faiss is None or num_chunks < HNSW_MIN_CHUNKS:
+        return INDEX_FLAT
+    if num_chunks < IVFPQ_MIN_CHUNKS:
+        return INDEX_HNSW
+    return INDEX_IVFPQ
+
+
+def min_training_vectors(index_type: str, params: Optional[AnnParams] = None) -> int:
+    """
+    Fragmentos necessários para treinar o índice: o IVF-PQ precisa de pelo
+    menos um vetor por centróide de cada sub-quantizador (2^pq_nbits).
+    """
+    if index_type == INDEX_IVFPQ:
+        return 2 ** (params or AnnParams()).pq_nbits
+    return 0
+
+
+def _require_faiss() -> None:
+    if faiss is None:
+        raise ImportError("O pacote faiss-cpu é necessário para índices aproximados (HNSW/IVF-PQ)")
+
+
+def _default_pq_m(dimension: int) -> int:
+    """Maior número de sub-quantizadores (<= 64) que divide a dimensão."""
+    for m in range(min(64, dimension), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+
+class AnnIndex:
+    """
+    Índice aproximado (FAISS) sobre as linhas normalizadas de um `VectorIndex`.
+
+    As linhas do índice FAISS coincidem com as linhas do `VectorIndex`, pelo que
+    o bitmap de filtros pode ser passado diretamente ao FAISS como seletor de IDs.
+    """
+
+    def __init__(self, index_type: str, faiss_index: Any, params: AnnParams):
+        self.index_type = index_type
+        self.faiss_index = faiss_index
+        self.params = params
+
+    @property
+    def ntotal(self) -> int:
+        return self.faiss_index.ntotal
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, index_type: str, params: Optional[AnnParams] = None) -> 'AnnIndex':
+        """
+        Constrói e, quando necessário, treina o índice.
+
+        Args:
+            vectors: Matriz (n, d) float32 com linhas normalizadas
+            index_type: `hnsw` ou `ivfpq`
+            params: Parâmetros de construção
+
+        Returns:
+            AnnIndex: Índice pronto a pesquisar
+
+        Raises:
+            ValueError: se houver menos vetores do que `min_training_vectors`
+        """
+        _require_faiss()
+        params = params or AnnParams()
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        num_vectors, dimension = vectors.shape
+        if num_vectors < min_training_vectors(index_type, params):
+            raise ValueError(
+                f"Um índice {index_type} precisa de pelo menos "
+                f"{min_training_vectors(index_type, params)} vetores para o treino ({num_vectors} disponíveis)"
+            )
+
+        if index_type == INDEX_HNSW:
+            index = faiss.IndexHNSWFlat(dimension, params.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = params.ef_construction
+        elif index_type == INDEX_IVFPQ:
+            nlist = params.nlist or max(1, min(65_536, int(4 * np.sqrt(num_vectors))))
+            # Cada lista precisa de dados de treino suficientes
+            nlist = max(1, min(nlist, num_vectors // 39))
+            pq_m = params.pq_m or _default_pq_m(dimension)
+            quantizer = faiss.IndexFlatIP(dimension)
+            index = faiss.IndexIVFPQ(
+                quantizer, dimension, nlist, pq_m, params.pq_nbits, faiss.METRIC_INNER_PRODUCT
+            )
+            params.nlist, params.pq_m = nlist, pq_m
+
+            # Etapa de treino numa amostra do corpus
+            started = time.perf_counter()
+            rng = np.random.default_rng(0)
+            sample_size = min(num_vectors, params.train_size)
+            sample = vectors[rng.choice(num_vectors, sample_size, replace=False)]
+            index.train(sample)
+            logger.info(
+                f"IVF-PQ treinado com {sample_size} vetores em {time.perf_counter() - started:.1f}s"
+            )
+        else:
+            raise ValueError(f"Tipo de índice aproximado desconhecido: {index_type}")
+
+        index.add(vectors)
+        return cls(index_type, index, params)
+
+    def _search_parameters(self, selector: Any = None) -> Any:
+        if self.index_type == INDEX_HNSW:
+            search_params = faiss.SearchParametersHNSW()
+            search_params.efSearch = self.params.ef_search
+        else:
+            search_params = faiss.SearchParametersIVF()
+            search_params.nprobe = self.params.nprobe
+        if selector is not None:
+            search_params.sel = selector
+        return search_params
+
+    def search(
+        self, query: np.ndarray, k: int, mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Pesquisa os `k` vizinhos mais próximos, opcionalmente restritos a um bitmap.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (linhas, pontuações) por ordem decrescente
+        """
+        query = np.ascontiguousarray(query.reshape(1, -1), dtype=np.float32)
+        selector = None
+        if mask is not None:
+            packed = np.packbits(mask, bitorder='little')
+            selector = faiss.IDSelectorBitmap(mask.size, faiss.swig_ptr(packed))
+        scores, rows = self.faiss_index.search(query, k, params=self._search_parameters(selector))
+        valid = rows[0] >= 0
+        return rows[0][valid], scores[0][valid]
+
+    def save(self, path: Path) -> None:
+        faiss.write_index(self.faiss_index, str(path))
+
+    @classmethod
+    def load(cls, path: Path, index_type: str, params: AnnParams, mmap: bool = False) -> 'AnnIndex':
+        """
+        Lê um índice guardado com `save`.
+
+        Com `mmap`, os dados que crescem com o corpus ficam mapeados do ficheiro,
+        e as páginas são partilhadas entre os workers: as listas invertidas do
+        IVF-PQ (IO_FLAG_MMAP) e os vetores do HNSW (IO_FLAG_MMAP_IFC, porque o
+        FAISS ignora IO_FLAG_MMAP no HNSW). O grafo do HNSW é sempre lido para
+        a memória de cada worker, cerca de 2 * hnsw_m * 4 bytes por vetor (256
+        bytes com hnsw_m=32). Num FAISS sem IO_FLAG_MMAP_IFC, cada worker lê
+        também os vetores.
+        """
+        _require_faiss()
+        flags = 0
+        if mmap:
+            flag = getattr(faiss, 'IO_FLAG_MMAP_IFC', None) if index_type == INDEX_HNSW else faiss.IO_FLAG_MMAP
+            if flag is None:
+                logger.warning(
+                    f"Esta versão do FAISS não mapeia índices HNSW: {path} é lido para a memória de cada worker"
+                )
+            else:
+                flags = flag | faiss.IO_FLAG_READ_ONLY
+        return cls(index_type, faiss.read_index(str(path), flags), params)
+
+
+def exact_search(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Vizinhos exatos (produto interno) para um lote de consultas."""
+    scores = queries @ vectors.T
+    k = min(k, vectors.shape[0])
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+def benchmark_index_types(
+    vectors: np.ndarray,
+    index_types: Sequence[str] = (INDEX_HNSW, INDEX_IVFPQ),
+    k: int = 10,
+    num_queries: int = 200,
+    ef_search_values: Sequence[int] = (16, 32, 64, 128, 256),
+    nprobe_values: Sequence[int] = (1, 4, 16, 64),
+    params: Optional[AnnParams] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Compara recall@k e latência dos índices aproximados com a pesquisa exata.
+
+    As consultas são amostradas do próprio corpus, o que reflete a distribuição
+    real dos embeddings guardados.
+
+    Returns:
+        List[Dict[str, Any]]: Uma linha por (tipo de índice, valor do parâmetro de pesquisa)
+    """
+    _require_faiss()
+    rng = np.random.default_rng(42)
+    num_queries = min(num_queries, vectors.shape[0])
+    queries = vectors[rng.choice(vectors.shape[0], num_queries, replace=False)]
+
+    started = time.perf_counter()
+    truth = exact_search(vectors, queries, k)
+    exact_ms = (time.perf_counter() - started) * 1000 / num_queries
+    results = [{
+        'index_type': INDEX_FLAT, 'param': None, 'recall': 1.0,
+        'build_s': 0.0, 'p50_ms': exact_ms, 'p95_ms': exact_ms,
+    }]
+
+    for index_type in index_types:
+        started = time.perf_counter()
+        ann = AnnIndex.build(vectors, index_type, AnnParams.from_dict((params or AnnParams()).to_dict()))
+        build_s = time.perf_counter() - started
+
+        if index_type == INDEX_HNSW:
+            knob, values = 'ef_search', ef_search_values
+        else:
+            knob, values = 'nprobe', nprobe_values
+
+        for value in values:
+            setattr(ann.params, knob, value)
+            latencies = []
+            hits = 0
+            for query, expected in zip(queries, truth):
+                started = time.perf_counter()
+                rows, _ = ann.search(query, k)
+                latencies.append((time.perf_counter() - started) * 1000)
+                hits += len(set(rows.tolist()) & set(expected.tolist()))
+            results.append({
+                'index_type': index_type,
+                'param': f'{knob}={value}',
+                'recall': hits / (num_queries * truth.shape[1]),
+                'build_s': build_s,
+                'p50_ms': float(np.percentile(latencies, 50)),
+                'p95_ms': float(np.percentile(latencies, 95)),
+            })
+    return results
@@ -0,0 +1,322 @@
+# file_manager/services/blob_store.py
+
+import hashlib
+import logging
+import os
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Tuple, Union
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ..models import Document, StoredBlob
+from ..utils.file_handlers import (
+    INSPECTION_BLOCK_SIZE,
+    FileInfo,
+    FileValidator,
+    inspect_file,
+    place_file,
+    stored_file_mode,
+    write_atomically,
+)
+from ..utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Níveis de diretórios (2 caracteres hexadecimais cada): ab/cd/abcd…ef.pdf,
+# 65 536 diretórios folha, para nenhum diretório crescer sem limite
+FAN_OUT_LEVELS = 2
+# Blobs sem referências mais recentes do que isto não são recolhidos: podem
+# pertencer a um upload ainda em processamento
+GARBAGE_GRACE_PERIOD = timedelta(hours=24)
+
+
+def blob_root() -> Path:
+    return Path(getattr(settings, 'BLOB_STORE_DIR', Path(settings.MEDIA_ROOT) / 'blobs'))
+
+
+def blob_relative_path(sha256: str, extension: str = '') -> str:
+    """Caminho de um conteúdo dentro do armazenamento (a extensão indica o formato ao Docling)."""
+    parts = [sha256[2 * level:2 * level + 2] for level in range(FAN_OUT_LEVELS)]
+    return '/'.join(parts + [sha256 + extension.lower()])
+
+
+class BlobStore:
+    """
+    Armazenamento endereçado pelo conteúdo: cada arquivo fica guardado uma vez,
+    no caminho dado pelo seu SHA-256.
+
+    Um conteúdo que já existe não volta a ser escrito: o upload repetido só
+    custa o cálculo do hash. `ref_count` conta os documentos que usam o blob
+    (`acquire`/`release`); os blobs sem referências são apagados por
+    `collect_garbage`, passado um período de tolerância.
+    """
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root or blob_root())
+
+    def path(self, blob: StoredBlob) -> Path:
+        return self.root / blob.path
+
+    def put_file(
+        self,
+        source: Union[str, Path],
+        info: Optional[FileInfo] = None,
+        mode: str = 'link',
+        extension: Optional[str] = None
+    ) -> Tuple[StoredBlob, bool, FileInfo]:
+        """
+        Guarda um arquivo no armazenamento.
+
+        Args:
+            source: Arquivo a guardar
+            info: Inspeção já feita do arquivo (com hash), para não o ler de novo
+            mode: Como colocar o arquivo no armazenamento (ver `place_file`); com
+                'move', o arquivo de origem deixa sempre de existir
+            extension: Extensão do blob (por omissão, a do arquivo de origem)
+
+        Returns:
+            Tuple[StoredBlob, bool, FileInfo]: O blob, se foi criado agora e os
+            metadados do arquivo (com o caminho no armazenamento)
+        """
+        source = Path(source)
+        if info is None or info.sha256 is None:
+            info = inspect_file(source)
+
+        blob = self._existing(info.sha256)
+        if blob is not None:
+            if mode == 'move':
+                source.unlink(missing_ok=True)
+            info.path = self.path(blob)
+            return blob, False, info
+
+        relative = blob_relative_path(info.sha256, source.suffix if extension is None else extension)
+        destination = self.root / relative
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        with timed('file_store', mode='blob'):
+            try:
+                place_file(source, destination, mode)
+                if mode == 'move':
+                    # Os temporários (de upload ou de `put_stream`) têm o modo 0600
+                    os.chmod(destination, stored_file_mode())
+            except FileExistsError:
+                # Outro processo guardou o mesmo conteúdo entretanto
+                if mode == 'move':
+                    source.unlink(missing_ok=True)
+
+        blob, created = self._register(info.sha256, relative, info)
+        info.path = self.path(blob)
+        return blob, created, info
+
+    def put_upload(self, uploaded_file: UploadedFile) -> Tuple[StoredBlob, bool, FileInfo]:
+        """
+        Guarda um arquivo enviado.
+
+        O hash é calculado antes de qualquer escrita: um conteúdo repetido não é
+        escrito em disco. Um upload em arquivo temporário é depois movido para o
+        armazenamento; um em memória é escrito uma única vez.
+        """
+        extension = Path(uploaded_file.name).suffix
+        if hasattr(uploaded_file, 'temporary_file_path'):
+            # Uma leitura para o hash; depois só uma mudança de nome (ou nada, se repetido)
+            return self.put_file(uploaded_file.temporary_file_path(), mode='move', extension=extension)
+
+        digest = hashlib.sha256()
+        for chunk in uploaded_file.chunks():
+            digest.update(chunk)
+        sha256 = digest.hexdigest()
+
+        blob = self._existing(sha256)
+        if blob is None:
+            relative = blob_relative_path(sha256, extension)
+            destination = self.root / relative
+            destination.parent.mkdir(parents=True, exist_ok=True)
+
+            def write(output):
+                for chunk in uploaded_file.chunks():
+                    output.write(chunk)
+
+            with timed('file_store', mode='blob'):
+                write_atomically(destination, write)
+            info = inspect_file(destination, compute_hash=False)
+            info.sha256 = sha256
+            blob, created = self._register(sha256, relative, info)
+            return blob, created, info
+
+        info = inspect_file(self.path(blob), compute_hash=False)
+        info.sha256 = sha256
+        return blob, False, info
+
+    def put_stream(
+        self,
+        stream: BinaryIO,
+        extension: str = '',
+        max_size: Optional[int] = None
+    ) -> Tuple[StoredBlob, bool, FileInfo]:
+        """
+        Guarda um fluxo de bytes (ex.: uma entrada de um arquivo compactado) sem o
+        ter todo em memória: é escrito num temporário do armazenamento enquanto o
+        hash é calculado e depois movido para o seu endereço (ou descartado, se o
+        conteúdo já existir).
+
+        Raises:
+            ValueError: se o fluxo exceder `max_size` bytes
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temporary = tempfile.mkstemp(dir=self.root, prefix='.', suffix='.part')
+        temporary = Path(temporary)
+        try:
+            size = 0
+            with os.fdopen(fd, 'wb') as output:
+                for block in iter(lambda: stream.read(INSPECTION_BLOCK_SIZE), b''):
+                    size += len(block)
+                    if max_size is not None and size > max_size:
+                        raise ValueError(
+                            f"Arquivo muito grande. Máximo permitido: {max_size/1024/1024}MB"
+                        )
+                    digest.update(block)
+                    output.write(block)
+
+            info = inspect_file(temporary, compute_hash=False)
+            info.sha256 = digest.hexdigest()
+            return self.put_file(temporary, info=info, mode='move', extension=extension)
+        finally:
+            temporary.unlink(missing_ok=True)
+
+    def put_validated_upload(self, uploaded_file: UploadedFile) -> Tuple[StoredBlob, FileInfo]:
+        """
+        Guarda um arquivo enviado e valida-o (tipo, extensão e tamanho).
+
+        Raises:
+            ValueError: se o arquivo for inválido (um blob criado por ele é apagado)
+        """
+        if uploaded_file.size > FileValidator.MAX_FILE_SIZE:
+            raise ValueError(
+                f"Arquivo inválido: Arquivo muito grande. "
+                f"Máximo permitido: {FileValidator.MAX_FILE_SIZE/1024/1024}MB"
+            )
+
+        blob, created, info = self.put_upload(uploaded_file)
+        is_valid, error_message = FileValidator.validate_file(info.path, info=info)
+        if not is_valid:
+            if created:
+                StoredBlob.objects.filter(pk=blob.pk, ref_count=0).delete()
+                info.path.unlink(missing_ok=True)
+            raise ValueError(f"Arquivo inválido: {error_message}")
+        return blob, info
+
+    def _register(self, sha256: str, relative: str, info: FileInfo) -> Tuple[StoredBlob, bool]:
+        blob, created = StoredBlob.objects.get_or_create(
+            sha256=sha256,
+            defaults={'path': relative, 'size': info.size, 'mime_type': info.mime_type},
+        )
+        if not created and blob.path != relative and not self.path(blob).exists():
+            # Registo sem arquivo (apagado à mão, restauro parcial): reparar
+            blob.path = relative
+            blob.save(update_fields=['path', 'updated_at'])
+        return blob, created
+
+    def _existing(self, sha256: str) -> Optional[StoredBlob]:
+        blob = StoredBlob.objects.filter(sha256=sha256).first()
+        if blob is None:
+            return None
+        if not self.path(blob).exists():
+            logger.warning(f"Blob {sha256} sem arquivo em {self.path(blob)}; será gravado de novo")
+            return None
+        # Renova o período de tolerância: a recolha não apaga um blob acabado de reutilizar
+        StoredBlob.objects.filter(pk=blob.pk).update(updated_at=timezone.now())
+        return blob
+
+    def adopt(self, document: Document) -> bool:
+        """
+        Passa o arquivo de um documento antigo para o armazenamento: o arquivo é
+        movido (ou descartado, se o conteúdo já existir) e o documento passa a
+        apontar para o blob.
+
+        Returns:
+            bool: Se o documento foi migrado (falso se o arquivo não existir)
+        """
+        source = Path(document.file_path)
+        if document.blob_id or not source.is_file():
+            return False
+        blob, _, info = self.put_file(source, mode='move')
+        with transaction.atomic():
+            document.blob = blob
+            document.file_path = str(info.path)
+            # O hash é único: um segundo documento com o mesmo conteúdo fica sem ele
+            if not document.file_hash and not Document.objects.filter(file_hash=info.sha256).exists():
+                document.file_hash = info.sha256
+            document.save(update_fields=['blob', 'file_path', 'file_hash', 'updated_at'])
+            self.acquire(blob)
+        return True
+
+    @staticmethod
+    def acquire(blob: StoredBlob) -> None:
+        """Regista mais um documento a usar o blob."""
+        StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1, updated_at=timezone.now())
+
+    @staticmethod
+    def release(blob_id: int) -> None:
+        """Regista que um documento deixou de usar o blob (o arquivo fica até à recolha)."""
+        StoredBlob.objects.filter(pk=blob_id, ref_count__gt=0).update(
+            ref_count=F('ref_count') - 1, updated_at=timezone.now()
+        )
+
+    def collect_garbage(self, grace_period: timedelta = GARBAGE_GRACE_PERIOD) -> int:
+        """
+        Apaga os blobs sem documentos há mais de `grace_period`.
+
+        Returns:
+            int: Número de blobs apagados
+        """
+        cutoff = timezone.now() - grace_period
+        removed = 0
+        candidates = StoredBlob.objects.filter(
+            ref_count=0, updated_at__lt=cutoff, documents__isnull=True
+        ).exclude(ingestion_jobs__status__in=['QUEUED', 'PROCESSING'])
+        for blob in candidates.iterator():
+            with transaction.atomic():
+                # Voltar a verificar com o registo bloqueado: um upload pode tê-lo adquirido
+                locked = StoredBlob.objects.select_for_update().filter(pk=blob.pk, ref_count=0).first()
+                if locked is None or locked.documents.exists():
+                    continue
+                locked.delete()
+                transaction.on_commit(lambda path=self.path(locked): path.unlink(missing_ok=True))
+            removed += 1
+
+        # Temporários de escritas interrompidas
+        for partial in self.root.glob('**/.*.part'):
+            if partial.stat().st_mtime < cutoff.timestamp():
+                partial.unlink(missing_ok=True)
+        return removed
+
+    @staticmethod
+    def recount() -> int:
+        """
+        Recalcula `ref_count` a partir dos documentos (reparação após alterações
+        feitas fora da aplicação).
+
+        Returns:
+            int: Número de blobs corrigidos
+        """
+        counts = Document.objects.filter(blob=OuterRef('pk')).values('blob').annotate(total=Count('pk')).values('total')
+        return StoredBlob.objects.exclude(
+            ref_count=Coalesce(Subquery(counts), 0)
+        ).update(ref_count=Coalesce(Subquery(counts), 0))
+
+    def stats(self) -> Dict[str, int]:
+        """Blobs guardados, bytes ocupados e bytes poupados pela deduplicação."""
+        return StoredBlob.objects.aggregate(
+            blobs=Count('pk'),
+            unreferenced=Count('pk', filter=Q(ref_count=0)),
+            stored_bytes=Coalesce(Sum('size'), 0),
+            # Sem deduplicação, cada documento teria a sua cópia
+            saved_bytes=Coalesce(Sum(F('size') * (F('ref_count') - 1), filter=Q(ref_count__gt=1)), 0),
+        )
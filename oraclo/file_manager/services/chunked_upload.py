@@ -0,0 +1,341 @@
+# file_manager/services/chunked_upload.py
+
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, BinaryIO, Optional, Tuple
+
+from django.conf import settings
+from django.core.files import locks
+from django.utils import timezone
+
+from ..models import Document, UploadSession
+from ..utils.file_handlers import INSPECTION_BLOCK_SIZE, FileOrganizer, FileValidator, inspect_file
+from ..utils.metrics import timed
+from .blob_store import BlobStore
+from .document_processor import DocumentProcessor, DuplicateDocumentError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_UPLOAD_CONFIG = {
+    'MAX_CHUNK_SIZE': 16 * 1024 * 1024,
+    'TTL_HOURS': 24,
+}
+
+CONTENT_RANGE_PATTERN = re.compile(r'^bytes (?P<start>\d+)-(?P<end>\d+)/(?P<total>\d+)$')
+
+# Estado do SHA-256 de cada sessão (objetos hashlib não são serializáveis). Se o
+# pedido seguinte chegar a outro processo, o hash do que já foi recebido é
+# recalculado uma vez a partir do arquivo parcial.
+MAX_CACHED_HASHERS = 256
+_hashers: 'OrderedDict[str, Tuple[int, Any]]' = OrderedDict()
+_hashers_lock = threading.Lock()
+
+
+class OffsetMismatch(ValueError):
+    """O intervalo não começa no último deslocamento confirmado."""
+
+    def __init__(self, offset: int, message: Optional[str] = None):
+        super().__init__(message or f"O intervalo deve começar no byte {offset}")
+        self.offset = offset
+
+
+def upload_config() -> dict:
+    return {**DEFAULT_UPLOAD_CONFIG, **getattr(settings, 'UPLOAD_SESSIONS', {})}
+
+
+def upload_directory() -> Path:
+    return Path(upload_config().get('DIRECTORY') or Path(settings.MEDIA_ROOT) / 'upload_sessions')
+
+
+def part_path(session: UploadSession) -> Path:
+    # A extensão do arquivo original fica no nome: a validação e o Docling dependem dela
+    return upload_directory() / f"{session.token}{Path(session.filename).suffix.lower()}"
+
+
+def parse_content_range(header: Optional[str]) -> Tuple[int, int, int]:
+    """
+    Lê um cabeçalho "Content-Range: bytes início-fim/total" (fim inclusivo).
+
+    Returns:
+        Tuple[int, int, int]: Início, fim (exclusivo) e total
+    """
+    match = CONTENT_RANGE_PATTERN.match((header or '').strip())
+    if not match:
+        raise ValueError("Cabeçalho Content-Range inválido (esperado: bytes início-fim/total)")
+    start, end, total = (int(match.group(name)) for name in ('start', 'end', 'total'))
+    if end < start:
+        raise ValueError("Intervalo de bytes inválido")
+    return start, end + 1, total
+
+
+def create_session(
+    filename: str,
+    total_size: int,
+    user: Optional[Any] = None,
+    title: str = '',
+    expected_sha256: str = '',
+) -> UploadSession:
+    """
+    Abre uma sessão de upload, depois de validar o nome e o tamanho anunciados.
+
+    Raises:
+        ValueError: se a extensão não for permitida ou o arquivo for grande demais
+    """
+    extension = Path(filename).suffix.lower()
+    allowed = {ext for extensions in FileValidator.ALLOWED_MIMETYPES.values() for ext in extensions}
+    if extension not in allowed:
+        raise ValueError(f"Extensão de arquivo não permitida: {extension or '(nenhuma)'}")
+    if total_size <= 0:
+        raise ValueError("Tamanho do arquivo inválido")
+    if total_size > FileValidator.MAX_FILE_SIZE:
+        raise ValueError(f"Arquivo muito grande. Máximo permitido: {FileValidator.MAX_FILE_SIZE/1024/1024}MB")
+    if expected_sha256 and not re.fullmatch(r'[0-9a-f]{64}', expected_sha256.lower()):
+        raise ValueError("SHA-256 esperado inválido")
+
+    session = UploadSession.objects.create(
+        user=user if getattr(user, 'is_authenticated', False) else None,
+        filename=Path(filename).name[:255],
+        title=title[:255],
+        total_size=total_size,
+        expected_sha256=expected_sha256.lower(),
+    )
+    path = part_path(session)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+    return session
+
+
+def _running_hash(session: UploadSession, part: BinaryIO) -> Any:
+    key = str(session.token)
+    with _hashers_lock:
+        cached = _hashers.get(key)
+    if cached is not None and cached[0] == session.received_bytes:
+        return cached[1]
+
+    # Outro processo recebeu as partes anteriores: recalcular a partir do disco
+    hasher = hashlib.sha256()
+    part.seek(0)
+    remaining = session.received_bytes
+    while remaining:
+        block = part.read(min(INSPECTION_BLOCK_SIZE, remaining))
+        if not block:
+            break
+        hasher.update(block)
+        remaining -= len(block)
+    return hasher
+
+
+def _remember_hash(session: UploadSession, offset: int, hasher: Any) -> None:
+    key = str(session.token)
+    with _hashers_lock:
+        _hashers[key] = (offset, hasher)
+        _hashers.move_to_end(key)
+        while len(_hashers) > MAX_CACHED_HASHERS:
+            _hashers.popitem(last=False)
+
+
+def _forget_hash(session: UploadSession) -> None:
+    with _hashers_lock:
+        _hashers.pop(str(session.token), None)
+
+
+def append_range(
+    session: UploadSession,
+    start: int,
+    end: int,
+    stream: BinaryIO,
+    chunk_sha256: Optional[str] = None,
+) -> UploadSession:
+    """
+    Acrescenta os bytes [start, end) ao arquivo parcial.
+
+    O intervalo tem de começar no último deslocamento confirmado. Os bytes são
+    escritos e incluídos no hash à medida que chegam; só depois de gravados em
+    disco (e, com `chunk_sha256`, verificados) o deslocamento avança. Um
+    intervalo interrompido ou corrompido é descartado e pode ser reenviado.
+
+    Args:
+        session: Sessão de upload
+        start: Primeiro byte do intervalo
+        end: Byte seguinte ao último do intervalo
+        stream: Corpo do pedido
+        chunk_sha256: SHA-256 do intervalo, se o cliente o indicar
+
+    Returns:
+        UploadSession: A sessão com o novo deslocamento
+
+    Raises:
+        OffsetMismatch: se o intervalo não começar no deslocamento confirmado
+        ValueError: se o intervalo for inválido, incompleto ou corrompido
+    """
+    if session.status != UploadSession.SessionStatus.ACTIVE:
+        raise ValueError(f"Sessão de upload {session.get_status_display().lower()}")
+    length = end - start
+    if length > upload_config()['MAX_CHUNK_SIZE']:
+        raise ValueError(f"Intervalo maior do que o máximo de {upload_config()['MAX_CHUNK_SIZE']} bytes")
+    if end > session.total_size:
+        raise ValueError("O intervalo ultrapassa o tamanho do arquivo")
+
+    with open(part_path(session), 'r+b') as part:
+        # Um intervalo de cada vez por sessão, também entre processos
+        if not locks.lock(part, locks.LOCK_EX | locks.LOCK_NB):
+            raise OffsetMismatch(session.received_bytes, "Outro intervalo desta sessão está a ser recebido")
+        try:
+            session.refresh_from_db()
+            if start != session.received_bytes:
+                raise OffsetMismatch(session.received_bytes)
+
+            running = _running_hash(session, part).copy()
+            chunk_hasher = hashlib.sha256()
+            part.seek(start)
+            part.truncate()
+            written = 0
+            with timed('upload_chunk'):
+                while written < length:
+                    block = stream.read(min(INSPECTION_BLOCK_SIZE, length - written))
+                    if not block:
+                        break
+                    part.write(block)
+                    running.update(block)
+                    chunk_hasher.update(block)
+                    written += len(block)
+
+                if written != length:
+                    part.truncate(start)
+                    raise ValueError(f"Intervalo incompleto: recebidos {written} de {length} bytes")
+                if chunk_sha256 and chunk_hasher.hexdigest() != chunk_sha256.lower():
+                    part.truncate(start)
+                    raise ValueError("SHA-256 do intervalo não confere; reenvie-o")
+
+                # Só se confirma ao cliente o que já está em disco
+                part.flush()
+                os.fsync(part.fileno())
+
+            updated = UploadSession.objects.filter(
+                pk=session.pk, received_bytes=start, status=UploadSession.SessionStatus.ACTIVE
+            ).update(received_bytes=end, updated_at=timezone.now())
+            if not updated:
+                session.refresh_from_db()
+                raise OffsetMismatch(session.received_bytes)
+            session.received_bytes = end
+            _remember_hash(session, end, running)
+        finally:
+            locks.unlock(part)
+    return session
+
+
+def complete_session(session: UploadSession, processor: Optional[Any] = None) -> Tuple[Document, bool]:
+    """
+    Entrega o arquivo montado à ingestão.
+
+    O hash vem das partes (o arquivo não é relido); o arquivo passa para o
+    armazenamento com uma mudança de nome e é processado. Repetir o pedido
+    depois de concluído devolve o mesmo documento.
+
+    Args:
+        session: Sessão com todos os bytes recebidos
+        processor: DocumentProcessor a usar (por omissão, um novo)
+
+    Returns:
+        Tuple[Document, bool]: O documento e se foi criado agora (falso se o
+        conteúdo já tinha sido processado)
+    """
+    if session.status == UploadSession.SessionStatus.COMPLETED and session.document_id:
+        return session.document, False
+    if session.status != UploadSession.SessionStatus.ACTIVE:
+        raise ValueError(f"Sessão de upload {session.get_status_display().lower()}")
+    if not session.is_complete:
+        raise OffsetMismatch(session.received_bytes, "Upload incompleto")
+
+    path = part_path(session)
+    try:
+        with open(path, 'rb') as part:
+            sha256 = _running_hash(session, part).hexdigest()
+        if session.expected_sha256 and sha256 != session.expected_sha256:
+            raise ValueError("O SHA-256 do arquivo recebido não confere com o indicado")
+
+        info = inspect_file(path, compute_hash=False)
+        info.sha256 = sha256
+        is_valid, error_message = FileValidator.validate_file(path, info=info)
+        if not is_valid:
+            raise ValueError(f"Arquivo inválido: {error_message}")
+
+        # Um documento cujo processamento falhou é reaproveitado pelo processador
+        existing = Document.objects.filter(file_hash=sha256).exclude(status=Document.DocumentStatus.ERROR).first()
+        if existing is not None:
+            path.unlink(missing_ok=True)
+            _finish(session, sha256, existing)
+            return existing, False
+
+        blob = None
+        if settings.DOCUMENT_STORAGE == 'blobs':
+            blob, _, info = BlobStore().put_file(path, info=info, mode='move')
+        else:
+            info.path = FileOrganizer().organize_file(path, mode='move')
+
+        processor = processor or DocumentProcessor()
+        try:
+            document = processor.process_document(
+                str(info.path),
+                title=session.title or Path(session.filename).stem,
+                file_info=info,
+                blob=blob,
+            )
+        except DuplicateDocumentError as e:
+            # Outro envio do mesmo conteúdo criou o documento entretanto
+            if blob is None and str(info.path) != e.document.file_path:
+                Path(info.path).unlink(missing_ok=True)
+            _finish(session, sha256, e.document)
+            return e.document, False
+        _finish(session, sha256, document)
+        return document, True
+
+    except Exception as e:
+        logger.error(f"Erro ao concluir o upload {session.token}: {str(e)}")
+        session.status = UploadSession.SessionStatus.FAILED
+        session.error = str(e)
+        session.save(update_fields=['status', 'error', 'updated_at'])
+        _forget_hash(session)
+        path.unlink(missing_ok=True)
+        raise
+
+
+def _finish(session: UploadSession, sha256: str, document: Document) -> None:
+    session.sha256 = sha256
+    session.document = document
+    session.status = UploadSession.SessionStatus.COMPLETED
+    session.save(update_fields=['sha256', 'document', 'status', 'updated_at'])
+    _forget_hash(session)
+
+
+def abort_session(session: UploadSession) -> None:
+    """Cancela uma sessão e apaga o arquivo parcial."""
+    if session.status == UploadSession.SessionStatus.ACTIVE:
+        session.status = UploadSession.SessionStatus.ABORTED
+        session.save(update_fields=['status', 'updated_at'])
+    part_path(session).unlink(missing_ok=True)
+    _forget_hash(session)
+
+
+def expire_sessions(ttl: Optional[timedelta] = None) -> int:
+    """
+    Cancela as sessões sem atividade há mais de `ttl` (UPLOAD_SESSIONS['TTL_HOURS']).
+
+    Returns:
+        int: Número de sessões canceladas
+    """
+    ttl = ttl if ttl is not None else timedelta(hours=upload_config()['TTL_HOURS'])
+    expired = UploadSession.objects.filter(
+        status=UploadSession.SessionStatus.ACTIVE, updated_at__lt=timezone.now() - ttl
+    )
+    count = 0
+    for session in expired.iterator():
+        abort_session(session)
+        count += 1
+    return count
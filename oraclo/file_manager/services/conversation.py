@@ -0,0 +1,224 @@
+# file_manager/services/conversation.py
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+from ..utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_LABEL = 'Resumo da conversa anterior'
+CACHE_KEY_PREFIX = 'oraclo:conversation:'
+# Janelas de trocas aceites de um histórico enviado pelo cliente (ver `seed`)
+SEED_MAX_WINDOWS = 4
+
+# Recebe (resumo_atual, trocas_a_resumir) e devolve o novo resumo
+Summarizer = Callable[[str, List[Tuple[str, str]]], str]
+
+
+@dataclass
+class ConversationState:
+    """Estado de uma conversa: resumo das trocas antigas e janela das mais recentes."""
+    summary: str = ''
+    turns: List[Tuple[str, str]] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'summary': self.summary, 'turns': [list(turn) for turn in self.turns]}
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'ConversationState':
+        if not data:
+            return cls()
+        return cls(
+            summary=data.get('summary', ''),
+            turns=[(question, answer) for question, answer in data.get('turns', [])]
+        )
+
+
+def truncate_summary(summary: str, turns: List[Tuple[str, str]], max_tokens: int) -> str:
+    """
+    Resumo extrativo usado quando não há LLM: junta as trocas e mantém o final.
+    """
+    lines = [summary] if summary else []
+    lines.extend(f"P: {question}\nR: {answer}" for question, answer in turns)
+    text = '\n'.join(lines)
+    while text and count_tokens(text) > max_tokens:
+        text = text[len(text) // 4:]
+    return text
+
+
+class LLMSummarizer:
+    """Comprime trocas antigas num resumo curto usando o LLM de chat."""
+
+    def __init__(self, llm: Any, max_tokens: int = 300):
+        self.llm = llm
+        self.max_tokens = max_tokens
+
+    def __call__(self, summary: str, turns: List[Tuple[str, str]]) -> str:
+        exchanges = '\n'.join(f"Utilizador: {q}\nAssistente: {a}" for q, a in turns)
+        prompt = (
+            "Atualize o resumo da conversa com as novas trocas, em português de Portugal, "
+            f"em no máximo {self.max_tokens} tokens. Preserve factos, números de regulamentos "
+            "e decisões.\n\n"
+            f"Resumo atual:\n{summary or '(vazio)'}\n\nNovas trocas:\n{exchanges}"
+        )
+        try:
+            response = self.llm.invoke(prompt)
+            return getattr(response, 'content', str(response)).strip()
+        except Exception as e:
+            logger.error(f"Erro ao resumir conversa, a usar resumo extrativo: {str(e)}")
+            return truncate_summary(summary, turns, self.max_tokens)
+
+
+class ConversationStore:
+    """
+    Memória de conversas no servidor, por sessão, guardada na cache do Django.
+
+    Mantém as últimas `window` trocas na íntegra e dobra as mais antigas num resumo;
+    o resumidor recebe no máximo `summary_input_tokens` tokens de trocas.
+    Cada pedido recebe um histórico limitado a `token_budget` tokens, e as conversas
+    inativas expiram ao fim de `ttl` segundos (a expiração é feita pela cache).
+    Com uma cache partilhada (ex.: Redis), a conversa é comum a todos os workers.
+    """
+
+    def __init__(
+        self,
+        cache_alias: Optional[str] = None,
+        ttl: Optional[int] = None,
+        window: Optional[int] = None,
+        token_budget: Optional[int] = None,
+        summary_max_tokens: Optional[int] = None,
+        summary_input_tokens: Optional[int] = None,
+        summarizer: Optional[Summarizer] = None,
+    ):
+        config = getattr(settings, 'CHAT_MEMORY', {})
+        self.cache = caches[cache_alias or config.get('CACHE_ALIAS', 'default')]
+        self.ttl = ttl or config.get('TTL', 3600)
+        self.window = window or config.get('WINDOW', 6)
+        self.token_budget = token_budget or config.get('TOKEN_BUDGET', 1500)
+        self.summary_max_tokens = summary_max_tokens or config.get('SUMMARY_MAX_TOKENS', 300)
+        self.summary_input_tokens = summary_input_tokens or config.get('SUMMARY_INPUT_TOKENS', 4000)
+        self.summarizer = summarizer or (
+            lambda summary, turns: truncate_summary(summary, turns, self.summary_max_tokens)
+        )
+
+    def _key(self, session_id: str) -> str:
+        return f"{CACHE_KEY_PREFIX}{session_id}"
+
+    def load(self, session_id: str) -> ConversationState:
+        return ConversationState.from_dict(self.cache.get(self._key(session_id)))
+
+    def save(self, session_id: str, state: ConversationState) -> None:
+        # Cada gravação renova o TTL: só conversas inativas expiram
+        self.cache.set(self._key(session_id), state.to_dict(), timeout=self.ttl)
+
+    def clear(self, session_id: str) -> None:
+        self.cache.delete(self._key(session_id))
+
+    def append(self, session_id: str, question: str, answer: str) -> ConversationState:
+        """Regista uma troca, comprimindo as trocas que saem da janela."""
+        state = self.load(session_id)
+        state.turns.append((question, answer))
+        self._compress(state)
+        self.save(session_id, state)
+        return state
+
+    def seed(self, session_id: str, history: List[Any]) -> None:
+        """
+        Inicializa uma sessão nova a partir do histórico enviado pelo cliente.
+
+        Só é usado quando o servidor ainda não tem estado (ex.: após expirar).
+        Do histórico só contam as últimas `window * SEED_MAX_WINDOWS` trocas:
+        o resto seria resumido numa só chamada ao LLM, de tamanho ilimitado.
+        """
+        if self.cache.get(self._key(session_id)) is not None:
+            return
+        if not isinstance(history, list):
+            return
+        state = ConversationState()
+        for exchange in history[-self.window * SEED_MAX_WINDOWS:]:
+            if isinstance(exchange, dict) and exchange.get('question'):
+                state.turns.append((exchange['question'], exchange.get('answer', '')))
+        if state.turns:
+            self._compress(state)
+            self.save(session_id, state)
+
+    def _compress(self, state: ConversationState) -> None:
+        overflow = len(state.turns) - self.window
+        if overflow > 0:
+            state.summary = self.summarizer(state.summary, self._summarizer_input(state.turns[:overflow]))
+            state.turns = state.turns[overflow:]
+
+    def _summarizer_input(self, turns: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """
+        As trocas mais recentes que cabem em `summary_input_tokens`; a mais
+        recente é cortada se não couber sozinha.
+        """
+        budget = self.summary_input_tokens
+        kept: List[Tuple[str, str]] = []
+        for question, answer in reversed(turns):
+            tokens = count_tokens(question) + count_tokens(answer)
+            if tokens > budget:
+                if not kept:
+                    # Aproximação de ~4 caracteres por token, repartidos pela pergunta e pela resposta
+                    kept.append((question[:budget * 2], answer[:budget * 2]))
+                break
+            budget -= tokens
+            kept.append((question, answer))
+        return list(reversed(kept))
+
+    def prompt_history(self, session_id: str) -> List[Tuple[str, str]]:
+        """
+        Histórico a enviar ao LLM, dentro do orçamento de tokens.
+
+        O resumo vem primeiro; seguem-se as trocas mais recentes que couberem.
+        """
+        state = self.load(session_id)
+        budget = self.token_budget
+        history: List[Tuple[str, str]] = []
+
+        if state.summary:
+            summary_tokens = count_tokens(state.summary)
+            if summary_tokens <= budget:
+                budget -= summary_tokens
+                history.append((SUMMARY_LABEL, state.summary))
+
+        recent: List[Tuple[str, str]] = []
+        for question, answer in reversed(state.turns):
+            tokens = count_tokens(question) + count_tokens(answer)
+            if tokens > budget:
+                break
+            budget -= tokens
+            recent.append((question, answer))
+
+        history.extend(reversed(recent))
+        return history
+
+
+def get_session_id(request: Any) -> str:
+    """Identificador da conversa: `session_id` do pedido ou a chave da sessão Django."""
+    session_id = request.data.get('session_id') if hasattr(request, 'data') else None
+    if session_id:
+        return str(session_id)
+    if not request.session.session_key:
+        request.session.save()
+    return request.session.session_key
+
+
+def conversation_key(request: Any, session_id: str) -> str:
+    """
+    Chave da conversa no armazenamento.
+
+    Para utilizadores autenticados a chave inclui o ID do utilizador, para que um
+    `session_id` adivinhado não dê acesso à conversa de outra pessoa. Os dois
+    tipos de chave têm prefixos distintos: um pedido anónimo não consegue
+    formar a chave de um utilizador, qualquer que seja o `session_id` enviado.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f"u:{user.pk}:{session_id}"
+    return f"s:{session_id}"
@@ -1,6 +1,5 @@
 # file_manager/services/document_processor.py
 
-import hashlib
 import logging
 import json
 from pathlib import Path
@@ -8,16 +7,15 @@ from typing import List, Dict, Any, Optional, Tuple
 
 # Importações do LangChain atualizadas
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.retrievers import BaseRetriever
 from langchain_core.runnables import RunnablePassthrough
 from langchain_community.vectorstores import FAISS
 from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate
 from langchain.chains import ConversationalRetrievalChain
-from langchain.memory import ConversationBufferMemory
 
 # Importações do Docling
-from docling.document_converter import DocumentConverter
+from docling.document_converter import DocumentConverter, PdfFormatOption
 from docling.datamodel.base_models import InputFormat
 from docling.datamodel.pipeline_options import (
     PdfPipelineOptions,
@@ -26,36 +24,75 @@ from docling.datamodel.pipeline_options import (
 )
 
 from django.conf import settings
-from django.db import transaction
+from django.db import IntegrityError, transaction
 
-from ..models import Document, DocumentEmbedding, DocumentCategory, Regulation
+from ..models import Document, DocumentEmbedding, DocumentCategory, Regulation, StoredBlob
+from ..utils.file_handlers import FileInfo, inspect_file
+from ..utils.metrics import CHUNKS_EMBEDDED, DOCUMENTS_PROCESSED, increment, timed
+from .embeddings import (
+    DEFAULT_EMBEDDING_MODEL,
+    active_embedding_model,
+    build_retriever,
+    embeddings_written,
+    get_embedding_provider,
+    searchable_embedding_models,
+)
+from .blob_store import BlobStore
+from .embedding_summary import record_embeddings
+from .model_clients import get_chat_model
+from .regulation_classifier import RegulationClassifier, save_classifications
+from .status_feed import record_event
+from .vector_index import RetrievalFilters
 
 logger = logging.getLogger(__name__)
 
+# Modelo por omissão; o modelo em uso é `settings.EMBEDDING_MODEL`
+EMBEDDING_MODEL_NAME = DEFAULT_EMBEDDING_MODEL
+
+
+class DuplicateDocumentError(ValueError):
+    """O arquivo já foi processado (ou está a sê-lo) noutro documento."""
+
+    def __init__(self, message: str, document: Document):
+        super().__init__(message)
+        self.document = document
+
+
 class DocumentProcessor:
-    def __init__(self):
-        self.doc_converter = self._setup_document_converter()
+    def __init__(
+        self,
+        embeddings: Optional[Any] = None,
+        llm: Optional[Any] = None,
+        doc_converter: Optional[Any] = None,
+        embedding_model: Optional[str] = None,
+    ):
+        """
+        Os componentes podem ser injetados (ex.: modelos locais nos testes e benchmarks);
+        por omissão são usados o Docling, o fornecedor de embeddings do modelo ativo
+        e o LLM partilhado do processo.
+
+        `embedding_model` é o nome guardado em `DocumentEmbedding.model_name`; com
+        embeddings injetados, deve corresponder ao modelo que os gera. Sem nenhum
+        dos dois, o processador segue o modelo ativo, mesmo que uma migração o
+        mude a meio de um documento.
+        """
+        self.doc_converter = doc_converter or self.setup_document_converter()
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
             chunk_overlap=200,
             length_function=len,
             add_start_index=True
         )
-        self.embeddings = OpenAIEmbeddings(
-            api_key=settings.OPENAI_API_KEY,
-            model="text-embedding-ada-002"
-        )
-        self.llm = ChatOpenAI(
-            model_name="gpt-4",
-            temperature=0.7,
-            api_key=settings.OPENAI_API_KEY
-        )
-        self.memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True
+        self.embedding_model = (
+            embedding_model or getattr(embeddings, 'model_name', None) or active_embedding_model()
         )
+        self.embeddings = embeddings or get_embedding_provider(self.embedding_model)
+        self.follows_active_model = embeddings is None and embedding_model is None
+        self.llm = llm or get_chat_model("gpt-4", temperature=0.7)
 
-    def _setup_document_converter(self) -> DocumentConverter:
+    @staticmethod
+    def setup_document_converter() -> DocumentConverter:
+        """Conversor Docling completo (layout, tabelas e OCR em português)."""
         pdf_options = PdfPipelineOptions(
             do_ocr=True,
             do_table_structure=True,
@@ -63,7 +100,7 @@ class DocumentProcessor:
             images_scale=2.0,
             ocr_options=TesseractOcrOptions(
                 force_full_page_ocr=True,
-                language='por'
+                lang=['por']
             )
         )
 
@@ -72,19 +109,13 @@ class DocumentProcessor:
                 InputFormat.PDF,
                 InputFormat.DOCX,
                 InputFormat.IMAGE,
-                InputFormat.HTML,
-                'txt'
+                InputFormat.HTML
             ],
-            pdf_options=pdf_options
+            format_options={
+                InputFormat.PDF: PdfFormatOption(pipeline_options=pdf_options)
+            }
         )
 
-    def _calculate_file_hash(self, file_path: str) -> str:
-        sha256_hash = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
-        return sha256_hash.hexdigest()
-
     def _detect_document_type(self, file_path: str) -> Document.DocumentType:
         ext = Path(file_path).suffix.lower()
         type_mapping = {
@@ -99,8 +130,13 @@ class DocumentProcessor:
         return type_mapping.get(ext, Document.DocumentType.OTHER)
 
     def _extract_metadata(self, doc_content: Any) -> Dict[str, Any]:
+        num_pages = getattr(doc_content, 'num_pages', 1)
+        if callable(num_pages):
+            # No DoclingDocument, num_pages é um método
+            num_pages = num_pages()
+
         metadata = {
-            'num_pages': getattr(doc_content, 'num_pages', 1),
+            'num_pages': num_pages,
             'has_images': False,
             'has_tables': False,
             'language': 'pt'
@@ -116,53 +152,163 @@ class DocumentProcessor:
 
         return metadata
 
-    @transaction.atomic
-    def process_document(self, file_path: str, title: Optional[str] = None) -> Document:
+    def process_document(
+        self,
+        file_path: str,
+        title: Optional[str] = None,
+        file_info: Optional[FileInfo] = None,
+        blob: Optional[StoredBlob] = None
+    ) -> Document:
+        """
+        Converte, fragmenta e indexa um arquivo.
+
+        Nenhuma transação abrange a conversão (com o OCR) nem o pedido de
+        embeddings: o documento é criado numa transação curta, os eventos de
+        progresso são gravados à medida que as etapas terminam e os fragmentos
+        e o status final numa última transação. Assim, outros uploads escrevem
+        na base de dados em paralelo e o progresso é visível de imediato. Se o
+        processamento falhar, o documento fica com o status ERROR e um novo
+        envio do mesmo arquivo reaproveita-o.
+        """
+        document = None
         try:
             if not Path(file_path).exists():
                 raise FileNotFoundError(f"Arquivo não encontrado: {file_path}")
 
-            file_hash = self._calculate_file_hash(file_path)
-            if Document.objects.filter(file_hash=file_hash).exists():
-                raise ValueError(f"Documento já processado anteriormente: {file_path}")
+            # Um processador reutilizado entre documentos usa o modelo ativo de cada um
+            self._switch_to_active_model()
 
-            document = Document.objects.create(
-                title=title or Path(file_path).name,
-                file_path=file_path,
-                document_type=self._detect_document_type(file_path),
-                status=Document.DocumentStatus.PROCESSING,
-                file_hash=file_hash
-            )
+            # Hash, tamanho e tipo MIME numa só leitura (reaproveitada, se já feita)
+            if file_info is None or file_info.sha256 is None:
+                file_info = inspect_file(file_path)
 
-            conversion_result = self.doc_converter.convert(file_path)
-            content = conversion_result.document.export_to_markdown()
+            with transaction.atomic(), timed('db_write'):
+                document = self._claim_document(file_path, title, file_info, blob)
+                record_event(document, 'received')
+
+            # Inclui o OCR, que o Docling executa durante a conversão
+            with timed('conversion'):
+                conversion_result = self.doc_converter.convert(file_path)
+                content = conversion_result.document.export_to_markdown()
             metadata = self._extract_metadata(conversion_result.document)
+            record_event(document, 'conversion')
+
+            with timed('splitting'):
+                text_chunks = self.text_splitter.split_text(content)
+            record_event(document, 'splitting')
             
-            text_chunks = self.text_splitter.split_text(content)
-            
-            for chunk in text_chunks:
-                embedding_vector = self.embeddings.embed_query(chunk)
-                DocumentEmbedding.objects.create(
-                    document=document,
-                    vector=embedding_vector,
-                    model_name="text-embedding-ada-002"
-                )
+            # Um pedido (ou lote local) por documento, em vez de um por fragmento
+            with timed('embedding', model=self.embedding_model):
+                vectors = self.embeddings.embed_documents(text_chunks) if text_chunks else []
+            increment(CHUNKS_EMBEDDED, len(text_chunks))
+            record_event(document, 'embedding')
+
+            # A ativação de uma migração durante a conversão já fez a sua recuperação:
+            # fragmentos do modelo anterior gravados agora deixariam de ser pesquisáveis
+            if self._switch_to_active_model():
+                with timed('embedding', model=self.embedding_model):
+                    vectors = self.embeddings.embed_documents(text_chunks) if text_chunks else []
 
             document.content = content
             document.metadata = metadata
             document.status = Document.DocumentStatus.PROCESSED
-            document.save()
+            # Os fragmentos e o status final ficam visíveis ao mesmo tempo
+            with transaction.atomic(), timed('db_write'):
+                DocumentEmbedding.objects.bulk_create([
+                    DocumentEmbedding(
+                        document=document,
+                        vector=vector,
+                        model_name=self.embedding_model,
+                        chunk_index=chunk_index,
+                        content=chunk
+                    )
+                    for chunk_index, (chunk, vector) in enumerate(zip(text_chunks, vectors))
+                ])
+                record_embeddings(document.pk, self.embedding_model, text_chunks, vectors)
+                document.save()
+                record_event(document, 'processed')
+            if vectors:
+                embeddings_written(self.embedding_model)
 
+            increment(DOCUMENTS_PROCESSED, status='processed')
             return document
 
         except Exception as e:
             logger.error(f"Erro ao processar documento {file_path}: {str(e)}")
-            if 'document' in locals():
+            increment(DOCUMENTS_PROCESSED, status='error')
+            if document is not None:
                 document.status = Document.DocumentStatus.ERROR
                 document.metadata = {'error': str(e)}
-                document.save()
+                with transaction.atomic():
+                    document.save(update_fields=['status', 'metadata', 'updated_at'])
+                    record_event(document, message=str(e))
             raise
 
+    def _switch_to_active_model(self) -> bool:
+        """Passa a usar o modelo ativo, se não for o atual; devolve se mudou."""
+        if not self.follows_active_model:
+            return False
+        model_name = active_embedding_model()
+        if model_name == self.embedding_model:
+            return False
+        logger.info(f"Modelo de embeddings ativo mudou de {self.embedding_model} para {model_name}")
+        self.embedding_model = model_name
+        self.embeddings = get_embedding_provider(model_name)
+        return True
+
+    def _claim_document(
+        self,
+        file_path: str,
+        title: Optional[str],
+        file_info: FileInfo,
+        blob: Optional[StoredBlob]
+    ) -> Document:
+        """
+        Cria o documento (ou reaproveita o de um processamento anterior que
+        falhou) com o status PROCESSING. Chamado dentro de uma transação.
+
+        O INSERT vem primeiro: a restrição de unicidade do hash decide entre
+        dois envios em simultâneo do mesmo conteúdo (no PostgreSQL, o segundo
+        espera pelo commit do primeiro), e só depois de um conflito se bloqueia
+        o documento existente para decidir se é reaproveitado.
+
+        Raises:
+            DuplicateDocumentError: se o arquivo já tiver sido processado (ou estiver a sê-lo)
+        """
+        fields = dict(
+            title=title or Path(file_path).name,
+            file_path=file_path,
+            document_type=self._detect_document_type(file_path),
+            status=Document.DocumentStatus.PROCESSING,
+            file_size=file_info.size,
+            mime_type=file_info.mime_type,
+            metadata={},
+        )
+        try:
+            with transaction.atomic():
+                document = Document.objects.create(file_hash=file_info.sha256, blob=blob, **fields)
+        except IntegrityError:
+            document = Document.objects.select_for_update().filter(file_hash=file_info.sha256).first()
+            if document is None:
+                raise
+        else:
+            if blob is not None:
+                BlobStore.acquire(blob)
+            return document
+
+        if document.status != Document.DocumentStatus.ERROR:
+            raise DuplicateDocumentError(f"Documento já processado anteriormente: {file_path}", document)
+
+        for name, value in fields.items():
+            setattr(document, name, value)
+        if blob is not None and document.blob_id != blob.pk:
+            if document.blob_id is not None:
+                BlobStore.release(document.blob_id)
+            BlobStore.acquire(blob)
+            document.blob = blob
+        document.save()
+        return document
+
     def process_batch(self, file_paths: List[str]) -> List[Document]:
         processed_documents = []
         for file_path in file_paths:
@@ -173,29 +319,38 @@ class DocumentProcessor:
                 logger.error(f"Erro ao processar {file_path}: {e}")
         return processed_documents
 
-    def setup_qa_chain(self, documents: List[Document]) -> ConversationalRetrievalChain:
-        documents_texts = []
-        for doc in documents:
-            if doc.content:
-                chunks = self.text_splitter.split_text(doc.content)
-                documents_texts.extend(chunks)
-
-        vectorstore = FAISS.from_texts(
-            documents_texts,
-            self.embeddings,
-            metadatas=[{"source": f"doc_{i}"} for i in range(len(documents_texts))]
-        )
+    def get_retriever(
+        self,
+        documents: Optional[List[Document]] = None,
+        filters: Optional[RetrievalFilters] = None,
+        search_type: str = "mmr",
+        k: int = 5,
+        fetch_k: int = 10
+    ) -> BaseRetriever:
+        """
+        Cria um retriever sobre os índices vetoriais persistidos, com filtros de metadados.
+
+        Os embeddings já guardados são reutilizados; nenhum documento é reprocessado.
+        Num corpus com vários modelos, cada índice é pesquisado com o seu modelo.
+        """
+        filters = filters or RetrievalFilters()
+        if documents is not None:
+            filters = filters.restricted_to(doc.pk for doc in documents)
+
+        providers = {
+            model_name: get_embedding_provider(model_name) for model_name in searchable_embedding_models()
+        }
+        providers[self.embedding_model] = self.embeddings
+        return build_retriever(filters, search_type=search_type, k=k, fetch_k=fetch_k, providers=providers)
 
+    def setup_qa_chain(
+        self,
+        documents: Optional[List[Document]] = None,
+        filters: Optional[RetrievalFilters] = None
+    ) -> ConversationalRetrievalChain:
         qa_chain = ConversationalRetrievalChain.from_llm(
             llm=self.llm,
-            retriever=vectorstore.as_retriever(
-                search_type="mmr",
-                search_kwargs={
-                    "k": 5,
-                    "fetch_k": 10
-                }
-            ),
-            memory=self.memory,
+            retriever=self.get_retriever(documents, filters),
             return_source_documents=True,
             verbose=True
         )
@@ -203,36 +358,18 @@ class DocumentProcessor:
         return qa_chain
 
     def classify_regulation(self, document: Document) -> Optional[Regulation]:
+        """
+        Classifica um documento como regulamento: pelas regras quando são
+        conclusivas, pelo LLM caso contrário. Para o corpus inteiro, usar o
+        comando classify_regulations, que agrupa os pedidos ao LLM.
+        """
         try:
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", """Você é um especialista em análise de regulamentos do setor de telecomunicações.
-                Analise o documento e extraia:
-                1. Tipo de regulamento
-                2. Escopo de aplicação
-                3. Data de vigência
-                4. Principais disposições
-                5. Relação com outros regulamentos
-                
-                Retorne a análise em formato JSON."""),
-                ("human", f"Documento: {document.content[:2000]}...")
-            ])
-
-            response = self.llm.invoke(prompt)
-            
-            try:
-                analysis = json.loads(response.content)
-                if analysis.get('is_regulation'):
-                    return Regulation.objects.create(
-                        title=analysis.get('title'),
-                        regulation_type=analysis.get('type'),
-                        document=document,
-                        effective_date=analysis.get('effective_date'),
-                        status='ACTIVE'
-                    )
-            except json.JSONDecodeError:
-                logger.error(f"Erro ao processar resposta da IA para documento {document.id}")
-                
-            return None
+            classifier = RegulationClassifier(llm=self.llm)
+            classifications = classifier.classify([document])
+            if not classifications:
+                return None
+            save_classifications(classifications, {document.pk: document})
+            return document.regulations.first()
 
         except Exception as e:
             logger.error(f"Erro ao classificar regulamento: {str(e)}")
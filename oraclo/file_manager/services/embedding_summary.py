@@ -0,0 +1,112 @@
+# file_manager/services/embedding_summary.py
+
+from typing import Iterable, Optional, Sequence
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, F, Max, OuterRef
+from django.utils import timezone
+
+from ..models import DocumentEmbedding, EmbeddingSummary
+from ..utils.tokens import count_tokens
+
+
+def record_embeddings(
+    document_id: int,
+    model_name: str,
+    texts: Sequence[str],
+    vectors: Sequence[Sequence[float]],
+    tokens: Optional[int] = None,
+) -> None:
+    """
+    Acrescenta ao resumo do documento os fragmentos acabados de gravar.
+
+    Chamado na mesma transação que grava os vetores, para o resumo nunca
+    divergir deles.
+
+    Args:
+        document_id: Documento dos fragmentos
+        model_name: Modelo que gerou os vetores
+        texts: Textos dos fragmentos
+        vectors: Vetores gravados
+        tokens: Tokens dos textos, se já contados
+    """
+    if not vectors:
+        return
+    chunks = len(vectors)
+    if tokens is None:
+        tokens = sum(count_tokens(text) for text in texts)
+    dimensions = len(vectors[0])
+    now = timezone.now()
+
+    updates = dict(
+        chunk_count=F('chunk_count') + chunks,
+        total_tokens=F('total_tokens') + tokens,
+        dimensions=dimensions,
+        last_embedded_at=now,
+        updated_at=now,
+    )
+    summaries = EmbeddingSummary.objects.filter(document_id=document_id, model_name=model_name)
+    if summaries.update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            EmbeddingSummary.objects.create(
+                document_id=document_id,
+                model_name=model_name,
+                chunk_count=chunks,
+                total_tokens=tokens,
+                dimensions=dimensions,
+                last_embedded_at=now,
+            )
+    except IntegrityError:
+        # Outro processo criou o resumo entretanto
+        summaries.update(**updates)
+
+
+def rebuild_embedding_summaries(document_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recalcula os resumos a partir dos fragmentos gravados (documentos anteriores
+    aos resumos ou alterados fora da aplicação).
+
+    A contagem vem de uma agregação; os textos são lidos para contar os tokens
+    e só um vetor por documento e modelo é carregado, para as dimensões.
+
+    Returns:
+        int: Número de resumos gravados
+    """
+    document_ids = list(document_ids) if document_ids is not None else None
+    embeddings = DocumentEmbedding.objects.all()
+    if document_ids is not None:
+        embeddings = embeddings.filter(document_id__in=document_ids)
+
+    groups = embeddings.values('document_id', 'model_name').annotate(
+        chunks=Count('id'), last_embedded_at=Max('created_at'), sample_id=Max('id')
+    ).order_by('document_id', 'model_name')
+
+    written = 0
+    for group in list(groups):
+        chunks = DocumentEmbedding.objects.filter(
+            document_id=group['document_id'], model_name=group['model_name']
+        )
+        tokens = sum(count_tokens(text) for text in chunks.values_list('content', flat=True).iterator())
+        sample = DocumentEmbedding.objects.only('vector').get(pk=group['sample_id'])
+        EmbeddingSummary.objects.update_or_create(
+            document_id=group['document_id'],
+            model_name=group['model_name'],
+            defaults={
+                'chunk_count': group['chunks'],
+                'dimensions': len(sample.vector or []),
+                'total_tokens': tokens,
+                'last_embedded_at': group['last_embedded_at'],
+            },
+        )
+        written += 1
+
+    # Resumos de modelos cujos fragmentos já não existem
+    stale = EmbeddingSummary.objects.filter(~Exists(DocumentEmbedding.objects.filter(
+        document_id=OuterRef('document_id'), model_name=OuterRef('model_name')
+    )))
+    if document_ids is not None:
+        stale = stale.filter(document_id__in=document_ids)
+    stale.delete()
+    return written
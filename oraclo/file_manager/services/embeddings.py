@@ -0,0 +1,363 @@
+# file_manager/services/embeddings.py
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+
+from ..models import DocumentEmbedding, EmbeddingMigration
+from .index_versions import write_pointer
+from .model_clients import get_openai_embeddings
+from .vector_index import (
+    FusedRetriever,
+    RetrievalFilters,
+    VectorIndexRetriever,
+    get_vector_index,
+    vector_index_root,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EMBEDDING_MODEL = 'text-embedding-ada-002'
+ACTIVE_MODEL_FILE = 'ACTIVE_MODEL'
+
+# Chaves da configuração de um modelo que não são passadas ao fornecedor
+PROVIDER_METADATA_KEYS = ('BACKEND', 'COST_PER_1K_TOKENS')
+
+# Segundos durante os quais o processo reutiliza a lista de modelos com fragmentos
+MODELS_WITH_EMBEDDINGS_TTL = 60
+
+
+class EmbeddingProvider(Embeddings):
+    """
+    Fornecedor de embeddings de um modelo.
+
+    `model_name` é o valor guardado em `DocumentEmbedding.model_name`: vetores de
+    modelos diferentes nunca são comparados entre si, cada modelo tem o seu índice.
+    """
+    backend = ''
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.model_name!r})'
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """Embeddings pela API da OpenAI, através do cliente partilhado do processo."""
+    backend = 'openai'
+
+    def __init__(self, model_name: str, batch_size: Optional[int] = None, **options: Any):
+        super().__init__(model_name)
+        if batch_size:
+            options['chunk_size'] = batch_size
+        self.options = options
+        self._client = None
+
+    @property
+    def client(self) -> Any:
+        # Criado só no primeiro uso: configurar o modelo não exige chave da API
+        if self._client is None:
+            self._client = get_openai_embeddings(self.model_name, **self.options)
+        return self._client
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.client.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.client.embed_query(text)
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """
+    Modelo de embeddings local (transformers em CPU), sem rede.
+
+    Os textos são ordenados por comprimento e codificados em lotes de
+    `batch_size`, o que reduz o padding; cada lote é paralelizado pelo torch em
+    `num_threads` threads. Modelos como o E5 esperam prefixos diferentes para
+    consultas e passagens (`query_prefix`, `document_prefix`).
+    """
+    backend = 'local'
+
+    def __init__(
+        self,
+        model_name: str,
+        path: Optional[str] = None,
+        batch_size: int = 32,
+        num_threads: Optional[int] = None,
+        max_length: int = 512,
+        pooling: str = 'mean',
+        normalize: bool = True,
+        query_prefix: str = '',
+        document_prefix: str = '',
+    ):
+        super().__init__(model_name)
+        if pooling not in ('mean', 'cls'):
+            raise ImproperlyConfigured(f"Pooling inválido para {model_name}: {pooling} (use 'mean' ou 'cls')")
+        self.path = path or model_name
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self.max_length = max_length
+        self.pooling = pooling
+        self.normalize = normalize
+        self.query_prefix = query_prefix
+        self.document_prefix = document_prefix
+        self._model = None
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        try:
+            import torch
+            from transformers import AutoModel, AutoTokenizer
+        except ImportError:
+            raise ImproperlyConfigured(
+                f"O modelo local {self.model_name} requer os pacotes torch e transformers"
+            )
+
+        if self.num_threads:
+            torch.set_num_threads(self.num_threads)
+        self._tokenizer = AutoTokenizer.from_pretrained(self.path)
+        self._model = AutoModel.from_pretrained(self.path)
+        self._model.eval()
+        logger.info(
+            f"Modelo de embeddings local {self.model_name} carregado de {self.path} "
+            f"({torch.get_num_threads()} threads)"
+        )
+
+    def _encode_batch(self, texts: List[str]) -> List[List[float]]:
+        import torch
+
+        encoded = self._tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_length, return_tensors='pt'
+        )
+        with torch.inference_mode():
+            hidden = self._model(**encoded).last_hidden_state
+            if self.pooling == 'cls':
+                pooled = hidden[:, 0]
+            else:
+                mask = encoded['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+            if self.normalize:
+                pooled = torch.nn.functional.normalize(pooled, p=2, dim=1)
+        return pooled.tolist()
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        # Um modelo por processo; o torch paraleliza cada lote internamente
+        with self._lock:
+            if self._model is None:
+                self._load()
+            order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+            vectors: List[Optional[List[float]]] = [None] * len(texts)
+            for start in range(0, len(order), self.batch_size):
+                batch = order[start:start + self.batch_size]
+                for position, vector in zip(batch, self._encode_batch([texts[i] for i in batch])):
+                    vectors[position] = vector
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed([self.document_prefix + text for text in texts])
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([self.query_prefix + text])[0]
+
+
+BACKENDS: Dict[str, Callable[..., EmbeddingProvider]] = {
+    OpenAIEmbeddingProvider.backend: OpenAIEmbeddingProvider,
+    LocalEmbeddingProvider.backend: LocalEmbeddingProvider,
+}
+
+_providers: Dict[str, EmbeddingProvider] = {}
+_providers_lock = threading.Lock()
+_models_with_embeddings: Dict[str, Tuple[float, bool]] = {}
+_models_lock = threading.Lock()
+
+
+def active_embedding_model() -> str:
+    """
+    Modelo usado nos documentos novos e nas consultas.
+
+    É `settings.EMBEDDING_MODEL`, exceto depois de uma re-indexação ativar outro
+    modelo: o ponteiro `ACTIVE_MODEL` é substituído atomicamente, como o `CURRENT`
+    dos índices, e todos os processos passam ao novo modelo no pedido seguinte.
+    """
+    try:
+        model_name = (vector_index_root() / ACTIVE_MODEL_FILE).read_text(encoding='utf-8').strip()
+    except FileNotFoundError:
+        model_name = ''
+    return model_name or getattr(settings, 'EMBEDDING_MODEL', DEFAULT_EMBEDDING_MODEL)
+
+
+def set_active_embedding_model(model_name: str) -> None:
+    """Muda o modelo ativo de todos os processos que partilham `settings.VECTOR_INDEX_DIR`."""
+    root = vector_index_root()
+    root.mkdir(parents=True, exist_ok=True)
+    write_pointer(root / ACTIVE_MODEL_FILE, model_name)
+    logger.info(f"Modelo de embeddings ativo: {model_name}")
+
+
+def embedding_cost_per_1k_tokens(model_name: str) -> float:
+    """Preço por 1000 tokens do modelo (`COST_PER_1K_TOKENS`; 0 para modelos locais)."""
+    try:
+        return float(provider_config(model_name).get('COST_PER_1K_TOKENS') or 0.0)
+    except ImproperlyConfigured:
+        return 0.0
+
+
+def configured_embedding_models() -> List[str]:
+    """Modelos com fornecedor configurado, começando pelo modelo ativo."""
+    active = active_embedding_model()
+    return [active] + [name for name in getattr(settings, 'EMBEDDING_PROVIDERS', {}) if name != active]
+
+
+def models_with_embeddings(model_names: Iterable[str]) -> Set[str]:
+    """
+    Os modelos indicados que têm fragmentos guardados.
+
+    Uma consulta indexada por modelo, reutilizada durante
+    MODELS_WITH_EMBEDDINGS_TTL segundos; `embeddings_written` invalida-a no
+    processo que grava. Noutro processo, um modelo só começa a ter fragmentos
+    como destino de uma migração, que só é pesquisado depois de ativado (e o
+    modelo ativo é sempre pesquisado), pelo que o atraso não tem efeito.
+    """
+    now = time.monotonic()
+    found = set()
+    for model_name in model_names:
+        with _models_lock:
+            cached = _models_with_embeddings.get(model_name)
+        if cached is None or cached[0] <= now:
+            has_embeddings = DocumentEmbedding.objects.filter(model_name=model_name).exists()
+            cached = (now + MODELS_WITH_EMBEDDINGS_TTL, has_embeddings)
+            with _models_lock:
+                _models_with_embeddings[model_name] = cached
+        if cached[1]:
+            found.add(model_name)
+    return found
+
+
+def embeddings_written(model_name: str) -> None:
+    """Regista que o modelo passou a ter fragmentos (ver `models_with_embeddings`)."""
+    with _models_lock:
+        cached = _models_with_embeddings.get(model_name)
+        if cached is not None and not cached[1]:
+            del _models_with_embeddings[model_name]
+
+
+def reset_models_with_embeddings() -> None:
+    with _models_lock:
+        _models_with_embeddings.clear()
+
+
+def searchable_embedding_models() -> List[str]:
+    """
+    Modelos pesquisados pelas consultas: o ativo e os restantes configurados que
+    tenham fragmentos (um modelo configurado mas sem dados não custa nada por pedido).
+
+    Ficam de fora os destinos de migrações ainda não ativadas (índice incompleto
+    ou por validar) e as origens das ativadas (o destino cobre os mesmos fragmentos).
+    """
+    active = active_embedding_model()
+    excluded = set()
+    for source, target, activated_at in EmbeddingMigration.objects.values_list(
+        'source_model', 'target_model', 'activated_at'
+    ):
+        excluded.add(source if activated_at else target)
+    candidates = [name for name in configured_embedding_models()[1:] if name not in excluded]
+    populated = models_with_embeddings(candidates)
+    return [active] + [name for name in candidates if name in populated]
+
+
+def provider_config(model_name: str) -> Dict[str, Any]:
+    configs = getattr(settings, 'EMBEDDING_PROVIDERS', {})
+    if model_name in configs:
+        return dict(configs[model_name])
+    if model_name == DEFAULT_EMBEDDING_MODEL:
+        return {'BACKEND': OpenAIEmbeddingProvider.backend}
+    raise ImproperlyConfigured(f"Nenhum fornecedor de embeddings configurado para o modelo {model_name}")
+
+
+def create_embedding_provider(model_name: str, config: Optional[Dict[str, Any]] = None) -> EmbeddingProvider:
+    """
+    Cria o fornecedor de um modelo a partir da configuração.
+
+    `BACKEND` é `openai`, `local` ou o caminho de uma classe; as restantes chaves
+    são passadas ao construtor em minúsculas (ex.: `BATCH_SIZE` -> `batch_size`).
+    """
+    config = dict(config if config is not None else provider_config(model_name))
+    backend = config.get('BACKEND', OpenAIEmbeddingProvider.backend)
+    provider_class = BACKENDS.get(backend) or import_string(backend)
+    options = {
+        key.lower(): value for key, value in config.items()
+        if value is not None and key not in PROVIDER_METADATA_KEYS
+    }
+    return provider_class(model_name, **options)
+
+
+def get_embedding_provider(model_name: Optional[str] = None) -> EmbeddingProvider:
+    """Fornecedor partilhado do processo para o modelo (por omissão, o modelo ativo)."""
+    model_name = model_name or active_embedding_model()
+    with _providers_lock:
+        provider = _providers.get(model_name)
+        if provider is None:
+            provider = _providers[model_name] = create_embedding_provider(model_name)
+        return provider
+
+
+def reset_embedding_providers() -> None:
+    with _providers_lock:
+        _providers.clear()
+
+
+def build_retriever(
+    filters: Optional[RetrievalFilters] = None,
+    search_type: str = 'mmr',
+    k: int = 5,
+    fetch_k: int = 10,
+    providers: Optional[Dict[str, Embeddings]] = None,
+) -> BaseRetriever:
+    """
+    Retriever sobre o corpus inteiro, mesmo que tenha embeddings de vários modelos.
+
+    Cada modelo com fragmentos guardados é pesquisado no seu próprio índice, com a
+    consulta embebida pelo mesmo modelo; havendo mais de um, os resultados são
+    combinados por fusão de rankings (as pontuações de modelos diferentes não são
+    comparáveis).
+
+    Args:
+        filters: Filtros de metadados
+        search_type: `mmr` ou `similarity`
+        k: Número de fragmentos devolvidos
+        fetch_k: Candidatos considerados pelo MMR
+        providers: Fornecedores por modelo (por omissão, os de `searchable_embedding_models`)
+
+    Returns:
+        BaseRetriever: Retriever de um só índice ou a fusão dos vários
+    """
+    model_names = list(providers) if providers is not None else searchable_embedding_models()
+    indexes = [(model_name, get_vector_index(model_name)) for model_name in model_names]
+    # Sem dados em nenhum modelo, pesquisa-se o índice (vazio) do primeiro
+    populated = [(model_name, index) for model_name, index in indexes if len(index)] or indexes[:1]
+
+    retrievers = [
+        VectorIndexRetriever(
+            index=index,
+            embeddings=providers[model_name] if providers is not None else get_embedding_provider(model_name),
+            filters=filters,
+            search_type=search_type,
+            k=k,
+            fetch_k=fetch_k
+        )
+        for model_name, index in populated
+    ]
+    if len(retrievers) == 1:
+        return retrievers[0]
+    return FusedRetriever(retrievers=retrievers, k=k)
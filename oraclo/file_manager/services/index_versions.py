@@ -0,0 +1,134 @@
+# file_manager/services/index_versions.py
+
+import logging
+import os
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = 'CURRENT'
+LOCK_FILE = '.publish.lock'
+VERSIONS_DIR = 'versions'
+STAGING_PREFIX = '.staging-'
+
+
+def new_version_id() -> str:
+    return timezone.now().strftime('%Y%m%dT%H%M%S%f')
+
+
+def version_path(model_dir: Path, version: str) -> Path:
+    return Path(model_dir) / VERSIONS_DIR / version
+
+
+def current_version(model_dir: Path) -> Optional[str]:
+    """
+    Lê a versão publicada do índice.
+
+    O ficheiro `CURRENT` é pequeno e substituído atomicamente, por isso ler a cada
+    pedido é barato e nunca devolve um valor parcial.
+    """
+    try:
+        version = (Path(model_dir) / CURRENT_FILE).read_text(encoding='utf-8').strip()
+    except FileNotFoundError:
+        return None
+    return version or None
+
+
+def write_pointer(path: Path, value: str) -> None:
+    """Substitui atomicamente um ficheiro-ponteiro (escrita num temporário + `os.replace`)."""
+    path = Path(path)
+    temporary = path.with_name(f'{path.name}.tmp')
+    with open(temporary, 'w', encoding='utf-8') as f:
+        f.write(value)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+def current_version_path(model_dir: Path) -> Optional[Path]:
+    version = current_version(model_dir)
+    return version_path(model_dir, version) if version else None
+
+
+@contextmanager
+def _publish_lock(model_dir: Path) -> Iterator[None]:
+    """Impede que duas publicações do mesmo modelo corram em simultâneo."""
+    if fcntl is None:
+        yield
+        return
+    with open(Path(model_dir) / LOCK_FILE, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def create_staging_directory(model_dir: Path, version: str) -> Path:
+    """Diretório onde uma nova versão é escrita antes de ser publicada."""
+    staging = Path(model_dir) / VERSIONS_DIR / f'{STAGING_PREFIX}{version}'
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir(parents=True)
+    return staging
+
+
+def publish_version(model_dir: Path, staging: Path, version: str, keep: Optional[int] = None) -> Path:
+    """
+    Publica uma versão já escrita em `staging`.
+
+    A versão é movida para `versions/<versão>` e o ponteiro `CURRENT` é substituído
+    com `os.replace`, que é atómico: cada processo vê a versão antiga ou a nova,
+    nunca uma mistura. Os processos que ainda usam a versão antiga mantêm os seus
+    mapeamentos válidos mesmo depois de os ficheiros serem removidos.
+
+    Args:
+        model_dir: Diretório do índice do modelo
+        staging: Diretório com a versão completa
+        version: Identificador da versão
+        keep: Número de versões a manter (por omissão `settings.VECTOR_INDEX_KEEP_VERSIONS`)
+
+    Returns:
+        Path: Diretório final da versão publicada
+    """
+    model_dir = Path(model_dir)
+    keep = keep or getattr(settings, 'VECTOR_INDEX_KEEP_VERSIONS', 2)
+    final = version_path(model_dir, version)
+
+    with _publish_lock(model_dir):
+        os.rename(staging, final)
+        write_pointer(model_dir / CURRENT_FILE, version)
+        logger.info(f"Versão {version} do índice publicada em {model_dir}")
+        _prune_versions(model_dir, keep)
+    return final
+
+
+def _prune_versions(model_dir: Path, keep: int) -> None:
+    versions_dir = Path(model_dir) / VERSIONS_DIR
+    published = sorted(
+        path for path in versions_dir.iterdir()
+        if path.is_dir() and not path.name.startswith(STAGING_PREFIX)
+    )
+    current = current_version(model_dir)
+    for path in published[:-keep]:
+        if path.name != current:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def link_or_copy(source: str, destination: str) -> None:
+    """Cria um hardlink (partilha as páginas em cache) ou copia se não for possível."""
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
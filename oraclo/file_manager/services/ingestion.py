@@ -0,0 +1,295 @@
+# file_manager/services/ingestion.py
+
+import logging
+import tarfile
+import threading
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path, PurePosixPath
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import Document, IngestionJob
+from ..utils.file_handlers import FileValidator
+from ..utils.metrics import increment, timed
+from .blob_store import BlobStore
+from .document_processor import DocumentProcessor, DuplicateDocumentError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INGESTION_CONFIG = {
+    'WORKERS': 2,
+    'MAX_FILES': 500,
+    'STALE_AFTER_MINUTES': 60,
+}
+
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+INGESTION_JOBS = 'oraclo_ingestion_jobs_total'
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_local = threading.local()
+
+
+def ingestion_config() -> Dict[str, Any]:
+    return {**DEFAULT_INGESTION_CONFIG, **getattr(settings, 'BULK_INGESTION', {})}
+
+
+def allowed_extensions() -> set:
+    return {ext for extensions in FileValidator.ALLOWED_MIMETYPES.values() for ext in extensions}
+
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _archive_entries(archive: UploadedFile) -> Iterator[Tuple[str, BinaryIO]]:
+    """
+    Entradas de um zip ou tar, lidas uma a uma em streaming (nada é extraído
+    para disco; cada entrada vai diretamente para o armazenamento).
+    """
+    if archive.name.lower().endswith('.zip'):
+        with zipfile.ZipFile(archive) as bundle:
+            for entry in bundle.infolist():
+                if not entry.is_dir():
+                    with bundle.open(entry) as stream:
+                        yield entry.filename, stream
+        return
+
+    # Modo "r|*": leitura sequencial, sem procurar no arquivo
+    with tarfile.open(fileobj=archive, mode='r|*') as bundle:
+        for member in bundle:
+            if member.isfile():
+                yield member.name, bundle.extractfile(member)
+
+
+def _skip_entry(name: str) -> bool:
+    path = PurePosixPath(name)
+    return any(part.startswith('.') or part == '__MACOSX' for part in path.parts)
+
+
+def receive_files(
+    files: Iterable[UploadedFile],
+    user: Optional[Any] = None,
+    store: Optional[BlobStore] = None,
+) -> Tuple[uuid.UUID, List[IngestionJob], List[Dict[str, str]]]:
+    """
+    Guarda os arquivos (e as entradas dos arquivos compactados) e cria um
+    trabalho de ingestão por arquivo válido.
+
+    Args:
+        files: Arquivos do pedido; zip e tar são abertos e as entradas tratadas
+            como arquivos
+        user: Utilizador que enviou o lote
+        store: Armazenamento a usar (por omissão, o configurado)
+
+    Returns:
+        Tuple: Identificador do lote, trabalhos criados e arquivos rejeitados
+        (`{'filename', 'error'}`)
+
+    Raises:
+        ValueError: se o lote exceder BULK_INGESTION['MAX_FILES'] arquivos
+    """
+    store = store or BlobStore()
+    batch = uuid.uuid4()
+    max_files = ingestion_config()['MAX_FILES']
+    user = user if getattr(user, 'is_authenticated', False) else None
+    jobs: List[IngestionJob] = []
+    rejected: List[Dict[str, str]] = []
+
+    def entries() -> Iterator[Tuple[str, BinaryIO]]:
+        for uploaded in files:
+            if is_archive(uploaded.name):
+                try:
+                    for name, stream in _archive_entries(uploaded):
+                        if not _skip_entry(name):
+                            yield f"{uploaded.name}/{name}", stream
+                except (zipfile.BadZipFile, tarfile.TarError) as e:
+                    rejected.append({'filename': uploaded.name, 'error': f"Arquivo compactado inválido: {str(e)}"})
+            else:
+                yield uploaded.name, uploaded
+
+    for name, stream in entries():
+        if len(jobs) + len(rejected) >= max_files:
+            raise ValueError(f"Lote com mais de {max_files} arquivos")
+
+        extension = Path(name).suffix.lower()
+        if extension not in allowed_extensions():
+            rejected.append({'filename': name, 'error': f"Extensão de arquivo não permitida: {extension or '(nenhuma)'}"})
+            continue
+        try:
+            with timed('ingestion_receive'):
+                blob, _, info = store.put_stream(stream, extension, max_size=FileValidator.MAX_FILE_SIZE)
+            is_valid, error_message = FileValidator.validate_file(info.path, info=info)
+            if not is_valid:
+                raise ValueError(error_message)
+        except ValueError as e:
+            rejected.append({'filename': name, 'error': str(e)})
+            continue
+
+        jobs.append(IngestionJob(batch=batch, user=user, filename=name[:255], blob=blob))
+
+    IngestionJob.objects.bulk_create(jobs)
+    increment(INGESTION_JOBS, len(jobs), status='queued')
+    return batch, jobs, rejected
+
+
+def _thread_converter() -> Any:
+    # O conversor do Docling é pesado e não é partilhado entre threads; o resto do
+    # processador (com o modelo de embeddings ativo) é criado em cada trabalho
+    converter = getattr(_local, 'converter', None)
+    if converter is None:
+        converter = _local.converter = DocumentProcessor.setup_document_converter()
+    return converter
+
+
+def run_job(job_id: int, processor: Optional[DocumentProcessor] = None) -> IngestionJob:
+    """
+    Processa um trabalho em fila. Um trabalho já reclamado por outro worker
+    não é processado de novo.
+    """
+    claimed = IngestionJob.objects.filter(pk=job_id, status=IngestionJob.JobStatus.QUEUED).update(
+        status=IngestionJob.JobStatus.PROCESSING, started_at=timezone.now(), updated_at=timezone.now()
+    )
+    job = IngestionJob.objects.select_related('blob').get(pk=job_id)
+    if not claimed:
+        return job
+
+    try:
+        if job.blob is None:
+            raise ValueError("Conteúdo do arquivo indisponível")
+        existing = Document.objects.filter(file_hash=job.blob.sha256).exclude(
+            status=Document.DocumentStatus.ERROR
+        ).first()
+        if existing is not None:
+            job.status = IngestionJob.JobStatus.DUPLICATE
+            job.document = existing
+        else:
+            store = BlobStore()
+            path = store.path(job.blob)
+            processor = processor or DocumentProcessor(doc_converter=_thread_converter())
+            job.document = processor.process_document(
+                str(path), title=Path(job.filename).stem, blob=job.blob
+            )
+            job.status = IngestionJob.JobStatus.COMPLETED
+    except DuplicateDocumentError as e:
+        # O mesmo conteúdo chegou em simultâneo noutro trabalho (ou upload)
+        job.status = IngestionJob.JobStatus.DUPLICATE
+        job.document = e.document
+    except Exception as e:
+        logger.error(f"Erro no trabalho de ingestão {job.pk} ({job.filename}): {str(e)}")
+        job.status = IngestionJob.JobStatus.FAILED
+        job.error = str(e)
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'document', 'error', 'finished_at', 'updated_at'])
+    increment(INGESTION_JOBS, status=job.status.lower())
+    return job
+
+
+def _run_in_worker(job_id: int) -> None:
+    try:
+        run_job(job_id)
+    finally:
+        # Cada thread do pool tem a sua ligação; não a deixar pendurada
+        close_old_connections()
+
+
+def get_executor() -> Optional[ThreadPoolExecutor]:
+    """Pool de processamento do processo (nenhum com BULK_INGESTION['WORKERS'] = 0)."""
+    global _executor
+    workers = ingestion_config()['WORKERS']
+    if workers <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ingestion')
+        return _executor
+
+
+def enqueue(jobs: Iterable[IngestionJob]) -> None:
+    """
+    Envia os trabalhos para o pool. Sem pool, ficam em fila na base de dados até
+    o comando process_ingestion_jobs os processar (que também recupera os
+    trabalhos de um processo que terminou a meio).
+    """
+    executor = get_executor()
+    if executor is None:
+        return
+    for job in jobs:
+        executor.submit(_run_in_worker, job.pk)
+
+
+def requeue_stale_jobs(stale_after: Optional[timedelta] = None) -> int:
+    """
+    Volta a pôr em fila os trabalhos interrompidos a meio (ex.: o processo
+    terminou durante o processamento). Só conta como interrompido um trabalho
+    em processamento há mais de `stale_after`: os que um worker vivo está a
+    processar não são tocados.
+
+    Os documentos que esses trabalhos deixaram com o status PROCESSING passam a
+    ERROR, para serem reaproveitados quando o trabalho voltar a correr.
+
+    Args:
+        stale_after: Por omissão, BULK_INGESTION['STALE_AFTER_MINUTES']
+
+    Returns:
+        int: Número de trabalhos de volta à fila
+    """
+    if stale_after is None:
+        stale_after = timedelta(minutes=ingestion_config()['STALE_AFTER_MINUTES'])
+    cutoff = timezone.now() - stale_after
+    with transaction.atomic():
+        stale = list(
+            IngestionJob.objects.select_for_update()
+            .filter(status=IngestionJob.JobStatus.PROCESSING)
+            .filter(Q(started_at__lt=cutoff) | Q(started_at__isnull=True))
+            .values_list('pk', 'blob_id')
+        )
+        if not stale:
+            return 0
+        Document.objects.filter(
+            status=Document.DocumentStatus.PROCESSING,
+            blob_id__in=[blob_id for _, blob_id in stale if blob_id is not None],
+        ).update(
+            status=Document.DocumentStatus.ERROR,
+            metadata={'error': 'Processamento interrompido'},
+            updated_at=timezone.now(),
+        )
+        return IngestionJob.objects.filter(pk__in=[pk for pk, _ in stale]).update(
+            status=IngestionJob.JobStatus.QUEUED, started_at=None, updated_at=timezone.now()
+        )
+
+
+def batch_status(batch: Optional[uuid.UUID] = None, job_ids: Optional[Iterable[int]] = None) -> Dict[str, Any]:
+    """
+    Estado de um lote (ou de uma lista de trabalhos) numa só consulta.
+
+    Returns:
+        Dict[str, Any]: Totais por estado e o estado de cada trabalho
+    """
+    jobs = IngestionJob.objects.all()
+    if batch is not None:
+        jobs = jobs.filter(batch=batch)
+    if job_ids is not None:
+        jobs = jobs.filter(pk__in=list(job_ids))
+
+    rows = list(jobs.values('id', 'filename', 'status', 'document_id', 'error'))
+    counts = {status: 0 for status in IngestionJob.JobStatus.values}
+    for row in rows:
+        counts[row['status']] += 1
+    pending = counts[IngestionJob.JobStatus.QUEUED] + counts[IngestionJob.JobStatus.PROCESSING]
+    return {
+        'batch': str(batch) if batch else None,
+        'total': len(rows),
+        'done': bool(rows) and pending == 0,
+        'counts': counts,
+        'jobs': rows,
+    }
@@ -0,0 +1,355 @@
+# file_manager/services/model_clients.py
+
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+import httpx
+from django.conf import settings
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+from ..utils.metrics import OPENAI_REQUESTS, OPENAI_RETRIES, increment
+from ..utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Estados que justificam nova tentativa: limite de taxa e falhas transitórias do servidor
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+RETRY_EXCEPTIONS = (httpx.ConnectError, httpx.ReadTimeout, httpx.WriteTimeout, httpx.RemoteProtocolError)
+
+DEFAULT_CLIENT_CONFIG = {
+    'BASE_URL': None,
+    'TIMEOUT': 60.0,
+    'MAX_CONNECTIONS': 20,
+    'MAX_KEEPALIVE_CONNECTIONS': 10,
+    'KEEPALIVE_EXPIRY': 30.0,
+    'REQUESTS_PER_MINUTE': 3000,
+    'TOKENS_PER_MINUTE': 1_000_000,
+    'INITIAL_CONCURRENCY': 4,
+    'MIN_CONCURRENCY': 1,
+    'MAX_CONCURRENCY': 16,
+    'MAX_RETRIES': 5,
+    'BACKOFF_BASE': 0.5,
+    'BACKOFF_MAX': 30.0,
+}
+
+
+def client_config() -> Dict[str, Any]:
+    return {**DEFAULT_CLIENT_CONFIG, **getattr(settings, 'OPENAI_CLIENT', {})}
+
+
+class TokenBucket:
+    """
+    Balde de tokens com reposição contínua (`capacity` por minuto).
+
+    `reserve` debita de imediato e devolve quanto tempo esperar até o débito
+    estar coberto, pelo que os pedidos em espera são servidos por ordem.
+    """
+
+    def __init__(self, per_minute: Optional[float], clock: Callable[[], float] = time.monotonic):
+        self.capacity = float(per_minute) if per_minute else None
+        self.rate = self.capacity / 60 if self.capacity else None
+        self.level = self.capacity or 0.0
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        if self.capacity is None:
+            return 0.0
+        self._refill()
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level / self.rate)
+
+    def cap(self, remaining: float) -> None:
+        """Alinha o balde com o saldo indicado pelo servidor."""
+        if self.capacity is not None:
+            self._refill()
+            self.level = min(self.level, remaining)
+
+
+class RateLimiter:
+    """Limita pedidos por minuto (RPM) e tokens por minuto (TPM) de todo o processo."""
+
+    def __init__(
+        self, requests_per_minute: Optional[float], tokens_per_minute: Optional[float],
+        clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.requests = TokenBucket(requests_per_minute, clock)
+        self.tokens = TokenBucket(tokens_per_minute, clock)
+        self.sleep = sleep
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int) -> float:
+        with self._lock:
+            wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+    def observe_headers(self, headers: httpx.Headers) -> None:
+        """Usa os cabeçalhos `x-ratelimit-remaining-*` da OpenAI para não exceder o limite real."""
+        with self._lock:
+            for header, bucket in (
+                ('x-ratelimit-remaining-requests', self.requests),
+                ('x-ratelimit-remaining-tokens', self.tokens),
+            ):
+                value = headers.get(header)
+                if value is not None:
+                    try:
+                        bucket.cap(float(value))
+                    except ValueError:
+                        pass
+
+
+class AdaptiveConcurrency:
+    """
+    Limite de pedidos simultâneos com aumento aditivo e redução multiplicativa (AIMD).
+
+    Cada `increase_after` sucessos seguidos abrem mais uma vaga; um 429 reduz o
+    limite para metade.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int, increase_after: int = 10):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.increase_after = increase_after
+        self.in_flight = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.in_flight -= 1
+                self._condition.notify()
+
+    def on_success(self) -> None:
+        with self._condition:
+            self._successes += 1
+            if self._successes >= self.increase_after and self.limit < self.maximum:
+                self.limit = min(self.maximum, self.limit + 1)
+                self._successes = 0
+                self._condition.notify()
+
+    def on_throttle(self) -> None:
+        with self._condition:
+            self.limit = max(self.minimum, self.limit / 2)
+            self._successes = 0
+
+
+def estimate_request_tokens(request: httpx.Request) -> int:
+    """Estimativa dos tokens de um pedido à API (texto enviado mais a resposta máxima pedida)."""
+    try:
+        body = json.loads(request.content or b'{}')
+    except (ValueError, UnicodeDecodeError):
+        return 1
+    if not isinstance(body, dict):
+        return 1
+
+    tokens = 0
+    inputs = body.get('input')
+    if isinstance(inputs, str):
+        tokens += count_tokens(inputs)
+    elif isinstance(inputs, list):
+        # Listas de strings ou de listas de IDs de tokens já codificados
+        tokens += sum(len(item) if isinstance(item, list) else count_tokens(str(item)) for item in inputs)
+    for message in body.get('messages') or []:
+        content = message.get('content') if isinstance(message, dict) else None
+        tokens += count_tokens(content if isinstance(content, str) else json.dumps(content or ''))
+    tokens += int(body.get('max_tokens') or body.get('max_completion_tokens') or 0)
+    return max(tokens, 1)
+
+
+def retry_delay(attempt: int, response: Optional[httpx.Response], base: float, maximum: float) -> float:
+    """Backoff exponencial com jitter total, respeitando o `Retry-After` do servidor."""
+    delay = random.uniform(0, min(maximum, base * (2 ** attempt)))
+    if response is not None:
+        retry_after = None
+        if response.headers.get('retry-after-ms'):
+            try:
+                retry_after = float(response.headers['retry-after-ms']) / 1000
+            except ValueError:
+                pass
+        elif response.headers.get('retry-after'):
+            try:
+                retry_after = float(response.headers['retry-after'])
+            except ValueError:
+                pass
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, maximum))
+    return delay
+
+
+class ResilientTransport(httpx.BaseTransport):
+    """
+    Transporte httpx partilhado pelos clientes OpenAI do processo.
+
+    Antes de cada envio reserva capacidade no limitador RPM/TPM e uma vaga de
+    concorrência; 429 e erros transitórios são repetidos com backoff e jitter,
+    e um 429 reduz a concorrência. As ligações keep-alive vêm do pool do
+    transporte subjacente.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.BaseTransport,
+        limiter: RateLimiter,
+        concurrency: AdaptiveConcurrency,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.transport = transport
+        self.limiter = limiter
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.sleep = sleep
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        tokens = estimate_request_tokens(request)
+        attempt = 0
+        while True:
+            self.limiter.acquire(tokens)
+            response, error = None, None
+            with self.concurrency.slot():
+                try:
+                    response = self.transport.handle_request(request)
+                except RETRY_EXCEPTIONS as e:
+                    error = e
+
+            if response is not None:
+                self.limiter.observe_headers(response.headers)
+                increment(OPENAI_REQUESTS, status=response.status_code)
+                if response.status_code not in RETRY_STATUSES:
+                    self.concurrency.on_success()
+                    return response
+                if response.status_code == 429:
+                    self.concurrency.on_throttle()
+            else:
+                increment(OPENAI_REQUESTS, status=type(error).__name__)
+
+            if attempt >= self.max_retries:
+                if response is not None:
+                    return response
+                raise error
+
+            delay = retry_delay(attempt, response, self.backoff_base, self.backoff_max)
+            if response is not None:
+                response.read()
+                response.close()
+            logger.warning(
+                f"Pedido à OpenAI falhou ({response.status_code if response is not None else error}); "
+                f"nova tentativa {attempt + 1}/{self.max_retries} em {delay:.2f}s"
+            )
+            increment(OPENAI_RETRIES)
+            attempt += 1
+            self.sleep(delay)
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+_lock = threading.Lock()
+_http_client: Optional[httpx.Client] = None
+_models: Dict[Tuple, Any] = {}
+
+
+def build_http_client(config: Optional[Dict[str, Any]] = None) -> httpx.Client:
+    config = config or client_config()
+    pool = httpx.HTTPTransport(
+        limits=httpx.Limits(
+            max_connections=config['MAX_CONNECTIONS'],
+            max_keepalive_connections=config['MAX_KEEPALIVE_CONNECTIONS'],
+            keepalive_expiry=config['KEEPALIVE_EXPIRY'],
+        ),
+    )
+    transport = ResilientTransport(
+        pool,
+        RateLimiter(config['REQUESTS_PER_MINUTE'], config['TOKENS_PER_MINUTE']),
+        AdaptiveConcurrency(
+            config['INITIAL_CONCURRENCY'], config['MIN_CONCURRENCY'], config['MAX_CONCURRENCY']
+        ),
+        max_retries=config['MAX_RETRIES'],
+        backoff_base=config['BACKOFF_BASE'],
+        backoff_max=config['BACKOFF_MAX'],
+    )
+    return httpx.Client(transport=transport, timeout=config['TIMEOUT'])
+
+
+def get_http_client() -> httpx.Client:
+    """Cliente HTTP único do processo: um pool de ligações e um limitador partilhados."""
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            _http_client = build_http_client()
+        return _http_client
+
+
+def _client_kwargs() -> Dict[str, Any]:
+    config = client_config()
+    kwargs = {
+        'api_key': settings.OPENAI_API_KEY,
+        'http_client': get_http_client(),
+        # As repetições são feitas pelo transporte, que conhece os limites de taxa
+        'max_retries': 0,
+    }
+    if config['BASE_URL']:
+        kwargs['base_url'] = config['BASE_URL']
+    return kwargs
+
+
+def _shared(key: Tuple, factory: Callable[[], Any]) -> Any:
+    with _lock:
+        model = _models.get(key)
+    if model is None:
+        model = factory()
+        with _lock:
+            model = _models.setdefault(key, model)
+    return model
+
+
+def get_chat_model(model: str = 'gpt-4', temperature: float = 0.7) -> ChatOpenAI:
+    """Modelo de chat partilhado, ligado ao cliente HTTP do processo."""
+    return _shared(
+        ('chat', model, temperature),
+        lambda: ChatOpenAI(model_name=model, temperature=temperature, **_client_kwargs())
+    )
+
+
+def get_openai_embeddings(model: str, **kwargs: Any) -> OpenAIEmbeddings:
+    """Modelo de embeddings OpenAI partilhado, ligado ao cliente HTTP do processo."""
+    return _shared(
+        ('embeddings', model, tuple(sorted(kwargs.items()))),
+        lambda: OpenAIEmbeddings(model=model, **_client_kwargs(), **kwargs)
+    )
+
+
+def reset_model_clients() -> None:
+    """Fecha o cliente partilhado (ex.: após mudar a configuração ou num fork)."""
+    global _http_client
+    with _lock:
+        if _http_client is not None:
+            _http_client.close()
+        _http_client = None
+        _models.clear()
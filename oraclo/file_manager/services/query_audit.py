@@ -0,0 +1,239 @@
+# file_manager/services/query_audit.py
+
+import random
+import re
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ..models import Document, DocumentCategory, DocumentCategoryLink, EmbeddingSummary, Regulation
+
+# Tabelas da aplicação: as de sessões e utilizadores são pequenas e ficam de fora
+AUDITED_TABLE_PREFIX = 'file_manager_'
+
+# Linhas do plano que indicam a leitura da tabela inteira ou uma ordenação sem índice
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (?P<table>\w+)(?! USING (?:COVERING )?INDEX)(?:\s|$)'),
+    'postgresql': re.compile(r'\bSeq Scan on (?P<table>\w+)'),
+}
+TEMP_SORT_PATTERN = re.compile(r'USE TEMP B-TREE FOR ORDER BY')
+
+
+@dataclass
+class QueryPlan:
+    """Plano de uma consulta de uma página e as leituras completas encontradas."""
+    sql: str
+    plan: List[str]
+    full_scans: List[str] = field(default_factory=list)
+    temp_sort: bool = False
+
+
+@dataclass
+class AuditedRequest:
+    """
+    Página a auditar. `expected_scans` são as tabelas que a página lê por
+    inteiro por natureza (ex.: a árvore de categorias completa).
+    """
+    name: str
+    view: Callable
+    url: str
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    expected_scans: Set[str] = field(default_factory=set)
+
+
+@dataclass
+class ViewAudit:
+    request: AuditedRequest
+    plans: List[QueryPlan] = field(default_factory=list)
+
+    @property
+    def flagged(self) -> List[QueryPlan]:
+        """Consultas com leituras completas que a página não devia fazer."""
+        return [
+            plan for plan in self.plans
+            if set(plan.full_scans) - self.request.expected_scans
+        ]
+
+
+def seed_dataset(documents: int = 20000, categories: int = 200, seed: int = 0) -> Dict[str, int]:
+    """
+    Cria um corpus sintético grande o bastante para o planeador preferir os
+    índices: documentos de vários tipos, status e datas, uma árvore de
+    categorias e regulamentos.
+
+    Returns:
+        Dict[str, int]: Número de registos criados por modelo
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+
+    tree: List[DocumentCategory] = []
+    for position in range(categories):
+        parent = rng.choice(tree) if tree and position % 5 else None
+        tree.append(DocumentCategory.objects.create(name=f'Auditoria {seed}-{position}', parent=parent))
+
+    types = list(Document.DocumentType.values)
+    statuses = list(Document.DocumentStatus.values)
+    created = Document.objects.bulk_create([
+        Document(
+            title=f'Documento de auditoria {position}',
+            file_path=f'/auditoria/{position}.pdf',
+            document_type=rng.choice(types),
+            status=rng.choice(statuses),
+            file_hash=f'{seed:08x}{position:056x}',
+            file_size=rng.randint(1024, 10 * 1024 * 1024),
+            metadata={},
+        )
+        for position in range(documents)
+    ], batch_size=1000)
+    # created_at é automático: espalhar as datas pelos últimos dois anos
+    for document in created:
+        document.created_at = now - timedelta(minutes=rng.randint(0, 2 * 365 * 24 * 60))
+    Document.objects.bulk_update(created, ['created_at'], batch_size=1000)
+
+    DocumentCategoryLink.objects.bulk_create([
+        DocumentCategoryLink(document=document, category=category)
+        for document in created
+        for category in rng.sample(tree, k=min(2, len(tree)))
+    ], batch_size=1000)
+
+    regulation_types = [value for value, _ in Regulation._meta.get_field('regulation_type').choices]
+    regulation_statuses = [value for value, _ in Regulation._meta.get_field('status').choices]
+    regulations = Regulation.objects.bulk_create([
+        Regulation(
+            title=f'Regulamento de auditoria {position}',
+            regulation_type=rng.choice(regulation_types),
+            status=rng.choice(regulation_statuses),
+            document=document,
+            effective_date=date(2000, 1, 1) + timedelta(days=rng.randint(0, 9000)),
+        )
+        for position, document in enumerate(created[::4])
+    ], batch_size=1000)
+
+    EmbeddingSummary.objects.bulk_create([
+        EmbeddingSummary(document=document, model_name='auditoria', chunk_count=10, dimensions=1536)
+        for document in created
+    ], batch_size=1000)
+
+    with connection.cursor() as cursor:
+        # Estatísticas atualizadas: sem elas o planeador pode ignorar os índices
+        cursor.execute('ANALYZE')
+    return {
+        'categories': len(tree),
+        'documents': len(created),
+        'regulations': len(regulations),
+    }
+
+
+def explain(sql: str) -> List[str]:
+    """Plano de execução de uma consulta, uma linha por nó."""
+    prefix = connection.ops.explain_query_prefix()
+    with connection.cursor() as cursor:
+        cursor.execute(f'{prefix} {sql}')
+        rows = cursor.fetchall()
+    if connection.vendor == 'sqlite':
+        # (id, pai, não usado, detalhe)
+        return [row[-1] for row in rows]
+    return [' '.join(str(column) for column in row) for row in rows]
+
+
+def full_scans(plan: List[str]) -> List[str]:
+    """Tabelas da aplicação lidas por inteiro segundo o plano."""
+    pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+    if pattern is None:
+        return []
+    tables = []
+    for line in plan:
+        for match in pattern.finditer(line):
+            table = match.group('table')
+            if table.startswith(AUDITED_TABLE_PREFIX) and table not in tables:
+                tables.append(table)
+    return tables
+
+
+def audit_request(request: AuditedRequest, user: Any) -> ViewAudit:
+    """
+    Executa uma página (com o template) e obtém o plano de cada consulta de leitura.
+    """
+    http_request = RequestFactory().get(request.url)
+    http_request.user = user or AnonymousUser()
+    http_request.session = {}
+
+    with CaptureQueriesContext(connection) as queries:
+        response = request.view(http_request, **request.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+
+    audit = ViewAudit(request=request)
+    for query in queries.captured_queries:
+        sql = query['sql']
+        if not sql.lstrip().upper().startswith('SELECT'):
+            continue
+        plan = explain(sql)
+        audit.plans.append(QueryPlan(
+            sql=sql,
+            plan=plan,
+            full_scans=full_scans(plan),
+            temp_sort=any(TEMP_SORT_PATTERN.search(line) for line in plan),
+        ))
+    return audit
+
+
+def default_requests() -> List[AuditedRequest]:
+    """As páginas auditadas, com as variações de filtros que os utilizadores usam."""
+    from .. import views
+
+    document_list = views.DocumentListView.as_view()
+    regulation_list = views.RegulationListView.as_view()
+    requests = [
+        AuditedRequest('home', views.HomeView.as_view(), '/'),
+        AuditedRequest('document_list', document_list, '/documents/'),
+        AuditedRequest('document_list?type', document_list, '/documents/?type=PDF'),
+        AuditedRequest('document_list?status', document_list, '/documents/?status=PROCESSED'),
+        AuditedRequest('document_list?type&status', document_list, '/documents/?type=PDF&status=PROCESSED'),
+        AuditedRequest('document_list?page', document_list, '/documents/?page=50'),
+        AuditedRequest('regulation_list', regulation_list, '/regulations/'),
+        AuditedRequest('regulation_list?status', regulation_list, '/regulations/?status=ACTIVE'),
+        AuditedRequest('regulation_list?type', regulation_list, '/regulations/?type=LAW'),
+        AuditedRequest(
+            'category_list', views.CategoryListView.as_view(), '/categories/',
+            expected_scans={'file_manager_documentcategory', 'file_manager_document_categories'},
+        ),
+    ]
+
+    category = DocumentCategory.objects.filter(parent__isnull=True).order_by('pk').first()
+    if category is not None:
+        requests += [
+            AuditedRequest('document_list?category', document_list, f'/documents/?category={category.pk}'),
+            AuditedRequest(
+                'category_detail', views.CategoryDetailView.as_view(), f'/categories/{category.pk}/',
+                {'pk': category.pk},
+            ),
+        ]
+    document = Document.objects.order_by('-pk').first()
+    if document is not None:
+        requests.append(AuditedRequest(
+            'document_detail', views.DocumentDetailView.as_view(), f'/documents/{document.pk}/',
+            {'pk': document.pk},
+        ))
+    return requests
+
+
+def audit_views(user: Any, requests: Optional[List[AuditedRequest]] = None) -> List[ViewAudit]:
+    """
+    Audita as consultas de cada página.
+
+    Args:
+        user: Utilizador com que as páginas são pedidas
+        requests: Páginas a auditar (por omissão, `default_requests()`)
+
+    Returns:
+        List[ViewAudit]: Os planos de cada página
+    """
+    return [audit_request(request, user) for request in requests or default_requests()]
@@ -0,0 +1,247 @@
+# file_manager/services/reembedding.py
+
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import DocumentEmbedding, EmbeddingMigration
+from ..utils.metrics import timed
+from ..utils.tokens import count_tokens
+from .embedding_summary import record_embeddings
+from .embeddings import (
+    active_embedding_model,
+    create_embedding_provider,
+    embedding_cost_per_1k_tokens,
+    embeddings_written,
+    get_embedding_provider,
+    set_active_embedding_model,
+)
+from .index_versions import current_version
+from .vector_index import build_vector_index, invalidate_vector_index, vector_index_path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 256
+
+
+def start_migration(
+    target_model: str,
+    source_model: Optional[str] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> EmbeddingMigration:
+    """
+    Cria a migração para `target_model`, ou devolve a que ficou por terminar.
+
+    Raises:
+        ValueError: se os modelos forem iguais, se o destino já tiver embeddings
+            fora de uma migração por terminar, ou se não houver fornecedor para ele
+    """
+    source_model = source_model or active_embedding_model()
+    if source_model == target_model:
+        raise ValueError(f"O modelo {target_model} já é o modelo de origem")
+
+    unfinished = EmbeddingMigration.objects.filter(
+        source_model=source_model,
+        target_model=target_model,
+        status__in=[
+            EmbeddingMigration.MigrationStatus.PENDING,
+            EmbeddingMigration.MigrationStatus.RUNNING,
+            EmbeddingMigration.MigrationStatus.FAILED,
+        ]
+    ).first()
+    if unfinished:
+        return unfinished
+
+    if DocumentEmbedding.objects.filter(model_name=target_model).exists():
+        raise ValueError(f"Já existem embeddings do modelo {target_model}")
+    # Falha já aqui se o modelo de destino não estiver configurado
+    create_embedding_provider(target_model)
+
+    return EmbeddingMigration.objects.create(
+        source_model=source_model,
+        target_model=target_model,
+        batch_size=batch_size,
+        total_chunks=DocumentEmbedding.objects.filter(model_name=source_model).count(),
+    )
+
+
+def _pending_chunks(migration: EmbeddingMigration):
+    return DocumentEmbedding.objects.filter(
+        model_name=migration.source_model, id__gt=migration.last_embedding_id
+    ).order_by('id')
+
+
+def _run_batches(
+    migration: EmbeddingMigration,
+    provider: Any,
+    cost_per_1k: float,
+    max_batches: Optional[int] = None,
+) -> bool:
+    """
+    Re-indexa lotes até esgotar os fragmentos pendentes. Devolve `True` se terminou.
+
+    Os vetores do lote e o avanço do cursor são gravados na mesma transação:
+    após uma falha, o lote interrompido é simplesmente repetido.
+    """
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        batch = list(
+            _pending_chunks(migration).only('id', 'document_id', 'chunk_index', 'content')[:migration.batch_size]
+        )
+        if not batch:
+            return True
+
+        started = time.perf_counter()
+        texts = [chunk.content for chunk in batch]
+        with timed('reembedding', model=migration.target_model):
+            vectors = provider.embed_documents(texts)
+        token_counts = [count_tokens(text) for text in texts]
+        tokens = sum(token_counts)
+
+        with transaction.atomic():
+            DocumentEmbedding.objects.bulk_create([
+                DocumentEmbedding(
+                    document_id=chunk.document_id,
+                    vector=vector,
+                    model_name=migration.target_model,
+                    chunk_index=chunk.chunk_index,
+                    content=chunk.content,
+                )
+                for chunk, vector in zip(batch, vectors)
+            ])
+            chunks_by_document: Dict[int, list] = {}
+            for chunk, vector, chunk_tokens in zip(batch, vectors, token_counts):
+                chunks_by_document.setdefault(chunk.document_id, []).append((chunk.content, vector, chunk_tokens))
+            for document_id, chunks in chunks_by_document.items():
+                document_texts, document_vectors, document_tokens = zip(*chunks)
+                record_embeddings(
+                    document_id, migration.target_model, document_texts, document_vectors, sum(document_tokens)
+                )
+            migration.last_embedding_id = batch[-1].id
+            migration.processed_chunks += len(batch)
+            migration.total_tokens += tokens
+            migration.estimated_cost += tokens / 1000 * cost_per_1k
+            migration.elapsed_seconds += time.perf_counter() - started
+            migration.save(update_fields=[
+                'last_embedding_id', 'processed_chunks', 'total_tokens',
+                'estimated_cost', 'elapsed_seconds', 'updated_at',
+            ])
+
+        batches += 1
+        logger.info(
+            f"Migração {migration.pk}: {migration.processed_chunks}/{migration.total_chunks} fragmentos, "
+            f"{migration.throughput:.1f} fragmentos/s, custo estimado ${migration.estimated_cost:.4f}"
+        )
+    return not _pending_chunks(migration).exists()
+
+
+def run_migration(
+    migration: EmbeddingMigration,
+    provider: Optional[Any] = None,
+    max_batches: Optional[int] = None,
+    activate: bool = True,
+) -> EmbeddingMigration:
+    """
+    Executa (ou retoma) uma migração de embeddings.
+
+    Os novos vetores ficam ao lado dos antigos e o índice do modelo de destino é
+    construído e publicado no seu próprio diretório, sem tocar no índice em uso.
+    Enquanto a migração decorre, as consultas ignoram o modelo de destino. Só no
+    fim o modelo ativo é trocado, atomicamente; os documentos processados com o
+    modelo antigo entretanto são apanhados numa última passagem. Os vetores do
+    modelo de origem são mantidos, para permitir voltar atrás.
+
+    Args:
+        migration: Migração a executar
+        provider: Fornecedor de embeddings do destino (por omissão, o configurado)
+        max_batches: Pára ao fim deste número de lotes (a migração fica por terminar)
+        activate: Se deve ativar o modelo de destino no fim
+
+    Returns:
+        EmbeddingMigration: A migração atualizada
+    """
+    provider = provider or get_embedding_provider(migration.target_model)
+    cost_per_1k = embedding_cost_per_1k_tokens(migration.target_model)
+
+    migration.status = EmbeddingMigration.MigrationStatus.RUNNING
+    migration.started_at = migration.started_at or timezone.now()
+    migration.error = ''
+    migration.total_chunks = migration.processed_chunks + _pending_chunks(migration).count()
+    migration.save()
+
+    try:
+        if not _run_batches(migration, provider, cost_per_1k, max_batches):
+            return migration
+
+        if _publishes_index(migration):
+            with timed('reembedding_index', model=migration.target_model):
+                build_vector_index(migration.target_model)
+
+        migration.status = EmbeddingMigration.MigrationStatus.COMPLETED
+        migration.finished_at = timezone.now()
+        migration.save()
+        if activate:
+            activate_migration(migration, provider)
+        logger.info(f"Migração {migration.pk} concluída: {migration_report(migration)}")
+        return migration
+
+    except Exception as e:
+        logger.error(f"Erro na migração de embeddings {migration.pk}: {str(e)}")
+        migration.status = EmbeddingMigration.MigrationStatus.FAILED
+        migration.error = str(e)
+        migration.save(update_fields=['status', 'error', 'updated_at'])
+        raise
+
+
+def _publishes_index(migration: EmbeddingMigration) -> bool:
+    # Com o índice de origem publicado, o de destino é publicado também antes da
+    # troca; sem ele, cada processo constrói o índice em memória
+    return current_version(vector_index_path(migration.source_model)) is not None
+
+
+def activate_migration(migration: EmbeddingMigration, provider: Optional[Any] = None) -> EmbeddingMigration:
+    """
+    Torna o modelo de destino de uma migração concluída o modelo ativo.
+
+    Os fragmentos gravados com o modelo antigo por processos que ainda não tinham
+    visto a troca são re-indexados logo a seguir.
+    """
+    if migration.status != EmbeddingMigration.MigrationStatus.COMPLETED:
+        raise ValueError(f"A migração {migration.pk} ainda não está concluída")
+
+    provider = provider or get_embedding_provider(migration.target_model)
+    set_active_embedding_model(migration.target_model)
+    embeddings_written(migration.target_model)
+    migration.activated_at = timezone.now()
+    migration.save(update_fields=['activated_at', 'updated_at'])
+
+    processed = migration.processed_chunks
+    _run_batches(migration, provider, embedding_cost_per_1k_tokens(migration.target_model))
+    if migration.processed_chunks > processed and _publishes_index(migration):
+        build_vector_index(migration.target_model)
+    invalidate_vector_index(migration.target_model)
+    return migration
+
+
+def migration_report(migration: EmbeddingMigration) -> Dict[str, Any]:
+    """Progresso, débito e custo de uma migração."""
+    return {
+        'id': migration.pk,
+        'source_model': migration.source_model,
+        'target_model': migration.target_model,
+        'status': migration.status,
+        'processed_chunks': migration.processed_chunks,
+        'total_chunks': migration.total_chunks,
+        'progress': migration.processed_chunks / migration.total_chunks if migration.total_chunks else 1.0,
+        'chunks_per_second': migration.throughput,
+        'tokens': migration.total_tokens,
+        'tokens_per_second': (
+            migration.total_tokens / migration.elapsed_seconds if migration.elapsed_seconds else 0.0
+        ),
+        'estimated_cost': migration.estimated_cost,
+        'elapsed_seconds': migration.elapsed_seconds,
+        'activated_at': migration.activated_at.isoformat() if migration.activated_at else None,
+    }
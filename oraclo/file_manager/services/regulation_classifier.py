@@ -0,0 +1,354 @@
+# file_manager/services/regulation_classifier.py
+
+import json
+import logging
+import re
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from ..models import Document, Regulation
+from ..utils.metrics import timed
+from ..utils.regulation_rules import match_regulation
+from .model_clients import get_chat_model
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CLASSIFIER_CONFIG = {
+    'CONFIDENCE_THRESHOLD': 0.8,
+    'LLM_BATCH_SIZE': 5,
+    'LLM_CONCURRENCY': 4,
+    'EXCERPT_CHARS': 2000,
+    'CHUNK_SIZE': 200,
+}
+
+# Chave em Document.metadata que marca um documento já classificado
+CHECK_METADATA_KEY = 'regulation_check'
+
+REGULATION_TYPES = {choice for choice, _ in Regulation._meta.get_field('regulation_type').choices}
+TYPE_ALIASES = {
+    'LEI': 'LAW',
+    'DECRETO': 'DECREE',
+    'DECRETO-LEI': 'DECREE',
+    'RESOLUÇÃO': 'RESOLUTION',
+    'RESOLUCAO': 'RESOLUTION',
+    'REGULAMENTO': 'NORMATIVE',
+    'NORMA': 'NORMATIVE',
+    'NORMATIVA': 'NORMATIVE',
+    'POLÍTICA': 'POLICY',
+    'POLITICA': 'POLICY',
+}
+
+LLM_PROMPT = """Você é um especialista em regulamentos do setor de telecomunicações da Guiné-Bissau.
+Para cada documento abaixo, indique se é um diploma regulatório e extraia os seus dados.
+Responda apenas com um array JSON, um objeto por documento, com as chaves:
+"id" (o ID indicado), "is_regulation" (true/false), "title", "type" (um de LAW, DECREE,
+RESOLUTION, NORMATIVE, POLICY), "number" (ex.: "5/2010" ou null) e
+"effective_date" (AAAA-MM-DD ou null).
+
+{documents}"""
+
+
+def classifier_config() -> Dict[str, Any]:
+    return {**DEFAULT_CLASSIFIER_CONFIG, **getattr(settings, 'REGULATION_CLASSIFIER', {})}
+
+
+@dataclass
+class RegulationClassification:
+    """Decisão sobre um documento: regulamento ou não, com os dados extraídos."""
+    document_id: int
+    is_regulation: bool
+    source: str
+    title: str = ''
+    regulation_type: str = ''
+    number: str = ''
+    effective_date: Optional[date] = None
+    confidence: Optional[float] = None
+
+
+def _normalize_type(value: Any) -> Optional[str]:
+    if not value:
+        return None
+    value = str(value).strip().upper()
+    value = TYPE_ALIASES.get(value, value)
+    return value if value in REGULATION_TYPES else None
+
+
+def _parse_llm_response(text: str) -> List[Dict[str, Any]]:
+    """Extrai o array JSON da resposta (tolera blocos ```json e texto à volta)."""
+    match = re.search(r'\[.*\]', text, re.DOTALL)
+    if not match:
+        raise ValueError("Resposta sem array JSON")
+    items = json.loads(match.group(0))
+    if not isinstance(items, list):
+        raise ValueError("Resposta não é um array")
+    return [item for item in items if isinstance(item, dict)]
+
+
+class RegulationClassifier:
+    """
+    Classifica documentos como regulamentos em três passos.
+
+    1. As regras compiladas extraem tipo, número e datas de todos os documentos.
+    2. Os documentos em que as regras atingem `confidence_threshold` ficam
+       classificados sem chamar o LLM.
+    3. Os restantes são agrupados (`llm_batch_size` documentos por prompt) e os
+       prompts são enviados em paralelo (`llm_concurrency`), através do cliente
+       partilhado e limitado por taxa.
+    """
+
+    def __init__(
+        self,
+        llm: Optional[Any] = None,
+        use_llm: bool = True,
+        confidence_threshold: Optional[float] = None,
+        llm_batch_size: Optional[int] = None,
+        llm_concurrency: Optional[int] = None,
+        excerpt_chars: Optional[int] = None,
+    ):
+        config = classifier_config()
+        self.use_llm = use_llm
+        self._llm = llm
+        self.confidence_threshold = confidence_threshold or config['CONFIDENCE_THRESHOLD']
+        self.llm_batch_size = llm_batch_size or config['LLM_BATCH_SIZE']
+        self.llm_concurrency = llm_concurrency or config['LLM_CONCURRENCY']
+        self.excerpt_chars = excerpt_chars or config['EXCERPT_CHARS']
+
+    @property
+    def llm(self) -> Any:
+        if self._llm is None:
+            self._llm = get_chat_model("gpt-4", temperature=0)
+        return self._llm
+
+    def classify(self, documents: Iterable[Document]) -> List[RegulationClassification]:
+        """
+        Classifica os documentos. Os que o LLM não conseguiu classificar (erro ou
+        resposta inválida) ficam de fora do resultado e serão tentados de novo.
+        """
+        results: List[RegulationClassification] = []
+        uncertain: List[Document] = []
+
+        with timed('regulation_rules'):
+            for document in documents:
+                match = match_regulation(document.content or '', document.title)
+                if match.is_regulation and match.confidence >= self.confidence_threshold:
+                    results.append(RegulationClassification(
+                        document_id=document.pk,
+                        is_regulation=True,
+                        source=Regulation.ClassificationSource.RULES,
+                        title=match.title or document.title,
+                        regulation_type=match.regulation_type,
+                        number=match.number or '',
+                        effective_date=match.effective_date,
+                        confidence=match.confidence,
+                    ))
+                elif self.use_llm:
+                    uncertain.append(document)
+
+        if uncertain:
+            results.extend(self._classify_with_llm(uncertain))
+        return results
+
+    def _prompt(self, documents: List[Document]) -> str:
+        sections = []
+        for document in documents:
+            hints = match_regulation(document.content or '', document.title)
+            hint = ''
+            if hints.is_regulation:
+                hint = f"\nIndícios das regras: tipo={hints.regulation_type}, número={hints.number or '?'}"
+            sections.append(
+                f"### Documento id={document.pk}\nTítulo: {document.title}{hint}\n"
+                f"{(document.content or '')[:self.excerpt_chars]}"
+            )
+        return LLM_PROMPT.format(documents='\n\n'.join(sections))
+
+    def _classify_with_llm(self, documents: List[Document]) -> List[RegulationClassification]:
+        groups = [
+            documents[start:start + self.llm_batch_size]
+            for start in range(0, len(documents), self.llm_batch_size)
+        ]
+        with timed('regulation_llm'):
+            responses = self.llm.batch(
+                [self._prompt(group) for group in groups],
+                config={'max_concurrency': self.llm_concurrency},
+                return_exceptions=True,
+            )
+
+        results = []
+        for group, response in zip(groups, responses):
+            if isinstance(response, Exception):
+                logger.error(f"Erro ao classificar lote de {len(group)} documentos: {str(response)}")
+                continue
+            try:
+                items = _parse_llm_response(getattr(response, 'content', str(response)))
+            except ValueError as e:
+                logger.error(f"Resposta inválida do LLM para {len(group)} documentos: {str(e)}")
+                continue
+
+            by_id = {document.pk: document for document in group}
+            for item in items:
+                try:
+                    document = by_id.get(int(item.get('id')))
+                except (TypeError, ValueError):
+                    document = None
+                if document is None:
+                    continue
+                regulation_type = _normalize_type(item.get('type'))
+                is_regulation = bool(item.get('is_regulation')) and regulation_type is not None
+                effective_date = item.get('effective_date')
+                try:
+                    effective_date = parse_date(str(effective_date)) if effective_date else None
+                except ValueError:
+                    effective_date = None
+                results.append(RegulationClassification(
+                    document_id=document.pk,
+                    is_regulation=is_regulation,
+                    source=Regulation.ClassificationSource.LLM,
+                    title=str(item.get('title') or document.title)[:255],
+                    regulation_type=regulation_type or '',
+                    number=str(item.get('number') or '')[:50],
+                    effective_date=effective_date,
+                ))
+        return results
+
+
+def save_classifications(
+    classifications: List[RegulationClassification],
+    documents: Dict[int, Document],
+) -> Dict[str, int]:
+    """
+    Grava as classificações com operações em lote.
+
+    Regulamentos novos são criados com `bulk_create`; os já classificados
+    automaticamente são atualizados com `bulk_update` (os manuais nunca são
+    alterados). Todos os documentos ficam marcados em `metadata`, para não serem
+    reenviados ao LLM na execução seguinte.
+
+    Returns:
+        Dict[str, int]: Regulamentos criados, atualizados e removidos
+    """
+    existing: Dict[int, Regulation] = {}
+    for regulation in Regulation.objects.filter(document_id__in=[c.document_id for c in classifications]):
+        existing.setdefault(regulation.document_id, regulation)
+
+    to_create, to_update, to_delete = [], [], []
+    checked_at = timezone.now().isoformat()
+    for classification in classifications:
+        regulation = existing.get(classification.document_id)
+        document = documents[classification.document_id]
+        document.metadata = {
+            **(document.metadata or {}),
+            CHECK_METADATA_KEY: {
+                'is_regulation': classification.is_regulation,
+                'source': classification.source,
+                'checked_at': checked_at,
+            }
+        }
+        if regulation is not None and regulation.classification_source == Regulation.ClassificationSource.MANUAL:
+            continue
+        if not classification.is_regulation:
+            if regulation is not None:
+                to_delete.append(regulation.pk)
+            continue
+
+        values = {
+            'title': classification.title[:255],
+            'regulation_type': classification.regulation_type,
+            'number': classification.number,
+            'effective_date': classification.effective_date,
+            'classification_source': classification.source,
+            'confidence': classification.confidence,
+        }
+        if regulation is None:
+            to_create.append(Regulation(document_id=classification.document_id, status='ACTIVE', **values))
+        else:
+            for field, value in values.items():
+                setattr(regulation, field, value)
+            to_update.append(regulation)
+
+    with transaction.atomic(), timed('db_write'):
+        Regulation.objects.bulk_create(to_create, batch_size=500)
+        Regulation.objects.bulk_update(
+            to_update,
+            ['title', 'regulation_type', 'number', 'effective_date', 'classification_source', 'confidence'],
+            batch_size=500,
+        )
+        Regulation.objects.filter(pk__in=to_delete).delete()
+        Document.objects.bulk_update(
+            [documents[c.document_id] for c in classifications], ['metadata'], batch_size=500
+        )
+    return {'created': len(to_create), 'updated': len(to_update), 'deleted': len(to_delete)}
+
+
+def pending_documents(reclassify: bool = False) -> QuerySet:
+    """Documentos processados ainda por classificar (ou todos, com `reclassify`)."""
+    documents = Document.objects.filter(status=Document.DocumentStatus.PROCESSED)
+    if not reclassify:
+        documents = documents.filter(regulations__isnull=True).exclude(metadata__has_key=CHECK_METADATA_KEY)
+    return documents.order_by('pk')
+
+
+def classify_corpus(
+    classifier: Optional[RegulationClassifier] = None,
+    documents: Optional[QuerySet] = None,
+    chunk_size: Optional[int] = None,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """
+    Classifica o corpus por blocos de `chunk_size` documentos.
+
+    Cada bloco passa pelas regras, pelo LLM (só os incertos) e é gravado em lote
+    antes de o seguinte ser lido, pelo que a memória usada não depende do
+    tamanho do corpus e uma interrupção só perde o bloco em curso.
+
+    Args:
+        classifier: Classificador a usar (por omissão, com o LLM partilhado)
+        documents: Documentos a classificar (por omissão, `pending_documents()`)
+        chunk_size: Documentos lidos e gravados de cada vez
+        dry_run: Classifica sem gravar
+
+    Returns:
+        Dict[str, Any]: Totais por origem, regulamentos gravados e duração
+    """
+    classifier = classifier or RegulationClassifier()
+    documents = documents if documents is not None else pending_documents()
+    chunk_size = chunk_size or classifier_config()['CHUNK_SIZE']
+
+    report = {
+        'documents': 0, 'rules': 0, 'llm': 0, 'regulations': 0, 'not_regulations': 0,
+        'unclassified': 0, 'created': 0, 'updated': 0, 'deleted': 0, 'seconds': 0.0,
+    }
+    started = time.perf_counter()
+    last_pk = 0
+    while True:
+        # Paginação por chave: cada bloco é uma consulta indexada, sem OFFSET
+        chunk = list(documents.filter(pk__gt=last_pk).only('id', 'title', 'content', 'metadata')[:chunk_size])
+        if not chunk:
+            break
+        last_pk = chunk[-1].pk
+
+        classifications = classifier.classify(chunk)
+        report['documents'] += len(chunk)
+        report['unclassified'] += len(chunk) - len(classifications)
+        for classification in classifications:
+            report['rules' if classification.source == Regulation.ClassificationSource.RULES else 'llm'] += 1
+            report['regulations' if classification.is_regulation else 'not_regulations'] += 1
+
+        if not dry_run and classifications:
+            saved = save_classifications(classifications, {document.pk: document for document in chunk})
+            for key, value in saved.items():
+                report[key] += value
+        logger.info(
+            f"Classificação de regulamentos: {report['documents']} documentos, "
+            f"{report['rules']} pelas regras, {report['llm']} pelo LLM"
+        )
+
+    report['seconds'] = time.perf_counter() - started
+    return report
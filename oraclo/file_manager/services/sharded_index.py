@@ -0,0 +1,350 @@
+# file_manager/services/sharded_index.py
+
+import heapq
+import json
+import logging
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Max, QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
+
+from ..models import Document, DocumentCategory, DocumentEmbedding
+from ..models.category import PATH_SEPARATOR, subtree_q
+from .ann import INDEX_AUTO, AnnParams
+from .index_versions import link_or_copy
+from .vector_index import RetrievalFilters, SearchHit, VectorIndex
+
+logger = logging.getLogger(__name__)
+
+SHARD_BY_YEAR = 'year'
+SHARD_BY_CATEGORY = 'category'
+SHARD_STRATEGIES = (SHARD_BY_YEAR, SHARD_BY_CATEGORY)
+
+MANIFEST_FILE = 'shards.json'
+SHARDS_DIR = 'shards'
+UNCATEGORIZED_SHARD = 'uncategorized'
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Pool partilhado pelo processo para a pesquisa em paralelo nos shards."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = getattr(settings, 'VECTOR_INDEX_SEARCH_WORKERS', None) or os.cpu_count() or 4
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='vector-shard')
+        return _executor
+
+
+def _category_roots() -> Dict[int, int]:
+    """Mapeia cada categoria para a sua categoria de topo (a raiz está no caminho)."""
+    return {
+        category_id: int(path.split(PATH_SEPARATOR, 1)[0])
+        for category_id, path in DocumentCategory.objects.values_list('id', 'path')
+    }
+
+
+def category_shard_key(root_id: int) -> str:
+    return f'category-{root_id}'
+
+
+class ShardedVectorIndex:
+    """
+    Índice vetorial dividido em shards por ano de criação ou categoria de topo.
+
+    Cada shard é um `VectorIndex` guardado no seu próprio diretório, reconstruível
+    de forma independente e mapeado em memória apenas quando uma pesquisa lhe acede.
+    As pesquisas são distribuídas pelos shards relevantes num pool de threads (numpy
+    e FAISS libertam o GIL) e os top-k parciais são combinados.
+
+    Um documento com categorias em várias árvores é indexado em cada shard
+    correspondente; os resultados são deduplicados por fragmento.
+    """
+
+    def __init__(self, directory: Path, manifest: Dict):
+        self.directory = Path(directory)
+        self.model_name = manifest['model_name']
+        self.shard_by = manifest['shard_by']
+        self.manifest = manifest
+        self.category_roots = {int(k): v for k, v in manifest.get('category_roots', {}).items()}
+        self._shards: Dict[str, VectorIndex] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(shard['num_chunks'] for shard in self.manifest['shards'].values())
+
+    @property
+    def index_type(self) -> str:
+        return f"sharded-{self.shard_by}"
+
+    @property
+    def last_embedding_id(self) -> Optional[int]:
+        return self.manifest.get('last_embedding_id')
+
+    @property
+    def built_at(self) -> Optional[datetime]:
+        built_at = self.manifest.get('built_at')
+        return parse_datetime(built_at) if built_at else None
+
+    def indexed_document_ids(self) -> np.ndarray:
+        # Só o array dos documentos de cada shard, sem carregar os shards
+        ids = [
+            np.unique(np.load(self.shard_path(key) / 'document_ids.npy', mmap_mode='r'))
+            for key in self.shard_keys
+        ]
+        return np.unique(np.concatenate(ids)) if ids else np.empty(0, dtype=np.int64)
+
+    @property
+    def shard_keys(self) -> List[str]:
+        return sorted(self.manifest['shards'])
+
+    @classmethod
+    def load(cls, directory: Path) -> 'ShardedVectorIndex':
+        """Lê o manifesto; os shards só são carregados quando pesquisados."""
+        manifest = json.loads((Path(directory) / MANIFEST_FILE).read_text(encoding='utf-8'))
+        return cls(directory, manifest)
+
+    def shard_path(self, key: str) -> Path:
+        return self.directory / SHARDS_DIR / key
+
+    def get_shard(self, key: str) -> VectorIndex:
+        with self._lock:
+            shard = self._shards.get(key)
+            if shard is None:
+                shard = VectorIndex.load(self.shard_path(key), mmap=True)
+                self._shards[key] = shard
+            return shard
+
+    def select_shards(self, filters: Optional[RetrievalFilters]) -> List[str]:
+        """Descarta os shards que os filtros excluem por completo."""
+        keys = [key for key in self.shard_keys if self.manifest['shards'][key]['num_chunks']]
+        if filters is None:
+            return keys
+
+        if self.shard_by == SHARD_BY_YEAR and (filters.date_from or filters.date_to):
+            first = filters.date_from.year if filters.date_from else None
+            last = filters.date_to.year if filters.date_to else None
+            return [
+                key for key in keys
+                if (first is None or int(key) >= first) and (last is None or int(key) <= last)
+            ]
+
+        if self.shard_by == SHARD_BY_CATEGORY and filters.category_ids:
+            if any(c not in self.category_roots for c in filters.category_ids if c > 0):
+                # Categoria criada depois da construção: não é possível podar com segurança
+                return keys
+            wanted = {
+                category_shard_key(self.category_roots[c])
+                for c in filters.category_ids if c in self.category_roots
+            }
+            return [key for key in keys if key in wanted]
+
+        return keys
+
+    def _fan_out(
+        self, query_vector: List[float], k: int, filters: Optional[RetrievalFilters]
+    ) -> List[Tuple[float, int, str, int]]:
+        """Pesquisa os shards em paralelo e devolve os `k` melhores (pontuação, fragmento, shard, linha)."""
+        keys = self.select_shards(filters)
+        if not keys:
+            return []
+
+        def search_shard(key: str) -> List[Tuple[float, int, str, int]]:
+            shard = self.get_shard(key)
+            rows, scores, _ = shard.ranked_rows(query_vector, k, filters)
+            return [
+                (float(score), int(shard.chunk_ids[row]), key, int(row))
+                for row, score in zip(rows, scores)
+            ]
+
+        if len(keys) == 1:
+            partials = [search_shard(keys[0])]
+        else:
+            partials = list(_get_executor().map(search_shard, keys))
+
+        best: Dict[int, Tuple[float, int, str, int]] = {}
+        for candidate in heapq.merge(*partials, key=lambda c: c[0], reverse=True):
+            best.setdefault(candidate[1], candidate)
+            if len(best) >= k:
+                break
+        return list(best.values())
+
+    def ranked_hits(
+        self, query_vector: List[float], k: int, filters: Optional[RetrievalFilters]
+    ) -> Tuple[List[SearchHit], np.ndarray]:
+        """Os `k` melhores fragmentos elegíveis e os seus vetores normalizados."""
+        candidates = self._fan_out(query_vector, k, filters)
+        if not candidates:
+            return [], np.empty((0, 0), dtype=np.float32)
+        hits = [self.get_shard(key).hit_for_row(row, score) for score, _, key, row in candidates]
+        vectors = np.stack([self.get_shard(key).vectors[row] for _, _, key, row in candidates])
+        return hits, vectors
+
+    def search(
+        self,
+        query_vector: List[float],
+        k: int = 5,
+        filters: Optional[RetrievalFilters] = None,
+    ) -> List[SearchHit]:
+        return [
+            self.get_shard(key).hit_for_row(row, score)
+            for score, _, key, row in self._fan_out(query_vector, k, filters)
+        ]
+
+    def max_marginal_relevance_search(
+        self,
+        query_vector: List[float],
+        k: int = 5,
+        fetch_k: int = 10,
+        lambda_mult: float = 0.5,
+        filters: Optional[RetrievalFilters] = None,
+    ) -> List[SearchHit]:
+        hits, vectors = self.ranked_hits(query_vector, fetch_k, filters)
+        if not hits:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        # Cópia normalizada: o vetor do chamador é reutilizado noutras pesquisas
+        query = query / (np.linalg.norm(query) or 1.0)
+        selected = maximal_marginal_relevance(query, vectors, lambda_mult=lambda_mult, k=k)
+        return [hits[i] for i in selected]
+
+
+def _shard_documents(shard_by: str, key: str) -> QuerySet:
+    if shard_by == SHARD_BY_YEAR:
+        return Document.objects.filter(created_at__year=int(key))
+    if key == UNCATEGORIZED_SHARD:
+        return Document.objects.filter(categories__isnull=True)
+    root_id = int(key.split('-', 1)[1])
+    return Document.objects.filter(subtree_q(f'{root_id}{PATH_SEPARATOR}', 'categories__')).distinct()
+
+
+def _list_shard_keys(model_name: str, shard_by: str) -> List[str]:
+    documents = Document.objects.filter(embeddings__model_name=model_name).distinct()
+    if shard_by == SHARD_BY_YEAR:
+        return [str(d.year) for d in documents.dates('created_at', 'year')]
+    keys = [
+        category_shard_key(root_id)
+        for root_id in DocumentCategory.objects.filter(parent__isnull=True).values_list('id', flat=True)
+    ]
+    if documents.filter(categories__isnull=True).exists():
+        keys.append(UNCATEGORIZED_SHARD)
+    return keys
+
+
+def _write_manifest(directory: Path, manifest: Dict) -> None:
+    temporary = directory / f'{MANIFEST_FILE}.tmp'
+    temporary.write_text(json.dumps(manifest), encoding='utf-8')
+    os.replace(temporary, directory / MANIFEST_FILE)
+
+
+def _build_shard(
+    directory: Path, model_name: str, shard_by: str, key: str,
+    index_type: str, params: Optional[AnnParams],
+) -> Dict:
+    shard = VectorIndex.build(model_name, documents=_shard_documents(shard_by, key))
+    shard.build_ann(index_type, params)
+    shard_dir = directory / SHARDS_DIR / key
+    if shard_dir.exists():
+        shutil.rmtree(shard_dir)
+    shard.save(shard_dir)
+    return {'num_chunks': len(shard), 'index_type': shard.index_type, 'built_at': timezone.now().isoformat()}
+
+
+def build_sharded_index(
+    directory: Path,
+    model_name: str,
+    shard_by: str,
+    index_type: str = INDEX_AUTO,
+    params: Optional[AnnParams] = None,
+    only: Optional[Set[str]] = None,
+    previous: Optional[Path] = None,
+) -> ShardedVectorIndex:
+    """
+    Constrói (todos ou alguns) shards do índice e atualiza o manifesto.
+
+    Args:
+        directory: Diretório do índice do modelo
+        model_name: Modelo de embedding a indexar
+        shard_by: `year` ou `category`
+        index_type: Tipo de índice de cada shard (`auto` escolhe pela dimensão do shard)
+        params: Parâmetros do índice aproximado
+        only: Reconstrói apenas estes shards, mantendo os restantes
+        previous: Versão anterior de onde os shards não reconstruídos são
+            reaproveitados (por omissão o próprio `directory`)
+
+    Returns:
+        ShardedVectorIndex: O índice com o manifesto atualizado
+    """
+    if shard_by not in SHARD_STRATEGIES:
+        raise ValueError(f"Estratégia de sharding desconhecida: {shard_by}")
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    previous = Path(previous) if previous else directory
+    # Lidos antes dos shards (ver VectorIndex.build)
+    built_at = timezone.now()
+    last_embedding_id = DocumentEmbedding.objects.filter(model_name=model_name).aggregate(
+        last=Max('id')
+    )['last'] or 0
+    keys = _list_shard_keys(model_name, shard_by)
+    manifest = {
+        'model_name': model_name, 'shard_by': shard_by, 'shards': {},
+        'last_embedding_id': last_embedding_id, 'built_at': built_at.isoformat(),
+    }
+    if only:
+        # Uma reconstrução parcial parte de uma versão completa: sem ela, a nova
+        # versão teria só os shards indicados e o resto do corpus desapareceria
+        if not (previous / MANIFEST_FILE).exists():
+            raise ValueError("Não há uma versão anterior do índice: construa todos os shards primeiro")
+        manifest = json.loads((previous / MANIFEST_FILE).read_text(encoding='utf-8'))
+        if manifest['shard_by'] != shard_by:
+            raise ValueError("Não é possível reconstruir shards com outra estratégia de sharding")
+        unknown = only - set(keys) - set(manifest['shards'])
+        if unknown:
+            raise ValueError(f"Shards desconhecidos: {', '.join(sorted(unknown))}")
+        # Os shards reaproveitados só têm os fragmentos até à versão anterior
+        previous_last = manifest.get('last_embedding_id')
+        manifest['last_embedding_id'] = (
+            min(last_embedding_id, previous_last) if previous_last is not None else None
+        )
+        previous_built_at = manifest.get('built_at')
+        manifest['built_at'] = (
+            min(built_at, parse_datetime(previous_built_at)).isoformat() if previous_built_at else None
+        )
+        if previous != directory:
+            for key in set(manifest['shards']) - only:
+                shutil.copytree(
+                    previous / SHARDS_DIR / key,
+                    directory / SHARDS_DIR / key,
+                    copy_function=link_or_copy
+                )
+
+    for key in keys:
+        if only and key not in only:
+            continue
+        manifest['shards'][key] = _build_shard(directory, model_name, shard_by, key, index_type, params)
+        logger.info(f"Shard {key} construído: {manifest['shards'][key]['num_chunks']} fragmentos")
+
+    # Remover shards que deixaram de existir (numa reconstrução parcial, só entre os indicados)
+    stale = set(manifest['shards']) - set(keys)
+    if only:
+        stale &= only
+    for key in stale:
+        manifest['shards'].pop(key)
+        shutil.rmtree(directory / SHARDS_DIR / key, ignore_errors=True)
+
+    manifest['category_roots'] = _category_roots()
+    _write_manifest(directory, manifest)
+    return ShardedVectorIndex(directory, manifest)
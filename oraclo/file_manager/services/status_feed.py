@@ -0,0 +1,241 @@
+# file_manager/services/status_feed.py
+
+import json
+import time
+import uuid
+from datetime import timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import Document, DocumentStatusEvent
+
+DEFAULT_FEED_CONFIG = {
+    'POLL_INTERVAL': 1.0,
+    'LONG_POLL_TIMEOUT': 25,
+    'SSE_MAX_SECONDS': 300,
+    'PAGE_SIZE': 200,
+    'MAX_IDS': 1000,
+    'LAG_SECONDS': 30,
+}
+
+# Fração do processamento concluída no fim de cada etapa (a conversão, com o
+# OCR, é de longe a mais demorada)
+STAGE_PROGRESS = {
+    'received': 0.0,
+    'conversion': 0.6,
+    'splitting': 0.65,
+    'embedding': 0.95,
+    'processed': 1.0,
+}
+
+
+def feed_config() -> Dict[str, Any]:
+    return {**DEFAULT_FEED_CONFIG, **getattr(settings, 'STATUS_FEED', {})}
+
+
+def parse_ids(value: Optional[str]) -> Optional[List[int]]:
+    """
+    Lê uma lista de ids separados por vírgulas ("1,2,3").
+
+    Raises:
+        ValueError: se algum id for inválido ou forem mais do que STATUS_FEED['MAX_IDS']
+    """
+    if not value:
+        return None
+    ids = [int(item) for item in value.split(',') if item.strip()]
+    if len(ids) > feed_config()['MAX_IDS']:
+        raise ValueError(f"No máximo {feed_config()['MAX_IDS']} documentos por pedido")
+    return ids
+
+
+def record_event(document: Document, stage: str = '', message: str = '') -> DocumentStatusEvent:
+    """
+    Regista o status atual do documento e a etapa concluída.
+
+    Args:
+        document: Documento (com o status já atualizado)
+        stage: Etapa concluída (ver STAGE_PROGRESS)
+        message: Detalhe, ex.: o erro
+
+    Returns:
+        DocumentStatusEvent: O evento criado
+    """
+    return DocumentStatusEvent.objects.create(
+        document=document,
+        status=document.status,
+        stage=stage,
+        progress=STAGE_PROGRESS.get(stage),
+        message=message,
+    )
+
+
+def document_statuses(document_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Status de vários documentos numa só consulta.
+
+    Returns:
+        Dict[int, Dict[str, Any]]: Status e última atualização por documento
+        (os inexistentes não aparecem)
+    """
+    rows = Document.objects.filter(pk__in=list(document_ids)).values('id', 'status', 'updated_at')
+    return {row['id']: {'status': row['status'], 'updated_at': row['updated_at']} for row in rows}
+
+
+def events_since(
+    cursor: int = 0,
+    document_ids: Optional[Iterable[int]] = None,
+    batch: Optional[uuid.UUID] = None,
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Eventos posteriores ao cursor, por ordem.
+
+    Um evento pode aparecer em mais do que uma resposta (ver `next_cursor`);
+    o cliente ignora os `id` que já recebeu.
+
+    Args:
+        cursor: Cursor devolvido pelo pedido anterior (ver `next_cursor`)
+        document_ids: Só os eventos destes documentos
+        batch: Só os eventos dos documentos de um lote de ingestão
+        limit: Máximo de eventos (por omissão, STATUS_FEED['PAGE_SIZE'])
+    """
+    events = DocumentStatusEvent.objects.filter(pk__gt=cursor)
+    if document_ids is not None:
+        events = events.filter(document_id__in=list(document_ids))
+    if batch is not None:
+        events = events.filter(document__ingestion_jobs__batch=batch)
+    return list(
+        events.order_by('pk').values(
+            'id', 'document_id', 'status', 'stage', 'progress', 'message', 'created_at'
+        )[:limit or feed_config()['PAGE_SIZE']]
+    )
+
+
+def _settled_cursor(cursor: int, last: int) -> int:
+    """
+    Maior `id` até `last` abaixo do qual já não pode aparecer nenhum evento.
+
+    Os `id` são atribuídos no INSERT e não no commit: no PostgreSQL, um `id`
+    mais baixo de outra transação ainda aberta (ex.: o evento 'processed',
+    escrito na transação final de `process_document`) pode ficar visível
+    depois de um mais alto. Um `id` em falta seguido de eventos com menos de
+    STATUS_FEED['LAG_SECONDS'] é esperado; passado esse tempo, conta como
+    uma transação desfeita.
+    """
+    if last <= cursor:
+        return cursor
+    cutoff = timezone.now() - timedelta(seconds=feed_config()['LAG_SECONDS'])
+    first_recent = (
+        DocumentStatusEvent.objects
+        .filter(pk__gt=cursor, pk__lte=last, created_at__gte=cutoff)
+        .order_by('pk')
+        .values_list('pk', flat=True)
+        .first()
+    )
+    if first_recent is None:
+        return last
+    previous = (
+        DocumentStatusEvent.objects
+        .filter(pk__gt=cursor, pk__lt=first_recent)
+        .order_by('-pk')
+        .values_list('pk', flat=True)
+        .first()
+    )
+    expected = (previous or cursor) + 1
+    present = (
+        DocumentStatusEvent.objects
+        .filter(pk__gte=first_recent, pk__lte=last)
+        .order_by('pk')
+        .values_list('pk', 'created_at')
+    )
+    for pk, created_at in present:
+        if pk != expected and created_at >= cutoff:
+            break
+        expected = pk + 1
+    return expected - 1
+
+
+def next_cursor(cursor: int, events: List[Dict[str, Any]]) -> int:
+    """
+    Cursor a usar no pedido seguinte, seguro perante a ordem dos commits.
+
+    Avança até ao último evento devolvido, exceto se antes dele faltar um
+    `id` recente (ver `_settled_cursor`): aí fica parado, e os eventos
+    seguintes voltam a ser devolvidos até o `id` em falta aparecer ou expirar.
+    """
+    return _settled_cursor(cursor, events[-1]['id'] if events else cursor)
+
+
+def wait_for_events(
+    cursor: int = 0,
+    timeout: Optional[float] = None,
+    after: Optional[int] = None,
+    **filters,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Long-poll: devolve logo os eventos posteriores ao cursor ou espera por eles
+    até `timeout` segundos.
+
+    Com o cursor parado num `id` em falta, os eventos a seguir ao cursor já
+    foram entregues; `after` (o maior `id` recebido) evita que o pedido
+    responda logo com eles, e a espera só termina com um evento novo ou com
+    o cursor a avançar.
+
+    A espera consulta a base de dados a cada STATUS_FEED['POLL_INTERVAL']
+    segundos com uma consulta indexada pela chave primária, pelo que não há
+    estado partilhado entre processos.
+
+    Returns:
+        Tuple[List[Dict[str, Any]], int]: Os eventos e o cursor seguinte
+    """
+    config = feed_config()
+    timeout = config['LONG_POLL_TIMEOUT'] if timeout is None else timeout
+    after = cursor if after is None else max(after, cursor)
+    deadline = time.monotonic() + timeout
+    while True:
+        events = events_since(cursor, **filters)
+        following = next_cursor(cursor, events)
+        remaining = deadline - time.monotonic()
+        if following > cursor or any(event['id'] > after for event in events) or remaining <= 0:
+            return events, following
+        time.sleep(min(config['POLL_INTERVAL'], remaining))
+
+
+def latest_cursor() -> int:
+    """Cursor atual do feed: um cliente novo que só quer o que vier a seguir começa aqui."""
+    last = DocumentStatusEvent.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    return _settled_cursor(0, last)
+
+
+def sse_stream(cursor: int = 0, **filters) -> Iterator[str]:
+    """
+    Feed em Server-Sent Events. Cada evento leva no `id` o cursor a partir do
+    qual o navegador retoma com Last-Event-ID ao reconectar (o do próprio
+    evento, ou o cursor parado num `id` em falta); a ligação termina ao fim
+    de STATUS_FEED['SSE_MAX_SECONDS'] para não prender um worker indefinidamente.
+    """
+    config = feed_config()
+    deadline = time.monotonic() + config['SSE_MAX_SECONDS']
+    # Eventos já enviados depois do cursor, para não os repetir enquanto está parado
+    sent: Set[int] = set()
+    yield f"retry: {int(config['POLL_INTERVAL'] * 1000)}\n\n"
+    while True:
+        events = events_since(cursor, **filters)
+        following = next_cursor(cursor, events)
+        fresh = [event for event in events if event['id'] not in sent]
+        for event in fresh:
+            yield (
+                f"id: {min(event['id'], following)}\nevent: status\n"
+                f"data: {json.dumps(event, default=str)}\n\n"
+            )
+        cursor = following
+        sent = {event['id'] for event in events if event['id'] > cursor}
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        if not fresh:
+            # Linha de comentário do SSE: mantém a ligação aberta através de proxies
+            yield ": keep-alive\n\n"
+            time.sleep(min(config['POLL_INTERVAL'], remaining))
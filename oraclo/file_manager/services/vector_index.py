@@ -0,0 +1,935 @@
+# file_manager/services/vector_index.py
+
+import json
+import logging
+import shutil
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max, Q, QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.text import slugify
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document as LangchainDocument
+from langchain_core.retrievers import BaseRetriever
+
+from ..models import Document, DocumentCategory, DocumentCategoryLink, DocumentEmbedding, Regulation
+from ..utils.metrics import timed
+from .ann import INDEX_AUTO, INDEX_FLAT, AnnIndex, AnnParams, choose_index_type, min_training_vectors
+from .index_versions import (
+    create_staging_directory,
+    current_version,
+    new_version_id,
+    publish_version,
+    version_path,
+)
+
+logger = logging.getLogger(__name__)
+
+# Ficheiros do índice persistido
+META_FILE = 'meta.json'
+ANN_FILE = 'ann.faiss'
+FACETS_FILE = 'facets.npy'
+FACET_KEYS_FILE = 'facets.json'
+TEXTS_FILE = 'texts.bin'
+TEXT_OFFSETS_FILE = 'text_offsets.npy'
+TITLES_FILE = 'titles.json'
+ARRAY_FILES = ('vectors', 'chunk_ids', 'document_ids', 'created_days')
+
+# Facetas indexadas como bitmaps por fragmento
+FACET_DOCUMENT_TYPE = 'document_type'
+FACET_CATEGORY = 'category'
+FACET_REGULATION_TYPE = 'regulation_type'
+FACET_REGULATION_STATUS = 'regulation_status'
+
+
+def _as_list(value: Any) -> List[str]:
+    """Aceita listas ou strings separadas por vírgulas vindas do pedido."""
+    if value in (None, ''):
+        return []
+    if isinstance(value, (list, tuple, set)):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [v.strip() for v in str(value).split(',') if v.strip()]
+
+
+def _as_date(value: Any, field_name: str) -> Optional[date]:
+    if value in (None, ''):
+        return None
+    if isinstance(value, date):
+        return value
+    parsed = parse_date(str(value))
+    if parsed is None:
+        raise ValueError(f"Data inválida para '{field_name}': {value}")
+    return parsed
+
+
+@dataclass
+class RetrievalFilters:
+    """
+    Filtros de metadados aplicados dentro do índice vetorial.
+
+    Os IDs de categoria já incluem as subcategorias; use `from_request_data`
+    para construir os filtros a partir do corpo de um pedido da API.
+    """
+    category_ids: Set[int] = field(default_factory=set)
+    document_types: Set[str] = field(default_factory=set)
+    regulation_types: Set[str] = field(default_factory=set)
+    regulation_statuses: Set[str] = field(default_factory=set)
+    document_ids: Optional[Set[int]] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    # Documentos cujos fragmentos no índice estão desatualizados (ver `LayeredVectorIndex`)
+    excluded_document_ids: Set[int] = field(default_factory=set)
+
+    @classmethod
+    def from_request_data(cls, data: Dict[str, Any]) -> 'RetrievalFilters':
+        """
+        Constrói os filtros a partir de `data['filters']` (ou das chaves de topo).
+
+        Raises:
+            ValueError: se algum valor de filtro for inválido
+        """
+        source = data.get('filters') or data
+        if not isinstance(source, dict):
+            raise ValueError("O campo 'filters' deve ser um objeto")
+
+        try:
+            requested_categories = [int(c) for c in _as_list(source.get('categories'))]
+        except ValueError:
+            raise ValueError("IDs de categoria inválidos")
+
+        category_ids: Set[int] = DocumentCategory.subtree_ids(requested_categories) if requested_categories else set()
+        if requested_categories and not category_ids:
+            # Categorias inexistentes não devem alargar a pesquisa ao corpus inteiro
+            category_ids = {-1}
+
+        filters = cls(
+            category_ids=category_ids,
+            document_types={t.upper() for t in _as_list(source.get('document_types'))},
+            regulation_types={t.upper() for t in _as_list(source.get('regulation_types'))},
+            regulation_statuses={s.upper() for s in _as_list(source.get('regulation_statuses'))},
+            date_from=_as_date(source.get('date_from'), 'date_from'),
+            date_to=_as_date(source.get('date_to'), 'date_to'),
+        )
+        if filters.date_from and filters.date_to and filters.date_from > filters.date_to:
+            raise ValueError("'date_from' não pode ser posterior a 'date_to'")
+        return filters
+
+    def restricted_to(self, document_ids: Iterable[int]) -> 'RetrievalFilters':
+        """Devolve uma cópia dos filtros limitada a um conjunto de documentos."""
+        ids = set(document_ids)
+        if self.document_ids is not None:
+            ids &= self.document_ids
+        return RetrievalFilters(
+            category_ids=set(self.category_ids),
+            document_types=set(self.document_types),
+            regulation_types=set(self.regulation_types),
+            regulation_statuses=set(self.regulation_statuses),
+            document_ids=ids,
+            date_from=self.date_from,
+            date_to=self.date_to,
+        )
+
+    def is_empty(self) -> bool:
+        return not (
+            self.category_ids or self.document_types or self.regulation_types
+            or self.regulation_statuses or self.document_ids is not None
+            or self.date_from or self.date_to or self.excluded_document_ids
+        )
+
+
+class TextStore:
+    """
+    Textos dos fragmentos num único ficheiro UTF-8 com uma tabela de deslocamentos.
+
+    Mapeado em memória, o texto de um fragmento só é lido quando é devolvido como
+    resultado, e todos os processos do servidor partilham a mesma cópia em cache.
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self.data = data
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return bytes(self.data[start:end]).decode('utf-8')
+
+    @staticmethod
+    def write(texts: Iterable[str], directory: Path) -> None:
+        offsets = [0]
+        with open(directory / TEXTS_FILE, 'wb') as f:
+            for text in texts:
+                encoded = text.encode('utf-8')
+                f.write(encoded)
+                offsets.append(offsets[-1] + len(encoded))
+        np.save(directory / TEXT_OFFSETS_FILE, np.asarray(offsets, dtype=np.int64))
+
+    @classmethod
+    def load(cls, directory: Path, mmap: bool = False) -> 'TextStore':
+        path = directory / TEXTS_FILE
+        offsets = np.load(directory / TEXT_OFFSETS_FILE, mmap_mode='r' if mmap else None)
+        if mmap and path.stat().st_size > 0:
+            data = np.memmap(path, dtype=np.uint8, mode='r')
+        else:
+            data = np.fromfile(path, dtype=np.uint8)
+        return cls(data, offsets)
+
+
+@dataclass
+class SearchHit:
+    """Resultado de uma pesquisa no índice vetorial."""
+    chunk_id: int
+    document_id: int
+    title: str
+    text: str
+    score: float
+
+    def to_langchain(self) -> LangchainDocument:
+        return LangchainDocument(
+            page_content=self.text,
+            metadata={
+                'chunk_id': self.chunk_id,
+                'document_id': self.document_id,
+                'title': self.title,
+                'score': self.score,
+            }
+        )
+
+
+class VectorIndex:
+    """
+    Índice vetorial construído a partir dos `DocumentEmbedding` guardados.
+
+    Cada faceta filtrável (tipo de documento, categoria, tipo e estado de regulamento)
+    é guardada como um bitmap por fragmento. Os filtros são combinados com operações
+    bit a bit antes do cálculo de similaridade, pelo que só os fragmentos elegíveis
+    são pontuados: quanto mais restritivo o filtro, mais rápida a pesquisa.
+
+    Opcionalmente, um índice aproximado (`AnnIndex`, HNSW ou IVF-PQ) substitui a
+    pesquisa exata; o bitmap de filtros é então passado ao FAISS como seletor.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        vectors: np.ndarray,
+        chunk_ids: np.ndarray,
+        document_ids: np.ndarray,
+        created_days: np.ndarray,
+        texts: Any,
+        titles: Dict[int, str],
+        facets: Dict[str, Dict[str, np.ndarray]],
+        ann: Optional[AnnIndex] = None,
+        last_embedding_id: Optional[int] = None,
+        built_at: Optional[datetime] = None,
+    ):
+        self.model_name = model_name
+        self.vectors = vectors
+        self.chunk_ids = chunk_ids
+        self.document_ids = document_ids
+        self.created_days = created_days
+        self.texts = texts
+        self.titles = titles
+        self.facets = facets
+        self.ann = ann
+        # Maior id de fragmento existente quando o índice foi construído: os
+        # posteriores são pesquisados à parte (ver `LayeredVectorIndex`)
+        self.last_embedding_id = last_embedding_id
+        # Início da leitura da base de dados: os documentos alterados depois
+        # disso têm fragmentos ou facetas desatualizados no índice
+        self.built_at = built_at
+
+    def __len__(self) -> int:
+        return len(self.chunk_ids)
+
+    @property
+    def index_type(self) -> str:
+        return self.ann.index_type if self.ann is not None else INDEX_FLAT
+
+    def build_ann(self, index_type: str = INDEX_AUTO, params: Optional[AnnParams] = None) -> None:
+        """
+        Constrói (e treina) o índice aproximado para os vetores atuais.
+
+        Um corpus pequeno demais para treinar o tipo pedido fica com a
+        pesquisa exata, como no modo `auto`.
+
+        Args:
+            index_type: `flat`, `hnsw`, `ivfpq` ou `auto` (escolha pela dimensão do corpus)
+            params: Parâmetros de construção e pesquisa
+        """
+        if index_type == INDEX_AUTO:
+            index_type = choose_index_type(len(self))
+        elif len(self) < min_training_vectors(index_type, params):
+            logger.warning(
+                f"{len(self)} fragmentos de {self.model_name} não chegam para treinar um índice "
+                f"{index_type} (mínimo {min_training_vectors(index_type, params)}); usada a pesquisa exata"
+            )
+            index_type = INDEX_FLAT
+        if index_type == INDEX_FLAT or len(self) == 0:
+            self.ann = None
+            return
+        started = time.perf_counter()
+        with timed('ann_build', index_type=index_type):
+            self.ann = AnnIndex.build(self.vectors, index_type, params)
+        logger.info(
+            f"Índice {index_type} construído para {self.model_name} "
+            f"({len(self)} fragmentos) em {time.perf_counter() - started:.1f}s"
+        )
+
+    def save(self, directory: Path) -> None:
+        """Guarda o índice em disco (vetores, metadados, bitmaps e índice aproximado)."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in ARRAY_FILES:
+            np.save(directory / f'{name}.npy', getattr(self, name))
+        # Bitmaps numa única matriz (facetas x fragmentos), para poder ser mapeada em memória
+        facet_keys = [
+            [facet, value] for facet, bitmaps in self.facets.items() for value in bitmaps
+        ]
+        facet_matrix = np.zeros((len(facet_keys), len(self)), dtype=bool)
+        for position, (facet, value) in enumerate(facet_keys):
+            facet_matrix[position] = self.facets[facet][value]
+        np.save(directory / FACETS_FILE, facet_matrix)
+        (directory / FACET_KEYS_FILE).write_text(json.dumps(facet_keys), encoding='utf-8')
+        TextStore.write(self.texts, directory)
+        (directory / TITLES_FILE).write_text(json.dumps(self.titles, ensure_ascii=False), encoding='utf-8')
+        if self.ann is not None:
+            self.ann.save(directory / ANN_FILE)
+        # O ficheiro de metadados é escrito por último: marca o índice como completo
+        (directory / META_FILE).write_text(json.dumps({
+            'model_name': self.model_name,
+            'index_type': self.index_type,
+            'ann_params': self.ann.params.to_dict() if self.ann is not None else None,
+            'num_chunks': len(self),
+            'last_embedding_id': self.last_embedding_id,
+            'built_at': (self.built_at or timezone.now()).isoformat(),
+        }), encoding='utf-8')
+
+    @classmethod
+    def load(cls, directory: Path, mmap: bool = False) -> 'VectorIndex':
+        """
+        Carrega um índice guardado com `save`.
+
+        Args:
+            directory: Diretório do índice
+            mmap: Mapear os ficheiros em memória (só leitura) em vez de os ler;
+                as páginas só são carregadas quando a pesquisa lhes acede
+        """
+        directory = Path(directory)
+        mmap_mode = 'r' if mmap else None
+        meta = json.loads((directory / META_FILE).read_text(encoding='utf-8'))
+        arrays = {
+            name: np.load(directory / f'{name}.npy', mmap_mode=mmap_mode) for name in ARRAY_FILES
+        }
+
+        facets: Dict[str, Dict[str, np.ndarray]] = {}
+        facet_matrix = np.load(directory / FACETS_FILE, mmap_mode=mmap_mode)
+        facet_keys = json.loads((directory / FACET_KEYS_FILE).read_text(encoding='utf-8'))
+        for position, (facet, value) in enumerate(facet_keys):
+            facets.setdefault(facet, {})[value] = facet_matrix[position]
+
+        ann = None
+        if meta['index_type'] != INDEX_FLAT:
+            ann = AnnIndex.load(
+                directory / ANN_FILE,
+                meta['index_type'],
+                AnnParams.from_dict(meta['ann_params']),
+                mmap=mmap,
+            )
+
+        titles = json.loads((directory / TITLES_FILE).read_text(encoding='utf-8'))
+        last_embedding_id = meta.get('last_embedding_id')
+        if last_embedding_id is None and len(arrays['chunk_ids']):
+            # Versões anteriores a este campo
+            last_embedding_id = int(arrays['chunk_ids'].max())
+        return cls(
+            model_name=meta['model_name'],
+            last_embedding_id=last_embedding_id,
+            built_at=parse_datetime(meta['built_at']) if meta.get('built_at') else None,
+            texts=TextStore.load(directory, mmap=mmap),
+            titles={int(doc_id): title for doc_id, title in titles.items()},
+            facets=facets,
+            ann=ann,
+            **arrays,
+        )
+
+    @classmethod
+    def build(
+        cls,
+        model_name: str,
+        documents: Optional[QuerySet] = None,
+        after_id: Optional[int] = None,
+        changed_documents: Optional[Iterable[int]] = None,
+    ) -> 'VectorIndex':
+        """
+        Constrói o índice a partir da base de dados para um modelo de embedding.
+
+        Fragmentos sem texto guardado são ignorados, pois não podem ser usados
+        como contexto.
+
+        Args:
+            model_name: Modelo de embedding a indexar
+            documents: Limita o índice a estes documentos (ex.: um shard)
+            after_id: Só os fragmentos com id superior (ex.: os posteriores a uma versão publicada)
+            changed_documents: Com `after_id`, também todos os fragmentos destes documentos
+        """
+        embeddings = DocumentEmbedding.objects.filter(model_name=model_name)
+        if documents is not None:
+            embeddings = embeddings.filter(document__in=documents.values('pk'))
+        if after_id is not None:
+            newer = Q(pk__gt=after_id)
+            if changed_documents:
+                newer |= Q(document_id__in=list(changed_documents))
+            embeddings = embeddings.filter(newer)
+        built_at = timezone.now()
+        # Lido antes dos fragmentos: um fragmento gravado entretanto fica no
+        # índice e na pesquisa dos posteriores, e é deduplicado
+        last_embedding_id = embeddings.aggregate(last=Max('id'))['last'] or after_id or 0
+        rows = (
+            embeddings
+            .exclude(content='')
+            .order_by('document_id', 'chunk_index', 'id')
+            .values_list('id', 'document_id', 'vector', 'content')
+        )
+
+        chunk_ids: List[int] = []
+        document_ids: List[int] = []
+        vectors: List[List[float]] = []
+        texts: List[str] = []
+        for chunk_id, document_id, vector, content in rows.iterator(chunk_size=2000):
+            chunk_ids.append(chunk_id)
+            document_ids.append(document_id)
+            vectors.append(vector)
+            texts.append(content)
+
+        doc_ids = np.asarray(document_ids, dtype=np.int64)
+        unique_doc_ids = sorted(set(document_ids))
+
+        documents = Document.objects.filter(id__in=unique_doc_ids).values_list(
+            'id', 'title', 'document_type', 'created_at'
+        )
+        titles: Dict[int, str] = {}
+        docs_by_type: Dict[str, List[int]] = {}
+        created_by_doc: Dict[int, int] = {}
+        for doc_id, title, document_type, created_at in documents:
+            titles[doc_id] = title
+            docs_by_type.setdefault(document_type, []).append(doc_id)
+            created_by_doc[doc_id] = created_at.date().toordinal()
+
+        docs_by_category: Dict[str, List[int]] = {}
+        category_links = DocumentCategoryLink.objects.filter(
+            document_id__in=unique_doc_ids
+        ).values_list('document_id', 'category_id')
+        for doc_id, category_id in category_links:
+            docs_by_category.setdefault(str(category_id), []).append(doc_id)
+
+        docs_by_regulation_type: Dict[str, List[int]] = {}
+        docs_by_regulation_status: Dict[str, List[int]] = {}
+        regulations = Regulation.objects.filter(document_id__in=unique_doc_ids).values_list(
+            'document_id', 'regulation_type', 'status'
+        )
+        for doc_id, regulation_type, regulation_status in regulations:
+            docs_by_regulation_type.setdefault(regulation_type, []).append(doc_id)
+            docs_by_regulation_status.setdefault(regulation_status, []).append(doc_id)
+
+        def bitmaps(docs_by_value: Dict[str, List[int]]) -> Dict[str, np.ndarray]:
+            return {
+                value: np.isin(doc_ids, np.asarray(ids, dtype=np.int64))
+                for value, ids in docs_by_value.items()
+            }
+
+        if vectors:
+            matrix = np.asarray(vectors, dtype=np.float32)
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        return cls(
+            model_name=model_name,
+            last_embedding_id=last_embedding_id,
+            built_at=built_at,
+            vectors=_normalize_rows(matrix),
+            chunk_ids=np.asarray(chunk_ids, dtype=np.int64),
+            document_ids=doc_ids,
+            created_days=np.asarray(
+                [created_by_doc.get(d, 0) for d in document_ids], dtype=np.int32
+            ),
+            texts=texts,
+            titles=titles,
+            facets={
+                FACET_DOCUMENT_TYPE: bitmaps(docs_by_type),
+                FACET_CATEGORY: bitmaps(docs_by_category),
+                FACET_REGULATION_TYPE: bitmaps(docs_by_regulation_type),
+                FACET_REGULATION_STATUS: bitmaps(docs_by_regulation_status),
+            },
+        )
+
+    def _facet_mask(self, facet: str, values: Iterable[Any]) -> np.ndarray:
+        mask = np.zeros(len(self), dtype=bool)
+        bitmaps = self.facets.get(facet, {})
+        for value in values:
+            bitmap = bitmaps.get(str(value))
+            if bitmap is not None:
+                mask |= bitmap
+        return mask
+
+    def filter_mask(self, filters: Optional[RetrievalFilters]) -> Optional[np.ndarray]:
+        """
+        Combina os bitmaps das facetas pedidas num único bitmap de fragmentos elegíveis.
+
+        Returns:
+            Optional[np.ndarray]: None quando não há filtros (todo o índice é elegível)
+        """
+        if filters is None or filters.is_empty():
+            return None
+
+        mask = np.ones(len(self), dtype=bool)
+        for facet, values in (
+            (FACET_DOCUMENT_TYPE, filters.document_types),
+            (FACET_CATEGORY, filters.category_ids),
+            (FACET_REGULATION_TYPE, filters.regulation_types),
+            (FACET_REGULATION_STATUS, filters.regulation_statuses),
+        ):
+            if values:
+                mask &= self._facet_mask(facet, values)
+        if filters.document_ids is not None:
+            mask &= np.isin(self.document_ids, np.fromiter(filters.document_ids, dtype=np.int64))
+        if filters.excluded_document_ids:
+            mask &= ~np.isin(self.document_ids, np.fromiter(filters.excluded_document_ids, dtype=np.int64))
+        if filters.date_from:
+            mask &= self.created_days >= filters.date_from.toordinal()
+        if filters.date_to:
+            mask &= self.created_days <= filters.date_to.toordinal()
+        return mask
+
+    def ranked_rows(
+        self, query_vector: List[float], k: int, filters: Optional[RetrievalFilters]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Devolve (linhas, pontuações, consulta normalizada) dos `k` melhores fragmentos elegíveis.
+
+        Filtros muito seletivos são resolvidos por pesquisa exata sobre os fragmentos
+        elegíveis, que é mais rápida e precisa do que percorrer o grafo/listas do ANN.
+        """
+        query = _normalize_rows(np.asarray(query_vector, dtype=np.float32).reshape(1, -1))[0]
+        empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32), query)
+        if len(self) == 0:
+            return empty
+
+        mask = self.filter_mask(filters)
+        eligible = len(self) if mask is None else int(np.count_nonzero(mask))
+        if eligible == 0:
+            return empty
+
+        if self.ann is not None and eligible > self.ann.params.exact_threshold:
+            rows, scores = self.ann.search(query, k, mask)
+            return rows, scores, query
+
+        if mask is None:
+            rows = np.arange(len(self))
+            scores = self.vectors @ query
+        else:
+            rows = np.flatnonzero(mask)
+            scores = self.vectors[rows] @ query
+        top = _top_k(scores, k)
+        return rows[top], scores[top], query
+
+    def indexed_document_ids(self) -> np.ndarray:
+        return np.unique(self.document_ids)
+
+    def hit_for_row(self, row: int, score: float) -> SearchHit:
+        document_id = int(self.document_ids[row])
+        return SearchHit(
+            chunk_id=int(self.chunk_ids[row]),
+            document_id=document_id,
+            title=self.titles.get(document_id, ''),
+            text=self.texts[row],
+            score=float(score),
+        )
+
+    def ranked_hits(
+        self, query_vector: List[float], k: int, filters: Optional[RetrievalFilters]
+    ) -> Tuple[List[SearchHit], np.ndarray]:
+        """Os `k` melhores fragmentos elegíveis e os seus vetores normalizados."""
+        rows, scores, _ = self.ranked_rows(query_vector, k, filters)
+        return [self.hit_for_row(row, score) for row, score in zip(rows, scores)], self.vectors[rows]
+
+    def search(
+        self,
+        query_vector: List[float],
+        k: int = 5,
+        filters: Optional[RetrievalFilters] = None,
+    ) -> List[SearchHit]:
+        """Pesquisa por similaridade de cosseno restrita aos fragmentos elegíveis."""
+        rows, scores, _ = self.ranked_rows(query_vector, k, filters)
+        return [self.hit_for_row(row, score) for row, score in zip(rows, scores)]
+
+    def max_marginal_relevance_search(
+        self,
+        query_vector: List[float],
+        k: int = 5,
+        fetch_k: int = 10,
+        lambda_mult: float = 0.5,
+        filters: Optional[RetrievalFilters] = None,
+    ) -> List[SearchHit]:
+        """Pesquisa MMR sobre os `fetch_k` fragmentos elegíveis mais próximos."""
+        rows, scores, query = self.ranked_rows(query_vector, fetch_k, filters)
+        if rows.size == 0:
+            return []
+        selected = maximal_marginal_relevance(
+            query, self.vectors[rows], lambda_mult=lambda_mult, k=k
+        )
+        return [self.hit_for_row(rows[i], scores[i]) for i in selected]
+
+
+class LayeredVectorIndex:
+    """
+    Versão publicada do índice mais os fragmentos gravados depois dela.
+
+    Os fragmentos posteriores (documentos processados desde a última construção)
+    ficam num índice exato em memória, pequeno até à próxima publicação; cada
+    pesquisa consulta os dois e combina os resultados por pontuação, pelo que um
+    documento novo é encontrado logo após o processamento.
+
+    Os documentos apagados ou alterados desde a construção (reprocessados, com
+    outras categorias ou regulamentos) são excluídos da versão publicada na
+    pesquisa; os que ainda existem são indexados de novo no índice dos posteriores.
+    """
+
+    def __init__(self, published: Any, delta: VectorIndex, excluded_documents: Optional[Set[int]] = None):
+        self.published = published
+        self.delta = delta
+        self.excluded_documents = set(excluded_documents or ())
+        self.model_name = published.model_name
+
+    def __len__(self) -> int:
+        return len(self.published) + len(self.delta)
+
+    @property
+    def index_type(self) -> str:
+        return self.published.index_type
+
+    def ranked_hits(
+        self, query_vector: List[float], k: int, filters: Optional[RetrievalFilters]
+    ) -> Tuple[List[SearchHit], np.ndarray]:
+        published_filters = filters
+        if self.excluded_documents:
+            published_filters = replace(
+                filters or RetrievalFilters(),
+                excluded_document_ids=(filters.excluded_document_ids if filters else set()) | self.excluded_documents,
+            )
+        hits, vectors = self.published.ranked_hits(query_vector, k, published_filters)
+        delta_hits, delta_vectors = self.delta.ranked_hits(query_vector, k, filters)
+        candidates: Dict[int, Tuple[SearchHit, np.ndarray]] = {}
+        for hit, vector in zip(hits + delta_hits, list(vectors) + list(delta_vectors)):
+            candidates.setdefault(hit.chunk_id, (hit, vector))
+        ranked = sorted(candidates.values(), key=lambda candidate: candidate[0].score, reverse=True)[:k]
+        if not ranked:
+            return [], np.empty((0, 0), dtype=np.float32)
+        return [hit for hit, _ in ranked], np.stack([vector for _, vector in ranked])
+
+    def search(
+        self,
+        query_vector: List[float],
+        k: int = 5,
+        filters: Optional[RetrievalFilters] = None,
+    ) -> List[SearchHit]:
+        return self.ranked_hits(query_vector, k, filters)[0]
+
+    def max_marginal_relevance_search(
+        self,
+        query_vector: List[float],
+        k: int = 5,
+        fetch_k: int = 10,
+        lambda_mult: float = 0.5,
+        filters: Optional[RetrievalFilters] = None,
+    ) -> List[SearchHit]:
+        hits, vectors = self.ranked_hits(query_vector, fetch_k, filters)
+        if not hits:
+            return []
+        query = _normalize_rows(np.asarray(query_vector, dtype=np.float32).reshape(1, -1))[0]
+        selected = maximal_marginal_relevance(query, vectors, lambda_mult=lambda_mult, k=k)
+        return [hits[i] for i in selected]
+
+
+class VectorIndexRetriever(BaseRetriever):
+    """
+    Adaptador LangChain que pesquisa o `VectorIndex` com filtros de metadados.
+    """
+    index: Any
+    embeddings: Any
+    filters: Optional[Any] = None
+    search_type: str = 'mmr'
+    k: int = 5
+    fetch_k: int = 10
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[LangchainDocument]:
+        with timed('query_embedding'):
+            query_vector = self.embeddings.embed_query(query)
+        with timed('vector_search', index_type=self.index.index_type):
+            if self.search_type == 'mmr':
+                hits = self.index.max_marginal_relevance_search(
+                    query_vector, k=self.k, fetch_k=self.fetch_k, filters=self.filters
+                )
+            else:
+                hits = self.index.search(query_vector, k=self.k, filters=self.filters)
+        return [hit.to_langchain() for hit in hits]
+
+
+class FusedRetriever(BaseRetriever):
+    """
+    Combina vários retrievers (ex.: um índice por modelo de embedding) por fusão
+    de rankings recíproca (RRF).
+
+    Só a posição de cada fragmento conta, pelo que pontuações de espaços vetoriais
+    diferentes nunca são comparadas. O mesmo texto de um documento encontrado por
+    mais de um retriever (ex.: durante uma re-indexação) aparece uma só vez.
+    """
+    retrievers: List[Any]
+    k: int = 5
+    rrf_k: int = 60
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[LangchainDocument]:
+        scores: Dict[Tuple, float] = {}
+        documents: Dict[Tuple, LangchainDocument] = {}
+        for retriever in self.retrievers:
+            results = retriever.invoke(query, config={'callbacks': run_manager.get_child()})
+            for rank, document in enumerate(results):
+                key = (document.metadata.get('document_id'), document.page_content)
+                scores[key] = scores.get(key, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+                documents.setdefault(key, document)
+        ranked = sorted(scores, key=scores.get, reverse=True)[:self.k]
+        return [documents[key] for key in ranked]
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Índices das `k` maiores pontuações, por ordem decrescente."""
+    k = min(k, scores.size)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+_index_cache: Dict[str, Tuple[Tuple, VectorIndex]] = {}
+_published_cache: Dict[str, Tuple[str, Any]] = {}
+_index_lock = threading.Lock()
+
+
+def _corpus_signature(model_name: str) -> Tuple:
+    """Assinatura barata do corpus, usada para detetar quando o índice está desatualizado."""
+    embeddings = DocumentEmbedding.objects.filter(model_name=model_name).aggregate(
+        count=Count('id'), last_id=Max('id')
+    )
+    documents = Document.objects.aggregate(last_update=Max('updated_at'))
+    regulations = Regulation.objects.aggregate(count=Count('id'), last_update=Max('updated_at'))
+    category_links = DocumentCategoryLink.objects.aggregate(
+        count=Count('id'), last_id=Max('id')
+    )
+    return (
+        embeddings['count'], embeddings['last_id'],
+        documents['last_update'],
+        regulations['count'], regulations['last_update'],
+        category_links['count'], category_links['last_id'],
+    )
+
+
+def _delta_signature(model_name: str, last_embedding_id: int) -> Tuple:
+    """
+    Assinatura do que mudou desde uma versão publicada: os fragmentos
+    posteriores (consulta pela chave primária) e o estado dos documentos,
+    regulamentos e categorias (apagados, reprocessados ou alterados).
+    """
+    embeddings = DocumentEmbedding.objects.filter(
+        model_name=model_name, pk__gt=last_embedding_id
+    ).aggregate(count=Count('id'), last_id=Max('id'))
+    documents = Document.objects.aggregate(count=Count('id'), last_update=Max('updated_at'))
+    regulations = Regulation.objects.aggregate(count=Count('id'), last_update=Max('updated_at'))
+    category_links = DocumentCategoryLink.objects.aggregate(count=Count('id'), last_id=Max('id'))
+    return (
+        embeddings['count'], embeddings['last_id'],
+        documents['count'], documents['last_update'],
+        regulations['count'], regulations['last_update'],
+        category_links['count'], category_links['last_id'],
+    )
+
+
+def _stale_documents(published: Any) -> Set[int]:
+    """
+    Documentos cujos fragmentos na versão publicada já não valem: apagados
+    desde a construção, ou alterados depois dela (reprocessados, com outras
+    categorias ou regulamentos; ver signals.py).
+    """
+    existing = np.fromiter(Document.objects.values_list('id', flat=True), dtype=np.int64)
+    stale = set(np.setdiff1d(published.indexed_document_ids(), existing).tolist())
+    if published.built_at is not None:
+        stale.update(Document.objects.filter(updated_at__gt=published.built_at).values_list('id', flat=True))
+        stale.update(
+            Regulation.objects.filter(updated_at__gt=published.built_at).values_list('document_id', flat=True)
+        )
+    return stale
+
+
+def vector_index_root() -> Path:
+    """Diretório base dos índices persistidos (`settings.VECTOR_INDEX_DIR`)."""
+    return Path(getattr(settings, 'VECTOR_INDEX_DIR', Path(settings.BASE_DIR) / 'vector_index'))
+
+
+def vector_index_path(model_name: str) -> Path:
+    """Diretório do índice persistido de um modelo de embedding."""
+    return vector_index_root() / slugify(model_name)
+
+
+def build_vector_index(
+    model_name: str,
+    index_type: Optional[str] = None,
+    params: Optional[AnnParams] = None,
+    shard_by: Optional[str] = None,
+    only_shards: Optional[Set[str]] = None,
+) -> Any:
+    """
+    Constrói o índice a partir da base de dados e publica-o como uma nova versão.
+
+    A versão é escrita num diretório temporário e só depois publicada
+    atomicamente; os processos em execução passam a usá-la no pedido seguinte,
+    sem reinício.
+
+    Args:
+        model_name: Modelo de embedding a indexar
+        index_type: `flat`, `hnsw`, `ivfpq` ou `auto` (por omissão `settings.VECTOR_INDEX_TYPE`)
+        params: Parâmetros do índice aproximado
+        shard_by: `year` ou `category` para um índice em shards
+            (por omissão `settings.VECTOR_INDEX_SHARD_BY`; vazio = índice único)
+        only_shards: Reconstrói apenas estes shards; os restantes são reaproveitados
+            da versão atual através de hardlinks
+
+    Returns:
+        VectorIndex ou ShardedVectorIndex: O índice construído
+    """
+    from .sharded_index import build_sharded_index
+
+    model_dir = vector_index_path(model_name)
+    index_type = index_type or getattr(settings, 'VECTOR_INDEX_TYPE', INDEX_AUTO)
+    shard_by = shard_by if shard_by is not None else getattr(settings, 'VECTOR_INDEX_SHARD_BY', '')
+
+    version = new_version_id()
+    staging = create_staging_directory(model_dir, version)
+    try:
+        if shard_by:
+            previous = current_version(model_dir)
+            index = build_sharded_index(
+                staging, model_name, shard_by, index_type, params, only_shards,
+                previous=version_path(model_dir, previous) if previous else None,
+            )
+        else:
+            index = VectorIndex.build(model_name)
+            index.build_ann(index_type, params)
+            index.save(staging)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    publish_version(model_dir, staging, version)
+    invalidate_vector_index(model_name)
+    return index
+
+
+def load_index_version(directory: Path) -> Any:
+    """Abre uma versão publicada, mapeada em memória (só leitura)."""
+    from .sharded_index import MANIFEST_FILE, ShardedVectorIndex
+
+    if (directory / MANIFEST_FILE).exists():
+        return ShardedVectorIndex.load(directory)
+    return VectorIndex.load(directory, mmap=True)
+
+
+def get_vector_index(model_name: str) -> Any:
+    """
+    Devolve o índice do processo para o modelo.
+
+    Se existir uma versão publicada (ver `build_vector_index`), é usada mapeada em
+    memória, partilhando a cache de páginas entre todos os workers do servidor
+    (no HNSW, só os vetores; o grafo fica em cada worker, ver `AnnIndex.load`).
+    Quando uma nova versão é publicada, o índice é trocado no pedido seguinte; os
+    pedidos em curso terminam com a versão que já tinham. Os fragmentos gravados
+    depois da versão, e os dos documentos alterados desde então, são pesquisados
+    num índice exato à parte, refeito quando mudam (ver `LayeredVectorIndex`).
+    Sem versão publicada, é construído um
+    índice exato em memória a partir da base de dados, refeito sempre que o
+    corpus muda.
+    """
+    model_dir = vector_index_path(model_name)
+    version = current_version(model_dir)
+    if not version:
+        signature = _corpus_signature(model_name)
+        with _index_lock:
+            cached = _index_cache.get(model_name)
+            if cached and cached[0] == signature:
+                return cached[1]
+            index = VectorIndex.build(model_name)
+            _index_cache[model_name] = (signature, index)
+            logger.info(
+                f"Índice vetorial ({index.index_type}, versão memória) "
+                f"carregado para {model_name}: {len(index)} fragmentos"
+            )
+            return index
+
+    with _index_lock:
+        cached = _published_cache.get(model_name)
+        if cached and cached[0] == version:
+            published = cached[1]
+        else:
+            published = load_index_version(version_path(model_dir, version))
+            _published_cache[model_name] = (version, published)
+            logger.info(
+                f"Índice vetorial ({published.index_type}, versão {version}) "
+                f"carregado para {model_name}: {len(published)} fragmentos"
+            )
+
+    last_embedding_id = published.last_embedding_id
+    if last_embedding_id is None:
+        return published
+    signature = (version,) + _delta_signature(model_name, last_embedding_id)
+    with _index_lock:
+        cached = _index_cache.get(model_name)
+        if cached and cached[0] == signature:
+            return cached[1]
+        stale = _stale_documents(published)
+        delta = VectorIndex.build(model_name, after_id=last_embedding_id, changed_documents=stale)
+        index = LayeredVectorIndex(published, delta, stale) if len(delta) or stale else published
+        _index_cache[model_name] = (signature, index)
+        logger.info(
+            f"Desde a versão {version} de {model_name}: {len(delta)} fragmentos novos "
+            f"ou reindexados, {len(stale)} documentos alterados"
+        )
+        return index
+
+
+def invalidate_vector_index(model_name: Optional[str] = None) -> None:
+    """Descarta o índice em cache (de um modelo ou de todos)."""
+    with _index_lock:
+        if model_name is None:
+            _index_cache.clear()
+            _published_cache.clear()
+        else:
+            _index_cache.pop(model_name, None)
+            _published_cache.pop(model_name, None)
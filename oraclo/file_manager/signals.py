@@ -0,0 +1,44 @@
+# file_manager/signals.py
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Document, DocumentCategoryLink, Regulation
+from .services.blob_store import BlobStore
+
+
+@receiver(post_delete, sender=Document)
+def release_document_blob(sender, instance: Document, **kwargs) -> None:
+    """Um documento apagado deixa de contar como referência do seu blob."""
+    if instance.blob_id:
+        blob_id = instance.blob_id
+        transaction.on_commit(lambda: BlobStore.release(blob_id))
+
+
+def _touch_documents(document_ids: Iterable[int]) -> None:
+    """
+    Marca os documentos como alterados: o índice vetorial publicado deixa de
+    usar os seus bitmaps de categorias e regulamentos (ver `_stale_documents`).
+    """
+    Document.objects.filter(pk__in=list(document_ids)).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=DocumentCategoryLink)
+def touch_recategorized_documents(sender, instance, action: str, reverse: bool, pk_set, **kwargs) -> None:
+    # add() cria as ligações em bloco, sem post_save; remove() e clear() apagam-nas com post_delete
+    if action == 'post_add' and pk_set:
+        _touch_documents(pk_set if reverse else [instance.pk])
+
+
+@receiver(post_save, sender=DocumentCategoryLink)
+@receiver(post_delete, sender=DocumentCategoryLink)
+def touch_linked_document(sender, instance: DocumentCategoryLink, **kwargs) -> None:
+    _touch_documents([instance.document_id])
+
+
+@receiver(post_delete, sender=Regulation)
+def touch_regulated_document(sender, instance: Regulation, **kwargs) -> None:
+    _touch_documents([instance.document_id])
@@ -4,6 +4,7 @@ document.addEventListener('DOMContentLoaded', function () {
     const chatInput = document.getElementById('chatInput');
     const chatContainer = document.getElementById('chatContainer');
     let chatHistory = [];
+    let sessionId = null;
 
     chatForm.addEventListener('submit', async function (e) {
         e.preventDefault();
@@ -28,6 +29,7 @@ document.addEventListener('DOMContentLoaded', function () {
                 },
                 body: JSON.stringify({
                     question: question,
+                    session_id: sessionId,
                     history: chatHistory
                 })
             });
@@ -49,6 +51,11 @@ document.addEventListener('DOMContentLoaded', function () {
             // Adicionar resposta da IA
             appendMessage(data.answer, 'assistant', data.sources || []);
 
+            // O histórico completo fica no servidor, associado à sessão
+            if (data.session_id) {
+                sessionId = data.session_id;
+            }
+
             // Atualizar histórico
             chatHistory.push({
                 question: question,
@@ -0,0 +1,91 @@
+# file_manager/tests/test_blob_store.py
+import hashlib
+import io
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.test import TestCase, override_settings
+
+from file_manager.models import Document, StoredBlob
+from file_manager.services.blob_store import BlobStore
+
+CONTENT = "Lei n.º 5/2010, de 12 de março\nLei das Comunicações Electrónicas\n".encode('utf-8') * 50
+SHA256 = hashlib.sha256(CONTENT).hexdigest()
+
+
+class BlobStoreTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = BlobStore(root=Path(directory.name))
+
+    def _files(self):
+        return sorted(path for path in self.store.root.rglob('*') if path.is_file())
+
+    def test_duplicate_uploads_share_one_blob(self):
+        blob, created, info = self.store.put_upload(SimpleUploadedFile('lei.txt', CONTENT))
+        self.assertTrue(created)
+        self.assertEqual(blob.sha256, SHA256)
+        self.assertEqual(blob.path, f'{SHA256[:2]}/{SHA256[2:4]}/{SHA256}.txt')
+        self.assertEqual(info.path.read_bytes(), CONTENT)
+
+        # O mesmo conteúdo, noutro nome e num arquivo temporário: nada é gravado
+        upload = TemporaryUploadedFile('Lei 5-2010 (cópia).TXT', 'text/plain', len(CONTENT), None)
+        upload.write(CONTENT)
+        upload.flush()
+        again, created, _ = self.store.put_upload(upload)
+        upload.close()
+
+        self.assertFalse(created)
+        self.assertEqual(again.pk, blob.pk)
+        self.assertEqual(self._files(), [info.path])
+        self.assertEqual(self.store.stats()['blobs'], 1)
+
+    @override_settings(FILE_UPLOAD_PERMISSIONS=0o640)
+    def test_blobs_get_the_configured_permissions(self):
+        _, _, written = self.store.put_upload(SimpleUploadedFile('lei.txt', CONTENT))
+        _, _, streamed = self.store.put_stream(io.BytesIO(CONTENT[::-1]), extension='.txt')
+
+        self.assertEqual(written.path.stat().st_mode & 0o777, 0o640)
+        self.assertEqual(streamed.path.stat().st_mode & 0o777, 0o640)
+
+    def test_references_and_garbage_collection(self):
+        blob, _, info = self.store.put_upload(SimpleUploadedFile('lei.txt', CONTENT))
+        documents = [
+            Document.objects.create(title=f'Lei {n}', file_path=str(info.path), blob=blob) for n in range(2)
+        ]
+        for _ in documents:
+            self.store.acquire(blob)
+        self.assertEqual(self.store.stats()['saved_bytes'], len(CONTENT))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            documents[0].delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            documents[1].delete()
+        # Ainda dentro do período de tolerância
+        self.assertEqual(self.store.collect_garbage(), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.store.collect_garbage(timedelta(0)), 1)
+        self.assertFalse(StoredBlob.objects.exists())
+        self.assertEqual(self._files(), [])
+
+    def test_adopt_and_recount(self):
+        legacy = self.store.root.parent / f'{self.store.root.name}-legado.txt'
+        legacy.write_bytes(CONTENT)
+        self.addCleanup(legacy.unlink, missing_ok=True)
+        document = Document.objects.create(title='Lei antiga', file_path=str(legacy))
+
+        self.assertTrue(self.store.adopt(document))
+        document.refresh_from_db()
+        self.assertFalse(legacy.exists())
+        self.assertEqual(Path(document.file_path).read_bytes(), CONTENT)
+        self.assertEqual(document.blob.ref_count, 1)
+
+        StoredBlob.objects.update(ref_count=7)
+        self.assertEqual(self.store.recount(), 1)
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
@@ -0,0 +1,90 @@
+# file_manager/tests/test_chunked_upload.py
+import hashlib
+import tempfile
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from file_manager.benchmarks.corpus import build_corpus
+from file_manager.benchmarks.fakes import FakeEmbeddings, fake_llm, offline_converter
+from file_manager.models import Document, UploadSession
+from file_manager.services.chunked_upload import complete_session
+from file_manager.services.document_processor import DocumentProcessor
+
+
+class ChunkedUploadTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        root = Path(directory.name)
+        settings_override = override_settings(
+            BLOB_STORE_DIR=root / 'blobs',
+            UPLOAD_SESSIONS={'DIRECTORY': root / 'sessions', 'MAX_CHUNK_SIZE': 64 * 1024},
+            DOCUMENT_STORAGE='blobs',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.path = build_corpus(root / 'corpus', num_documents=1)[0]
+        self.data = self.path.read_bytes()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='scanner', password='x'))
+
+    def _put(self, url, start, end, **headers):
+        return self.client.generic(
+            'PUT', url, self.data[start:end], content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end - 1}/{len(self.data)}', **headers
+        )
+
+    def test_resume_after_interrupted_range(self):
+        response = self.client.post(reverse('file_manager:upload_create'), {
+            'filename': self.path.name, 'size': len(self.data),
+            'sha256': hashlib.sha256(self.data).hexdigest(), 'title': 'Lei digitalizada',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        url = reverse('file_manager:upload_session', args=[response.data['id']])
+
+        middle = len(self.data) // 2
+        self.assertEqual(self._put(url, 0, middle // 2).data['offset'], middle // 2)
+
+        # Intervalo corrompido: descartado, o deslocamento não avança
+        corrupted = self._put(url, middle // 2, middle, HTTP_X_CHUNK_SHA256='0' * 64)
+        self.assertEqual(corrupted.status_code, 400)
+        self.assertEqual(self.client.get(url).data['offset'], middle // 2)
+
+        # Fora de ordem: o servidor indica de onde retomar
+        conflict = self._put(url, middle, len(self.data))
+        self.assertEqual(conflict.status_code, 409)
+        self.assertEqual(conflict['Upload-Offset'], str(middle // 2))
+
+        self.assertEqual(self._put(
+            url, middle // 2, middle,
+            HTTP_X_CHUNK_SHA256=hashlib.sha256(self.data[middle // 2:middle]).hexdigest()
+        ).status_code, 200)
+        self.assertEqual(self._put(url, middle, len(self.data)).data['offset'], len(self.data))
+
+        session = UploadSession.objects.get()
+        processor = DocumentProcessor(embeddings=FakeEmbeddings(size=8), llm=fake_llm(), doc_converter=offline_converter())
+        document, created = complete_session(session, processor=processor)
+
+        self.assertTrue(created)
+        self.assertEqual(document.title, 'Lei digitalizada')
+        self.assertEqual(document.file_hash, hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(Path(document.file_path).read_bytes(), self.data)
+        document.blob.refresh_from_db()
+        self.assertEqual(document.blob.ref_count, 1)
+        self.assertEqual(session.status, UploadSession.SessionStatus.COMPLETED)
+        # Concluir de novo devolve o mesmo documento
+        self.assertEqual(complete_session(session)[0].pk, document.pk)
+        self.assertEqual(Document.objects.count(), 1)
+
+    def test_rejects_invalid_sessions(self):
+        create = reverse('file_manager:upload_create')
+        self.assertEqual(self.client.post(create, {'filename': 'a.exe', 'size': 10}, format='json').status_code, 400)
+        self.assertEqual(
+            self.client.post(create, {'filename': 'a.pdf', 'size': 10 ** 9}, format='json').status_code, 400
+        )
+        self.assertEqual(APIClient().post(create, {'filename': 'a.pdf', 'size': 10}).status_code, 403)
@@ -0,0 +1,78 @@
+# file_manager/tests/test_conversation.py
+import time
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.test import RequestFactory, TestCase
+
+from file_manager.services.conversation import SUMMARY_LABEL, ConversationStore, conversation_key
+
+
+class ConversationStoreTestCase(TestCase):
+    def setUp(self):
+        self.summaries = []
+
+        def summarizer(summary, turns):
+            self.summaries.append(turns)
+            return (summary + ' ' + ' '.join(q for q, _ in turns)).strip()
+
+        self.store = ConversationStore(window=2, token_budget=1000, ttl=60, summarizer=summarizer)
+        self.store.clear('sessao')
+
+    def test_old_turns_are_folded_into_summary(self):
+        for position in range(4):
+            self.store.append('sessao', f'pergunta {position}', f'resposta {position}')
+
+        state = self.store.load('sessao')
+        self.assertEqual(len(state.turns), 2)
+        self.assertEqual(state.summary, 'pergunta 0 pergunta 1')
+
+        history = self.store.prompt_history('sessao')
+        self.assertEqual(history[0], (SUMMARY_LABEL, 'pergunta 0 pergunta 1'))
+        self.assertEqual(history[1:], [('pergunta 2', 'resposta 2'), ('pergunta 3', 'resposta 3')])
+
+    def test_prompt_history_respects_token_budget(self):
+        store = ConversationStore(window=10, token_budget=30, ttl=60)
+        store.clear('orcamento')
+        store.append('orcamento', 'antiga ' * 40, 'longa ' * 40)
+        store.append('orcamento', 'recente', 'curta')
+        self.assertEqual(store.prompt_history('orcamento'), [('recente', 'curta')])
+
+    def test_seed_only_initializes_new_sessions(self):
+        history = [{'question': 'a', 'answer': '1'}, {'question': 'b', 'answer': '2'}]
+        self.store.seed('sessao', history)
+        self.store.seed('sessao', [{'question': 'ignorada', 'answer': 'x'}])
+        self.assertEqual(self.store.load('sessao').turns, [('a', '1'), ('b', '2')])
+
+    def test_seeded_history_is_bounded_before_summarizing(self):
+        history = [{'question': f'pergunta {n}', 'answer': 'resposta'} for n in range(1000)]
+        self.store.seed('sessao', history)
+        # window=2: só as últimas 8 trocas contam, e 6 vão para o resumo
+        self.assertEqual(len(self.summaries[0]), 6)
+        self.assertEqual(self.summaries[0][0][0], 'pergunta 992')
+
+        store = ConversationStore(window=1, ttl=60, summary_input_tokens=50, summarizer=self.store.summarizer)
+        store.clear('longa')
+        store.seed('longa', [
+            {'question': 'antiga ' * 500, 'answer': 'x'},
+            {'question': 'recente', 'answer': 'y'},
+            {'question': 'atual', 'answer': 'z'},
+        ])
+        self.assertEqual(self.summaries[1], [('recente', 'y')])
+
+    def test_inactive_conversations_expire(self):
+        store = ConversationStore(ttl=1)
+        store.append('expira', 'pergunta', 'resposta')
+        time.sleep(1.1)
+        self.assertEqual(store.prompt_history('expira'), [])
+
+    def test_anonymous_session_id_cannot_reach_a_user_conversation(self):
+        user = User.objects.create_user(username='analista', password='x')
+        authenticated = RequestFactory().post('/api/chat/')
+        authenticated.user = user
+        anonymous = RequestFactory().post('/api/chat/')
+        anonymous.user = AnonymousUser()
+
+        own = conversation_key(authenticated, 'abc')
+        self.assertNotEqual(conversation_key(anonymous, f'u{user.pk}:abc'), own)
+        self.assertNotEqual(conversation_key(anonymous, f'u:{user.pk}:abc'), own)
+        self.assertNotEqual(conversation_key(anonymous, own), own)
@@ -0,0 +1,135 @@
+# file_manager/tests/test_document_processor.py
+import hashlib
+import tempfile
+from pathlib import Path
+
+from django.db import IntegrityError, connection
+from django.test import TestCase
+
+from file_manager.benchmarks.corpus import build_corpus
+from file_manager.benchmarks.fakes import FakeEmbeddings, TextLayerConverter, fake_llm, offline_converter
+from file_manager.benchmarks.ingestion import compare_ingestion_reports, run_ingestion_benchmark
+from file_manager.models import Document, DocumentEmbedding
+from file_manager.services.document_processor import EMBEDDING_MODEL_NAME, DocumentProcessor, DuplicateDocumentError
+from file_manager.utils.file_handlers import FileValidator
+
+
+class DocumentProcessorTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.processor = DocumentProcessor(
+            embeddings=FakeEmbeddings(size=16),
+            llm=fake_llm(),
+            doc_converter=offline_converter(),
+        )
+
+    def test_process_document_stores_chunks(self):
+        for path in build_corpus(Path(self.directory.name), num_documents=3):
+            document = self.processor.process_document(str(path))
+
+            self.assertEqual(document.status, Document.DocumentStatus.PROCESSED)
+            self.assertIn('Artigo', document.content)
+            embeddings = DocumentEmbedding.objects.filter(document=document).order_by('chunk_index')
+            self.assertTrue(embeddings.exists())
+            self.assertEqual(
+                list(embeddings.values_list('chunk_index', flat=True)), list(range(embeddings.count()))
+            )
+            first = embeddings.first()
+            self.assertEqual(first.model_name, EMBEDDING_MODEL_NAME)
+            self.assertEqual(len(first.vector), 16)
+            self.assertEqual(first.vector, self.processor.embeddings.embed_query(first.content))
+            self.assertIsInstance(document.metadata['num_pages'], int)
+            self.assertEqual(document.file_size, path.stat().st_size)
+            self.assertIn(path.suffix, FileValidator.ALLOWED_MIMETYPES[document.mime_type])
+            summary = document.embedding_summaries.get()
+            self.assertEqual(
+                (summary.model_name, summary.chunk_count, summary.dimensions),
+                (EMBEDDING_MODEL_NAME, embeddings.count(), 16)
+            )
+
+    def test_duplicate_document_is_rejected(self):
+        path = build_corpus(Path(self.directory.name), num_documents=1)[0]
+        self.processor.process_document(str(path))
+        with self.assertRaises(ValueError):
+            self.processor.process_document(str(path))
+
+    def test_document_claimed_by_another_upload_is_a_duplicate(self):
+        path = build_corpus(Path(self.directory.name), num_documents=1)[0]
+        # Outro envio do mesmo conteúdo já criou o documento e ainda o processa
+        rival = Document.objects.create(
+            title='Rival', file_path=str(path), status=Document.DocumentStatus.PROCESSING,
+            file_hash=hashlib.sha256(path.read_bytes()).hexdigest()
+        )
+        with self.assertRaises(DuplicateDocumentError) as raised:
+            self.processor.process_document(str(path))
+
+        self.assertEqual(raised.exception.document, rival)
+        self.assertEqual(list(Document.objects.all()), [rival])
+        with self.assertRaises(IntegrityError):
+            Document.objects.create(title='Cópia', file_path=str(path), file_hash=rival.file_hash)
+
+    def test_conversion_and_embedding_run_outside_transactions(self):
+        path = build_corpus(Path(self.directory.name), num_documents=1)[0]
+        outer = len(connection.atomic_blocks)
+        depths = []
+        converter, embeddings = self.processor.doc_converter, self.processor.embeddings
+
+        class Probe:
+            def __getattr__(self, name):
+                depths.append(len(connection.atomic_blocks))
+                return getattr(converter if name == 'convert' else embeddings, name)
+
+        self.processor.doc_converter = self.processor.embeddings = Probe()
+        self.processor.process_document(str(path))
+
+        self.assertEqual(depths, [outer, outer])
+
+    def test_failed_document_keeps_error_and_is_reused(self):
+        path = build_corpus(Path(self.directory.name), num_documents=1)[0]
+        converter = self.processor.doc_converter
+        self.processor.doc_converter = None
+        with self.assertRaises(AttributeError):
+            self.processor.process_document(str(path))
+
+        failed = Document.objects.get()
+        self.assertEqual(failed.status, Document.DocumentStatus.ERROR)
+        self.assertIn('error', failed.metadata)
+        self.assertEqual(
+            list(failed.status_events.values_list('status', flat=True)),
+            [Document.DocumentStatus.PROCESSING, Document.DocumentStatus.ERROR]
+        )
+
+        self.processor.doc_converter = converter
+        document = self.processor.process_document(str(path))
+        self.assertEqual(document.pk, failed.pk)
+        self.assertEqual(document.status, Document.DocumentStatus.PROCESSED)
+        self.assertNotIn('error', document.metadata)
+
+    def test_text_layer_converter_reads_pdf_pages(self):
+        path = build_corpus(Path(self.directory.name), num_documents=1)[0]
+        result = TextLayerConverter().convert(str(path))
+        self.assertEqual(result.document.num_pages, 1)
+        self.assertIn('Artigo 1.1', result.document.export_to_markdown())
+
+
+class IngestionBenchmarkTestCase(TestCase):
+    def test_benchmark_report_and_comparison(self):
+        report = run_ingestion_benchmark(num_documents=3, repeat=1, embedding_size=16)
+
+        self.assertEqual(report['corpus']['documents'], 3)
+        self.assertEqual(report['corpus']['by_format'], {'pdf': 1, 'docx': 1, 'html': 1})
+        for stage in ('conversion', 'splitting', 'embedding', 'persistence', 'total'):
+            self.assertLessEqual(report['stages'][stage]['p50_ms'], report['stages'][stage]['p99_ms'])
+        self.assertGreater(report['throughput']['documents_per_s'], 0)
+        self.assertGreater(report['memory']['peak_traced_mb'], 0)
+        # As passagens do benchmark são revertidas
+        self.assertFalse(Document.objects.exists())
+
+        slower = {**report, 'stages': {
+            stage: {name: value * 2 for name, value in values.items()}
+            for stage, values in report['stages'].items()
+        }}
+        rows = {row['metric']: row for row in compare_ingestion_reports(slower, report, tolerance=0.2)}
+        self.assertTrue(rows['stages.total.p95_ms']['regression'])
+        self.assertFalse(rows['throughput.documents_per_s']['regression'])
@@ -0,0 +1,285 @@
+# file_manager/tests/test_embeddings.py
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+
+from file_manager.benchmarks.corpus import build_corpus
+from file_manager.benchmarks.fakes import (
+    FakeEmbeddings,
+    HashingEmbeddings,
+    RegisteredHashingEmbeddings,
+    fake_llm,
+    offline_converter,
+)
+from file_manager.models import Document, DocumentEmbedding, EmbeddingMigration, EmbeddingSummary
+from file_manager.services.document_processor import DocumentProcessor
+from file_manager.services.embedding_summary import rebuild_embedding_summaries
+from file_manager.services.embeddings import (
+    LocalEmbeddingProvider,
+    OpenAIEmbeddingProvider,
+    active_embedding_model,
+    build_retriever,
+    create_embedding_provider,
+    get_embedding_provider,
+    reset_embedding_providers,
+    reset_models_with_embeddings,
+    searchable_embedding_models,
+)
+from file_manager.services.reembedding import migration_report, run_migration, start_migration
+from file_manager.services.vector_index import FusedRetriever, VectorIndexRetriever, invalidate_vector_index
+
+VOCABULARY = ['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]', 'query', 'passage', ':'] + [
+    'regulamento', 'licença', 'espectro', 'tarifa', 'operador', 'artigo', 'de', 'o', 'a'
+]
+
+
+def write_tiny_model(directory: Path) -> None:
+    """Modelo BERT minúsculo com pesos aleatórios, para testar o backend local sem rede."""
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+
+    vocabulary = {token: position for position, token in enumerate(VOCABULARY)}
+    BertTokenizerFast(vocab=vocabulary, strip_accents=False).save_pretrained(directory)
+    config = BertConfig(
+        vocab_size=len(VOCABULARY), hidden_size=16, num_hidden_layers=1,
+        num_attention_heads=2, intermediate_size=32,
+    )
+    BertModel(config).save_pretrained(directory)
+
+
+class LocalEmbeddingProviderTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.TemporaryDirectory()
+        write_tiny_model(Path(cls.directory.name))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def test_batched_embeddings_match_single_texts(self):
+        provider = create_embedding_provider('local-teste', {
+            'BACKEND': 'local', 'PATH': self.directory.name, 'BATCH_SIZE': 2, 'NUM_THREADS': 2,
+            'QUERY_PREFIX': 'query: ', 'DOCUMENT_PREFIX': 'passage: ',
+        })
+        self.assertIsInstance(provider, LocalEmbeddingProvider)
+
+        texts = ['regulamento de espectro', 'tarifa', 'licença de o operador artigo a', 'artigo']
+        vectors = provider.embed_documents(texts)
+
+        self.assertEqual(len(vectors), len(texts))
+        for text, vector in zip(texts, vectors):
+            self.assertAlmostEqual(float(np.linalg.norm(vector)), 1.0, places=5)
+            np.testing.assert_allclose(vector, provider.embed_documents([text])[0], atol=1e-5)
+        # A consulta leva um prefixo diferente do das passagens
+        self.assertFalse(np.allclose(provider.embed_query('tarifa'), vectors[1]))
+        self.assertEqual(provider.embed_documents([]), [])
+
+
+class EmbeddingRegistryTestCase(TestCase):
+    def setUp(self):
+        reset_embedding_providers()
+        self.addCleanup(reset_embedding_providers)
+        reset_models_with_embeddings()
+        self.addCleanup(reset_models_with_embeddings)
+        invalidate_vector_index()
+        self.addCleanup(invalidate_vector_index)
+
+    @override_settings(EMBEDDING_MODEL='text-embedding-3-small', EMBEDDING_PROVIDERS={
+        'text-embedding-3-small': {'BACKEND': 'openai', 'BATCH_SIZE': 100},
+    })
+    def test_registry_uses_configured_provider(self):
+        provider = get_embedding_provider()
+        self.assertIsInstance(provider, OpenAIEmbeddingProvider)
+        self.assertEqual(provider.model_name, 'text-embedding-3-small')
+        self.assertEqual(provider.options, {'chunk_size': 100})
+        self.assertIs(provider, get_embedding_provider('text-embedding-3-small'))
+        with self.assertRaises(ImproperlyConfigured):
+            get_embedding_provider('modelo-desconhecido')
+
+    def test_mixed_model_corpus_uses_one_index_per_model(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        paths = build_corpus(Path(directory.name), num_documents=2)
+        providers = {'hashing': HashingEmbeddings(size=32), 'fake': FakeEmbeddings(size=8)}
+        for path, (model_name, embeddings) in zip(paths, providers.items()):
+            DocumentProcessor(
+                embeddings=embeddings, llm=fake_llm(), doc_converter=offline_converter(),
+                embedding_model=model_name,
+            ).process_document(str(path))
+
+        self.assertEqual(
+            set(DocumentEmbedding.objects.values_list('model_name', flat=True)), {'hashing', 'fake'}
+        )
+        retriever = build_retriever(search_type='similarity', k=50, providers=providers)
+        self.assertIsInstance(retriever, FusedRetriever)
+        results = retriever.invoke('Artigo regulamento')
+        self.assertEqual(len({doc.metadata['document_id'] for doc in results}), 2)
+        self.assertEqual(len(results), DocumentEmbedding.objects.count())
+
+        # Um só modelo com dados dispensa a fusão
+        retriever = build_retriever(providers={'hashing': providers['hashing'], 'outro': FakeEmbeddings(size=8)})
+        self.assertIsInstance(retriever, VectorIndexRetriever)
+
+    @override_settings(EMBEDDING_MODEL='hashing', EMBEDDING_PROVIDERS={
+        'hashing': {'BACKEND': 'local', 'PATH': None},
+        'fake': {'BACKEND': 'local', 'PATH': None},
+        'vazio': {'BACKEND': 'local', 'PATH': None},
+    })
+    def test_models_without_embeddings_are_not_searched(self):
+        self.assertEqual(searchable_embedding_models(), ['hashing'])
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = build_corpus(Path(directory.name), num_documents=1)[0]
+        DocumentProcessor(
+            embeddings=FakeEmbeddings(size=8), llm=fake_llm(), doc_converter=offline_converter(),
+            embedding_model='fake',
+        ).process_document(str(path))
+
+        # A gravação invalida a cache do processo
+        with self.assertNumQueries(2):
+            self.assertEqual(searchable_embedding_models(), ['hashing', 'fake'])
+        with self.assertNumQueries(1):
+            self.assertEqual(searchable_embedding_models(), ['hashing', 'fake'])
+
+
+class FailingEmbeddings(HashingEmbeddings):
+    """Falha a partir da chamada `fail_on`, para simular uma interrupção."""
+
+    def __init__(self, fail_on: int):
+        super().__init__(size=16)
+        self.fail_on = fail_on
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        if self.calls >= self.fail_on:
+            raise RuntimeError('Ligação perdida')
+        return super().embed_documents(texts)
+
+
+class EmbeddingMigrationTestCase(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        settings = override_settings(
+            VECTOR_INDEX_DIR=self.tmp.name,
+            EMBEDDING_MODEL='antigo',
+            EMBEDDING_PROVIDERS={
+                'antigo': {'BACKEND': 'local', 'PATH': '/inexistente'},
+                'novo': {'BACKEND': 'local', 'PATH': '/inexistente', 'COST_PER_1K_TOKENS': 0.02},
+            },
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        reset_embedding_providers()
+        self.addCleanup(reset_embedding_providers)
+        invalidate_vector_index()
+
+        for title in ('Lei das Comunicações', 'Regulamento de Espectro'):
+            document = Document.objects.create(title=title, file_path=f'/test/{title}.pdf')
+            for chunk_index in range(3):
+                DocumentEmbedding.objects.create(
+                    document=document, vector=[1.0, 0.0], model_name='antigo',
+                    chunk_index=chunk_index, content=f'{title}, artigo {chunk_index + 1}.º',
+                )
+
+    def test_migration_resumes_after_failure_and_switches_model(self):
+        migration = start_migration('novo', batch_size=2)
+        self.assertEqual(migration.total_chunks, 6)
+
+        # O segundo lote falha: o primeiro fica gravado e o cursor aponta para ele
+        with self.assertRaises(RuntimeError):
+            run_migration(migration, provider=FailingEmbeddings(fail_on=2))
+        migration.refresh_from_db()
+        self.assertEqual(migration.status, EmbeddingMigration.MigrationStatus.FAILED)
+        self.assertEqual(migration.processed_chunks, 2)
+        self.assertEqual(DocumentEmbedding.objects.filter(model_name='novo').count(), 2)
+        self.assertEqual(active_embedding_model(), 'antigo')
+        self.assertEqual(searchable_embedding_models(), ['antigo'])
+
+        resumed = start_migration('novo', batch_size=2)
+        self.assertEqual(resumed.pk, migration.pk)
+        run_migration(resumed, provider=HashingEmbeddings(size=16))
+
+        resumed.refresh_from_db()
+        self.assertEqual(resumed.status, EmbeddingMigration.MigrationStatus.COMPLETED)
+        self.assertIsNotNone(resumed.activated_at)
+        new = DocumentEmbedding.objects.filter(model_name='novo')
+        self.assertEqual(new.count(), 6)
+        self.assertEqual(
+            sorted(new.values_list('document_id', 'chunk_index')),
+            sorted(DocumentEmbedding.objects.filter(model_name='antigo').values_list('document_id', 'chunk_index'))
+        )
+        self.assertEqual(active_embedding_model(), 'novo')
+        self.assertEqual(searchable_embedding_models(), ['novo'])
+
+        # O lote que falhou não entrou no resumo: os totais coincidem com os fragmentos
+        summaries = EmbeddingSummary.objects.filter(model_name='novo')
+        self.assertEqual(sorted(summaries.values_list('chunk_count', 'dimensions')), [(3, 16), (3, 16)])
+
+        report = migration_report(resumed)
+        self.assertEqual(report['progress'], 1.0)
+        self.assertEqual(sum(summaries.values_list('total_tokens', flat=True)), report['tokens'])
+        self.assertGreater(report['tokens'], 0)
+        self.assertAlmostEqual(report['estimated_cost'], report['tokens'] / 1000 * 0.02)
+
+        with self.assertRaises(ValueError):
+            start_migration('novo', source_model='antigo')
+
+    def test_rebuild_summaries_from_stored_chunks(self):
+        document = Document.objects.first()
+        EmbeddingSummary.objects.create(document=document, model_name='removido', chunk_count=9)
+
+        self.assertEqual(rebuild_embedding_summaries(), 2)
+
+        summary = EmbeddingSummary.objects.get(document=document)
+        self.assertEqual((summary.model_name, summary.chunk_count, summary.dimensions), ('antigo', 3, 2))
+        self.assertGreater(summary.total_tokens, 0)
+
+
+@override_settings(
+    EMBEDDING_MODEL='antigo',
+    EMBEDDING_PROVIDERS={
+        model: {'BACKEND': 'file_manager.benchmarks.fakes.RegisteredHashingEmbeddings', 'SIZE': size}
+        for model, size in (('antigo', 8), ('novo', 16))
+    },
+)
+class ActiveModelSwitchTestCase(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        settings = override_settings(VECTOR_INDEX_DIR=self.tmp.name, MEDIA_ROOT=self.tmp.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        reset_embedding_providers()
+        self.addCleanup(reset_embedding_providers)
+        invalidate_vector_index()
+
+    def test_document_converted_across_an_activation_is_stored_with_the_new_model(self):
+        path = build_corpus(Path(self.tmp.name), num_documents=1)[0]
+        processor = DocumentProcessor(llm=fake_llm(), doc_converter=offline_converter())
+        self.assertEqual(processor.embedding_model, 'antigo')
+        converter = processor.doc_converter
+
+        class ActivatingConverter:
+            """A migração é ativada (com a sua recuperação) enquanto o documento é convertido."""
+
+            def convert(self, source):
+                run_migration(start_migration('novo'), provider=RegisteredHashingEmbeddings('novo', size=16))
+                return converter.convert(source)
+
+        processor.doc_converter = ActivatingConverter()
+        document = processor.process_document(str(path))
+
+        self.assertEqual(active_embedding_model(), 'novo')
+        chunks = DocumentEmbedding.objects.filter(document=document)
+        self.assertTrue(chunks.exists())
+        self.assertEqual(set(chunks.values_list('model_name', flat=True)), {'novo'})
+        self.assertEqual({len(vector) for vector in chunks.values_list('vector', flat=True)}, {16})
+        self.assertEqual(searchable_embedding_models(), ['novo'])
@@ -0,0 +1,135 @@
+# file_manager/tests/test_file_handlers.py
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.test import SimpleTestCase, override_settings
+
+from file_manager.utils.file_handlers import (
+    FileOrganizer,
+    FileProcessor,
+    FileValidator,
+    PROCESS_UMASK,
+    TelecomDocumentHandler,
+    get_magic,
+    inspect_file,
+    place_file,
+)
+from file_manager.utils.keyword_matcher import KeywordMatcher
+
+
+class KeywordMatcherTestCase(SimpleTestCase):
+    def test_folding_plurals_and_word_boundaries(self):
+        text = "A LEI e as Resoluções sobre REDES; o leilão de Frequências e a outorga."
+        hits = TelecomDocumentHandler.match_categories(text)
+
+        self.assertEqual(
+            [(hit.keyword, text[hit.start:hit.end]) for hit in hits['regulatory']],
+            [('lei', 'LEI'), ('resolução', 'Resoluções')]
+        )
+        self.assertEqual([text[hit.start:hit.end] for hit in hits['infrastructure']], ['REDES'])
+        self.assertEqual(
+            TelecomDocumentHandler.classify_document(text),
+            ['regulatory', 'licensing', 'spectrum', 'infrastructure']
+        )
+        self.assertEqual(TelecomDocumentHandler.classify_document("O leilão decorreu em Bissau."), [])
+
+    def test_counts_match_positions(self):
+        matcher = KeywordMatcher({'tarifas': ['tarifa de interligação', 'preço'], 'vazia': []})
+        text = "Tarifa de\n Interligação e preços; tarifa de interligação." * 3
+
+        self.assertEqual(matcher.counts(text), {'tarifas': 9})
+        self.assertEqual(len(matcher.match(text)['tarifas']), 9)
+        self.assertEqual(matcher.match(text)['tarifas'][0].start, 0)
+
+
+class FileInspectionTestCase(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'lei.txt'
+        # Maior do que um bloco: o hash tem de cobrir o resto do arquivo
+        self.data = ("Lei n.º 5/2010 das Comunicações Electrónicas.\n" * 30000).encode('utf-8')
+        self.path.write_bytes(self.data)
+
+    def test_inspect_file_single_pass(self):
+        info = inspect_file(self.path)
+
+        self.assertEqual(info.size, len(self.data))
+        self.assertEqual(info.mime_type, 'text/plain')
+        self.assertEqual(info.sha256, hashlib.sha256(self.data).hexdigest())
+        self.assertIsNone(inspect_file(self.path, compute_hash=False).sha256)
+        self.assertEqual(FileValidator.validate_file(self.path, info=info), (True, None))
+        self.assertEqual(FileValidator.validate_file(self.path.with_name('outro.txt'))[0], False)
+
+    def test_magic_detector_is_per_thread(self):
+        detectors = []
+        thread = threading.Thread(target=lambda: detectors.append(get_magic()))
+        thread.start()
+        thread.join()
+
+        self.assertIs(get_magic(), get_magic())
+        self.assertIsNot(detectors[0], get_magic())
+
+
+class FileStorageTestCase(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+        self.source = self.root / 'Lei 5-2010.txt'
+        self.source.write_bytes(b'Lei n.\xc2\xba 5/2010\n' * 1000)
+        self.organizer = FileOrganizer(base_dir=self.root / 'documents')
+
+    def test_link_and_move_modes(self):
+        linked = self.organizer.organize_file(self.source, 'regulatory')
+        # Sem cópia de dados: hardlink (mesmo inode) ou reflink, e o original fica
+        self.assertTrue(self.source.exists())
+        self.assertEqual(linked.read_bytes(), self.source.read_bytes())
+        self.assertEqual(linked.parent.name, 'regulatory')
+
+        inode = self.source.stat().st_ino
+        moved = place_file(self.source, self.root / 'movido.txt', 'move')
+        self.assertEqual(moved, 'rename')
+        self.assertFalse(self.source.exists())
+        self.assertEqual((self.root / 'movido.txt').stat().st_ino, inode)
+
+        with self.assertRaises(FileExistsError):
+            place_file(linked, self.root / 'movido.txt', 'copy')
+
+    def test_store_upload_writes_final_path_directly(self):
+        upload = SimpleUploadedFile('Decreto 12.txt', b'Decreto n.\xc2\xba 12/2013\n' * 100)
+        result = FileProcessor(organizer=self.organizer).process_upload(upload, 'general')
+
+        stored = Path(result['new_path'])
+        self.assertEqual(stored.read_bytes(), b'Decreto n.\xc2\xba 12/2013\n' * 100)
+        self.assertEqual(result['mime_type'], 'text/plain')
+        # Nenhum temporário .part deixado no diretório
+        self.assertEqual(list(stored.parent.iterdir()), [stored])
+
+        invalid = SimpleUploadedFile('imagem.txt', b'\x89PNG\r\n\x1a\n' + b'\x00' * 64)
+        with self.assertRaises(ValueError):
+            FileProcessor(organizer=self.organizer).process_upload(invalid)
+        self.assertEqual(list(stored.parent.iterdir()), [stored])
+
+    def test_stored_uploads_get_the_configured_permissions(self):
+        content = b'Decreto n.\xc2\xba 12/2013\n' * 100
+
+        # Nomes distintos: o caminho organizado só tem o segundo como carimbo
+        def uploads(number):
+            yield SimpleUploadedFile(f'Decreto {number}.txt', content)
+            # Os temporários do Django (e do mkstemp) são criados com o modo 0600
+            temporary = TemporaryUploadedFile(f'Decreto {number + 1}.txt', 'text/plain', len(content), None)
+            temporary.write(content)
+            temporary.flush()
+            self.addCleanup(temporary.close)
+            yield temporary
+
+        for number, permissions, expected in ((12, 0o640, 0o640), (14, None, 0o644 & ~PROCESS_UMASK)):
+            with override_settings(FILE_UPLOAD_PERMISSIONS=permissions):
+                for upload in uploads(number):
+                    with self.subTest(permissions=permissions, upload=type(upload).__name__):
+                        stored = self.organizer.store_upload(upload, 'regulatory')
+                        self.assertEqual(stored.stat().st_mode & 0o777, expected)
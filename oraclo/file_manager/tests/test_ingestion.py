@@ -0,0 +1,205 @@
+# file_manager/tests/test_ingestion.py
+import io
+import tarfile
+import tempfile
+import zipfile
+from datetime import timedelta
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from file_manager.benchmarks.corpus import build_corpus
+from file_manager.benchmarks.fakes import (
+    FakeEmbeddings,
+    RegisteredHashingEmbeddings,
+    fake_llm,
+    offline_converter,
+)
+from file_manager.models import Document, DocumentEmbedding, IngestionJob
+from file_manager.services.document_processor import DocumentProcessor
+from file_manager.services.embeddings import reset_embedding_providers, searchable_embedding_models
+from file_manager.services.ingestion import requeue_stale_jobs, run_job
+from file_manager.services.reembedding import run_migration, start_migration
+from file_manager.services.vector_index import invalidate_vector_index
+
+
+class BulkIngestionTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        root = Path(directory.name)
+        settings_override = override_settings(
+            BLOB_STORE_DIR=root / 'blobs',
+            BULK_INGESTION={'WORKERS': 0, 'MAX_FILES': 10},
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.paths = build_corpus(root / 'corpus', num_documents=2)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='sync', password='x'))
+        self.processor = DocumentProcessor(
+            embeddings=FakeEmbeddings(size=8), llm=fake_llm(), doc_converter=offline_converter()
+        )
+
+    def _upload(self, *files):
+        return self.client.post(reverse('file_manager:ingestion'), {'files': list(files)}, format='multipart')
+
+    def test_archive_and_files_become_pollable_jobs(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as bundle:
+            for path in self.paths:
+                bundle.write(path, f'lote/{path.name}')
+            bundle.writestr('__MACOSX/._lixo.pdf', b'x')
+            bundle.writestr('lote/macro.exe', b'MZ')
+
+        response = self.client.post(reverse('file_manager:ingestion'), {'files': [
+            SimpleUploadedFile('lote.zip', archive.getvalue()),
+            # Mesmo conteúdo de uma entrada do zip: não é processado duas vezes
+            SimpleUploadedFile(self.paths[0].name, self.paths[0].read_bytes()),
+        ]}, format='multipart')
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(len(response.data['jobs']), 3)
+        self.assertEqual([item['filename'] for item in response.data['rejected']], ['lote.zip/lote/macro.exe'])
+
+        status_url = reverse('file_manager:ingestion_batch', args=[response.data['batch']])
+        self.assertEqual(self.client.get(status_url).data['counts']['QUEUED'], 3)
+
+        for job in response.data['jobs']:
+            run_job(job['id'], processor=self.processor)
+
+        batch = self.client.get(status_url).data
+        self.assertTrue(batch['done'])
+        self.assertEqual(batch['counts']['COMPLETED'], 2)
+        self.assertEqual(batch['counts']['DUPLICATE'], 1)
+        self.assertEqual(len({job['document_id'] for job in batch['jobs']}), 2)
+        # Um trabalho já concluído não volta a ser processado
+        self.assertEqual(run_job(response.data['jobs'][0]['id']).status, IngestionJob.JobStatus.COMPLETED)
+
+    def test_job_racing_another_upload_of_the_same_content_is_a_duplicate(self):
+        job_id = self._upload(SimpleUploadedFile(self.paths[0].name, self.paths[0].read_bytes())).data['jobs'][0]['id']
+
+        class RacingProcessor(DocumentProcessor):
+            def process_document(self, file_path, **kwargs):
+                # O mesmo conteúdo, enviado por outra via, é criado depois da verificação do trabalho
+                self.rival = Document.objects.create(
+                    title='Rival', file_path='/blobs/rival', file_hash=kwargs['blob'].sha256,
+                    status=Document.DocumentStatus.PROCESSING
+                )
+                return super().process_document(file_path, **kwargs)
+
+        processor = RacingProcessor(embeddings=FakeEmbeddings(size=8), llm=fake_llm(), doc_converter=offline_converter())
+        job = run_job(job_id, processor=processor)
+
+        self.assertEqual((job.status, job.document, job.error), (IngestionJob.JobStatus.DUPLICATE, processor.rival, ''))
+        self.assertEqual(Document.objects.count(), 1)
+
+    def test_tar_archive_entries_are_streamed_into_jobs(self):
+        archive = io.BytesIO()
+        with tarfile.open(fileobj=archive, mode='w:gz') as bundle:
+            for path in self.paths:
+                bundle.add(path, f'lote/{path.name}')
+            hidden = tarfile.TarInfo('lote/.DS_Store')
+            hidden.size = 1
+            bundle.addfile(hidden, io.BytesIO(b'x'))
+
+        response = self._upload(SimpleUploadedFile('lote.tar.gz', archive.getvalue()))
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(
+            sorted(job['filename'] for job in response.data['jobs']),
+            sorted(f'lote.tar.gz/lote/{path.name}' for path in self.paths)
+        )
+        self.assertEqual(response.data['rejected'], [])
+
+    def test_batch_over_max_files_is_rejected(self):
+        with override_settings(BULK_INGESTION={'WORKERS': 0, 'MAX_FILES': 1}):
+            response = self._upload(*[
+                SimpleUploadedFile(path.name, path.read_bytes()) for path in self.paths
+            ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('1', response.data['error'])
+        self.assertFalse(IngestionJob.objects.exists())
+
+    def test_requeue_only_touches_stale_jobs(self):
+        response = self._upload(*[SimpleUploadedFile(path.name, path.read_bytes()) for path in self.paths])
+        stale, live = IngestionJob.objects.filter(pk__in=[job['id'] for job in response.data['jobs']]).order_by('pk')
+        now = timezone.now()
+        IngestionJob.objects.filter(pk=stale.pk).update(
+            status=IngestionJob.JobStatus.PROCESSING, started_at=now - timedelta(hours=2)
+        )
+        IngestionJob.objects.filter(pk=live.pk).update(
+            status=IngestionJob.JobStatus.PROCESSING, started_at=now - timedelta(minutes=1)
+        )
+        # O documento que o processo interrompido deixou a meio
+        interrupted = Document.objects.create(
+            title='Interrompido', file_path='/blobs/x', file_hash=stale.blob.sha256,
+            blob=stale.blob, status=Document.DocumentStatus.PROCESSING
+        )
+
+        self.assertEqual(requeue_stale_jobs(timedelta(minutes=30)), 1)
+
+        stale.refresh_from_db()
+        live.refresh_from_db()
+        interrupted.refresh_from_db()
+        self.assertEqual(stale.status, IngestionJob.JobStatus.QUEUED)
+        self.assertEqual(live.status, IngestionJob.JobStatus.PROCESSING)
+        self.assertEqual(interrupted.status, Document.DocumentStatus.ERROR)
+
+        # Ao voltar a correr, o trabalho reaproveita o documento interrompido
+        job = run_job(stale.pk, processor=self.processor)
+        self.assertEqual(job.status, IngestionJob.JobStatus.COMPLETED)
+        self.assertEqual(job.document_id, interrupted.pk)
+        interrupted.refresh_from_db()
+        self.assertEqual(interrupted.status, Document.DocumentStatus.PROCESSED)
+
+    @override_settings(
+        EMBEDDING_MODEL='antigo',
+        EMBEDDING_PROVIDERS={
+            model: {'BACKEND': 'file_manager.benchmarks.fakes.RegisteredHashingEmbeddings', 'SIZE': size}
+            for model, size in (('antigo', 8), ('novo', 16))
+        },
+    )
+    def test_jobs_after_a_migration_is_activated_use_the_new_model(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        index_settings = override_settings(VECTOR_INDEX_DIR=directory.name)
+        index_settings.enable()
+        self.addCleanup(index_settings.disable)
+        reset_embedding_providers()
+        self.addCleanup(reset_embedding_providers)
+        invalidate_vector_index()
+
+        models_at_conversion = []
+        converter = offline_converter()
+
+        class RecordingConverter:
+            def convert(self, source):
+                models_at_conversion.append(processor.embedding_model)
+                return converter.convert(source)
+
+        # Como um worker que já processou trabalhos antes da troca de modelo
+        processor = DocumentProcessor(llm=fake_llm(), doc_converter=RecordingConverter())
+        first, second = (
+            self._upload(SimpleUploadedFile(path.name, path.read_bytes())).data['jobs'][0]['id']
+            for path in self.paths
+        )
+        run_job(first, processor=processor)
+
+        run_migration(start_migration('novo'), provider=RegisteredHashingEmbeddings('novo', size=16))
+        job = run_job(second, processor=processor)
+
+        self.assertEqual(job.status, IngestionJob.JobStatus.COMPLETED)
+        # O modelo é resolvido no início do trabalho, e não só antes da gravação
+        self.assertEqual(models_at_conversion, ['antigo', 'novo'])
+        chunks = DocumentEmbedding.objects.filter(document=job.document)
+        self.assertTrue(chunks.exists())
+        self.assertEqual(set(chunks.values_list('model_name', flat=True)), {'novo'})
+        self.assertEqual(searchable_embedding_models(), ['novo'])
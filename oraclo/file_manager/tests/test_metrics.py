@@ -0,0 +1,156 @@
+# file_manager/tests/test_metrics.py
+import tempfile
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from file_manager.utils.metrics import (
+    REQUESTS_TOTAL,
+    STAGE_DURATION,
+    STAGE_ERRORS,
+    StageCollector,
+    current_collector,
+    increment,
+    registry,
+    timed,
+)
+from file_manager.utils.profiling import list_profiles, profile_request
+
+
+class MetricsTestCase(TestCase):
+    def setUp(self):
+        registry.reset()
+        self.addCleanup(registry.reset)
+
+    def test_timed_records_histogram_and_errors(self):
+        with timed('conversion'):
+            pass
+        with self.assertRaises(RuntimeError):
+            with timed('conversion'):
+                raise RuntimeError('falha')
+
+        histogram = registry.histogram(STAGE_DURATION, stage='conversion')
+        self.assertEqual(histogram.count, 2)
+        self.assertEqual(registry.counter_value(STAGE_ERRORS, stage='conversion'), 1)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled_metrics_record_nothing(self):
+        with timed('conversion'):
+            pass
+        increment('oraclo_documents_processed_total', status='processed')
+        self.assertEqual(registry.render().strip(), '')
+
+    def test_prometheus_text_format(self):
+        registry.observe(STAGE_DURATION, 0.2, {'stage': 'embedding'})
+        registry.observe(STAGE_DURATION, 3.0, {'stage': 'embedding'})
+        increment('oraclo_documents_processed_total', status='processed')
+
+        text = registry.render()
+        self.assertIn('# TYPE oraclo_stage_duration_seconds histogram', text)
+        self.assertIn('oraclo_stage_duration_seconds_bucket{stage="embedding",le="0.25"} 1', text)
+        self.assertIn('oraclo_stage_duration_seconds_bucket{stage="embedding",le="5"} 2', text)
+        self.assertIn('oraclo_stage_duration_seconds_bucket{stage="embedding",le="+Inf"} 2', text)
+        self.assertIn('oraclo_stage_duration_seconds_count{stage="embedding"} 2', text)
+        self.assertIn('oraclo_documents_processed_total{status="processed"} 1', text)
+
+    @override_settings(METRICS_ALLOWED_IPS=['127.0.0.1'])
+    def test_metrics_endpoint(self):
+        self.client.get('/login/')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('oraclo_http_requests_total{method="GET",status="200",view="login"} 1', response.content.decode())
+        self.assertEqual(registry.counter_value(REQUESTS_TOTAL, view='metrics', method='GET', status=200), 1)
+
+        with override_settings(METRICS_TOKEN='segredo', METRICS_ALLOWED_IPS=[]):
+            self.assertEqual(self.client.get('/metrics').status_code, 401)
+            response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer segredo')
+            self.assertEqual(response.status_code, 200)
+
+        with override_settings(METRICS_ENABLED=False):
+            self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+    @override_settings(METRICS_TOKEN=None, METRICS_ALLOWED_IPS=[])
+    def test_metrics_endpoint_is_not_public_by_default(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+        staff = User.objects.create_user(username='operador', password='x', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+        self.client.logout()
+
+        with override_settings(METRICS_TOKEN='segredo', METRICS_ALLOWED_IPS=['10.0.0.5']):
+            self.assertEqual(self.client.get('/metrics').status_code, 401)
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer outro').status_code, 401)
+            self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.5').status_code, 200)
+
+
+class ProfilingTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.staff = User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        self.user = User.objects.create_user(username='utilizador', password='testpass123')
+        self.settings_override = override_settings(PROFILING={
+            'ENABLED': True, 'SAMPLE_RATE': 0.0, 'DIRECTORY': Path(self.directory.name), 'MAX_PROFILES': 2,
+        })
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def test_header_profiles_staff_requests(self):
+        self.client.login(username='staff', password='testpass123')
+        response = self.client.get(reverse('file_manager:document_upload'), HTTP_X_ORACLO_PROFILE='1')
+
+        self.assertEqual(response.status_code, 200)
+        profile_id = response['X-Oraclo-Profile-Id']
+        self.assertTrue((Path(self.directory.name) / f'{profile_id}.prof').exists())
+        summary = list_profiles(self.directory.name)[0]
+        self.assertEqual(summary['id'], profile_id)
+        self.assertEqual(summary['view'], 'DocumentUploadView')
+        self.assertEqual(summary['user'], 'staff')
+        self.assertTrue(summary['top_functions'])
+
+    def test_profile_counts_queries_and_stages(self):
+        def handler():
+            with timed('db_write'):
+                User.objects.count()
+                User.objects.exists()
+            return HttpResponse('ok')
+
+        request = RequestFactory().get('/api/search/')
+        request.user = self.staff
+        response = profile_request(request, 'DocumentSearchAPIView', handler)
+
+        summary = list_profiles(self.directory.name)[0]
+        self.assertEqual(summary['id'], response['X-Oraclo-Profile-Id'])
+        self.assertEqual(summary['sql']['count'], 2)
+        self.assertEqual(summary['stages']['db_write']['count'], 1)
+
+    def test_header_is_ignored_for_non_staff(self):
+        self.client.login(username='utilizador', password='testpass123')
+        response = self.client.get(reverse('file_manager:document_upload'), HTTP_X_ORACLO_PROFILE='1')
+        self.assertNotIn('X-Oraclo-Profile-Id', response)
+        self.assertEqual(list_profiles(self.directory.name), [])
+
+    def test_sampling_and_retention(self):
+        self.client.login(username='utilizador', password='testpass123')
+        with self.settings(PROFILING={'ENABLED': True, 'SAMPLE_RATE': 1.0,
+                                      'DIRECTORY': Path(self.directory.name), 'MAX_PROFILES': 2}):
+            for _ in range(3):
+                self.client.get(reverse('file_manager:document_upload'))
+        self.assertEqual(len(list_profiles(self.directory.name)), 2)
+        self.assertEqual(len(list(Path(self.directory.name).glob('*.prof'))), 2)
+
+    def test_stage_collector_sees_timers_with_metrics_disabled(self):
+        collector = StageCollector()
+        token = current_collector.set(collector)
+        try:
+            with self.settings(METRICS_ENABLED=False):
+                with timed('hash'):
+                    pass
+        finally:
+            current_collector.reset(token)
+        self.assertEqual(collector.stages['hash']['count'], 1)
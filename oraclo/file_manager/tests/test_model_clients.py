@@ -0,0 +1,157 @@
+# file_manager/tests/test_model_clients.py
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+from django.test import TestCase, override_settings
+
+from file_manager.services.model_clients import (
+    AdaptiveConcurrency,
+    RateLimiter,
+    ResilientTransport,
+    estimate_request_tokens,
+    get_chat_model,
+    get_openai_embeddings,
+    reset_model_clients,
+)
+
+
+class MockOpenAIServer:
+    """Servidor local que imita os endpoints de embeddings e chat da OpenAI."""
+
+    def __init__(self, throttle_first: int = 0):
+        self.throttle_first = throttle_first
+        self.requests = 0
+        self.connections = set()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                server.requests += 1
+                server.connections.add(self.client_address)
+                if server.requests <= server.throttle_first:
+                    self._send(429, {'error': {'message': 'Rate limit', 'type': 'rate_limit'}},
+                               {'retry-after-ms': '1'})
+                    return
+                if self.path.endswith('/embeddings'):
+                    inputs = body['input'] if isinstance(body['input'], list) else [body['input']]
+                    data = [
+                        {'object': 'embedding', 'index': i, 'embedding': [float(len(str(text))), 1.0, 0.0]}
+                        for i, text in enumerate(inputs)
+                    ]
+                    payload = {'object': 'list', 'data': data, 'model': body['model'],
+                               'usage': {'prompt_tokens': 1, 'total_tokens': 1}}
+                else:
+                    payload = {
+                        'id': 'chatcmpl-1', 'object': 'chat.completion', 'created': 0, 'model': body['model'],
+                        'choices': [{'index': 0, 'finish_reason': 'stop',
+                                     'message': {'role': 'assistant', 'content': 'Resposta simulada'}}],
+                        'usage': {'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2},
+                    }
+                self._send(200, payload, {'x-ratelimit-remaining-requests': '100'})
+
+            def _send(self, status, payload, headers):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}/v1'
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class RateLimitTestCase(TestCase):
+    def test_token_bucket_waits_for_refill(self):
+        now = [0.0]
+        sleeps = []
+        limiter = RateLimiter(2, 600, clock=lambda: now[0], sleep=sleeps.append)
+
+        self.assertEqual(limiter.acquire(10), 0)
+        self.assertEqual(limiter.acquire(10), 0)
+        # Terceiro pedido no mesmo minuto: espera pela reposição de 1 pedido (30s)
+        self.assertAlmostEqual(limiter.acquire(10), 30.0)
+        self.assertEqual(sleeps, [30.0])
+
+        # Só TPM: um pedido maior que a capacidade esvazia o balde e o seguinte espera
+        limiter = RateLimiter(None, 600, clock=lambda: now[0], sleep=sleeps.append)
+        self.assertAlmostEqual(limiter.acquire(700), 0.0)
+        self.assertAlmostEqual(limiter.acquire(60), 6.0)
+
+    def test_adaptive_concurrency(self):
+        concurrency = AdaptiveConcurrency(initial=8, minimum=1, maximum=10, increase_after=2)
+        concurrency.on_throttle()
+        self.assertEqual(concurrency.limit, 4)
+        concurrency.on_success()
+        concurrency.on_success()
+        self.assertEqual(concurrency.limit, 5)
+        for _ in range(5):
+            concurrency.on_throttle()
+        self.assertEqual(concurrency.limit, 1)
+
+    def test_estimate_request_tokens(self):
+        request = httpx.Request('POST', 'http://x/v1/chat/completions', json={
+            'messages': [{'role': 'user', 'content': 'olá ' * 40}], 'max_tokens': 100
+        })
+        self.assertGreater(estimate_request_tokens(request), 100)
+        request = httpx.Request('POST', 'http://x/v1/embeddings', json={'input': [[1, 2, 3], [4, 5]]})
+        self.assertEqual(estimate_request_tokens(request), 5)
+
+
+@override_settings(OPENAI_API_KEY='sk-teste')
+class ModelClientTestCase(TestCase):
+    def setUp(self):
+        reset_model_clients()
+        self.addCleanup(reset_model_clients)
+
+    def test_retries_throttled_requests_and_reuses_connections(self):
+        with MockOpenAIServer(throttle_first=2) as server:
+            with self.settings(OPENAI_CLIENT={'BASE_URL': server.url, 'BACKOFF_BASE': 0.001}):
+                embeddings = get_openai_embeddings('text-embedding-ada-002', check_embedding_ctx_length=False)
+                self.assertIs(
+                    embeddings,
+                    get_openai_embeddings('text-embedding-ada-002', check_embedding_ctx_length=False)
+                )
+                vectors = embeddings.embed_documents(['um', 'dois'])
+                for _ in range(3):
+                    embeddings.embed_query('três')
+                answer = get_chat_model().invoke('Olá')
+
+        self.assertEqual(vectors, [[2.0, 1.0, 0.0], [4.0, 1.0, 0.0]])
+        self.assertEqual(answer.content, 'Resposta simulada')
+        # 2 respostas 429 + 5 pedidos bem-sucedidos, todos pela mesma ligação keep-alive
+        self.assertEqual(server.requests, 7)
+        self.assertEqual(len(server.connections), 1)
+
+    def test_gives_up_after_max_retries(self):
+        with MockOpenAIServer(throttle_first=100) as server:
+            concurrency = AdaptiveConcurrency(initial=4, minimum=1, maximum=8)
+            transport = ResilientTransport(
+                httpx.HTTPTransport(), RateLimiter(None, None), concurrency,
+                max_retries=2, sleep=lambda seconds: None
+            )
+            with httpx.Client(transport=transport) as client:
+                response = client.post(f'{server.url}/embeddings', json={'input': 'a', 'model': 'm'})
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(server.requests, 3)
+        self.assertEqual(concurrency.limit, 1)
@@ -0,0 +1,103 @@
+# file_manager/tests/test_query_counts.py
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from file_manager.models import Document, DocumentCategory, DocumentEmbedding, EmbeddingSummary, Regulation
+
+
+class QueryCountTestCase(TestCase):
+    """
+    O número de consultas de cada página é fixo: não cresce com o número de
+    documentos listados nem com os dados associados a cada documento.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='leitor', password='x')
+        self.client.force_login(self.user)
+        self.categories = [DocumentCategory.objects.create(name=f'Categoria {i}') for i in range(5)]
+
+    def _document(self, related: int) -> Document:
+        document = Document.objects.create(
+            title='Resolução', file_path='/nao/existe.pdf', file_size=1024, mime_type='application/pdf',
+            status=Document.DocumentStatus.PROCESSED
+        )
+        document.categories.set(self.categories[:related])
+        Regulation.objects.bulk_create([
+            Regulation(title=f'Regulamento {i}', regulation_type='LAW', document=document) for i in range(related)
+        ])
+        DocumentEmbedding.objects.bulk_create([
+            DocumentEmbedding(document=document, vector=[0.1] * 8, model_name='fake', chunk_index=i)
+            for i in range(related * 10)
+        ])
+        EmbeddingSummary.objects.create(document=document, model_name='fake', chunk_count=related * 10, dimensions=8)
+        return document
+
+    def _count(self, url: str) -> int:
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_document_list_is_independent_of_page_size_and_relations(self):
+        self._document(related=1)
+        url = reverse('file_manager:document_list')
+        baseline = self._count(url)
+
+        for _ in range(12):
+            self._document(related=5)
+        self.assertEqual(self._count(url), baseline)
+        self.assertEqual(self._count(f'{url}?category={self.categories[0].pk}&status=PROCESSED'), baseline)
+        # Sessão e utilizador, contagem, página e categorias da página
+        self.assertEqual(baseline, 5)
+
+    def test_document_detail_is_independent_of_related_data(self):
+        small = self._document(related=1)
+        large = self._document(related=5)
+
+        baseline = self._count(reverse('file_manager:document_detail', args=[small.pk]))
+        self.assertEqual(self._count(reverse('file_manager:document_detail', args=[large.pk])), baseline)
+        # Sessão e utilizador, documento, categorias, regulamentos e resumo dos embeddings
+        self.assertEqual(baseline, 6)
+
+    def test_category_pages_are_independent_of_tree_size(self):
+        root = self.categories[0]
+        child = DocumentCategory.objects.create(name='Espectro', parent=root)
+        self._document(related=1)
+        list_url = reverse('file_manager:category_list')
+        detail_url = reverse('file_manager:category_detail', args=[root.pk])
+        list_queries, detail_queries = self._count(list_url), self._count(detail_url)
+
+        parent = child
+        for depth in range(6):
+            parent = DocumentCategory.objects.create(name=f'Nível {depth}', parent=parent)
+            self._document(related=0).categories.add(parent)
+
+        self.assertEqual(self._count(list_url), list_queries)
+        response = self.client.get(detail_url)
+        self.assertEqual(len(response.context['documents']), 7)
+        self.assertEqual(self._count(detail_url), detail_queries)
+
+
+class QueryPlanTestCase(TestCase):
+    """As listagens usam índices mesmo com muitos documentos (ver o comando audit_queries)."""
+
+    def test_list_pages_do_not_scan_tables(self):
+        from file_manager.services.query_audit import audit_views, default_requests, seed_dataset
+
+        seed_dataset(documents=2000, categories=20)
+        user = User.objects.create_user(username='auditor', password='x')
+        audits = audit_views(user, [
+            request for request in default_requests()
+            if request.name.startswith(('document_list', 'regulation_list', 'category_detail'))
+        ])
+
+        self.assertGreater(len(audits), 5)
+        for audit in audits:
+            with self.subTest(page=audit.request.name):
+                self.assertEqual(
+                    [plan.full_scans for plan in audit.flagged], [],
+                    '\n'.join(line for plan in audit.flagged for line in plan.plan)
+                )
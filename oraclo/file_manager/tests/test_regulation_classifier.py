@@ -0,0 +1,95 @@
+# file_manager/tests/test_regulation_classifier.py
+import json
+from datetime import date
+
+from django.test import TestCase
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from file_manager.models import Document, Regulation
+from file_manager.services.regulation_classifier import RegulationClassifier, classify_corpus
+from file_manager.utils.regulation_rules import match_regulation
+
+
+LAW = """# Lei n.º 5/2010, de 12 de março de 2010
+Lei das Comunicações Electrónicas
+
+Artigo 1.º A presente lei entra em vigor em 1 de abril de 2010."""
+
+ORDER = """ARN - Autoridade Reguladora Nacional
+Fixa as tarifas de interligação entre operadores, nos termos da Lei n.º 5/2010.
+Produz efeitos a partir de 2019-01-01."""
+
+REPORT = "Relatório anual do mercado de telecomunicações. Assinantes móveis: 1,4 milhões."
+
+
+class RegulationRulesTestCase(TestCase):
+    def test_header_reference_is_conclusive(self):
+        match = match_regulation(LAW, 'lei_5_2010.pdf')
+
+        self.assertEqual(match.regulation_type, 'LAW')
+        self.assertEqual(match.number, '5/2010')
+        self.assertEqual(match.date, date(2010, 3, 12))
+        self.assertEqual(match.effective_date, date(2010, 4, 1))
+        self.assertEqual(match.subject, 'Lei das Comunicações Electrónicas')
+        self.assertEqual(match.confidence, 1.0)
+
+    def test_citation_is_not_conclusive(self):
+        match = match_regulation(ORDER)
+
+        self.assertTrue(match.is_regulation)
+        self.assertLess(match.confidence, 0.8)
+        self.assertFalse(match_regulation(REPORT).is_regulation)
+
+
+class RegulationClassifierTestCase(TestCase):
+    def setUp(self):
+        self.documents = {
+            title: Document.objects.create(
+                title=title, file_path=f'/test/{title}.pdf', content=content,
+                status=Document.DocumentStatus.PROCESSED,
+            )
+            for title, content in (('lei_5_2010', LAW), ('deliberacao', ORDER), ('relatorio', REPORT))
+        }
+
+    def _llm(self):
+        # Uma só resposta: os dois documentos incertos vão no mesmo prompt
+        answer = [
+            {'id': self.documents['deliberacao'].pk, 'is_regulation': True,
+             'title': 'Deliberação sobre tarifas de interligação', 'type': 'Regulamento',
+             'number': None, 'effective_date': '2019-01-01'},
+            {'id': self.documents['relatorio'].pk, 'is_regulation': False},
+        ]
+        return FakeListChatModel(responses=[f"```json\n{json.dumps(answer)}\n```", "sem resposta"])
+
+    def test_rules_fast_path_and_batched_llm(self):
+        llm = self._llm()
+        report = classify_corpus(RegulationClassifier(llm=llm, llm_batch_size=5))
+
+        self.assertEqual(report['documents'], 3)
+        self.assertEqual(report['rules'], 1)
+        self.assertEqual(report['llm'], 2)
+        self.assertEqual(report['created'], 2)
+        self.assertEqual(llm.i, 1)
+
+        law = Regulation.objects.get(document=self.documents['lei_5_2010'])
+        self.assertEqual(law.classification_source, Regulation.ClassificationSource.RULES)
+        self.assertEqual((law.regulation_type, law.number), ('LAW', '5/2010'))
+        order = Regulation.objects.get(document=self.documents['deliberacao'])
+        self.assertEqual(order.classification_source, Regulation.ClassificationSource.LLM)
+        self.assertEqual(order.regulation_type, 'NORMATIVE')
+        self.assertEqual(order.effective_date, date(2019, 1, 1))
+        self.assertFalse(Regulation.objects.filter(document=self.documents['relatorio']).exists())
+
+        # Já classificados (incluindo o que não é regulamento): nada a fazer
+        self.assertEqual(classify_corpus(RegulationClassifier(llm=self._llm()))['documents'], 0)
+
+    def test_reclassify_keeps_manual_regulations(self):
+        Regulation.objects.create(
+            document=self.documents['lei_5_2010'], title='Lei das Comunicações', regulation_type='LAW',
+        )
+        documents = Document.objects.filter(status=Document.DocumentStatus.PROCESSED).order_by('pk')
+        classify_corpus(RegulationClassifier(use_llm=False), documents=documents)
+
+        regulation = Regulation.objects.get(document=self.documents['lei_5_2010'])
+        self.assertEqual(regulation.title, 'Lei das Comunicações')
+        self.assertEqual(regulation.classification_source, Regulation.ClassificationSource.MANUAL)
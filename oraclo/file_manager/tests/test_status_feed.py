@@ -0,0 +1,108 @@
+# file_manager/tests/test_status_feed.py
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from file_manager.benchmarks.corpus import build_corpus
+from file_manager.benchmarks.fakes import FakeEmbeddings, fake_llm, offline_converter
+from file_manager.models import Document, DocumentStatusEvent
+from file_manager.services.document_processor import DocumentProcessor
+from file_manager.services.status_feed import document_statuses, latest_cursor, record_event, sse_stream
+
+
+@override_settings(STATUS_FEED={'POLL_INTERVAL': 0.01, 'LONG_POLL_TIMEOUT': 0.05, 'SSE_MAX_SECONDS': 0})
+class StatusFeedTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        processor = DocumentProcessor(embeddings=FakeEmbeddings(size=8), llm=fake_llm(), doc_converter=offline_converter())
+        self.documents = [
+            processor.process_document(str(path))
+            for path in build_corpus(Path(directory.name), num_documents=2)
+        ]
+        self.user = User.objects.create_user(username='painel', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_statuses_of_many_documents_in_one_query(self):
+        ids = [document.pk for document in self.documents]
+        with self.assertNumQueries(1):
+            statuses = document_statuses(ids + [999])
+        self.assertEqual({pk: row['status'] for pk, row in statuses.items()}, dict.fromkeys(ids, 'PROCESSED'))
+
+        response = self.client.get(reverse('file_manager:document_status'), {'ids': f'{ids[0]},999'})
+        self.assertEqual(response.data['missing'], [999])
+
+    def test_long_poll_follows_stages_from_cursor(self):
+        url = reverse('file_manager:document_events')
+        first = self.documents[0]
+        events = self.client.get(url, {'cursor': 0, 'ids': first.pk}).data['events']
+
+        self.assertEqual(
+            [event['stage'] for event in events],
+            ['received', 'conversion', 'splitting', 'embedding', 'processed']
+        )
+        self.assertEqual(events[0]['status'], Document.DocumentStatus.PROCESSING)
+        self.assertEqual((events[-1]['status'], events[-1]['progress']), (Document.DocumentStatus.PROCESSED, 1.0))
+
+        # Nada de novo: a espera termina no timeout, com o mesmo cursor
+        cursor = self.client.get(url, {'cursor': 0}).data['cursor']
+        idle = self.client.get(url, {'cursor': cursor}).data
+        self.assertEqual((idle['events'], idle['cursor']), ([], cursor))
+
+    def test_server_sent_events_resume_from_last_event_id(self):
+        self.client.force_login(self.user)
+        seen = DocumentStatusEvent.objects.order_by('pk').values_list('pk', flat=True)[2]
+        response = self.client.get(reverse('file_manager:document_event_stream'), HTTP_LAST_EVENT_ID=str(seen))
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join(response.streaming_content).decode()
+        ids = [int(line[4:]) for line in body.splitlines() if line.startswith('id: ')]
+        self.assertEqual(ids, list(DocumentStatusEvent.objects.filter(pk__gt=seen).values_list('pk', flat=True)))
+        self.assertIn('event: status', body)
+
+    def test_event_committed_out_of_order_is_not_skipped(self):
+        url = reverse('file_manager:document_events')
+        document = self.documents[0]
+        cursor = latest_cursor()
+        # A transação que recebeu `cursor + 1` ainda não fez commit quando
+        # outra, com o id seguinte, já o fez
+        DocumentStatusEvent.objects.create(pk=cursor + 2, document=document, status=document.status, stage='later')
+
+        first = self.client.get(url, {'cursor': cursor}).data
+        self.assertEqual([event['stage'] for event in first['events']], ['later'])
+        self.assertEqual((first['cursor'], first['after']), (cursor, cursor + 2))
+        self.assertEqual(latest_cursor(), cursor)
+
+        # Sem novidades, o pedido seguinte espera em vez de repetir logo o evento
+        idle = self.client.get(url, {'cursor': first['cursor'], 'after': first['after']}).data
+        self.assertEqual((idle['cursor'], idle['after']), (cursor, cursor + 2))
+
+        DocumentStatusEvent.objects.create(pk=cursor + 1, document=document, status=document.status, stage='earlier')
+        late = self.client.get(url, {'cursor': first['cursor'], 'after': first['after']}).data
+        self.assertEqual([event['stage'] for event in late['events']], ['earlier', 'later'])
+        self.assertEqual(late['cursor'], cursor + 2)
+
+        # O SSE envia cada evento uma só vez, com o cursor seguro no id
+        stream = sse_stream(cursor)
+        next(stream)
+        self.assertIn(f'id: {cursor + 1}\n', next(stream))
+        self.assertIn(f'id: {cursor + 2}\n', next(stream))
+
+    def test_missing_id_stops_holding_the_cursor_after_the_lag(self):
+        document = self.documents[0]
+        cursor = latest_cursor()
+        DocumentStatusEvent.objects.create(pk=cursor + 2, document=document, status=document.status)
+        self.assertEqual(latest_cursor(), cursor)
+
+        # Passado STATUS_FEED['LAG_SECONDS'], o id em falta é de uma transação desfeita
+        DocumentStatusEvent.objects.filter(pk=cursor + 2).update(created_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(latest_cursor(), cursor + 2)
+        self.assertEqual(record_event(document).pk, cursor + 3)
+        self.assertEqual(latest_cursor(), cursor + 3)
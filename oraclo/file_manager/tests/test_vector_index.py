@@ -0,0 +1,459 @@
+# file_manager/tests/test_vector_index.py
+import tempfile
+import unittest
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from file_manager.benchmarks.retrieval import (
+    compare_retrieval_reports,
+    load_labelled_set,
+    run_retrieval_benchmark,
+)
+from file_manager.benchmarks.corpus import build_corpus
+from file_manager.benchmarks.fakes import FakeEmbeddings, fake_llm, offline_converter
+from file_manager.models import Document, DocumentCategory, DocumentEmbedding, Regulation
+from file_manager.services import ann
+from file_manager.services.index_versions import VERSIONS_DIR, current_version
+from file_manager.services.document_processor import DocumentProcessor
+from file_manager.services.sharded_index import ShardedVectorIndex, build_sharded_index
+from file_manager.services.vector_index import (
+    RetrievalFilters,
+    TextStore,
+    VectorIndex,
+    build_vector_index,
+    get_vector_index,
+    invalidate_vector_index,
+)
+
+MODEL = 'test-model'
+
+
+class VectorIndexTestCase(TestCase):
+    def setUp(self):
+        invalidate_vector_index()
+        self.telecom = DocumentCategory.objects.create(name='Telecom')
+        self.spectrum = DocumentCategory.objects.create(name='Espectro', parent=self.telecom)
+        self.other = DocumentCategory.objects.create(name='Outros')
+
+        self.spectrum_doc = self._create_document('Plano de Frequências', 'PDF', [1.0, 0.0, 0.0])
+        self.spectrum_doc.categories.add(self.spectrum)
+        Regulation.objects.create(
+            title='Resolução de Espectro',
+            regulation_type='RESOLUTION',
+            status='ACTIVE',
+            document=self.spectrum_doc
+        )
+
+        self.law_doc = self._create_document('Lei das TIC', 'DOCX', [0.9, 0.1, 0.0])
+        self.law_doc.categories.add(self.other)
+        Regulation.objects.create(
+            title='Lei Revogada',
+            regulation_type='LAW',
+            status='REVOKED',
+            document=self.law_doc
+        )
+
+        self.old_doc = self._create_document('Relatório Antigo', 'PDF', [0.0, 1.0, 0.0])
+        Document.objects.filter(pk=self.old_doc.pk).update(
+            created_at=timezone.now() - timedelta(days=400)
+        )
+
+    def _create_document(self, title, document_type, vector):
+        document = Document.objects.create(
+            title=title,
+            file_path=f'/test/{title}.pdf',
+            document_type=document_type,
+            status=Document.DocumentStatus.PROCESSED
+        )
+        DocumentEmbedding.objects.create(
+            document=document,
+            vector=vector,
+            model_name=MODEL,
+            chunk_index=0,
+            content=f'Texto de {title}'
+        )
+        return document
+
+    def test_unfiltered_search_ranks_by_similarity(self):
+        index = VectorIndex.build(MODEL)
+        hits = index.search([1.0, 0.0, 0.0], k=3)
+        self.assertEqual(len(index), 3)
+        self.assertEqual(hits[0].document_id, self.spectrum_doc.pk)
+        self.assertEqual(hits[0].title, 'Plano de Frequências')
+        self.assertEqual(hits[-1].document_id, self.old_doc.pk)
+
+    def test_category_filter_includes_descendants(self):
+        index = VectorIndex.build(MODEL)
+        filters = RetrievalFilters.from_request_data({'filters': {'categories': [self.telecom.pk]}})
+        hits = index.search([0.9, 0.1, 0.0], k=5, filters=filters)
+        self.assertEqual([hit.document_id for hit in hits], [self.spectrum_doc.pk])
+
+    def test_regulation_and_type_filters_are_combined(self):
+        index = VectorIndex.build(MODEL)
+        filters = RetrievalFilters.from_request_data({
+            'regulation_statuses': 'active,revoked',
+            'document_types': ['DOCX'],
+        })
+        hits = index.search([1.0, 0.0, 0.0], k=5, filters=filters)
+        self.assertEqual([hit.document_id for hit in hits], [self.law_doc.pk])
+
+    def test_date_filter_excludes_older_documents(self):
+        index = VectorIndex.build(MODEL)
+        filters = RetrievalFilters(date_from=date.today() - timedelta(days=30))
+        hits = index.search([0.0, 1.0, 0.0], k=5, filters=filters)
+        self.assertNotIn(self.old_doc.pk, [hit.document_id for hit in hits])
+        self.assertEqual(len(hits), 2)
+
+    def test_filter_without_matches_returns_nothing(self):
+        index = VectorIndex.build(MODEL)
+        filters = RetrievalFilters(regulation_types={'DECREE'})
+        self.assertEqual(index.search([1.0, 0.0, 0.0], filters=filters), [])
+        self.assertEqual(
+            index.max_marginal_relevance_search([1.0, 0.0, 0.0], filters=filters), []
+        )
+
+    def test_invalid_filters_raise_value_error(self):
+        with self.assertRaises(ValueError):
+            RetrievalFilters.from_request_data({'date_from': '31/12/2024'})
+        with self.assertRaises(ValueError):
+            RetrievalFilters.from_request_data({'categories': 'abc'})
+
+    def test_cached_index_is_rebuilt_when_corpus_changes(self):
+        index = get_vector_index(MODEL)
+        self.assertIs(get_vector_index(MODEL), index)
+        self._create_document('Novo Documento', 'TXT', [0.0, 0.0, 1.0])
+        rebuilt = get_vector_index(MODEL)
+        self.assertIsNot(rebuilt, index)
+        self.assertEqual(len(rebuilt), 4)
+
+
+@unittest.skipIf(ann.faiss is None, 'faiss-cpu não instalado')
+class AnnIndexTestCase(TestCase):
+    def setUp(self):
+        invalidate_vector_index()
+        rng = np.random.default_rng(7)
+        self.vectors = rng.normal(size=(2000, 16)).astype(np.float32)
+        self.vectors /= np.linalg.norm(self.vectors, axis=1, keepdims=True)
+
+    def test_choose_index_type_by_corpus_size(self):
+        self.assertEqual(ann.choose_index_type(1_000), ann.INDEX_FLAT)
+        self.assertEqual(ann.choose_index_type(200_000), ann.INDEX_HNSW)
+        self.assertEqual(ann.choose_index_type(5_000_000), ann.INDEX_IVFPQ)
+
+    def test_filtered_ann_search_respects_bitmap(self):
+        for index_type in (ann.INDEX_HNSW, ann.INDEX_IVFPQ):
+            index = ann.AnnIndex.build(self.vectors, index_type, ann.AnnParams(nprobe=64))
+            mask = np.zeros(len(self.vectors), dtype=bool)
+            mask[::10] = True
+            rows, scores = index.search(self.vectors[0], 5, mask)
+            self.assertTrue(len(rows) > 0)
+            self.assertTrue(mask[rows].all())
+            self.assertEqual(rows[0], 0)
+
+    def test_benchmark_reports_recall_against_exact_search(self):
+        results = ann.benchmark_index_types(
+            self.vectors, [ann.INDEX_HNSW], k=5, num_queries=20, ef_search_values=[128]
+        )
+        self.assertEqual(results[0]['index_type'], ann.INDEX_FLAT)
+        self.assertGreater(results[1]['recall'], 0.9)
+
+    def test_persisted_index_round_trip(self):
+        document = Document.objects.create(title='Doc', file_path='/test/doc.pdf')
+        DocumentEmbedding.objects.bulk_create([
+            DocumentEmbedding(
+                document=document, vector=vector.tolist(), model_name=MODEL,
+                chunk_index=i, content=f'fragmento {i}'
+            ) for i, vector in enumerate(self.vectors[:500])
+        ])
+        with tempfile.TemporaryDirectory() as tmp, override_settings(VECTOR_INDEX_DIR=tmp):
+            built = build_vector_index(MODEL, ann.INDEX_HNSW, ann.AnnParams(exact_threshold=0))
+            loaded = get_vector_index(MODEL)
+            self.assertEqual(loaded.index_type, ann.INDEX_HNSW)
+            self.assertEqual(len(loaded), len(built))
+            hits = loaded.search(self.vectors[3].tolist(), k=3)
+            self.assertEqual(hits[0].text, 'fragmento 3')
+
+    @unittest.skipUnless(Path('/proc/self/maps').exists(), 'requer /proc/self/maps (Linux)')
+    def test_load_maps_the_vector_storage_of_each_index_type(self):
+        document = Document.objects.create(title='Doc', file_path='/test/doc.pdf')
+        DocumentEmbedding.objects.bulk_create([
+            DocumentEmbedding(
+                document=document, vector=vector.tolist(), model_name=MODEL,
+                chunk_index=i, content=f'fragmento {i}'
+            ) for i, vector in enumerate(self.vectors[:500])
+        ])
+
+        def mapped(path):
+            return str(path) in Path('/proc/self/maps').read_text()
+
+        for index_type, data_file in (
+            (ann.INDEX_FLAT, 'vectors.npy'),
+            (ann.INDEX_HNSW, 'ann.faiss'),
+            (ann.INDEX_IVFPQ, 'ann.faiss'),
+        ):
+            with self.subTest(index_type=index_type), tempfile.TemporaryDirectory() as tmp:
+                built = VectorIndex.build(MODEL)
+                built.build_ann(index_type)
+                built.save(Path(tmp))
+                loaded = VectorIndex.load(Path(tmp), mmap=True)
+                self.assertEqual(loaded.index_type, index_type)
+                self.assertTrue(mapped(Path(tmp) / data_file))
+                self.assertEqual(loaded.search(self.vectors[3].tolist(), k=1)[0].text, 'fragmento 3')
+                del loaded
+
+    def test_ivfpq_on_a_small_corpus_falls_back_to_exact_search(self):
+        document = Document.objects.create(title='Doc', file_path='/test/doc.pdf')
+        DocumentEmbedding.objects.bulk_create([
+            DocumentEmbedding(
+                document=document, vector=vector.tolist(), model_name=MODEL,
+                chunk_index=i, content=f'fragmento {i}'
+            ) for i, vector in enumerate(self.vectors[:100])
+        ])
+        with self.assertRaises(ValueError):
+            ann.AnnIndex.build(self.vectors[:100], ann.INDEX_IVFPQ)
+
+        with tempfile.TemporaryDirectory() as tmp, override_settings(VECTOR_INDEX_DIR=tmp):
+            built = build_vector_index(MODEL, ann.INDEX_IVFPQ)
+            self.assertEqual(built.index_type, ann.INDEX_FLAT)
+            hits = get_vector_index(MODEL).search(self.vectors[3].tolist(), k=1)
+            self.assertEqual(hits[0].text, 'fragmento 3')
+
+
+class ShardedVectorIndexTestCase(TestCase):
+    def setUp(self):
+        invalidate_vector_index()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = DocumentCategory.objects.create(name='Regulação')
+        self.child = DocumentCategory.objects.create(name='Licenças', parent=self.root)
+        self.other = DocumentCategory.objects.create(name='Técnico')
+
+        rng = np.random.default_rng(3)
+        self.documents = []
+        for position in range(6):
+            document = Document.objects.create(title=f'Doc {position}', file_path=f'/test/{position}.pdf')
+            year = 2022 + position % 2
+            Document.objects.filter(pk=document.pk).update(
+                created_at=timezone.now().replace(year=year, month=6, day=1)
+            )
+            document.categories.add(self.child if position % 3 else self.other)
+            DocumentEmbedding.objects.bulk_create([
+                DocumentEmbedding(
+                    document=document, vector=rng.normal(size=8).tolist(), model_name=MODEL,
+                    chunk_index=i, content=f'Doc {position} / {i}'
+                ) for i in range(4)
+            ])
+            self.documents.append(document)
+        self.query = rng.normal(size=8).tolist()
+
+    def test_sharded_search_matches_single_index(self):
+        expected = [hit.chunk_id for hit in VectorIndex.build(MODEL).search(self.query, k=6)]
+        for shard_by in ('year', 'category'):
+            index = build_sharded_index(self.tmp.name + shard_by, MODEL, shard_by, ann.INDEX_FLAT)
+            self.assertEqual(len(index), 24)
+            self.assertEqual([hit.chunk_id for hit in index.search(self.query, k=6)], expected)
+            self.assertEqual(len(index.max_marginal_relevance_search(self.query, k=3)), 3)
+
+    def test_mmr_leaves_the_query_vector_untouched(self):
+        index = build_sharded_index(self.tmp.name, MODEL, 'year', ann.INDEX_FLAT)
+        query = np.asarray(self.query, dtype=np.float32)
+        original = query.copy()
+        index.max_marginal_relevance_search(query, k=3)
+        np.testing.assert_array_equal(query, original)
+
+    def test_filters_prune_shards(self):
+        by_year = build_sharded_index(self.tmp.name, MODEL, 'year', ann.INDEX_FLAT)
+        self.assertEqual(by_year.shard_keys, ['2022', '2023'])
+        filters = RetrievalFilters(date_from=date(2023, 1, 1))
+        self.assertEqual(by_year.select_shards(filters), ['2023'])
+
+        by_category = build_sharded_index(self.tmp.name + 'c', MODEL, 'category', ann.INDEX_FLAT)
+        filters = RetrievalFilters(category_ids=self.child.get_descendant_ids())
+        self.assertEqual(by_category.select_shards(filters), [f'category-{self.root.pk}'])
+        hits = by_category.search(self.query, k=24, filters=filters)
+        self.assertEqual(len(hits), 16)
+
+    def test_single_shard_rebuild_keeps_other_shards(self):
+        build_sharded_index(self.tmp.name, MODEL, 'year', ann.INDEX_FLAT)
+        DocumentEmbedding.objects.filter(document=self.documents[0]).delete()
+        index = build_sharded_index(self.tmp.name, MODEL, 'year', ann.INDEX_FLAT, only={'2022'})
+        self.assertEqual(index.manifest['shards']['2022']['num_chunks'], 8)
+        self.assertEqual(index.manifest['shards']['2023']['num_chunks'], 12)
+
+    def test_partial_rebuild_requires_known_shards_and_drops_emptied_ones(self):
+        with self.assertRaises(ValueError):
+            build_sharded_index(self.tmp.name, MODEL, 'year', ann.INDEX_FLAT, only={'2022'})
+
+        build_sharded_index(self.tmp.name, MODEL, 'year', ann.INDEX_FLAT)
+        with self.assertRaises(ValueError):
+            build_sharded_index(self.tmp.name, MODEL, 'year', ann.INDEX_FLAT, only={'1999'})
+
+        DocumentEmbedding.objects.filter(document__in=self.documents[1::2]).delete()
+        index = build_sharded_index(self.tmp.name, MODEL, 'year', ann.INDEX_FLAT, only={'2023'})
+        self.assertEqual(index.shard_keys, ['2022'])
+        self.assertEqual(len(index), 12)
+
+    def test_get_vector_index_loads_shards_lazily(self):
+        with override_settings(VECTOR_INDEX_DIR=self.tmp.name):
+            build_vector_index(MODEL, ann.INDEX_FLAT, shard_by='year')
+            index = get_vector_index(MODEL)
+            self.assertIsInstance(index, ShardedVectorIndex)
+            self.assertEqual(index._shards, {})
+            index.search(self.query, k=2, filters=RetrievalFilters(date_to=date(2022, 12, 31)))
+            self.assertEqual(list(index._shards), ['2022'])
+
+    def test_partial_rebuild_publishes_new_version_with_linked_shards(self):
+        with override_settings(VECTOR_INDEX_DIR=self.tmp.name):
+            build_vector_index(MODEL, ann.INDEX_FLAT, shard_by='year')
+            first = get_vector_index(MODEL)
+            DocumentEmbedding.objects.filter(document=self.documents[0]).delete()
+            build_vector_index(MODEL, ann.INDEX_FLAT, shard_by='year', only_shards={'2022'})
+            second = get_vector_index(MODEL)
+            self.assertIsNot(second, first)
+            self.assertEqual(len(first), 24)
+            self.assertEqual(len(second), 20)
+            self.assertEqual(len(second.search(self.query, k=24)), 20)
+
+
+class IndexVersionTestCase(TestCase):
+    def setUp(self):
+        invalidate_vector_index()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.document = Document.objects.create(title='Doc', file_path='/test/doc.pdf')
+        self._add_chunk('Ação regulatória', [1.0, 0.0])
+
+    def _add_chunk(self, text, vector):
+        DocumentEmbedding.objects.create(
+            document=self.document, vector=vector, model_name=MODEL,
+            chunk_index=DocumentEmbedding.objects.count(), content=text
+        )
+
+    def test_documents_processed_after_publishing_are_searchable(self):
+        processor = DocumentProcessor(
+            embeddings=FakeEmbeddings(size=16), llm=fake_llm(), doc_converter=offline_converter()
+        )
+        model_name = processor.embedding_model
+        for seed, shard_by in enumerate(('', 'year')):
+            with self.subTest(shard_by=shard_by), tempfile.TemporaryDirectory() as corpus, \
+                    override_settings(VECTOR_INDEX_DIR=f'{self.tmp.name}/{seed}'):
+                first, second = build_corpus(Path(corpus), num_documents=2, seed=seed)
+                processor.process_document(str(first))
+                build_vector_index(model_name, ann.INDEX_FLAT, shard_by=shard_by)
+                published = get_vector_index(model_name)
+
+                document = processor.process_document(str(second))
+                chunk = document.embeddings.order_by('chunk_index').first()
+                for search_type in ('similarity', 'mmr'):
+                    hits = processor.get_retriever(search_type=search_type, k=1).invoke(chunk.content)
+                    self.assertEqual(hits[0].metadata['document_id'], document.pk)
+                index = get_vector_index(model_name)
+                self.assertIs(index.published, published)
+                self.assertEqual(len(index.delta), document.embeddings.count())
+
+    def test_deleted_and_changed_documents_are_not_served_from_the_published_version(self):
+        regulation = Regulation.objects.create(
+            title='Resolução', regulation_type='RESOLUTION', status='ACTIVE', document=self.document
+        )
+        category = DocumentCategory.objects.create(name='Espectro')
+        categorized = Document.objects.create(title='Com categoria', file_path='/test/categoria.pdf')
+        categorized.categories.add(category)
+        removed = Document.objects.create(title='Removido', file_path='/test/removido.pdf')
+        for document, text, vector in ((categorized, 'Plano de espectro', [0.8, 0.2]), (removed, 'Texto removido', [0.9, 0.1])):
+            DocumentEmbedding.objects.create(
+                document=document, vector=vector, model_name=MODEL, chunk_index=0, content=text
+            )
+        active = RetrievalFilters(regulation_statuses={'ACTIVE'})
+        revoked = RetrievalFilters(regulation_statuses={'REVOKED'})
+        in_category = RetrievalFilters(category_ids={category.pk})
+
+        with override_settings(VECTOR_INDEX_DIR=self.tmp.name):
+            build_vector_index(MODEL, ann.INDEX_FLAT)
+            published = get_vector_index(MODEL)
+            self.assertEqual(len(published.search([1.0, 0.0], k=5)), 3)
+            self.assertEqual(len(published.search([1.0, 0.0], k=5, filters=active)), 1)
+            self.assertEqual(len(published.search([1.0, 0.0], k=5, filters=in_category)), 1)
+
+            removed.delete()
+            regulation.status = 'REVOKED'
+            regulation.save()
+            categorized.categories.remove(category)
+
+            index = get_vector_index(MODEL)
+            self.assertEqual(
+                [hit.text for hit in index.search([1.0, 0.0], k=5)], ['Ação regulatória', 'Plano de espectro']
+            )
+            self.assertEqual(index.search([1.0, 0.0], k=5, filters=active), [])
+            self.assertEqual([hit.text for hit in index.search([1.0, 0.0], k=5, filters=revoked)], ['Ação regulatória'])
+            self.assertEqual(index.search([1.0, 0.0], k=5, filters=in_category), [])
+
+            # De volta à categoria: a ligação nova também é vista sem reconstruir
+            categorized.categories.add(category)
+            hits = get_vector_index(MODEL).search([1.0, 0.0], k=5, filters=in_category)
+            self.assertEqual([hit.text for hit in hits], ['Plano de espectro'])
+
+    def test_text_store_round_trip_with_mmap(self):
+        texts = ['primeiro', '', 'Resolução n.º 3 — espectro']
+        TextStore.write(texts, Path(self.tmp.name))
+        store = TextStore.load(Path(self.tmp.name), mmap=True)
+        self.assertEqual([store[i] for i in range(len(store))], texts)
+
+    def test_published_version_is_swapped_in_without_restart(self):
+        with override_settings(VECTOR_INDEX_DIR=self.tmp.name, VECTOR_INDEX_KEEP_VERSIONS=1):
+            build_vector_index(MODEL, ann.INDEX_FLAT, shard_by='')
+            first = get_vector_index(MODEL)
+            self.assertIs(get_vector_index(MODEL), first)
+            self.assertIsInstance(first.vectors, np.memmap)
+            self.assertEqual(first.search([1.0, 0.0], k=1)[0].text, 'Ação regulatória')
+
+            self._add_chunk('Licenciamento', [0.0, 1.0])
+            build_vector_index(MODEL, ann.INDEX_FLAT, shard_by='')
+            second = get_vector_index(MODEL)
+            self.assertIsNot(second, first)
+            self.assertEqual(second.search([0.0, 1.0], k=1)[0].text, 'Licenciamento')
+
+            # A versão antiga foi removida, mas o índice em uso continua válido
+            model_dir = Path(self.tmp.name) / 'test-model'
+            versions = [p.name for p in (model_dir / VERSIONS_DIR).iterdir()]
+            self.assertEqual(versions, [current_version(model_dir)])
+            self.assertEqual(first.search([1.0, 0.0], k=1)[0].text, 'Ação regulatória')
+
+
+class RetrievalBenchmarkTestCase(TestCase):
+    def test_labelled_set_formats(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'perguntas.jsonl'
+            path.write_text(
+                '{"question": "Prazo da portabilidade?", "relevant": "lei.pdf"}\n'
+                '{"question": "Taxas de regulação?", "relevant": ["a.pdf", "b.pdf"]}\n',
+                encoding='utf-8'
+            )
+            questions = load_labelled_set(path)
+            self.assertEqual(questions[0].relevant, ['lei.pdf'])
+            self.assertEqual(questions[1].relevant, ['a.pdf', 'b.pdf'])
+
+            path.write_text('[{"question": "Sem rótulos"}]', encoding='utf-8')
+            with self.assertRaises(ValueError):
+                load_labelled_set(path)
+
+    def test_benchmark_reports_quality_per_retriever(self):
+        report = run_retrieval_benchmark(
+            retrievers=['mmr', 'similarity', 'sharded-year'], num_documents=6, num_questions=8
+        )
+
+        self.assertEqual(set(report['retrievers']), {'mmr', 'similarity', 'sharded-year'})
+        similarity = report['retrievers']['similarity']
+        self.assertGreater(similarity['recall_at_k'], 0)
+        self.assertGreater(similarity['mrr'], 0)
+        self.assertGreater(similarity['context_tokens']['mean'], 0)
+        self.assertGreater(similarity['prompt_tokens']['mean'], similarity['context_tokens']['mean'])
+        self.assertLessEqual(similarity['latency']['p50_ms'], similarity['latency']['p99_ms'])
+        self.assertFalse(Document.objects.exists())
+
+        worse = {'retrievers': {'similarity': {**similarity, 'recall_at_k': similarity['recall_at_k'] / 2}}}
+        rows = {row['metric']: row for row in compare_retrieval_reports(worse, report)}
+        self.assertTrue(rows['retrievers.similarity.recall_at_k']['regression'])
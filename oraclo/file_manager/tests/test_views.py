@@ -1,7 +1,18 @@
 # file_manager/tests/test_views.py
-from django.test import TestCase, Client
+import tempfile
+from pathlib import Path
+
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, Client, RequestFactory, override_settings
 from django.urls import reverse
+from file_manager.benchmarks.corpus import build_corpus
+from file_manager.benchmarks.fakes import FakeEmbeddings, fake_llm, offline_converter
 from file_manager.models import Document, DocumentCategory, Regulation
+from file_manager.services.document_processor import DocumentProcessor
+from file_manager.views import DocumentUploadView
 from django.contrib.auth.models import User
 
 class FileManagerTestCase(TestCase):
@@ -68,6 +79,26 @@ class ModelTestCase(TestCase):
         )
         self.assertEqual(str(category), 'Test Category')
 
+    def test_category_move_updates_subtree_paths(self):
+        root = DocumentCategory.objects.create(name='Raiz')
+        child = DocumentCategory.objects.create(name='Filha', parent=root)
+        grandchild = DocumentCategory.objects.create(name='Neta', parent=child)
+        other = DocumentCategory.objects.create(name='Outra')
+
+        child.parent = other
+        child.save()
+
+        grandchild.refresh_from_db()
+        self.assertEqual(grandchild.path, f'{other.pk}/{child.pk}/{grandchild.pk}/')
+        self.assertEqual(grandchild.depth, 2)
+        self.assertEqual(root.get_descendant_ids(), {root.pk})
+        self.assertEqual(other.get_descendant_ids(include_self=False), {child.pk, grandchild.pk})
+        self.assertEqual([c.name for c in grandchild.get_ancestors()], ['Outra', 'Filha'])
+
+        other.parent = grandchild
+        with self.assertRaises(ValidationError):
+            other.save()
+
     def test_regulation_creation(self):
         document = Document.objects.create(
             title='Test Document',
@@ -79,4 +110,40 @@ class ModelTestCase(TestCase):
             regulation_type='LAW',
             document=document
         )
-        self.assertEqual(str(regulation), 'Test Regulation')
\ No newline at end of file
+        self.assertEqual(str(regulation), 'Test Regulation')
+
+class DocumentUploadViewTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='autor', password='x')
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.processor = DocumentProcessor(
+            embeddings=FakeEmbeddings(size=8), llm=fake_llm(), doc_converter=offline_converter()
+        )
+
+    def _post(self, data):
+        request = RequestFactory().post(reverse('file_manager:document_upload'), data)
+        request.user = self.user
+        request.session = SessionStore()
+        request._messages = FallbackStorage(request)
+        view = DocumentUploadView.as_view(processor_factory=lambda: self.processor)
+        return view(request)
+
+    def test_upload_creates_one_categorized_document(self):
+        category = DocumentCategory.objects.create(name='Espectro')
+        path = build_corpus(Path(self.directory.name), num_documents=1)[0]
+        with override_settings(BLOB_STORE_DIR=Path(self.directory.name) / 'blobs'), open(path, 'rb') as handle:
+            response = self._post({
+                'title': 'Plano de frequências',
+                'document_type': Document.DocumentType.PDF,
+                'categories': [category.pk],
+                'file_path': SimpleUploadedFile(path.name, handle.read()),
+            })
+
+        self.assertEqual(Document.objects.count(), 1)
+        document = Document.objects.get()
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.url, reverse('file_manager:document_detail', args=[document.pk]))
+        self.assertEqual(document.title, 'Plano de frequências')
+        self.assertEqual(document.status, Document.DocumentStatus.PROCESSED)
+        self.assertEqual(list(document.categories.all()), [category])
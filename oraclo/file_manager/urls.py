@@ -25,4 +25,16 @@ urlpatterns = [
     # APIs
     path('api/chat/', views.DocumentChatAPIView.as_view(), name='document_chat'),
     path('api/search/', views.DocumentSearchAPIView.as_view(), name='document_search'),
+    path('api/uploads/', views.UploadSessionCreateAPIView.as_view(), name='upload_create'),
+    path('api/uploads/<uuid:token>/', views.UploadSessionAPIView.as_view(), name='upload_session'),
+    path(
+        'api/uploads/<uuid:token>/complete/',
+        views.UploadSessionCompleteAPIView.as_view(),
+        name='upload_complete'
+    ),
+    path('api/documents/status/', views.DocumentStatusAPIView.as_view(), name='document_status'),
+    path('api/documents/events/', views.DocumentEventsAPIView.as_view(), name='document_events'),
+    path('api/documents/events/stream/', views.DocumentEventStreamView.as_view(), name='document_event_stream'),
+    path('api/ingestion/', views.IngestionAPIView.as_view(), name='ingestion'),
+    path('api/ingestion/<uuid:batch>/', views.IngestionBatchAPIView.as_view(), name='ingestion_batch'),
 ]
\ No newline at end of file
@@ -1,19 +1,221 @@
 # file_manager/utils/file_handlers.py
 import os
+import errno
+import fcntl
 import shutil
+import hashlib
+import tempfile
 import mimetypes
 import logging
+import threading
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import List, Set, Dict, Optional, Tuple, Union
+from typing import Any, List, Set, Dict, Optional, Tuple, Union
 import magic  # python-magic para detecção de tipo de arquivo
 from django.conf import settings
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import UploadedFile
 from django.utils.text import slugify
 
+from .keyword_matcher import KeywordHit, KeywordMatcher
+from .metrics import timed
+from .regulation_rules import extract_regulation_info
+
 logger = logging.getLogger(__name__)
 
+# Blocos de leitura da inspeção; o primeiro bloco serve também para o libmagic
+INSPECTION_BLOCK_SIZE = 1024 * 1024
+
+_magic_local = threading.local()
+
+
+def get_magic() -> magic.Magic:
+    """
+    Detetor libmagic da thread atual.
+
+    Criar um `magic.Magic` carrega a base de dados de assinaturas; os handles do
+    libmagic não são thread-safe, por isso cada thread mantém o seu.
+    """
+    detector = getattr(_magic_local, 'detector', None)
+    if detector is None:
+        detector = _magic_local.detector = magic.Magic(mime=True)
+    return detector
+
+
+@dataclass
+class FileInfo:
+    """Metadados de um arquivo, obtidos numa só leitura (ver `inspect_file`)."""
+    path: Path
+    size: int
+    created: datetime
+    modified: datetime
+    mime_type: str
+    sha256: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.path.name,
+            'extension': self.path.suffix,
+            'size': self.size,
+            'created': self.created,
+            'modified': self.modified,
+            'mime_type': self.mime_type,
+            'path': str(self.path.absolute()),
+            'sha256': self.sha256,
+        }
+
+
+def inspect_file(file_path: Union[str, Path], compute_hash: bool = True) -> FileInfo:
+    """
+    Obtém tamanho, datas, tipo MIME e hash SHA-256 de um arquivo numa só passagem.
+
+    Um único `stat()`; o tipo MIME é detetado a partir do primeiro bloco lido,
+    que também entra no hash, pelo que o arquivo é lido uma só vez.
+
+    Args:
+        file_path: Caminho do arquivo
+        compute_hash: Se deve ler o arquivo inteiro para calcular o hash
+
+    Returns:
+        FileInfo: Metadados do arquivo
+    """
+    file_path = Path(file_path)
+    with open(file_path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        head = f.read(INSPECTION_BLOCK_SIZE)
+        with timed('mime_detection'):
+            mime_type = get_magic().from_buffer(head)
+
+        sha256 = None
+        if compute_hash:
+            with timed('hash'):
+                digest = hashlib.sha256(head)
+                for block in iter(lambda: f.read(INSPECTION_BLOCK_SIZE), b''):
+                    digest.update(block)
+                sha256 = digest.hexdigest()
+
+    return FileInfo(
+        path=file_path,
+        size=stat.st_size,
+        created=datetime.fromtimestamp(stat.st_ctime),
+        modified=datetime.fromtimestamp(stat.st_mtime),
+        mime_type=mime_type,
+        sha256=sha256,
+    )
+
+
+# Modos de armazenamento de FileOrganizer.organize_file:
+#   'move': renomeia o arquivo (o original deixa de existir);
+#   'link': reflink (cópia copy-on-write) ou hardlink; o original fica intacto;
+#   'copy': cópia integral.
+# Em todos os modos, se o atalho não for possível (outro sistema de arquivos,
+# sistema sem reflink/hardlink), o arquivo é copiado em streaming.
+STORAGE_MODES = ('move', 'link', 'copy')
+
+# ioctl FICLONE do Linux (btrfs, XFS, ...): clona o arquivo sem copiar dados
+FICLONE = 0x40049409
+
+
+def _reflink(source: Path, destination: Path) -> bool:
+    """Cria `destination` como clone copy-on-write de `source`, se o sistema o suportar."""
+    try:
+        with open(source, 'rb') as src, open(destination, 'xb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        return True
+    except OSError:
+        destination.unlink(missing_ok=True)
+        return False
+
+
+def _read_umask() -> int:
+    # os.umask só se lê alterando-a; lida uma vez, na importação, para não a
+    # mudar enquanto outras threads criam arquivos
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+PROCESS_UMASK = _read_umask()
+
+
+def stored_file_mode() -> int:
+    """Permissões dos arquivos guardados: `FILE_UPLOAD_PERMISSIONS` ou 0o644 menos a umask."""
+    return settings.FILE_UPLOAD_PERMISSIONS or (0o644 & ~PROCESS_UMASK)
+
+
+def write_atomically(destination: Path, write: Any) -> None:
+    """
+    Escreve num temporário do diretório de destino e renomeia-o no fim: o arquivo
+    final nunca fica visível a meio da escrita.
+
+    O `mkstemp` cria o temporário com o modo 0600; antes da renomeação recebe
+    as permissões de `stored_file_mode`, como os arquivos do `FileSystemStorage`.
+    """
+    fd, temporary = tempfile.mkstemp(dir=destination.parent, prefix='.', suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as output:
+            write(output)
+        os.chmod(temporary, stored_file_mode())
+        os.replace(temporary, destination)
+    except BaseException:
+        Path(temporary).unlink(missing_ok=True)
+        raise
+
+
+def _streamed_copy(source: Path, destination: Path) -> None:
+    # copyfileobj usa blocos grandes; o kernel faz a cópia com sendfile quando possível
+    def write(output):
+        with open(source, 'rb') as src:
+            shutil.copyfileobj(src, output, INSPECTION_BLOCK_SIZE)
+    write_atomically(destination, write)
+    shutil.copystat(source, destination)
+
+
+def place_file(source: Path, destination: Path, mode: str = 'link') -> str:
+    """
+    Coloca `source` em `destination` pelo meio mais barato que o modo permite.
+
+    Args:
+        source: Arquivo de origem
+        destination: Caminho final (não pode existir)
+        mode: 'move', 'link' ou 'copy' (ver STORAGE_MODES)
+
+    Returns:
+        str: Método usado: 'rename', 'reflink', 'hardlink' ou 'copy'
+    """
+    if mode not in STORAGE_MODES:
+        raise ValueError(f"Modo de armazenamento desconhecido: {mode}")
+
+    if destination.exists():
+        raise FileExistsError(f"Arquivo já existe: {destination}")
+
+    if mode == 'move':
+        # Atómico no mesmo sistema de arquivos; noutro (EXDEV), copiar e apagar
+        try:
+            os.rename(source, destination)
+            return 'rename'
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+        _streamed_copy(source, destination)
+        source.unlink()
+        return 'copy'
+
+    if mode == 'link':
+        if _reflink(source, destination):
+            return 'reflink'
+        try:
+            os.link(source, destination)
+            return 'hardlink'
+        except OSError:
+            pass
+
+    _streamed_copy(source, destination)
+    return 'copy'
+
+
 class FileValidator:
     """
     Classe responsável por validar arquivos baseado em diversos critérios.
@@ -36,12 +238,17 @@ class FileValidator:
     MAX_FILE_SIZE = 100 * 1024 * 1024  
 
     @classmethod
-    def validate_file(cls, file_path: Union[str, Path]) -> Tuple[bool, Optional[str]]:
+    def validate_file(
+        cls,
+        file_path: Union[str, Path],
+        info: Optional[FileInfo] = None
+    ) -> Tuple[bool, Optional[str]]:
         """
         Valida um arquivo verificando tipo, tamanho e outros critérios.
 
         Args:
             file_path: Caminho do arquivo a ser validado
+            info: Resultado de `inspect_file`, se já disponível (evita nova leitura)
 
         Returns:
             Tuple[bool, Optional[str]]: (é_válido, mensagem_de_erro)
@@ -50,30 +257,28 @@ class FileValidator:
         
         try:
             # Verificar existência
-            if not file_path.exists():
+            if info is None and not file_path.exists():
                 return False, "Arquivo não encontrado"
 
+            # A inspeção lê o início do arquivo: uma falha aqui é um arquivo ilegível
+            if info is None:
+                try:
+                    info = inspect_file(file_path, compute_hash=False)
+                except OSError as e:
+                    return False, f"Arquivo corrompido ou ilegível: {str(e)}"
+
             # Verificar tamanho
-            file_size = file_path.stat().st_size
-            if file_size > cls.MAX_FILE_SIZE:
+            if info.size > cls.MAX_FILE_SIZE:
                 return False, f"Arquivo muito grande. Máximo permitido: {cls.MAX_FILE_SIZE/1024/1024}MB"
 
             # Verificar tipo MIME
-            mime_type = magic.Magic(mime=True).from_file(str(file_path))
-            if mime_type not in cls.ALLOWED_MIMETYPES:
-                return False, f"Tipo de arquivo não permitido: {mime_type}"
+            if info.mime_type not in cls.ALLOWED_MIMETYPES:
+                return False, f"Tipo de arquivo não permitido: {info.mime_type}"
 
             # Verificar extensão
-            if file_path.suffix.lower() not in cls.ALLOWED_MIMETYPES[mime_type]:
+            if file_path.suffix.lower() not in cls.ALLOWED_MIMETYPES[info.mime_type]:
                 return False, "Extensão de arquivo inválida para o tipo de conteúdo"
 
-            # Verificar se arquivo não está corrompido
-            try:
-                with open(file_path, 'rb') as f:
-                    f.read(1024)  # Tentar ler o início do arquivo
-            except Exception as e:
-                return False, f"Arquivo corrompido ou ilegível: {str(e)}"
-
             return True, None
 
         except Exception as e:
@@ -85,15 +290,17 @@ class FileOrganizer:
     Classe responsável por organizar arquivos em uma estrutura padronizada.
     """
 
-    def __init__(self, base_dir: Optional[Path] = None):
+    def __init__(self, base_dir: Optional[Path] = None, mode: Optional[str] = None):
         """
         Inicializa o organizador de arquivos.
 
         Args:
             base_dir: Diretório base para armazenamento (opcional)
+            mode: Modo de armazenamento (por omissão, settings.DOCUMENT_STORAGE_MODE)
         """
         self.base_dir = base_dir or Path(settings.MEDIA_ROOT) / 'documents'
         self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.mode = mode or getattr(settings, 'DOCUMENT_STORAGE_MODE', 'link')
 
     def generate_file_path(self, original_name: str, category: str = 'general') -> Path:
         """
@@ -122,13 +329,19 @@ class FileOrganizer:
 
         return category_dir / new_name
 
-    def organize_file(self, source_path: Union[str, Path], category: str = 'general') -> Path:
+    def organize_file(
+        self,
+        source_path: Union[str, Path],
+        category: str = 'general',
+        mode: Optional[str] = None
+    ) -> Path:
         """
-        Organiza um arquivo movendo-o para a estrutura adequada.
+        Organiza um arquivo colocando-o na estrutura adequada.
 
         Args:
             source_path: Caminho do arquivo fonte
             category: Categoria do documento
+            mode: 'move', 'link' ou 'copy' (por omissão, o modo do organizador)
 
         Returns:
             Path: Novo caminho do arquivo
@@ -140,11 +353,41 @@ class FileOrganizer:
         # Gerar novo caminho
         new_path = self.generate_file_path(source_path.name, category)
         
-        # Copiar arquivo
-        shutil.copy2(source_path, new_path)
+        mode = mode or self.mode
+        with timed('file_store', mode=mode):
+            method = place_file(source_path, new_path, mode)
+        logger.debug(f"Arquivo {source_path} organizado em {new_path} ({method})")
         
         return new_path
 
+    def store_upload(self, uploaded_file: UploadedFile, category: str = 'general') -> Path:
+        """
+        Grava um arquivo enviado diretamente no caminho organizado.
+
+        Os uploads grandes, que o Django guarda num temporário, são movidos (uma
+        simples mudança de nome, com FILE_UPLOAD_TEMP_DIR no mesmo sistema de
+        arquivos que MEDIA_ROOT); os pequenos, em memória, são escritos uma vez.
+
+        Args:
+            uploaded_file: Arquivo recebido no pedido
+            category: Categoria do documento
+
+        Returns:
+            Path: Caminho do arquivo gravado
+        """
+        new_path = self.generate_file_path(uploaded_file.name, category)
+        with timed('file_store', mode='upload'):
+            if hasattr(uploaded_file, 'temporary_file_path'):
+                place_file(Path(uploaded_file.temporary_file_path()), new_path, 'move')
+                # O temporário do Django foi criado com o modo 0600
+                os.chmod(new_path, stored_file_mode())
+            else:
+                def write(output):
+                    for chunk in uploaded_file.chunks():
+                        output.write(chunk)
+                write_atomically(new_path, write)
+        return new_path
+
 class TelecomDocumentHandler:
     """
     Manipulador especializado para documentos do setor de telecomunicações.
@@ -159,6 +402,9 @@ class TelecomDocumentHandler:
         'infrastructure': ['infraestrutura', 'rede', 'equipamento']
     }
 
+    # Compilado uma vez para todas as categorias (ver `utils.keyword_matcher`)
+    CATEGORY_MATCHER = KeywordMatcher(TELECOM_CATEGORIES)
+
     @staticmethod
     def classify_document(content: str) -> List[str]:
         """
@@ -170,47 +416,45 @@ class TelecomDocumentHandler:
         Returns:
             List[str]: Lista de categorias identificadas
         """
-        categories = []
-        content_lower = content.lower()
-        
-        for category, keywords in TelecomDocumentHandler.TELECOM_CATEGORIES.items():
-            if any(keyword in content_lower for keyword in keywords):
-                categories.append(category)
-        
-        return categories
+        counts = TelecomDocumentHandler.CATEGORY_MATCHER.counts(content)
+        return [category for category in TelecomDocumentHandler.TELECOM_CATEGORIES if category in counts]
 
     @staticmethod
-    def extract_regulation_info(content: str) -> Dict[str, str]:
+    def match_categories(content: str) -> Dict[str, List[KeywordHit]]:
         """
-        Extrai informações regulatórias do documento.
+        Ocorrências das palavras-chave de cada categoria, numa só passagem pelo texto.
 
         Args:
             content: Conteúdo do documento
 
         Returns:
-            Dict[str, str]: Informações regulatórias extraídas
+            Dict[str, List[KeywordHit]]: Ocorrências (palavra-chave e posição) por categoria
         """
-        # Implementar extração de informações específicas
-        # Exemplo básico - expandir conforme necessidade
-        info = {
-            'number': None,
-            'date': None,
-            'type': None,
-            'subject': None
-        }
-        
-        # Adicionar lógica de extração mais sofisticada aqui
-        
-        return info
+        return TelecomDocumentHandler.CATEGORY_MATCHER.match(content)
+
+    @staticmethod
+    def extract_regulation_info(content: str, title: str = '') -> Dict[str, Any]:
+        """
+        Extrai informações regulatórias do documento com as regras compiladas
+        (ver `utils.regulation_rules`).
+
+        Args:
+            content: Conteúdo do documento
+            title: Título do documento, usado como indício adicional
+
+        Returns:
+            Dict[str, Any]: `number`, `date`, `type`, `subject` e a `confidence` das regras
+        """
+        return extract_regulation_info(content, title)
 
 class FileProcessor:
     """
     Processador principal que integra todas as funcionalidades de manipulação de arquivos.
     """
 
-    def __init__(self):
+    def __init__(self, organizer: Optional[FileOrganizer] = None):
         self.validator = FileValidator()
-        self.organizer = FileOrganizer()
+        self.organizer = organizer or FileOrganizer()
         self.telecom_handler = TelecomDocumentHandler()
 
     def process_file(self, file_path: Union[str, Path], category: str = 'general') -> Dict[str, any]:
@@ -225,30 +469,71 @@ class FileProcessor:
             Dict[str, any]: Resultado do processamento
         """
         try:
-            # Validar arquivo
-            is_valid, error_message = FileValidator.validate_file(file_path)
+            # Validar arquivo (uma leitura: tipo, tamanho e hash)
+            with timed('file_validation'):
+                if not Path(file_path).exists():
+                    raise ValueError("Arquivo inválido: Arquivo não encontrado")
+                info = inspect_file(file_path)
+                is_valid, error_message = FileValidator.validate_file(file_path, info=info)
             if not is_valid:
                 raise ValueError(f"Arquivo inválido: {error_message}")
 
             # Organizar arquivo
             new_path = self.organizer.organize_file(file_path, category)
 
-            # Processar metadados
-            result = {
-                'original_path': str(file_path),
-                'new_path': str(new_path),
-                'category': category,
-                'processed_at': datetime.now().isoformat(),
-                'mime_type': magic.Magic(mime=True).from_file(str(new_path)),
-                'size': new_path.stat().st_size
-            }
-
-            return result
+            # O arquivo organizado tem o mesmo conteúdo: a inspeção continua válida
+            info.path = new_path
+            return self._result(str(file_path), info, category)
 
         except Exception as e:
             logger.error(f"Erro ao processar arquivo {file_path}: {str(e)}")
             raise
 
+    def process_upload(self, uploaded_file: UploadedFile, category: str = 'general') -> Dict[str, any]:
+        """
+        Processa um arquivo enviado: grava-o logo no caminho final, sem cópia
+        intermédia, e valida-o aí. Um arquivo inválido é apagado.
+
+        Args:
+            uploaded_file: Arquivo recebido no pedido
+            category: Categoria do documento
+
+        Returns:
+            Dict[str, any]: Resultado do processamento
+        """
+        if uploaded_file.size > FileValidator.MAX_FILE_SIZE:
+            raise ValueError(
+                f"Arquivo inválido: Arquivo muito grande. "
+                f"Máximo permitido: {FileValidator.MAX_FILE_SIZE/1024/1024}MB"
+            )
+
+        new_path = self.organizer.store_upload(uploaded_file, category)
+        try:
+            with timed('file_validation'):
+                info = inspect_file(new_path)
+                is_valid, error_message = FileValidator.validate_file(new_path, info=info)
+            if not is_valid:
+                raise ValueError(f"Arquivo inválido: {error_message}")
+        except Exception as e:
+            logger.error(f"Erro ao processar upload {uploaded_file.name}: {str(e)}")
+            new_path.unlink(missing_ok=True)
+            raise
+
+        return self._result(uploaded_file.name, info, category)
+
+    @staticmethod
+    def _result(original: str, info: FileInfo, category: str) -> Dict[str, any]:
+        return {
+            'original_path': original,
+            'new_path': str(info.path),
+            'category': category,
+            'processed_at': datetime.now().isoformat(),
+            'mime_type': info.mime_type,
+            'size': info.size,
+            'file_hash': info.sha256,
+            'file_info': info,
+        }
+
 def get_file_info(file_path: Union[str, Path]) -> Dict[str, any]:
     """
     Obtém informações detalhadas sobre um arquivo.
@@ -259,14 +544,4 @@ def get_file_info(file_path: Union[str, Path]) -> Dict[str, any]:
     Returns:
         Dict[str, any]: Informações do arquivo
     """
-    file_path = Path(file_path)
-    
-    return {
-        'name': file_path.name,
-        'extension': file_path.suffix,
-        'size': file_path.stat().st_size,
-        'created': datetime.fromtimestamp(file_path.stat().st_ctime),
-        'modified': datetime.fromtimestamp(file_path.stat().st_mtime),
-        'mime_type': magic.Magic(mime=True).from_file(str(file_path)),
-        'path': str(file_path.absolute())
-    }
\ No newline at end of file
+    return inspect_file(file_path, compute_hash=False).as_dict()
@@ -0,0 +1,147 @@
+# file_manager/utils/keyword_matcher.py
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+
+def _fold_char(char: str) -> str:
+    base = ''.join(c for c in unicodedata.normalize('NFKD', char) if not unicodedata.combining(c)).lower()
+    return base if len(base) == 1 else char.lower() if len(char.lower()) == 1 else char
+
+
+# Tabela de dobragem (minúsculas, sem acentos) dos alfabetos latinos. Cada
+# carácter dá exatamente um carácter, pelo que as posições no texto dobrado são
+# as mesmas do original.
+FOLD_TABLE = {
+    code: folded
+    for code in range(0x250)
+    if (folded := _fold_char(chr(code))) != chr(code)
+}
+
+
+def fold(text: str) -> str:
+    """Minúsculas e sem acentos, com o mesmo comprimento do texto original."""
+    return text.translate(FOLD_TABLE)
+
+
+def plural_forms(word: str) -> Tuple[str, ...]:
+    """
+    Formas do plural português de uma palavra já dobrada (sem acentos).
+
+    "licenca" -> "licencas", "resolucao" -> "resolucoes", "rede" -> "redes",
+    "nacional" -> "nacionais", "homologacao" -> "homologacoes".
+    """
+    if word.endswith('ao'):
+        return (word[:-2] + 'oes', word[:-2] + 'aes', word + 's')
+    if word.endswith(('al', 'el', 'ol', 'ul')):
+        return (word[:-1] + 'is',)
+    if word.endswith('il'):
+        return (word[:-1] + 's', word[:-2] + 'eis')
+    if word.endswith('m'):
+        return (word[:-1] + 'ns',)
+    if word.endswith(('r', 'z', 's')):
+        return (word + 'es',)
+    return (word + 's',)
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    Alternância em forma de árvore de prefixos ("rede|redes|regulamento" ->
+    "re(?:des?|gulamento)"): o motor testa cada prefixo comum uma só vez.
+    """
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        optional = '' in node
+        branches = [
+            (r'\s+' if char == ' ' else re.escape(char)) + build(child)
+            for char, child in sorted(node.items()) if char
+        ]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if optional:
+            return ('(?:' + body + ')?') if len(branches) == 1 and len(body) > 1 else body + '?'
+        return body
+
+    return build(trie)
+
+
+@dataclass(frozen=True)
+class KeywordHit:
+    """Ocorrência de uma palavra-chave, com a posição no texto original."""
+    category: str
+    keyword: str
+    start: int
+    end: int
+
+
+class KeywordMatcher:
+    """
+    Pesquisa todas as palavras-chave de todas as categorias numa só passagem.
+
+    As palavras-chave (e os seus plurais) são dobradas e compiladas numa única
+    alternância em árvore de prefixos, limitada a palavras inteiras: "lei"
+    encontra "Lei" e "leis", mas não "leilão". O texto é dobrado uma vez com
+    `str.translate` e percorrido uma vez pela expressão, pelo que o custo depende
+    do tamanho do texto e não do número de palavras-chave.
+    """
+
+    def __init__(self, categories: Mapping[str, Iterable[str]], inflect: bool = True):
+        self.categories = {category: list(keywords) for category, keywords in categories.items()}
+        # Forma dobrada -> (categoria, palavra-chave original)
+        self._lookup: Dict[str, List[Tuple[str, str]]] = {}
+        for category, keywords in self.categories.items():
+            for keyword in keywords:
+                folded = ' '.join(fold(keyword).split())
+                forms = (folded,)
+                if inflect and ' ' not in folded:
+                    forms += plural_forms(folded)
+                for form in forms:
+                    targets = self._lookup.setdefault(form, [])
+                    if (category, keyword) not in targets:
+                        targets.append((category, keyword))
+
+        # O texto já chega dobrado: sem IGNORECASE, que torna a pesquisa bem mais lenta
+        self.pattern = re.compile(r'\b' + _trie_pattern(self._lookup) + r'\b') if self._lookup else None
+
+    def finditer(self, text: str) -> Iterable[KeywordHit]:
+        if self.pattern is None:
+            return
+        for match in self.pattern.finditer(fold(text)):
+            form = ' '.join(match.group(0).split())
+            for category, keyword in self._lookup.get(form, ()):
+                yield KeywordHit(category, keyword, match.start(), match.end())
+
+    def match(self, text: str) -> Dict[str, List[KeywordHit]]:
+        """
+        Ocorrências por categoria (só as categorias com ocorrências).
+
+        Args:
+            text: Texto a pesquisar
+
+        Returns:
+            Dict[str, List[KeywordHit]]: Ocorrências por categoria, por ordem de posição
+        """
+        hits: Dict[str, List[KeywordHit]] = {}
+        for hit in self.finditer(text):
+            hits.setdefault(hit.category, []).append(hit)
+        return hits
+
+    def counts(self, text: str) -> Dict[str, int]:
+        """Número de ocorrências por categoria."""
+        counts: Dict[str, int] = {}
+        if self.pattern is None:
+            return counts
+        # Sem posições: findall evita criar um objeto por ocorrência
+        for found, total in Counter(self.pattern.findall(fold(text))).items():
+            for category, _ in self._lookup.get(' '.join(found.split()), ()):
+                counts[category] = counts.get(category, 0) + total
+        return counts
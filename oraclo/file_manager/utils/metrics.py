@@ -0,0 +1,274 @@
+# file_manager/utils/metrics.py
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from django.conf import settings
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Limites dos buckets dos histogramas, em segundos
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+STAGE_DURATION = 'oraclo_stage_duration_seconds'
+STAGE_ERRORS = 'oraclo_stage_errors_total'
+REQUEST_DURATION = 'oraclo_http_request_duration_seconds'
+REQUESTS_TOTAL = 'oraclo_http_requests_total'
+DOCUMENTS_PROCESSED = 'oraclo_documents_processed_total'
+CHUNKS_EMBEDDED = 'oraclo_chunks_embedded_total'
+OPENAI_REQUESTS = 'oraclo_openai_requests_total'
+OPENAI_RETRIES = 'oraclo_openai_retries_total'
+
+METRIC_HELP = {
+    STAGE_DURATION: 'Duração de cada etapa do processamento.',
+    STAGE_ERRORS: 'Etapas terminadas com exceção.',
+    REQUEST_DURATION: 'Duração dos pedidos HTTP por view.',
+    REQUESTS_TOTAL: 'Pedidos HTTP por view, método e estado.',
+    DOCUMENTS_PROCESSED: 'Documentos processados por estado final.',
+    CHUNKS_EMBEDDED: 'Fragmentos com embedding gerado.',
+    OPENAI_REQUESTS: 'Pedidos HTTP à API da OpenAI por estado.',
+    OPENAI_RETRIES: 'Novas tentativas de pedidos à API da OpenAI.',
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Optional[Dict[str, Any]]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in (labels or {}).items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key: LabelKey, extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Histogram:
+    """Histograma cumulativo no formato do Prometheus."""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        position = bisect.bisect_left(self.buckets, value)
+        if position < len(self.counts):
+            self.counts[position] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        rows, total = [], 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            rows.append((_format_value(bound), total))
+        rows.append(('+Inf', self.count))
+        return rows
+
+
+class MetricsRegistry:
+    """
+    Contadores e histogramas do processo, exportados em formato de texto do Prometheus.
+
+    Os valores são por processo: com vários workers, cada um expõe os seus e o
+    Prometheus agrega-os por instância.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+
+    def inc(self, name: str, value: float = 1.0, labels: Optional[Dict[str, Any]] = None) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(
+        self, name: str, value: float, labels: Optional[Dict[str, Any]] = None,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def counter_value(self, name: str, **labels: Any) -> float:
+        return self._counters.get(name, {}).get(_label_key(labels), 0.0)
+
+    def histogram(self, name: str, **labels: Any) -> Optional[Histogram]:
+        return self._histograms.get(name, {}).get(_label_key(labels))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self) -> str:
+        """Exporta todas as métricas no formato de exposição de texto do Prometheus."""
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(self._counters):
+                lines.append(f'# HELP {name} {METRIC_HELP.get(name, name)}')
+                lines.append(f'# TYPE {name} counter')
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f'{name}{_format_labels(key)} {_format_value(value)}')
+            for name in sorted(self._histograms):
+                lines.append(f'# HELP {name} {METRIC_HELP.get(name, name)}')
+                lines.append(f'# TYPE {name} histogram')
+                for key, histogram in sorted(self._histograms[name].items()):
+                    for bound, count in histogram.cumulative():
+                        lines.append(f'{name}_bucket{_format_labels(key, [("le", bound)])} {count}')
+                    lines.append(f'{name}_sum{_format_labels(key)} {histogram.sum!r}')
+                    lines.append(f'{name}_count{_format_labels(key)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def metrics_enabled() -> bool:
+    return getattr(settings, 'METRICS_ENABLED', True)
+
+
+class StageCollector:
+    """Acumula o tempo por etapa de um único pedido (usado pelo perfilador)."""
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        totals = self.stages.setdefault(stage, {'count': 0, 'seconds': 0.0})
+        totals['count'] += 1
+        totals['seconds'] += seconds
+
+
+# Coletor do pedido em curso, quando este está a ser perfilado
+current_collector: ContextVar[Optional[StageCollector]] = ContextVar('current_collector', default=None)
+
+
+class _StageTimer:
+    __slots__ = ('stage', 'labels', 'started', 'record', 'collector')
+
+    def __init__(self, stage: str, labels: Dict[str, Any], record: bool, collector: Optional[StageCollector]):
+        self.stage = stage
+        self.labels = labels
+        self.record = record
+        self.collector = collector
+        self.started = 0.0
+
+    def __enter__(self) -> '_StageTimer':
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        elapsed = time.perf_counter() - self.started
+        if self.collector is not None:
+            self.collector.add(self.stage, elapsed)
+        if self.record:
+            registry.observe(STAGE_DURATION, elapsed, self.labels)
+            if exc_type is not None:
+                registry.inc(STAGE_ERRORS, labels=self.labels)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> '_NullTimer':
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        return None
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timed(stage: str, **labels: Any) -> Any:
+    """
+    Mede a duração de uma etapa: `with timed('conversion'): ...`.
+
+    Com `METRICS_ENABLED = False` (e sem perfilador ativo) devolve um contexto
+    vazio partilhado, sem leitura do relógio nem alocação.
+    """
+    record = metrics_enabled()
+    collector = current_collector.get()
+    if not record and collector is None:
+        return _NULL_TIMER
+    return _StageTimer(stage, {'stage': stage, **labels}, record, collector)
+
+
+def instrumented(stage: str, **labels: Any) -> Callable:
+    """Decorador equivalente a `timed` para uma função inteira."""
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(stage, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def increment(name: str, value: float = 1.0, **labels: Any) -> None:
+    if metrics_enabled():
+        registry.inc(name, value, labels)
+
+
+class LLMTimingCallback(BaseCallbackHandler):
+    """Regista a duração de cada chamada ao LLM feita dentro de uma chain (etapa `llm`)."""
+
+    def __init__(self):
+        self._started: Dict[UUID, float] = {}
+        self._record = metrics_enabled()
+        self._collector = current_collector.get()
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def _finish(self, run_id: UUID, failed: bool) -> None:
+        started = self._started.pop(run_id, None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        if self._collector is not None:
+            self._collector.add('llm', elapsed)
+        if self._record:
+            registry.observe(STAGE_DURATION, elapsed, {'stage': 'llm'})
+            if failed:
+                registry.inc(STAGE_ERRORS, labels={'stage': 'llm'})
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, failed=False)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, failed=True)
+
+
+def chain_callbacks() -> List[BaseCallbackHandler]:
+    """Callbacks de instrumentação a passar às chains (vazio se não houver nada a medir)."""
+    if metrics_enabled() or current_collector.get() is not None:
+        return [LLMTimingCallback()]
+    return []
@@ -0,0 +1,199 @@
+# file_manager/utils/profiling.py
+import cProfile
+import io
+import json
+import logging
+import pstats
+import random
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .metrics import StageCollector, current_collector
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SUFFIX = '.prof'
+SUMMARY_SUFFIX = '.json'
+TOP_FUNCTIONS = 30
+
+# Um perfil de cada vez por processo: o cProfile não suporta perfis concorrentes
+_profile_lock = threading.Lock()
+
+DEFAULT_PROFILING = {
+    'ENABLED': False,
+    'HEADER': 'X-Oraclo-Profile',
+    'SAMPLE_RATE': 0.0,
+    'DIRECTORY': None,
+    'MAX_PROFILES': 200,
+    'MAX_AGE_DAYS': 7,
+}
+
+
+def profiling_config() -> Dict[str, Any]:
+    config = {**DEFAULT_PROFILING, **getattr(settings, 'PROFILING', {})}
+    if config['DIRECTORY'] is None:
+        config['DIRECTORY'] = Path(settings.BASE_DIR) / 'profiles'
+    return config
+
+
+class _QueryCounter:
+    """`execute_wrapper` que conta as consultas SQL e o tempo gasto na base de dados."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+def should_profile(request: Any, config: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    Decide se o pedido é perfilado.
+
+    O cabeçalho só é aceite de utilizadores staff (um perfil expõe detalhes
+    internos); a amostragem aplica-se a todos os pedidos.
+    """
+    config = config or profiling_config()
+    if not config['ENABLED']:
+        return False
+    if request.headers.get(config['HEADER']):
+        user = getattr(request, 'user', None)
+        return bool(user is not None and user.is_staff)
+    return config['SAMPLE_RATE'] > 0 and random.random() < config['SAMPLE_RATE']
+
+
+def _top_functions(profiler: cProfile.Profile, limit: int = TOP_FUNCTIONS) -> List[Dict[str, Any]]:
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, function), (_, calls, own, cumulative, _) in stats.stats.items():
+        rows.append({
+            'function': f'{filename}:{line}({function})',
+            'calls': calls,
+            'own_s': own,
+            'cumulative_s': cumulative,
+        })
+    rows.sort(key=lambda row: row['cumulative_s'], reverse=True)
+    return rows[:limit]
+
+
+def prune_profiles(directory: Path, max_profiles: int, max_age_days: int) -> int:
+    """Remove os perfis além do limite de quantidade ou de idade. Devolve quantos foram removidos."""
+    directory = Path(directory)
+    if not directory.exists():
+        return 0
+    summaries = sorted(directory.glob(f'*{SUMMARY_SUFFIX}'), reverse=True)
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for position, summary in enumerate(summaries):
+        if position < max_profiles and summary.stat().st_mtime >= cutoff:
+            continue
+        summary.unlink(missing_ok=True)
+        summary.with_suffix(PROFILE_SUFFIX).unlink(missing_ok=True)
+        removed += 1
+    return removed
+
+
+def list_profiles(directory: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """Resumos dos perfis guardados, do mais recente para o mais antigo."""
+    directory = Path(directory or profiling_config()['DIRECTORY'])
+    if not directory.exists():
+        return []
+    return [
+        json.loads(path.read_text(encoding='utf-8'))
+        for path in sorted(directory.glob(f'*{SUMMARY_SUFFIX}'), reverse=True)
+    ]
+
+
+def profile_request(request: Any, view_name: str, handler: Any) -> Any:
+    """
+    Executa `handler()` com cProfile, coletor de etapas e contador de consultas SQL.
+
+    Guarda `<id>.prof` (formato pstats, abre com snakeviz ou flameprof para um
+    flame graph) e `<id>.json` com a decomposição por etapa, o número e o tempo
+    das consultas e as funções mais pesadas. O ID segue no cabeçalho
+    `X-Oraclo-Profile-Id` da resposta.
+    """
+    config = profiling_config()
+    profile_id = f"{timezone.now().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    collector = StageCollector()
+    queries = _QueryCounter()
+    profiler = cProfile.Profile()
+
+    token = current_collector.set(collector)
+    started = time.perf_counter()
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            profiler.enable()
+            try:
+                response = handler()
+                # Respostas adiadas (ex.: templates) são geradas aqui, dentro do perfil
+                if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+                    response.render()
+            finally:
+                profiler.disable()
+    finally:
+        elapsed = time.perf_counter() - started
+        current_collector.reset(token)
+
+    try:
+        directory = Path(config['DIRECTORY'])
+        directory.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(str(directory / f'{profile_id}{PROFILE_SUFFIX}'))
+        user = getattr(request, 'user', None)
+        summary = {
+            'id': profile_id,
+            'created_at': timezone.now().isoformat(),
+            'view': view_name,
+            'method': request.method,
+            'path': request.path,
+            'user': user.get_username() if user is not None and user.is_authenticated else None,
+            'status': getattr(response, 'status_code', None),
+            'duration_s': elapsed,
+            'stages': collector.stages,
+            'sql': {'count': queries.count, 'seconds': queries.seconds},
+            'top_functions': _top_functions(profiler),
+        }
+        (directory / f'{profile_id}{SUMMARY_SUFFIX}').write_text(
+            json.dumps(summary, indent=2, ensure_ascii=False), encoding='utf-8'
+        )
+        prune_profiles(directory, config['MAX_PROFILES'], config['MAX_AGE_DAYS'])
+        response['X-Oraclo-Profile-Id'] = profile_id
+    except Exception as e:
+        # Uma falha ao guardar o perfil nunca afeta a resposta
+        logger.error(f"Erro ao guardar perfil do pedido {request.path}: {str(e)}")
+    return response
+
+
+class ProfiledViewMixin:
+    """
+    Perfila a view quando o pedido traz o cabeçalho de perfil (staff) ou é amostrado.
+
+    Ver `settings.PROFILING`.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if not should_profile(request) or not _profile_lock.acquire(blocking=False):
+            return super().dispatch(request, *args, **kwargs)
+        try:
+            return profile_request(
+                request, type(self).__name__,
+                lambda: super(ProfiledViewMixin, self).dispatch(request, *args, **kwargs)
+            )
+        finally:
+            _profile_lock.release()
@@ -0,0 +1,187 @@
+# file_manager/utils/regulation_rules.py
+import re
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, Optional
+
+# Zona inicial do documento onde a referência identifica o próprio diploma; mais
+# adiante, uma referência é normalmente a citação de outro diploma
+HEADER_CHARS = 1000
+# Distância máxima entre a referência e a data de publicação
+DATE_WINDOW = 200
+# Distância máxima entre "em vigor" e a data de vigência
+EFFECTIVE_WINDOW = 120
+
+# Pesos da confiança das regras
+WEIGHT_HEADER_REFERENCE = 0.6
+WEIGHT_BODY_REFERENCE = 0.3
+WEIGHT_DATE = 0.25
+WEIGHT_TITLE = 0.15
+
+KIND_TO_TYPE = {
+    'decreto-lei': 'DECREE',
+    'decreto lei': 'DECREE',
+    'decreto': 'DECREE',
+    'lei': 'LAW',
+    'resolução': 'RESOLUTION',
+    'resolucao': 'RESOLUTION',
+    'regulamento': 'NORMATIVE',
+    'deliberação': 'NORMATIVE',
+    'deliberacao': 'NORMATIVE',
+    'portaria': 'NORMATIVE',
+    'despacho': 'NORMATIVE',
+    'instrução': 'NORMATIVE',
+    'instrucao': 'NORMATIVE',
+    'norma': 'NORMATIVE',
+    'normativa': 'NORMATIVE',
+}
+
+MONTHS = {
+    'janeiro': 1, 'fevereiro': 2, 'março': 3, 'marco': 3, 'abril': 4, 'maio': 5, 'junho': 6,
+    'julho': 7, 'agosto': 8, 'setembro': 9, 'outubro': 10, 'novembro': 11, 'dezembro': 12,
+}
+
+_KINDS = '|'.join(sorted((re.escape(kind) for kind in KIND_TO_TYPE), key=len, reverse=True))
+
+# "Lei n.º 5/2010", "Decreto-Lei nº 12/2013", "Resolução 3/2019", "Regulamento número 7"
+REFERENCE_PATTERN = re.compile(
+    rf'\b(?P<kind>{_KINDS})\s+'
+    r'(?:(?:n\.?\s*[º°o]\.?|número)\s*(?P<number>\d+(?:[/.-]\d+)*(?:/[A-Z]{2,})?)'
+    r'|(?P<year_number>\d+/\d{2,4}(?:/[A-Z]{2,})?))',
+    re.IGNORECASE,
+)
+# "Política Nacional de ...", "Estratégia Nacional de ..." (sem número)
+POLICY_PATTERN = re.compile(r'\b(?:política|estratégia)\s+(?:nacional|setorial|sectorial)\b', re.IGNORECASE)
+
+LONG_DATE_PATTERN = re.compile(
+    r'\b(?P<day>\d{1,2})\s+de\s+(?P<month>' + '|'.join(MONTHS) + r')\s+de\s+(?P<year>\d{4})\b',
+    re.IGNORECASE,
+)
+SUBJECT_DATE_PATTERN = re.compile(r'(?:,?\s*de\s+)?' + LONG_DATE_PATTERN.pattern, re.IGNORECASE)
+NUMERIC_DATE_PATTERN = re.compile(r'\b(?P<day>\d{1,2})[/.-](?P<month>\d{1,2})[/.-](?P<year>\d{4})\b')
+ISO_DATE_PATTERN = re.compile(r'\b(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})\b')
+EFFECTIVE_PATTERN = re.compile(r'\bem\s+vigor\b|\bvigência\b', re.IGNORECASE)
+
+
+@dataclass
+class RegulationMatch:
+    """Resultado das regras para um documento."""
+    regulation_type: Optional[str] = None
+    number: Optional[str] = None
+    date: Optional[date] = None
+    effective_date: Optional[date] = None
+    title: Optional[str] = None
+    subject: Optional[str] = None
+    confidence: float = 0.0
+
+    @property
+    def is_regulation(self) -> bool:
+        return self.regulation_type is not None
+
+
+def _to_date(match: re.Match) -> Optional[date]:
+    month = match.group('month')
+    month = MONTHS[month.lower()] if not month.isdigit() else int(month)
+    try:
+        return date(int(match.group('year')), month, int(match.group('day')))
+    except ValueError:
+        return None
+
+
+def find_date(text: str) -> Optional[date]:
+    """Primeira data válida do texto (por extenso, dd/mm/aaaa ou ISO)."""
+    found = []
+    for pattern in (LONG_DATE_PATTERN, NUMERIC_DATE_PATTERN, ISO_DATE_PATTERN):
+        for match in pattern.finditer(text):
+            parsed = _to_date(match)
+            if parsed:
+                found.append((match.start(), parsed))
+                break
+    return min(found)[1] if found else None
+
+
+def _line_at(content: str, position: int) -> str:
+    start = content.rfind('\n', 0, position) + 1
+    end = content.find('\n', position)
+    return content[start:end if end >= 0 else len(content)].strip().lstrip('#').strip()
+
+
+def _effective_date(content: str) -> Optional[date]:
+    for match in EFFECTIVE_PATTERN.finditer(content):
+        found = find_date(content[match.end():match.end() + EFFECTIVE_WINDOW])
+        if found:
+            return found
+    return None
+
+
+def match_regulation(content: str, title: str = '') -> RegulationMatch:
+    """
+    Aplica as regras ao texto de um documento.
+
+    A confiança soma os indícios encontrados: referência ao diploma no cabeçalho
+    (ou, com menos peso, no corpo), data junto da referência e o tipo de diploma
+    repetido no título.
+
+    Args:
+        content: Conteúdo do documento
+        title: Título do documento (ex.: nome do ficheiro)
+
+    Returns:
+        RegulationMatch: Tipo, número, datas, título e confiança
+    """
+    result = RegulationMatch()
+    reference = REFERENCE_PATTERN.search(content)
+    policy = POLICY_PATTERN.search(content, 0, HEADER_CHARS)
+    if reference:
+        kind = reference.group('kind').lower()
+        result.regulation_type = KIND_TO_TYPE[kind]
+        result.number = reference.group('number') or reference.group('year_number')
+        line = _line_at(content, reference.start())
+        # No cabeçalho e a abrir a linha (título do diploma, não uma citação)
+        in_header = (
+            reference.start() < HEADER_CHARS
+            and line.lower().startswith(reference.group(0).lower())
+        )
+        result.confidence += WEIGHT_HEADER_REFERENCE if in_header else WEIGHT_BODY_REFERENCE
+
+        result.title = line[:255] or None
+        result.date = find_date(content[reference.end():reference.end() + DATE_WINDOW])
+        if result.date:
+            result.confidence += WEIGHT_DATE
+        if title and kind.split('-')[0] in title.lower():
+            result.confidence += WEIGHT_TITLE
+
+        # Assunto: o que vem depois da referência na mesma linha, ou a linha seguinte
+        rest = line[line.lower().find(reference.group(0).lower()) + len(reference.group(0)):]
+        rest = SUBJECT_DATE_PATTERN.sub('', rest).strip(' ,.-–—:')
+        next_line = content.find('\n', reference.end())
+        if not rest and next_line >= 0:
+            following = content[next_line + 1:].lstrip().split('\n', 1)[0]
+            rest = following.strip().lstrip('#').strip()
+        result.subject = rest[:255] or None
+    elif policy:
+        result.regulation_type = 'POLICY'
+        result.title = _line_at(content, policy.start())[:255] or None
+        result.date = find_date(content[:HEADER_CHARS])
+        result.confidence = WEIGHT_BODY_REFERENCE + (WEIGHT_DATE if result.date else 0.0)
+
+    result.effective_date = _effective_date(content) or result.date
+    result.confidence = min(result.confidence, 1.0)
+    return result
+
+
+def extract_regulation_info(content: str, title: str = '') -> Dict[str, Any]:
+    """
+    Informações regulatórias extraídas pelas regras.
+
+    Returns:
+        Dict[str, Any]: `number`, `date` (ISO), `type`, `subject` e `confidence`
+    """
+    match = match_regulation(content, title)
+    return {
+        'number': match.number,
+        'date': match.date.isoformat() if match.date else None,
+        'type': match.regulation_type,
+        'subject': match.subject,
+        'confidence': match.confidence,
+    }
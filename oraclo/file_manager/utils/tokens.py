@@ -0,0 +1,38 @@
+# file_manager/utils/tokens.py
+import logging
+from functools import lru_cache
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Aproximação usada quando o tokenizador não está disponível (ex.: sem rede)
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(encoding_name: str) -> Optional[Any]:
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(encoding_name)
+    except Exception as e:
+        logger.warning(f"Tokenizador {encoding_name} indisponível, a usar aproximação: {e}")
+        return None
+
+
+def count_tokens(text: str, encoding_name: str = 'cl100k_base') -> int:
+    """
+    Conta os tokens de um texto com o tokenizador dos modelos OpenAI.
+
+    Args:
+        text: Texto a contar
+        encoding_name: Codificação do tiktoken
+
+    Returns:
+        int: Número de tokens (aproximado se o tiktoken não estiver disponível)
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(encoding_name)
+    if encoding is None:
+        return max(1, len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
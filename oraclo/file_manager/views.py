@@ -1,11 +1,12 @@
 # file_manager/views.py
 import logging
 import json
+import uuid
 from typing import List, Any, Dict
 from django.views.generic import ListView, DetailView, CreateView, DeleteView, TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import JsonResponse
-from django.urls import reverse_lazy
+from django.http import Http404, HttpResponse, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
+from django.urls import reverse, reverse_lazy
 from django.shortcuts import render, get_object_or_404
 from django.core.exceptions import PermissionDenied
 from django.contrib import messages
@@ -15,14 +16,13 @@ from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
 from langchain.prompts.chat import (
     ChatPromptTemplate,
     SystemMessagePromptTemplate,
     HumanMessagePromptTemplate,
 )
 from django.conf import settings
-from langchain.memory import ConversationBufferMemory
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain.chains import ConversationalRetrievalChain
 from langchain_community.vectorstores import FAISS
 
@@ -31,13 +31,46 @@ from .models import (
     Document,
     DocumentCategory,
     DocumentEmbedding,
+    IngestionJob,
     Regulation,
-    TimeStampedModel
+    TimeStampedModel,
+    UploadSession
 )
 
+from .models.category import subtree_q
+
 # Importações de serviços e utilitários
+from .services.blob_store import BlobStore
+from .services.chunked_upload import (
+    OffsetMismatch,
+    abort_session,
+    append_range,
+    complete_session,
+    create_session,
+    parse_content_range,
+)
 from .services.document_processor import DocumentProcessor
-from .utils.file_handlers import FileProcessor, get_file_info
+from .services.ingestion import batch_status, enqueue, receive_files
+from .services.status_feed import (
+    document_statuses,
+    feed_config,
+    latest_cursor,
+    parse_ids,
+    sse_stream,
+    wait_for_events,
+)
+from .services.embeddings import build_retriever
+from .services.model_clients import get_chat_model
+from .services.vector_index import RetrievalFilters
+from .services.conversation import (
+    ConversationStore,
+    LLMSummarizer,
+    conversation_key,
+    get_session_id,
+)
+from .utils.file_handlers import FileProcessor, inspect_file
+from .utils.metrics import chain_callbacks, metrics_enabled, registry, timed
+from .utils.profiling import ProfiledViewMixin
 from .forms import DocumentUploadForm, DocumentSearchForm
 
 
@@ -91,9 +124,9 @@ class DocumentListView(LoginRequiredMixin, ListView):
     paginate_by = 10
 
     def get_queryset(self):
-        queryset = Document.objects.prefetch_related(
-            'categories',
-            'regulations'
+        # O conteúdo extraído não aparece na lista: não o carregar por documento
+        queryset = Document.objects.defer('content').prefetch_related(
+            'categories'
         ).order_by('-created_at')
         
         # Aplicar filtros
@@ -138,16 +171,29 @@ class DocumentDetailView(LoginRequiredMixin, DetailView):
     template_name = 'file_manager/document_detail.html'
     context_object_name = 'document'
 
+    def get_queryset(self):
+        # Categorias e regulamentos vêm com o documento: o número de consultas
+        # não depende da quantidade de dados associados
+        return Document.objects.prefetch_related('categories', 'regulations', 'embedding_summaries')
+
     def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
         context = super().get_context_data(**kwargs)
-        document = self.get_object()
+        document = self.object
         
-        # Informações do arquivo
-        if document.file_path:
-            context['file_info'] = get_file_info(document.file_path)
+        # Informações do arquivo, guardadas no processamento; os documentos
+        # antigos são inspecionados uma única vez
+        if document.file_size is None and document.file_path:
+            try:
+                info = inspect_file(document.file_path, compute_hash=False)
+                document.file_size, document.mime_type = info.size, info.mime_type
+                document.save(update_fields=['file_size', 'mime_type', 'updated_at'])
+            except OSError as e:
+                logger.warning(f"Arquivo do documento {document.pk} indisponível: {str(e)}")
+        if document.file_size is not None:
+            context['file_info'] = {'size': document.file_size, 'mime_type': document.mime_type}
         
         # Regulamentos relacionados
-        context['regulations'] = document.regulations.all().select_related('document')
+        context['regulations'] = document.regulations.all()
         
         # Histórico de processamento
         context['processing_history'] = document.metadata.get('processing_history', [])
@@ -155,20 +201,21 @@ class DocumentDetailView(LoginRequiredMixin, DetailView):
         # Categorias
         context['categories'] = document.categories.all()
         
-        # Embeddings
-        context['embeddings'] = document.embeddings.all()
+        # Embeddings: só o resumo por modelo, sem ler os fragmentos
+        context['embedding_summaries'] = document.embedding_summaries.all()
         
         return context
 
 
-class DocumentUploadView(LoginRequiredMixin, CreateView):
+class DocumentUploadView(LoginRequiredMixin, ProfiledViewMixin, CreateView):
     """
     Permite upload e processamento de novos documentos.
     """
     model = Document
     form_class = DocumentUploadForm
     template_name = 'file_manager/document_upload.html'
-    success_url = reverse_lazy('file_manager:document_list')
+    # Processador dos uploads (injetável, ex.: com modelos locais nos testes)
+    processor_factory = DocumentProcessor
 
     def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
         context = super().get_context_data(**kwargs)
@@ -179,48 +226,49 @@ class DocumentUploadView(LoginRequiredMixin, CreateView):
         return context
 
     def form_valid(self, form):
-        try:
-            # Salvar documento inicialmente
-            document = form.save(commit=False)
-            document.status = Document.DocumentStatus.PROCESSING
-            document.save()
+        uploaded_file = self.request.FILES.get('file_path')
+        if uploaded_file is None:
+            form.add_error('file_path', 'Selecione o arquivo a enviar.')
+            return self.form_invalid(form)
 
-            # Processar o arquivo
-            processor = DocumentProcessor()
-            file_processor = FileProcessor()
-
-            # Processar e organizar arquivo
-            file_result = file_processor.process_file(
-                document.file_path,
-                category=form.cleaned_data.get('category', 'general')
-            )
-
-            # Processar conteúdo e gerar embeddings
-            processed_doc = processor.process_document(
-                file_result['new_path'],
-                title=document.title
-            )
-
-            # Vincular categorias se fornecidas
-            categories = form.cleaned_data.get('categories', [])
-            if categories:
-                document.categories.set(categories)
-
-            messages.success(
-                self.request,
-                'Documento enviado e processado com sucesso.'
+        try:
+            # O documento é criado pelo processador (com o hash, o tamanho e o
+            # tipo MIME); o formulário só fornece o título e as categorias
+            processor = self.processor_factory()
+            if settings.DOCUMENT_STORAGE == 'blobs':
+                # Endereçado pelo conteúdo: um arquivo repetido não é gravado de novo
+                blob, file_info = BlobStore().put_validated_upload(uploaded_file)
+            else:
+                blob = None
+                file_info = FileProcessor().process_upload(uploaded_file)['file_info']
+
+            document = processor.process_document(
+                str(file_info.path),
+                title=form.cleaned_data['title'],
+                file_info=file_info,
+                blob=blob
             )
-            return super().form_valid(form)
-
         except Exception as e:
+            # Se o documento chegou a ser criado, o processador deixou-o com o status ERROR
             messages.error(
                 self.request,
                 f'Erro no processamento: {str(e)}'
             )
-            document.status = Document.DocumentStatus.ERROR
-            document.metadata['error'] = str(e)
-            document.save()
-            return super().form_invalid(form)
+            return self.form_invalid(form)
+
+        categories = form.cleaned_data.get('categories')
+        if categories:
+            document.categories.set(categories)
+
+        self.object = document
+        messages.success(
+            self.request,
+            'Documento enviado e processado com sucesso.'
+        )
+        return HttpResponseRedirect(self.get_success_url())
+
+    def get_success_url(self) -> str:
+        return reverse('file_manager:document_detail', args=[self.object.pk])
 
 class DocumentDeleteView(LoginRequiredMixin, DeleteView):
     """
@@ -239,27 +287,16 @@ class DocumentDeleteView(LoginRequiredMixin, DeleteView):
             messages.error(request, f'Erro ao excluir documento: {str(e)}')
             return self.render_to_response(self.get_context_data())
 
-class DocumentChatAPIView(APIView):
+class DocumentChatAPIView(ProfiledViewMixin, APIView):
     """
     API para interação conversacional inteligente com documentos usando GPT-4.
     """
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.llm = ChatOpenAI(
-            model_name="gpt-4",
-            temperature=0.7,
-            api_key=settings.OPENAI_API_KEY
-        )
-        self.embeddings = OpenAIEmbeddings(
-            api_key=settings.OPENAI_API_KEY
-        )
-        self.memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True
-        )
+        self.llm = get_chat_model("gpt-4", temperature=0.7)
 
-    def setup_qa_chain(self, documents: List[Document]) -> ConversationalRetrievalChain:
+    def setup_qa_chain(self, filters: RetrievalFilters) -> ConversationalRetrievalChain:
         """
         Configura a chain de QA com o contexto específico do ORACLO.
         """
@@ -279,14 +316,9 @@ class DocumentChatAPIView(APIView):
         Histórico da conversa: {chat_history}
         """
 
-        # Criar vetores de documentos
-        doc_contents = [
-            doc.content for doc in documents if doc.content
-        ]
-        vectorstore = FAISS.from_texts(
-            doc_contents,
-            self.embeddings
-        )
+        # Pesquisar os índices vetoriais persistidos (um por modelo de embedding),
+        # com os filtros do pedido
+        retriever = build_retriever(filters, search_type="similarity", k=3)
 
         # Configurar o prompt
         prompt = ChatPromptTemplate.from_messages([
@@ -297,10 +329,7 @@ class DocumentChatAPIView(APIView):
         # Criar e retornar a chain
         return ConversationalRetrievalChain.from_llm(
             llm=self.llm,
-            retriever=vectorstore.as_retriever(
-                search_kwargs={"k": 3}
-            ),
-            memory=self.memory,
+            retriever=retriever,
             combine_docs_chain_kwargs={"prompt": prompt},
             return_source_documents=True,
             verbose=True
@@ -309,10 +338,12 @@ class DocumentChatAPIView(APIView):
     def post(self, request, format=None):
         """
         Processa perguntas e mantém contexto da conversa.
+
+        O histórico fica no servidor, por sessão; cada pedido envia ao LLM apenas
+        o resumo e as trocas recentes que cabem no orçamento de tokens.
         """
         try:
             question = request.data.get('question')
-            chat_history = request.data.get('history', [])
             
             if not question:
                 return Response(
@@ -320,42 +351,43 @@ class DocumentChatAPIView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Buscar documentos processados
-            documents = Document.objects.filter(
-                status=Document.DocumentStatus.PROCESSED
-            ).select_related()
-            
+            try:
+                filters = RetrievalFilters.from_request_data(request.data)
+            except ValueError as e:
+                return Response(
+                    {'error': str(e)},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
             # Configurar e executar a chain
-            qa_chain = self.setup_qa_chain(documents)
+            qa_chain = self.setup_qa_chain(filters)
             
-            # Atualizar histórico do chat
-            for exchange in chat_history:
-                if isinstance(exchange, dict):
-                    self.memory.save_context(
-                        {"input": exchange.get('question', '')},
-                        {"output": exchange.get('answer', '')}
-                    )
+            # Histórico limitado da sessão
+            session_id = get_session_id(request)
+            key = conversation_key(request, session_id)
+            store = ConversationStore(summarizer=LLMSummarizer(self.llm))
+            store.seed(key, request.data.get('history', []))
 
             # Processar a pergunta
-            result = qa_chain({
-                "question": question,
-                "chat_history": chat_history
-            })
+            with timed('qa_chain'):
+                result = qa_chain({
+                    "question": question,
+                    "chat_history": store.prompt_history(key)
+                }, callbacks=chain_callbacks())
+            store.append(key, question, result['answer'])
             
             # Extrair fontes
-            sources = []
-            if hasattr(result, 'source_documents'):
-                sources = [
-                    {
-                        'title': doc.title,
-                        'type': doc.document_type,
-                        'id': doc.id
-                    } for doc in result.source_documents
-                ]
+            sources = [
+                {
+                    'title': doc.metadata.get('title'),
+                    'id': doc.metadata.get('document_id')
+                } for doc in result.get('source_documents', [])
+            ]
 
             response_data = {
                 'answer': result['answer'],
                 'sources': sources,
+                'session_id': session_id,
                 'confidence': 0.95  # Exemplo - pode ser calculado baseado no score de similaridade
             }
 
@@ -372,7 +404,7 @@ class DocumentChatAPIView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-class DocumentSearchAPIView(APIView):
+class DocumentSearchAPIView(ProfiledViewMixin, APIView):
     """
     API para pesquisa semântica em documentos.
     """
@@ -385,14 +417,25 @@ class DocumentSearchAPIView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
+            try:
+                filters = RetrievalFilters.from_request_data(request.data)
+            except ValueError as e:
+                return Response(
+                    {'error': str(e)},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
             processor = DocumentProcessor()
-            qa_chain = processor.setup_qa_chain(Document.objects.all())
+            qa_chain = processor.setup_qa_chain(filters=filters)
             
-            response = qa_chain.run(query)
+            with timed('qa_chain'):
+                response = qa_chain({"question": query, "chat_history": []}, callbacks=chain_callbacks())
             
             return Response({
-                'answer': response,
-                'sources': [doc.title for doc in response.source_documents]
+                'answer': response['answer'],
+                'sources': [
+                    doc.metadata.get('title') for doc in response.get('source_documents', [])
+                ]
             })
 
         except Exception as e:
@@ -401,7 +444,7 @@ class DocumentSearchAPIView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-class DocumentChatAPIView(APIView):
+class DocumentChatAPIView(ProfiledViewMixin, APIView):
     """
     API para interação conversacional com documentos.
     """
@@ -416,17 +459,35 @@ class DocumentChatAPIView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
+            try:
+                filters = RetrievalFilters.from_request_data(request.data)
+            except ValueError as e:
+                return Response(
+                    {'error': str(e)},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
             processor = DocumentProcessor()
-            qa_chain = processor.setup_qa_chain(Document.objects.all())
+            qa_chain = processor.setup_qa_chain(filters=filters)
+
+            session_id = get_session_id(request)
+            key = conversation_key(request, session_id)
+            store = ConversationStore(summarizer=LLMSummarizer(processor.llm))
+            store.seed(key, chat_history)
             
-            response = qa_chain({
-                "question": question,
-                "chat_history": chat_history
-            })
+            with timed('qa_chain'):
+                response = qa_chain({
+                    "question": question,
+                    "chat_history": store.prompt_history(key)
+                }, callbacks=chain_callbacks())
+            store.append(key, question, response['answer'])
             
             return Response({
                 'answer': response['answer'],
-                'sources': [doc.title for doc in response.get('source_documents', [])]
+                'sources': [
+                    doc.metadata.get('title') for doc in response.get('source_documents', [])
+                ],
+                'session_id': session_id
             })
 
         except Exception as e:
@@ -437,15 +498,31 @@ class DocumentChatAPIView(APIView):
 
 class CategoryListView(LoginRequiredMixin, ListView):
     """
-    Lista todas as categorias de documentos.
+    Lista todas as categorias de documentos, em árvore.
+
+    A árvore inteira, com o caminho de cada categoria e as contagens, sai de
+    uma consulta; a ordem é montada em memória.
     """
     model = DocumentCategory
     template_name = 'file_manager/category_list.html'
     context_object_name = 'categories'
 
+    def get_queryset(self):
+        return DocumentCategory.objects.annotate(document_count=Count('document_links'))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        categories = DocumentCategory.as_tree(context['categories'])
+        names = {category.pk: category.name for category in categories}
+        for category in categories:
+            category.ancestor_names = [names[pk] for pk in category.ancestor_ids if pk in names]
+        context['categories'] = context['object_list'] = categories
+        return context
+
 class CategoryDetailView(LoginRequiredMixin, DetailView):
     """
-    Exibe detalhes de uma categoria específica e seus documentos.
+    Exibe detalhes de uma categoria específica e os documentos de toda a sua
+    subárvore, num número fixo de consultas.
     """
     model = DocumentCategory
     template_name = 'file_manager/category_detail.html'
@@ -453,9 +530,16 @@ class CategoryDetailView(LoginRequiredMixin, DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['documents'] = Document.objects.filter(
-            categories=self.object
-        ).order_by('-created_at')
+        category = self.object
+        context['ancestors'] = category.get_ancestors()
+        context['subcategories'] = category.children.annotate(
+            document_count=Count('document_links')
+        ).order_by('name')
+        context['documents'] = list(
+            Document.objects.filter(subtree_q(category.path, 'categories__'))
+            .distinct()
+            .order_by('-created_at')
+        )
         return context
 
 class RegulationListView(LoginRequiredMixin, ListView):
@@ -466,6 +550,34 @@ class RegulationListView(LoginRequiredMixin, ListView):
     template_name = 'file_manager/regulation_list.html'
     context_object_name = 'regulations'
 
+    def get_queryset(self):
+        # O documento de cada regulamento vem na mesma consulta, sem o conteúdo
+        queryset = Regulation.objects.select_related('document').defer(
+            'document__content', 'document__metadata'
+        )
+
+        regulation_type = self.request.GET.get('type')
+        if regulation_type:
+            queryset = queryset.filter(regulation_type=regulation_type)
+
+        status = self.request.GET.get('status')
+        if status:
+            queryset = queryset.filter(status=status)
+
+        search_query = self.request.GET.get('q')
+        if search_query:
+            queryset = queryset.filter(Q(title__icontains=search_query) | Q(number__icontains=search_query))
+
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update({
+            'regulation_types': Regulation._meta.get_field('regulation_type').choices,
+            'regulation_statuses': Regulation._meta.get_field('status').choices,
+        })
+        return context
+
 class RegulationDetailView(LoginRequiredMixin, DetailView):
     """
     Exibe detalhes de um regulamento específico.
@@ -475,7 +587,7 @@ class RegulationDetailView(LoginRequiredMixin, DetailView):
     context_object_name = 'regulation'
 
 
-class DocumentChatAPIView(APIView):
+class DocumentChatAPIView(ProfiledViewMixin, APIView):
     """
     API para interação conversacional com documentos usando IA.
     """
@@ -490,24 +602,41 @@ class DocumentChatAPIView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
+            # Filtros de metadados (categoria, tipo, regulamento, datas)
+            try:
+                filters = RetrievalFilters.from_request_data(request.data)
+            except ValueError as e:
+                return Response(
+                    {'error': str(e)},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
             # Inicializar processador de documentos
             processor = DocumentProcessor()
 
-            # Buscar documentos relevantes
-            documents = Document.objects.filter(status=Document.DocumentStatus.PROCESSED)
-            
-            # Configurar e executar a chain de QA
-            qa_chain = processor.setup_qa_chain(documents)
+            # Configurar e executar a chain de QA sobre o índice filtrado
+            qa_chain = processor.setup_qa_chain(filters=filters)
+
+            # Memória da conversa no servidor, limitada por janela e orçamento de tokens
+            session_id = get_session_id(request)
+            key = conversation_key(request, session_id)
+            store = ConversationStore(summarizer=LLMSummarizer(processor.llm))
+            store.seed(key, chat_history)
             
             # Processar a pergunta
-            response = qa_chain({
-                "question": question,
-                "chat_history": chat_history
-            })
+            with timed('qa_chain'):
+                response = qa_chain({
+                    "question": question,
+                    "chat_history": store.prompt_history(key)
+                }, callbacks=chain_callbacks())
+            store.append(key, question, response['answer'])
             
             return Response({
                 'answer': response['answer'],
-                'sources': [doc.title for doc in response.get('source_documents', [])]
+                'sources': [
+                    doc.metadata.get('title') for doc in response.get('source_documents', [])
+                ],
+                'session_id': session_id
             })
 
         except Exception as e:
@@ -515,4 +644,263 @@ class DocumentChatAPIView(APIView):
             return Response(
                 {'error': 'Erro ao processar pergunta'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+
+def _upload_session_data(session: UploadSession) -> Dict[str, Any]:
+    return {
+        'id': str(session.token),
+        'filename': session.filename,
+        'size': session.total_size,
+        'offset': session.received_bytes,
+        'status': session.status,
+        'document_id': session.document_id,
+    }
+
+
+class UploadSessionCreateAPIView(APIView):
+    """
+    Abre um upload em partes: POST {filename, size, title?, sha256?}.
+
+    As partes são depois enviadas por ordem, com PUT e Content-Range, para
+    `api/uploads/<id>/`; o upload termina com POST em `api/uploads/<id>/complete/`.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, format=None):
+        try:
+            size = int(request.data.get('size', 0))
+            session = create_session(
+                filename=request.data.get('filename', ''),
+                total_size=size,
+                user=request.user,
+                title=request.data.get('title', ''),
+                expected_sha256=request.data.get('sha256', ''),
+            )
+        except (TypeError, ValueError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(_upload_session_data(session), status=status.HTTP_201_CREATED)
+
+
+class UploadSessionAPIView(APIView):
+    """
+    Estado (GET), envio de um intervalo de bytes (PUT) e cancelamento (DELETE)
+    de um upload em partes.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get_session(self, request, token):
+        return UploadSession.objects.filter(token=token, user=request.user).first()
+
+    def get(self, request, token, format=None):
+        session = self.get_session(request, token)
+        if session is None:
+            return Response({'error': 'Sessão de upload não encontrada'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(_upload_session_data(session), headers={'Upload-Offset': str(session.received_bytes)})
+
+    def put(self, request, token, format=None):
+        session = self.get_session(request, token)
+        if session is None:
+            return Response({'error': 'Sessão de upload não encontrada'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            start, end, total = parse_content_range(request.META.get('HTTP_CONTENT_RANGE'))
+            if total != session.total_size:
+                raise ValueError(f"Tamanho total diferente do anunciado ({session.total_size})")
+            if int(request.META.get('CONTENT_LENGTH') or 0) != end - start:
+                raise ValueError("Content-Length diferente do tamanho do intervalo")
+            # O corpo é lido em streaming, sem passar pela memória de uma só vez
+            session = append_range(
+                session, start, end, request.stream, request.META.get('HTTP_X_CHUNK_SHA256')
+            )
+        except OffsetMismatch as e:
+            return Response(
+                {'error': str(e), 'offset': e.offset},
+                status=status.HTTP_409_CONFLICT,
+                headers={'Upload-Offset': str(e.offset)}
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(_upload_session_data(session), headers={'Upload-Offset': str(session.received_bytes)})
+
+    def delete(self, request, token, format=None):
+        session = self.get_session(request, token)
+        if session is None:
+            return Response({'error': 'Sessão de upload não encontrada'}, status=status.HTTP_404_NOT_FOUND)
+        abort_session(session)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadSessionCompleteAPIView(ProfiledViewMixin, APIView):
+    """
+    Conclui um upload em partes: o arquivo montado é processado e o documento
+    devolvido. Pode ser repetido sem efeitos adicionais.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, token, format=None):
+        session = UploadSession.objects.filter(token=token, user=request.user).first()
+        if session is None:
+            return Response({'error': 'Sessão de upload não encontrada'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            document, created = complete_session(session)
+        except OffsetMismatch as e:
+            return Response({'error': str(e), 'offset': e.offset}, status=status.HTTP_409_CONFLICT)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response(
+                {'error': 'Erro ao processar o documento', 'details': str(e) if settings.DEBUG else None},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        return Response(
+            {**_upload_session_data(session), 'document_id': document.pk, 'duplicate': not created},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
+class IngestionAPIView(ProfiledViewMixin, APIView):
+    """
+    Ingestão em lote: POST multipart com vários `files` (PDF, DOCX ou arquivos
+    zip/tar, cujas entradas são lidas em streaming).
+
+    Responde logo com 202, o identificador do lote e um trabalho por arquivo; o
+    processamento decorre em paralelo e o estado consulta-se em
+    `api/ingestion/<lote>/`.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, format=None):
+        files = request.FILES.getlist('files')
+        if not files:
+            return Response({'error': 'Nenhum arquivo enviado'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            batch, jobs, rejected = receive_files(files, user=request.user)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        enqueue(jobs)
+
+        return Response(
+            {
+                'batch': str(batch),
+                'jobs': [{'id': job.pk, 'filename': job.filename} for job in jobs],
+                'rejected': rejected,
+            },
+            status=status.HTTP_202_ACCEPTED if jobs else status.HTTP_400_BAD_REQUEST
+        )
+
+
+class IngestionBatchAPIView(APIView):
+    """
+    Estado de um lote de ingestão numa só chamada: totais por estado e, por
+    trabalho, o estado, o documento criado e o erro.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, batch, format=None):
+        if not IngestionJob.objects.filter(batch=batch, user=request.user).exists():
+            return Response({'error': 'Lote não encontrado'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(batch_status(batch))
+
+
+def _feed_filters(params) -> Dict[str, Any]:
+    filters = {'document_ids': parse_ids(params.get('ids'))}
+    if params.get('batch'):
+        filters['batch'] = uuid.UUID(params['batch'])
+    return filters
+
+
+class DocumentStatusAPIView(APIView):
+    """
+    Status de vários documentos numa só consulta: GET ?ids=1,2,3.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, format=None):
+        try:
+            ids = parse_ids(request.query_params.get('ids'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if not ids:
+            return Response({'error': 'Indique os documentos em ids'}, status=status.HTTP_400_BAD_REQUEST)
+
+        statuses = document_statuses(ids)
+        return Response({
+            # O cursor atual permite seguir depois o feed sem perder alterações
+            'cursor': latest_cursor(),
+            'documents': statuses,
+            'missing': [pk for pk in ids if pk not in statuses],
+        })
+
+
+class DocumentEventsAPIView(APIView):
+    """
+    Feed de alterações em long-poll: GET ?cursor=N[&after=M][&ids=…|&batch=…][&timeout=s].
+
+    Responde assim que houver eventos posteriores ao cursor (ou, sem eventos,
+    ao fim do timeout) com os eventos, o cursor e o `after` a repetir no
+    pedido seguinte. Um evento pode vir em mais do que uma resposta; o
+    cliente ignora os `id` que já recebeu.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, format=None):
+        try:
+            cursor = int(request.query_params.get('cursor', 0))
+            after = int(request.query_params.get('after', cursor))
+            max_timeout = feed_config()['LONG_POLL_TIMEOUT']
+            timeout = min(float(request.query_params.get('timeout', max_timeout)), max_timeout)
+            filters = _feed_filters(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        events, cursor = wait_for_events(cursor, timeout=max(timeout, 0), after=after, **filters)
+        return Response({
+            'cursor': cursor,
+            'after': max([after] + [event['id'] for event in events]),
+            'events': events,
+        })
+
+
+class DocumentEventStreamView(View):
+    """
+    O mesmo feed em Server-Sent Events (EventSource), retomado com Last-Event-ID.
+    """
+    def get(self, request):
+        if not request.user.is_authenticated:
+            return HttpResponse(status=401)
+        try:
+            cursor = int(request.headers.get('Last-Event-ID') or request.GET.get('cursor', 0))
+            filters = _feed_filters(request.GET)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        response = StreamingHttpResponse(sse_stream(cursor, **filters), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Sem buffer no nginx: cada evento segue logo para o cliente
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class MetricsView(View):
+    """
+    Métricas do processo no formato de texto do Prometheus.
+    """
+    def get(self, request):
+        if not metrics_enabled():
+            raise Http404
+        token = getattr(settings, 'METRICS_TOKEN', None)
+        allowed = (
+            (token and request.headers.get('Authorization') == f'Bearer {token}')
+            or request.user.is_staff
+            or request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', [])
+        )
+        if not allowed:
+            # Sem token configurado, o endpoint não é anunciado
+            if token:
+                return HttpResponse(status=401, headers={'WWW-Authenticate': 'Bearer'})
+            raise Http404
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')